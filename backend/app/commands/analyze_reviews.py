@@ -0,0 +1,47 @@
+"""
+Analyze review text: sentiment and highlight phrases for new and edited
+reviews, then per-restaurant summaries for the owner dashboard and the AI
+assistant.
+
+    python -m app.commands.analyze_reviews              # one pass
+    python -m app.commands.analyze_reviews --watch      # keep going every REVIEW_ANALYSIS_SECONDS
+    python -m app.commands.analyze_reviews --all        # re-analyze every review
+"""
+import argparse
+import time
+from app.config import REVIEW_ANALYSIS_SECONDS
+from app.database import SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.services.review_insights import analyze_reviews, BATCH_SIZE
+
+
+def run_pass(batch_size: int, everything: bool = False, log=print):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        analyzed, summarized = analyze_reviews(db, batch_size=batch_size, everything=everything, log=log)
+        if analyzed or summarized:
+            print(f"Analyzed {analyzed} reviews and summarized {summarized} restaurants "
+                  f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze review text")
+    parser.add_argument("--watch", action="store_true", help=f"run every {REVIEW_ANALYSIS_SECONDS}s until stopped")
+    parser.add_argument("--all", action="store_true", help="re-analyze every review, not just new and edited ones")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    run_pass(args.batch_size, everything=args.all)
+    while args.watch:
+        time.sleep(REVIEW_ANALYSIS_SECONDS)
+        try:
+            run_pass(args.batch_size, log=lambda *_: None)
+        except Exception as e:
+            print(f"Review analysis failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Generate resized variants for every blob in upload storage and record the
+ones written on its media_blobs row — srcset only lists recorded variants.
+Blobs with nothing recorded (uploaded before variants were recorded, or
+whose background job failed) are regenerated. Uploads from before blobs/
+get theirs when migrate_uploads_to_blobs moves them.
+
+    python -m app.commands.backfill_images            # only missing variants
+    python -m app.commands.backfill_images --force    # regenerate all
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import os
+import time
+from app.database import engine, SessionLocal
+from app.models.media_blob import MediaBlob
+from app.services.images import store_variants, is_variant
+from app.services.blob_store import ALL_VARIANT_WIDTHS, BLOB_PREFIX, record_variants
+from app.services.storage import storage, url_from_key
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif')
+LEGACY_PREFIXES = ("restaurant_photos/", "profile_pics/")
+
+
+async def find_originals() -> tuple[list[str], int]:
+    """Every original blob, skipping files we generated, and how many older uploads are still outside blobs/"""
+    blobs = [
+        key for key in await storage.list_keys(BLOB_PREFIX)
+        if key.lower().endswith(IMAGE_EXTENSIONS) and not is_variant(key)
+    ]
+    legacy = 0
+    for prefix in LEGACY_PREFIXES:
+        legacy += sum(
+            1 for key in await storage.list_keys(prefix)
+            if key.lower().endswith(IMAGE_EXTENSIONS) and not is_variant(key)
+        )
+    return blobs, legacy
+
+
+def blobs_with_variants() -> set[str]:
+    with SessionLocal() as db:
+        return {digest for (digest,) in db.query(MediaBlob.hash).filter(MediaBlob.variants.isnot(None))}
+
+
+async def backfill(args):
+    keys, legacy = await find_originals()
+    print(f"Found {len(keys)} original images in {type(storage).__name__}")
+    if legacy:
+        print(f"  {legacy} older uploads outside blobs/ have no srcset until "
+              "python -m app.commands.migrate_uploads_to_blobs moves them")
+    recorded = await asyncio.to_thread(blobs_with_variants)
+
+    started = time.perf_counter()
+    written = failed = 0
+    sem = asyncio.Semaphore(args.workers * 2)  # keep every worker busy while others wait on storage
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        async def one(key):
+            nonlocal written, failed
+            async with sem:
+                try:
+                    digest = os.path.splitext(os.path.basename(key))[0]
+                    force = args.force or digest not in recorded
+                    # A blob may back a restaurant photo, a profile pic or both
+                    stored = await store_variants(key, ALL_VARIANT_WIDTHS, force, executor=pool)
+                    if stored:
+                        await asyncio.to_thread(record_variants, engine, url_from_key(key), stored)
+                    written += sum(len(by_width) for by_width in stored.values())
+                except Exception as e:
+                    failed += 1
+                    print(f"  skipped {key}: {e}")
+
+        await asyncio.gather(*(one(key) for key in keys))
+
+    elapsed = time.perf_counter() - started
+    print(f"Done! Wrote {written} variants in {elapsed:.1f}s ({failed} images failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill image variants for existing uploads")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--force", action="store_true", help="regenerate variants that already exist")
+    asyncio.run(backfill(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
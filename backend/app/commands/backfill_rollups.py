@@ -0,0 +1,32 @@
+"""
+Rebuild the day / week review rollups behind the owner trends endpoint from
+the reviews table. Run once after upgrading, or after loading reviews
+outside the API.
+
+    python -m app.commands.backfill_rollups                  # every restaurant
+    python -m app.commands.backfill_rollups --restaurant 42  # just these
+"""
+import argparse
+import time
+from app.database import SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.services.rollups import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild review rollups")
+    parser.add_argument("--restaurant", type=int, action="append", help="restaurant id (repeatable)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rebuilt = rebuild_rollups(db, args.restaurant)
+        db.commit()
+        print(f"Done! Rebuilt rollups for {rebuilt} restaurants in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
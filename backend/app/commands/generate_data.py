@@ -0,0 +1,265 @@
+"""
+Fill the database with synthetic users, owners, restaurants, reviews,
+favorites and preferences. The same --seed always produces the same data
+(on an empty database), so benchmark runs are comparable across commits.
+
+    python -m app.commands.generate_data --users 10000 --restaurants 2000 --reviews 200000
+
+Every generated account has the password "password123" and an email like
+user42@example.com (owners: owner7@example.com) so the load tests can log in.
+Restaurant popularity is skewed (a few get most of the reviews and favorites),
+the way real traffic is.
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, func
+import argparse
+import itertools
+import json
+import random
+import time
+from app.database import SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.models.favorite import Favorite
+from app.models.restaurant import Restaurant
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_preference import UserPreference
+from app.services.auth import hash_password
+from app.services.geohash import encode
+from app.services.attributes import to_bits
+from app.services.hours import rebuild_hours
+from app.services.ratings import recompute_ratings
+from app.services.rollups import rebuild_rollups
+
+GENERATED_PASSWORD = "password123"
+EMAIL_DOMAIN = "example.com"
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# (city, state, zip prefix, latitude, longitude of downtown)
+CITIES = [
+    ("San Jose", "CA", "951", 37.3382, -121.8863), ("San Francisco", "CA", "941", 37.7749, -122.4194),
+    ("Oakland", "CA", "946", 37.8044, -122.2712), ("Palo Alto", "CA", "943", 37.4419, -122.1430),
+    ("Seattle", "WA", "981", 47.6062, -122.3321), ("Portland", "OR", "972", 45.5152, -122.6784),
+    ("Austin", "TX", "787", 30.2672, -97.7431), ("Chicago", "IL", "606", 41.8781, -87.6298),
+    ("New York", "NY", "100", 40.7128, -74.0060), ("Boston", "MA", "021", 42.3601, -71.0589),
+]
+CITY_SPREAD_DEG = 0.08  # restaurants cluster within roughly 10 km of downtown
+CUISINES = [
+    "Italian", "Chinese", "Mexican", "Indian", "Japanese", "Thai", "American", "French",
+    "Korean", "Vietnamese", "Mediterranean", "Greek", "Spanish", "Ethiopian", "Vegan",
+]
+AMENITIES = ["wifi", "outdoor_seating", "delivery", "takeout", "reservations", "parking", "wheelchair_accessible"]
+TAGS = ["vegetarian", "vegan", "gluten_free", "halal", "casual", "romantic", "fine_dining", "family"]
+PRICE_TIERS = ["$", "$$", "$$$", "$$$$"]
+WEEK = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+HOURS = [
+    json.dumps({day: "11am-10pm" for day in WEEK}),
+    json.dumps({day: "11am-2:30pm, 5pm-10pm" for day in WEEK[1:]} | {"mon": "closed"}),
+    json.dumps({day: "6pm-2am" if day in ("fri", "sat") else "6pm-11pm" for day in WEEK}),   # open late
+    json.dumps({day: "7am-3pm" for day in WEEK}),
+    json.dumps({day: "open 24 hours" for day in WEEK}),
+]
+PRICE_WEIGHTS = [30, 45, 20, 5]
+NAME_PARTS = (
+    ["Golden", "Little", "Blue", "Rustic", "Urban", "Lucky", "Green", "Old Town", "Sunny", "Royal"],
+    ["Dragon", "Olive", "Table", "Kitchen", "Garden", "Spoon", "Lantern", "Harbor", "Oven", "Bowl"],
+)
+REVIEW_PHRASES = {
+    1: ["Terrible service.", "Food was cold.", "Would not come back."],
+    2: ["Pretty disappointing.", "Overpriced for what you get.", "Slow service."],
+    3: ["It was okay.", "Decent food, nothing special.", "Average experience."],
+    4: ["Really good food.", "Friendly staff.", "Would come back."],
+    5: ["Amazing!", "Best meal in town.", "Absolutely loved it."],
+}
+# Skews ratings towards 4 and 5, like real review sites
+RATING_WEIGHTS = [8, 10, 17, 33, 32]
+
+
+def _timestamp(rng: random.Random, max_days: int = 365) -> datetime:
+    return EPOCH + timedelta(seconds=rng.randrange(max_days * 86400))
+
+
+def _next_id(db, model) -> int:
+    return db.execute(select(func.coalesce(func.max(model.id), 0))).scalar() + 1
+
+
+def _insert_batches(db, model, rows, batch_size: int) -> int:
+    """Multi-row INSERTs of batch_size rows from an iterator, committing each batch"""
+    written = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        db.execute(insert(model), batch)
+        db.commit()
+        written += len(batch)
+    return written
+
+
+def _pick_distinct(rng: random.Random, population: range, cum_weights: list, k: int) -> set:
+    """k distinct ids drawn with the popularity skew"""
+    k = min(k, len(population))
+    picked = set()
+    while len(picked) < k:
+        picked.update(rng.choices(population, cum_weights=cum_weights, k=k - len(picked)))
+    return picked
+
+
+def generate(db, users: int, owners: int, restaurants: int, reviews: int, favorites: int,
+             seed: int = 42, batch_size: int = 2000, log=print) -> dict:
+    """Insert the synthetic data set and return how many rows of each kind were written"""
+    rng = random.Random(seed)
+    password_hash = hash_password(GENERATED_PASSWORD)
+    counts = {}
+
+    # --- Users and owners ---
+    first_user = _next_id(db, User)
+    owner_ids = range(first_user, first_user + owners)
+    user_ids = range(first_user + owners, first_user + owners + users)
+
+    def user_rows():
+        for user_id in itertools.chain(owner_ids, user_ids):
+            role = "owner" if user_id in owner_ids else "user"
+            city, state = rng.choice(CITIES)[:2]
+            yield {
+                "id": user_id,
+                "name": f"{role.title()} {user_id}",
+                "email": f"{role}{user_id}@{EMAIL_DOMAIN}",
+                "password_hash": password_hash,
+                "city": city,
+                "state": state,
+                "country": "United States",
+                "role": role,
+                "is_active": True,
+                "created_at": _timestamp(rng),
+            }
+
+    counts["users"] = _insert_batches(db, User, user_rows(), batch_size)
+    log(f"  {counts['users']} users ({owners} owners)")
+
+    # --- Preferences for about half of the users ---
+    def preference_rows():
+        for user_id in user_ids:
+            if rng.random() < 0.5:
+                dietary = rng.choice([None, "vegetarian", "vegan", "gluten-free"])
+                ambiance = rng.choice([None, "casual", "fine dining", "family"])
+                yield {
+                    "user_id": user_id,
+                    "cuisine_preferences": ",".join(rng.sample(CUISINES, rng.randint(1, 3))),
+                    "price_range": rng.choices(PRICE_TIERS, PRICE_WEIGHTS)[0],
+                    "preferred_location": rng.choice(CITIES)[0],
+                    "search_radius_km": rng.choice([5, 10, 25]),
+                    "dietary_needs": dietary,
+                    "ambiance": ambiance,
+                    "dietary_bits": to_bits(dietary),
+                    "ambiance_bits": to_bits(ambiance),
+                    "sort_preference": rng.choice(["rating", "distance", "popularity", "price"]),
+                }
+
+    counts["preferences"] = _insert_batches(db, UserPreference, preference_rows(), batch_size)
+    log(f"  {counts['preferences']} preferences")
+
+    # --- Restaurants, mostly owned ---
+    first_restaurant = _next_id(db, Restaurant)
+    restaurant_ids = range(first_restaurant, first_restaurant + restaurants)
+
+    def restaurant_rows():
+        for restaurant_id in restaurant_ids:
+            city, state, zip_prefix, city_lat, city_lng = rng.choice(CITIES)
+            lat = round(rng.gauss(city_lat, CITY_SPREAD_DEG / 2), 6)
+            lng = round(rng.gauss(city_lng, CITY_SPREAD_DEG / 2), 6)
+            cuisine = rng.choice(CUISINES)
+            owner_id = rng.choice(owner_ids) if owner_ids and rng.random() < 0.8 else None
+            amenities = ",".join(rng.sample(AMENITIES, rng.randint(0, 4)) + rng.sample(TAGS, rng.randint(0, 2))) or None
+            yield {
+                "id": restaurant_id,
+                "name": f"{rng.choice(NAME_PARTS[0])} {rng.choice(NAME_PARTS[1])} {restaurant_id}",
+                "cuisine_type": cuisine,
+                "description": f"{cuisine} food in {city}.",
+                "address": f"{rng.randint(1, 9999)} {rng.choice(['Main', 'Oak', 'First', 'Market'])} St",
+                "city": city,
+                "state": state,
+                "zip_code": f"{zip_prefix}{rng.randint(0, 99):02d}",
+                "phone": f"555-{rng.randint(0, 9999):04d}",
+                "hours": rng.choice(HOURS),
+                "price_tier": rng.choices(PRICE_TIERS, PRICE_WEIGHTS)[0],
+                "amenities": amenities,
+                "latitude": lat,
+                "longitude": lng,
+                "geohash": encode(lat, lng),
+                "attribute_bits": to_bits(amenities),
+                "avg_rating": 0.0,
+                "review_count": 0,
+                "is_claimed": owner_id is not None,
+                "owner_id": owner_id,
+                "created_at": _timestamp(rng),
+            }
+
+    counts["restaurants"] = _insert_batches(db, Restaurant, restaurant_rows(), batch_size)
+    counts["hours"] = rebuild_hours(db, after_id=first_restaurant - 1)
+    log(f"  {counts['restaurants']} restaurants ({counts['hours']} opening-hours intervals)")
+
+    # Popularity follows a power law — cumulative weights make choices() O(log n)
+    cum_weights = list(itertools.accumulate(rng.paretovariate(1.2) for _ in restaurant_ids))
+
+    # --- Reviews: one per (user, restaurant), spread unevenly over users ---
+    def per_user(total: int):
+        """How many of total each user gets — some users are far more active than others"""
+        if not user_ids:
+            return
+        activity = [rng.expovariate(1.0) for _ in user_ids]
+        scale = total / sum(activity)
+        for user_id, weight in zip(user_ids, activity):
+            yield user_id, round(weight * scale)
+
+    def review_rows():
+        for user_id, k in per_user(reviews):
+            for restaurant_id in sorted(_pick_distinct(rng, restaurant_ids, cum_weights, k)):
+                rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+                yield {
+                    "user_id": user_id,
+                    "restaurant_id": restaurant_id,
+                    "rating": rating,
+                    "comment": " ".join(rng.sample(REVIEW_PHRASES[rating], 2)),
+                    "created_at": _timestamp(rng),
+                }
+
+    counts["reviews"] = _insert_batches(db, Review, review_rows(), batch_size)
+    log(f"  {counts['reviews']} reviews")
+
+    def favorite_rows():
+        for user_id, k in per_user(favorites):
+            for restaurant_id in sorted(_pick_distinct(rng, restaurant_ids, cum_weights, k)):
+                yield {"user_id": user_id, "restaurant_id": restaurant_id, "created_at": _timestamp(rng)}
+
+    counts["favorites"] = _insert_batches(db, Favorite, favorite_rows(), batch_size)
+    log(f"  {counts['favorites']} favorites")
+
+    recompute_ratings(db, restaurant_ids)
+    rebuild_rollups(db, restaurant_ids)
+    db.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic data set")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--owners", type=int, default=50)
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=10000)
+    parser.add_argument("--favorites", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows per INSERT batch")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        counts = generate(db, args.users, args.owners, args.restaurants, args.reviews, args.favorites,
+                          seed=args.seed, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        print(f"Done! Wrote {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Bulk-load users, restaurants and reviews from JSON-lines or CSV files, e.g.
+the Yelp open dataset. Files are streamed in batches, so memory stays flat
+however large they are, and each batch is written with multi-row INSERTs.
+
+    python -m app.commands.import_data restaurants yelp_academic_dataset_business.json
+    python -m app.commands.import_data users yelp_academic_dataset_user.json
+    python -m app.commands.import_data reviews yelp_academic_dataset_review.json --batch-size 5000
+
+Progress is committed together with every batch, so re-running the same
+command after a failure picks up where it stopped. Import restaurants (and
+optionally users) before reviews: reviews are matched to them by their
+external ids, and reviewers that weren't imported get a placeholder account.
+avg_rating / review_count are recomputed once, after the last review batch.
+"""
+from datetime import datetime, timezone
+from itertools import islice
+from sqlalchemy import select, insert, text
+import argparse
+import csv
+import json
+import os
+import time
+import uuid
+from app.database import SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.models.import_job import ImportJob, ImportIdMap
+from app.models.restaurant import Restaurant
+from app.models.review import Review
+from app.models.user import User
+from app.services.auth import hash_password
+from app.services.geohash import encode
+from app.services.attributes import to_bits
+from app.services.hours import write_hours
+from app.services.ratings import recompute_ratings
+from app.services.rollups import rebuild_rollups
+from app.services.feed import mark_stale
+
+KINDS = ("users", "restaurants", "reviews")
+PRICE_TIERS = ("$", "$$", "$$$", "$$$$")
+
+# Yelp dataset attribute -> our amenities value
+YELP_AMENITIES = {
+    "WiFi": "wifi",
+    "OutdoorSeating": "outdoor_seating",
+    "RestaurantsDelivery": "delivery",
+    "RestaurantsTakeOut": "takeout",
+    "RestaurantsReservations": "reservations",
+    "WheelchairAccessible": "wheelchair_accessible",
+    "BusinessAcceptsCreditCards": "credit_cards",
+    "DogsAllowed": "dogs_allowed",
+}
+
+
+# --- Reading ---
+
+def read_records(path: str):
+    """Yield one dict per record, without loading the file"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(records, size: int):
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _first(record: dict, *names):
+    """The first non-empty field out of several possible column names"""
+    for name in names:
+        value = record.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _truncate(value, length: int):
+    return str(value)[:length] if value is not None else None
+
+
+def _parse_datetime(value):
+    if not value:
+        return datetime.now(timezone.utc)
+    return datetime.fromisoformat(str(value))
+
+
+# --- Converting records to rows ---
+
+def restaurant_row(record: dict) -> dict:
+    attributes = record.get("attributes") or {}
+    if isinstance(attributes, str):
+        attributes = json.loads(attributes)
+
+    categories = [c.strip() for c in (record.get("categories") or "").split(",") if c.strip()]
+    cuisine = _first(record, "cuisine_type") or next(
+        (c for c in categories if c not in ("Restaurants", "Food")), categories[0] if categories else None
+    )
+
+    price = _first(record, "price_tier")
+    if price is None and str(attributes.get("RestaurantsPriceRange2", "")).isdigit():
+        price = "$" * int(attributes["RestaurantsPriceRange2"])
+    if price not in PRICE_TIERS:
+        price = None
+
+    amenities = _first(record, "amenities")
+    if amenities is None:
+        # Yelp stores these as strings like "True" or "u'free'"
+        amenities = ",".join(
+            name for key, name in YELP_AMENITIES.items()
+            if str(attributes.get(key, "")).strip("u'") in ("True", "free", "paid")
+        ) or None
+
+    latitude, longitude = _first(record, "latitude"), _first(record, "longitude")
+    latitude = float(latitude) if latitude is not None else None
+    longitude = float(longitude) if longitude is not None else None
+
+    hours = record.get("hours")
+    if isinstance(hours, dict):
+        hours = json.dumps({day[:3].lower(): value for day, value in hours.items()})
+
+    return {
+        "name": _truncate(record.get("name") or "Unnamed", 200),
+        "cuisine_type": _truncate(cuisine, 100),
+        "description": record.get("description"),
+        "address": _truncate(record.get("address"), 300),
+        "city": _truncate(record.get("city"), 100),
+        "state": _truncate(record.get("state"), 50),
+        "zip_code": _truncate(_first(record, "zip_code", "postal_code"), 20),
+        "phone": _truncate(record.get("phone"), 20),
+        "email": _truncate(record.get("email"), 100),
+        "website": _truncate(record.get("website"), 200),
+        "hours": hours if hours and len(hours) <= 500 else None,
+        "price_tier": price,
+        "amenities": _truncate(amenities, 300),
+        "latitude": latitude,
+        "longitude": longitude,
+        "geohash": encode(latitude, longitude) if latitude is not None and longitude is not None else None,
+        "attribute_bits": to_bits(amenities),
+        "avg_rating": float(_first(record, "avg_rating", "stars") or 0.0),
+        "review_count": int(_first(record, "review_count") or 0),
+    }
+
+
+def user_row(record: dict, external_id: str, password_hash: str) -> dict:
+    return {
+        "name": _truncate(record.get("name") or "Yelp user", 100),
+        "email": _truncate(record.get("email") or f"{external_id}@import.invalid", 100),
+        "password_hash": password_hash,
+        "city": _truncate(record.get("city"), 100),
+        "role": "user",
+        "is_active": True,
+        "created_at": _parse_datetime(_first(record, "created_at", "yelping_since")),
+    }
+
+
+def review_row(record: dict, user_id: int, restaurant_id: int) -> dict:
+    rating = round(float(_first(record, "rating", "stars") or 0))
+    return {
+        "user_id": user_id,
+        "restaurant_id": restaurant_id,
+        "rating": min(max(rating, 1), 5),
+        "comment": _first(record, "comment", "text"),
+        "created_at": _parse_datetime(_first(record, "created_at", "date")),
+    }
+
+
+# --- Writing ---
+
+def lookup_ids(db, kind: str, external_ids) -> dict:
+    """external id -> our id for records imported earlier"""
+    if not external_ids:
+        return {}
+    rows = db.execute(
+        select(ImportIdMap.external_id, ImportIdMap.internal_id)
+        .where(ImportIdMap.kind == kind, ImportIdMap.external_id.in_(list(external_ids)))
+    )
+    return dict(rows.all())
+
+
+def insert_mapped(db, kind: str, model, rows_by_external_id: dict) -> dict:
+    """
+    Insert rows, letting the database number them, and write the external
+    id -> id mapping for them in the same batch.
+    """
+    if not rows_by_external_id:
+        return {}
+    external_ids = list(rows_by_external_id)
+    rows = list(rows_by_external_id.values())
+    dialect = db.get_bind().dialect
+    if dialect.insert_returning:
+        # SQLite / MariaDB / PostgreSQL: the ids come back in the order of the rows
+        statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+        ids = dict(zip(external_ids, db.execute(statement, rows).scalars()))
+    else:
+        # MySQL: one multi-row INSERT, which is a "simple insert" to InnoDB. It
+        # reserves the statement's whole run of AUTO_INCREMENT values at once
+        # (innodb_autoinc_lock_mode 0, 1 and 2 alike), so other inserts —
+        # API requests included — are numbered before or after it, never
+        # inside it. lastrowid is the first value, the rest follow
+        # auto_increment_increment apart.
+        result = db.execute(insert(model).values(rows))
+        if result.rowcount != len(rows):
+            raise RuntimeError(f"Inserted {result.rowcount} of {len(rows)} {kind}")
+        step = db.execute(text("SELECT @@auto_increment_increment")).scalar()
+        ids = {ext: result.lastrowid + i * step for i, ext in enumerate(external_ids)}
+
+    db.execute(insert(ImportIdMap), [
+        {"kind": kind, "external_id": ext, "internal_id": internal_id} for ext, internal_id in ids.items()
+    ])
+    return ids
+
+
+class Importer:
+    def __init__(self, db, kind: str):
+        self.db = db
+        self.kind = kind
+        self.skipped = 0
+        self.placeholder_users = 0
+        self._password_hash = None
+
+    @property
+    def password_hash(self) -> str:
+        # Imported accounts get a hash of a throwaway secret, so nobody can log in as them
+        if self._password_hash is None:
+            self._password_hash = hash_password(uuid.uuid4().hex)
+        return self._password_hash
+
+    def write(self, batch: list[dict]) -> int:
+        """Write one batch and return the number of rows inserted"""
+        return getattr(self, f"write_{self.kind}")(batch)
+
+    def _new_entities(self, kind: str, batch: list[dict], id_fields: tuple) -> dict:
+        """Records keyed by external id, minus ones imported already (or repeated in the batch)"""
+        by_id = {}
+        for record in batch:
+            external_id = _first(record, *id_fields)
+            if external_id is None:
+                self.skipped += 1
+            else:
+                by_id.setdefault(str(external_id), record)
+        known = lookup_ids(self.db, kind, by_id.keys())
+        return {ext: record for ext, record in by_id.items() if ext not in known}
+
+    def write_restaurants(self, batch: list[dict]) -> int:
+        new = self._new_entities("restaurants", batch, ("business_id", "id"))
+        rows = {ext: restaurant_row(record) for ext, record in new.items()}
+        ids = insert_mapped(self.db, "restaurants", Restaurant, rows)
+        write_hours(self.db, ((ids[ext], row["hours"], row["state"]) for ext, row in rows.items()))
+        return len(ids)
+
+    def write_users(self, batch: list[dict]) -> int:
+        new = self._new_entities("users", batch, ("user_id", "id"))
+        rows = {ext: user_row(record, ext, self.password_hash) for ext, record in new.items()}
+        return len(insert_mapped(self.db, "users", User, rows))
+
+    def write_reviews(self, batch: list[dict]) -> int:
+        restaurant_ids = lookup_ids(
+            self.db, "restaurants", {str(_first(r, "business_id", "restaurant_id")) for r in batch}
+        )
+        user_ids = lookup_ids(self.db, "users", {str(r.get("user_id")) for r in batch if r.get("user_id")})
+
+        missing_users = {}
+        for record in batch:
+            external_id = record.get("user_id")
+            if external_id and str(external_id) not in user_ids:
+                missing_users.setdefault(str(external_id), user_row({}, str(external_id), self.password_hash))
+        user_ids.update(insert_mapped(self.db, "users", User, missing_users))
+        self.placeholder_users += len(missing_users)
+
+        rows = []
+        for record in batch:
+            restaurant_id = restaurant_ids.get(str(_first(record, "business_id", "restaurant_id")))
+            user_id = user_ids.get(str(record.get("user_id")))
+            if restaurant_id is None or user_id is None:
+                self.skipped += 1
+                continue
+            rows.append(review_row(record, user_id, restaurant_id))
+        if rows:
+            self.db.execute(insert(Review), rows)
+        return len(rows)
+
+
+def get_job(db, kind: str, source: str, restart: bool) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.kind == kind, ImportJob.source == source).first()
+    if job is None:
+        job = ImportJob(kind=kind, source=source, records_done=0, rows_written=0, status="running")
+        db.add(job)
+    elif restart:
+        job.records_done, job.rows_written, job.status = 0, 0, "running"
+    db.commit()
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import users, restaurants or reviews")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path", help="JSON-lines file (one object per line) or CSV with a header row")
+    parser.add_argument("--batch-size", type=int, default=2000, help="records per INSERT batch")
+    parser.add_argument("--restart", action="store_true",
+                        help="start from the top instead of resuming (already-imported users and "
+                             "restaurants are skipped, reviews are inserted again)")
+    args = parser.parse_args()
+    source = os.path.abspath(args.path)
+
+    db = SessionLocal()
+    try:
+        job = get_job(db, args.kind, source, args.restart)
+        if job.status == "done":
+            print(f"{source} was already imported ({job.rows_written} rows) — use --restart to run it again")
+            return
+        if job.records_done:
+            print(f"Resuming after {job.records_done} records")
+
+        importer = Importer(db, args.kind)
+        records = islice(read_records(source), job.records_done, None)
+        started = last_report = time.perf_counter()
+        written = 0
+
+        try:
+            for batch in batches(records, args.batch_size):
+                rows = importer.write(batch)
+                job.records_done += len(batch)
+                job.rows_written += rows
+                db.commit()
+
+                written += rows
+                if time.perf_counter() - last_report >= 5:
+                    last_report = time.perf_counter()
+                    rate = written / (last_report - started)
+                    print(f"  {job.records_done} records read, {written} rows written ({rate:,.0f} rows/s)")
+        except Exception:
+            db.rollback()
+            print(f"Stopped after {job.records_done} records — re-run the same command to resume")
+            raise
+
+        if args.kind == "reviews":
+            print("Recomputing restaurant ratings and review rollups...")
+            recompute_ratings(db)
+            rebuild_rollups(db)
+        if args.kind != "users":
+            mark_stale(db, everyone=True)  # new users get a feed on the next refresh_feeds pass anyway
+        job.status = "done"
+        db.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"Done! Wrote {written} {args.kind} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s, "
+              f"{importer.skipped} records skipped, {importer.placeholder_users} placeholder users created)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
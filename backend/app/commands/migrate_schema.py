@@ -0,0 +1,138 @@
+"""
+Bring an existing database up to date with the models: create missing tables,
+add missing columns and indexes, then run data backfills for new columns.
+Safe to run repeatedly — only what's missing is created.
+
+    python -m app.commands.migrate_schema
+
+init_db only creates tables that don't exist yet, so databases loaded from
+yelp_db.sql (or created before a column was added) need this.
+"""
+from sqlalchemy import inspect, select, update, bindparam
+from sqlalchemy.schema import CreateColumn
+from app.database import engine, Base, SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.models.restaurant import Restaurant
+from app.models.restaurant_stats import RestaurantStats
+from app.models.review import Review
+from app.models.user_preference import UserPreference
+from app.services.geohash import encode
+from app.services.attributes import to_bits
+from app.services.hours import rebuild_hours
+from app.services.ratings import recompute_ratings
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_missing_schema() -> list[str]:
+    """Create whatever tables, columns and indexes the models have and the database doesn't"""
+    changes = []
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            table.create(bind=engine)
+            changes.append(f"created table {table.name}")
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                changes.append(f"added column {table.name}.{column.name}")
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                changes.append(f"created index {index.name}")
+    return changes
+
+
+def backfill_geohashes(db) -> int:
+    """Fill restaurants.geohash for rows that have coordinates but no hash yet"""
+    table = Restaurant.__table__
+    stmt = update(table).where(table.c.id == bindparam("restaurant_id")).values(geohash=bindparam("hash"))
+    filled = 0
+    while True:
+        rows = db.execute(
+            select(Restaurant.id, Restaurant.latitude, Restaurant.longitude)
+            .where(Restaurant.geohash.is_(None), Restaurant.latitude.isnot(None), Restaurant.longitude.isnot(None))
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return filled
+        db.execute(stmt, [
+            {"restaurant_id": restaurant_id, "hash": encode(lat, lng)} for restaurant_id, lat, lng in rows
+        ])
+        db.commit()
+        filled += len(rows)
+
+
+def backfill_attribute_bits(db) -> int:
+    """Convert the comma-separated amenities / dietary needs / ambiance of rows that have no bits yet"""
+    filled = 0
+    jobs = (
+        (Restaurant, Restaurant.attribute_bits, {"attribute_bits": Restaurant.amenities}),
+        (UserPreference, UserPreference.dietary_bits,
+         {"dietary_bits": UserPreference.dietary_needs, "ambiance_bits": UserPreference.ambiance}),
+    )
+    for model, marker, sources in jobs:
+        table = model.__table__
+        stmt = update(table).where(table.c.id == bindparam("row_id")).values(
+            {name: bindparam(f"new_{name}") for name in sources}
+        )
+        while True:
+            rows = db.execute(
+                select(model.id, *sources.values()).where(marker.is_(None)).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            db.execute(stmt, [
+                {"row_id": row_id, **{f"new_{name}": to_bits(text) for name, text in zip(sources, texts)}}
+                for row_id, *texts in rows
+            ])
+            db.commit()
+            filled += len(rows)
+    return filled
+
+
+def backfill_restaurant_stats(db) -> int:
+    """Fill restaurant_stats for restaurants with reviews but no stats row yet"""
+    filled = 0
+    while True:
+        restaurant_ids = db.execute(
+            select(Review.restaurant_id).distinct()
+            .outerjoin(RestaurantStats, RestaurantStats.restaurant_id == Review.restaurant_id)
+            .where(RestaurantStats.restaurant_id.is_(None))
+            .limit(BACKFILL_BATCH_SIZE)
+        ).scalars().all()
+        if not restaurant_ids:
+            return filled
+        recompute_ratings(db, restaurant_ids)
+        db.commit()
+        filled += len(restaurant_ids)
+
+
+def main():
+    changes = add_missing_schema()
+    for change in changes:
+        print(f"  {change}")
+
+    db = SessionLocal()
+    try:
+        filled = backfill_geohashes(db)
+        attributes = backfill_attribute_bits(db)
+        hours = rebuild_hours(db, missing_only=True)
+        db.commit()
+        stats = backfill_restaurant_stats(db)
+    finally:
+        db.close()
+    print(f"Done! {len(changes)} schema changes, {filled} restaurant geohashes, {attributes} attribute bitmasks, "
+          f"{hours} opening-hours intervals and {stats} rating stats filled in")
+
+
+if __name__ == "__main__":
+    main()
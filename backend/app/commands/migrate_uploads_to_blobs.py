@@ -0,0 +1,69 @@
+"""
+Move photos and profile pictures uploaded before content-addressed storage
+into blobs/, deduplicating identical files and updating their URLs. Each
+moved file gets its resized variants written and recorded on its blob, so
+its srcset lists them.
+
+    python -m app.commands.migrate_uploads_to_blobs
+"""
+import os
+import uuid
+import xxhash
+from app.database import SessionLocal, engine
+from app import models  # noqa: F401 — registers every model's mapper
+from app.models.restaurant_photo import RestaurantPhoto
+from app.models.user import User
+from app.services.blob_store import ALL_VARIANT_WIDTHS, TMP_DIR, acquire_blob, blob_key, is_blob_url, record_variants
+from app.services.images import store_variants, variant_keys
+from app.services.storage import storage, run_storage, key_from_url
+
+
+def migrate_file(db, url: str) -> tuple[str, int]:
+    """Returns the new blob URL and the number of bytes the move freed by deduplicating"""
+    key = key_from_url(url)
+    data = run_storage(storage.get, key)
+    digest = xxhash.xxh3_128_hexdigest(data)
+    ext = os.path.splitext(key)[1].lstrip(".").lower().replace("jpeg", "jpg")
+    existing = run_storage(storage.exists, blob_key(digest, ext))
+
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, f".{uuid.uuid4()}.part")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    new_url = acquire_blob(db, tmp_path, digest, ext, len(data))
+    run_storage(storage.delete_many, [key] + variant_keys(key, ALL_VARIANT_WIDTHS))
+    return new_url, len(data) if existing else 0
+
+
+def main():
+    db = SessionLocal()
+    moved = saved = missing = 0
+    try:
+        rows = [(p, "photo_url") for p in db.query(RestaurantPhoto).all()]
+        rows += [(u, "profile_pic") for u in db.query(User).filter(User.profile_pic.isnot(None)).all()]
+
+        for row, field in rows:
+            url = getattr(row, field)
+            if is_blob_url(url):
+                continue
+            if not run_storage(storage.exists, key_from_url(url)):
+                missing += 1
+                continue
+            new_url, freed = migrate_file(db, url)
+            setattr(row, field, new_url)
+            db.commit()
+            # After the commit: record_variants locks the blob row from its own session
+            written = run_storage(store_variants, key_from_url(new_url), ALL_VARIANT_WIDTHS)
+            if written:
+                record_variants(engine, new_url, written)
+            moved += 1
+            saved += freed
+    finally:
+        db.close()
+
+    print(f"Done! Moved {moved} files into blobs, freed {saved / (1024 * 1024):.1f} MB "
+          f"through deduplication ({missing} files were missing from storage)")
+
+
+if __name__ == "__main__":
+    main()
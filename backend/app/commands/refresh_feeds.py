@@ -0,0 +1,48 @@
+"""
+Rank personalized home feeds: users who don't have one yet, then the ones
+marked stale by preference, favorite, review or restaurant changes.
+
+    python -m app.commands.refresh_feeds              # one pass
+    python -m app.commands.refresh_feeds --watch      # keep going every FEED_REFRESH_SECONDS
+    python -m app.commands.refresh_feeds --all        # re-rank everyone (e.g. after changing the weights)
+"""
+import argparse
+import time
+from app.config import FEED_REFRESH_SECONDS
+from app.database import SessionLocal
+from app import models  # noqa: F401 — registers every model's mapper
+from app.services.feed import refresh_feeds, mark_stale, BATCH_SIZE
+
+
+def run_pass(batch_size: int, everyone: bool = False):
+    db = SessionLocal()
+    try:
+        if everyone:
+            mark_stale(db, everyone=True)
+            db.commit()
+        started = time.perf_counter()
+        ranked = refresh_feeds(db, batch_size=batch_size)
+        if ranked:
+            print(f"Ranked {ranked} feeds in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank personalized home feeds")
+    parser.add_argument("--watch", action="store_true", help=f"run every {FEED_REFRESH_SECONDS}s until stopped")
+    parser.add_argument("--all", action="store_true", help="mark every feed stale first")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    run_pass(args.batch_size, everyone=args.all)
+    while args.watch:
+        time.sleep(FEED_REFRESH_SECONDS)
+        try:
+            run_pass(args.batch_size)
+        except Exception as e:
+            print(f"Feed refresh failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,4 +5,86 @@ load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback_secret_key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+
+# Password hashing — bcrypt cost factor and the dedicated executor it runs on
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")  # "thread" or "process"
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 2))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", 64))  # waiting jobs before we answer 503
+
+# Uploaded images — resized variants are generated on a small background pool
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_FORMATS = [f.strip() for f in os.getenv("IMAGE_FORMATS", "webp,jpeg").split(",") if f.strip()]
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+
+# Where uploads live — "local" keeps them under UPLOAD_ROOT, "s3" uses any
+# S3-compatible store (AWS, or MinIO / moto_server locally) so several API
+# nodes can share them
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", "uploads")
+# Uploads still arriving — kept out of UPLOAD_ROOT (served at /uploads) but on
+# the same filesystem, so moving a finished one into place is a rename
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "uploads_tmp")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "http://localhost:9000")
+S3_BUCKET = os.getenv("S3_BUCKET", "yelp-uploads")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")  # set when the bucket is publicly readable, to redirect instead of proxy
+
+# Collaborative-filtering recommendations — the item-item model is refreshed
+# incrementally from new favorites/reviews and rebuilt from scratch now and then
+RECOMMENDER_NEIGHBORS = int(os.getenv("RECOMMENDER_NEIGHBORS", 50))  # similar restaurants kept per restaurant
+RECOMMENDER_REFRESH_SECONDS = int(os.getenv("RECOMMENDER_REFRESH_SECONDS", 60))
+RECOMMENDER_REBUILD_SECONDS = int(os.getenv("RECOMMENDER_REBUILD_SECONDS", 3600))
+
+# Personalized home feed — ranked per user by a background job and stored
+# precomputed, so serving it is a primary-key read
+FEED_SIZE = int(os.getenv("FEED_SIZE", 100))                 # restaurants kept per user
+FEED_REFRESH_SECONDS = int(os.getenv("FEED_REFRESH_SECONDS", 60))
+
+# Review text analysis — sentiment and highlight phrases, computed offline by
+# `python -m app.commands.analyze_reviews` for new and edited reviews
+REVIEW_ANALYSIS_SECONDS = int(os.getenv("REVIEW_ANALYSIS_SECONDS", 300))
+
+# Search facets — per-process in-memory index of cuisine / price / city /
+# amenity counts, updated by restaurant writes and refreshed from the database
+FACET_VALUES = int(os.getenv("FACET_VALUES", 20))                    # values returned per facet
+FACET_REFRESH_SECONDS = int(os.getenv("FACET_REFRESH_SECONDS", 30))  # picks up other workers' writes
+
+# Autocomplete — per-process in-memory prefix index of restaurant names,
+# cities and cuisines, kept in sync the same way as the facet index
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", 60))  # also picks up new ratings
+
+# Fuzzy name search (fuzzy=true) — per-process in-memory trigram index of
+# restaurant names, kept in sync the same way as the facet index
+FUZZY_MIN_SIMILARITY = float(os.getenv("FUZZY_MIN_SIMILARITY", 0.5))   # share of the search's trigrams a name must have
+FUZZY_MAX_MATCHES = int(os.getenv("FUZZY_MAX_MATCHES", 1000))          # best matches the other filters are applied to
+NAME_SEARCH_REFRESH_SECONDS = int(os.getenv("NAME_SEARCH_REFRESH_SECONDS", 30))
+
+# Opening hours — restaurants.hours is local time in the restaurant's state's
+# time zone; restaurants without a (US) state use this one
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles")
+
+# Search result cache — GET /restaurants responses keyed by their parameters
+# and version counters of the cities / cuisines they cover, which restaurant
+# and review writes bump. "memory" is a per-process LRU, "shared" a SQLite
+# file all workers on the host share, "off" disables it
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 5000))                # responses kept
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", 300))   # bounds staleness from unseen writes
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3")
+
+# Cross-worker cache invalidation — writes tell the other workers' in-memory
+# caches to evict or reload. "local" for a single worker, "unix" for every
+# worker on this host (Unix datagram sockets in INVALIDATION_SOCKET_DIR),
+# "broker" for pub/sub on INVALIDATION_CHANNEL (an in-process stand-in until
+# a real broker client is plugged into build_bus)
+INVALIDATION_BUS = os.getenv("INVALIDATION_BUS", "local")
+INVALIDATION_SOCKET_DIR = os.getenv("INVALIDATION_SOCKET_DIR", "/tmp/yelp-invalidation")
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "yelp-invalidation")
+
+# Batch lookups (GET /restaurants/batch, /users/batch, /users/me/favorites/status)
+# — most ids one request may ask for
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 100))
@@ -1,10 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, users, restaurants, reviews, favorites, owner, ai_assistant
+from app.services.auth import get_hashing_stats
+from app.services.recommendations import recommender
+from app.services.facets import facet_index
+from app.services.autocomplete import autocomplete
+from app.services.name_search import name_index
+from app.services.search_cache import search_cache
+from app.services.restaurant_index import warm_up_all
+from app.services.invalidation import bus
+from app.services.uploads import UploadSizeLimitMiddleware
+from app.services.etags import ConditionalGetMiddleware
+from app.services.blob_store import TMP_DIR
+from app.services.media import MediaFiles, StorageFiles
+from app.services.storage import storage, LocalStorage
+from app.database import engine
 import os
 
-app = FastAPI(title="Yelp Prototype API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the in-memory restaurant indexes in the background, before the first search needs them
+    warm_up_all(engine)
+    # Hear about other workers' writes
+    bus.start()
+    yield
+    bus.close()
+
+app = FastAPI(title="Yelp Prototype API", version="1.0.0", lifespan=lifespan)
+
+# ── Cap multipart upload size as the body streams in (added first so CORS wraps its 413) ──
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# ── Weak ETags and 304 Not Modified on GETs (inside CORS, so 304s carry its headers too) ──
+app.add_middleware(ConditionalGetMiddleware)
 
 # ── CORS — allow React frontend to talk to FastAPI ──
 app.add_middleware(
@@ -16,8 +46,14 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+os.makedirs(TMP_DIR, exist_ok=True)
+if isinstance(storage, LocalStorage):
+    os.makedirs(storage.root, exist_ok=True)
+    # Strong ETags, conditional GET, ranges, and immutable caching for content-addressed blobs
+    app.mount("/uploads", MediaFiles(directory=storage.root), name="uploads")
+else:
+    # Object store — redirect to the bucket or proxy with the same cache headers
+    app.mount("/uploads", StorageFiles(storage), name="uploads")
 
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -29,4 +65,32 @@ app.include_router(ai_assistant.router)
 
 @app.get("/")
 def root():
-    return {"message": "Yelp Prototype API is running!"}
\ No newline at end of file
+    return {"message": "Yelp Prototype API is running!"}
+
+@app.get("/metrics/password-hashing")
+def password_hashing_metrics():
+    return get_hashing_stats()
+
+@app.get("/metrics/recommender")
+def recommender_metrics():
+    return recommender.stats
+
+@app.get("/metrics/facets")
+def facet_metrics():
+    return facet_index.stats
+
+@app.get("/metrics/autocomplete")
+def autocomplete_metrics():
+    return autocomplete.stats
+
+@app.get("/metrics/name-search")
+def name_search_metrics():
+    return name_index.stats
+
+@app.get("/metrics/search-cache")
+def search_cache_metrics():
+    return {**search_cache.stats, "entries": len(search_cache.backend)}
+
+@app.get("/metrics/invalidation")
+def invalidation_metrics():
+    return bus.stats
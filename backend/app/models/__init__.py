@@ -6,4 +6,12 @@ from app.models.review import Review
 from app.models.favorite import Favorite
 from app.models.restaurant_photo import RestaurantPhoto
 from app.models.review_photo import ReviewPhoto
-from app.models.restaurant_claim import RestaurantClaim
\ No newline at end of file
+from app.models.restaurant_claim import RestaurantClaim
+from app.models.media_blob import MediaBlob
+from app.models.import_job import ImportJob, ImportIdMap
+from app.models.user_feed import UserFeed
+from app.models.restaurant_stats import RestaurantStats
+from app.models.review_rollup import ReviewRollup
+from app.models.review_insight import ReviewInsight
+from app.models.restaurant_insight import RestaurantInsight
+from app.models.restaurant_hours import RestaurantHours
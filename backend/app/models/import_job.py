@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    __table_args__ = (UniqueConstraint("kind", "source", name="uq_import_job_source"),)
+
+    id           = Column(Integer, primary_key=True, index=True)
+    kind         = Column(String(20), nullable=False)    # "users", "restaurants" or "reviews"
+    source       = Column(String(500), nullable=False)   # absolute path of the imported file
+    records_done = Column(BigInteger, nullable=False, default=0)  # records consumed, committed with each batch
+    rows_written = Column(BigInteger, nullable=False, default=0)
+    status       = Column(String(20), nullable=False, default="running")  # running / done
+    created_at   = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at   = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ImportIdMap(Base):
+    __tablename__ = "import_id_map"
+    __table_args__ = (UniqueConstraint("kind", "external_id", name="uq_import_id_map_external"),)
+
+    id          = Column(Integer, primary_key=True, index=True)
+    kind        = Column(String(20), nullable=False)   # "users" or "restaurants"
+    external_id = Column(String(64), nullable=False)   # e.g. a Yelp dataset business_id
+    internal_id = Column(Integer, nullable=False)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, select
+from sqlalchemy.sql import func
+from app.database import Base
+
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    id         = Column(Integer, primary_key=True, index=True)
+    hash       = Column(String(32), unique=True, nullable=False, index=True)  # xxh3-128 hex of the file bytes
+    ext        = Column(String(10), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    ref_count  = Column(Integer, nullable=False, default=1)  # photos / profile pics pointing at this blob
+    # JSON of the resized variants written so far, per format: asked width -> actual
+    # width (never wider than the original), e.g. {"webp": {"320": 320, "640": 500}}
+    variants   = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Blob URLs are "/uploads/blobs/a9/<hash>.<ext>" — where the hash starts (1-based, for SQL substr)
+BLOB_URL_PREFIX = "/uploads/blobs/"
+BLOB_URL_HASH_START = len(BLOB_URL_PREFIX + "a9/") + 1
+
+
+def variants_of(url_column):
+    """The variants recorded for the blob behind a URL column, as a correlated subquery"""
+    return select(MediaBlob.variants).where(
+        url_column.startswith(BLOB_URL_PREFIX),
+        MediaBlob.hash == func.substr(url_column, BLOB_URL_HASH_START, 32)
+    ).correlate_except(MediaBlob).scalar_subquery()
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Enum, Text, ForeignKey
+from sqlalchemy import event, Column, Integer, BigInteger, String, Float, Boolean, DateTime, Enum, Text, ForeignKey
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from app.database import Base
+from app.services.geohash import encode
+from app.services.attributes import to_bits
 
 class Restaurant(Base):
     __tablename__ = "restaurants"
@@ -20,16 +22,41 @@ class Restaurant(Base):
     hours        = Column(String(500), nullable=True)  # JSON string e.g. {"mon": "9am-10pm"}
     price_tier   = Column(Enum("$", "$$", "$$$", "$$$$"), nullable=True)
     amenities    = Column(String(300), nullable=True)  # e.g. "wifi,outdoor_seating"
+    attribute_bits = Column(BigInteger, nullable=True)  # amenities as bits, kept in sync below
+    latitude     = Column(Float, nullable=True)
+    longitude    = Column(Float, nullable=True)
+    geohash      = Column(String(12), nullable=True, index=True)  # kept in sync with lat/lng, see below
     avg_rating   = Column(Float, default=0.0)
-    review_count = Column(Integer, default=0)
+    review_count = Column(Integer, default=0, index=True)
     is_claimed   = Column(Boolean, default=False)
     owner_id     = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at   = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at   = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at   = Column(DateTime(timezone=True), onupdate=func.now(), index=True)  # in-memory index watermark
+    version      = Column(Integer, nullable=False, default=1, server_default="1",
+                          onupdate=literal_column("version + 1"))  # bumped by every UPDATE — the ETag of GETs
 
     # Relationships
     owner    = relationship("User", back_populates="restaurants")
     reviews  = relationship("Review", back_populates="restaurant")
     photos   = relationship("RestaurantPhoto", back_populates="restaurant")
     favorites = relationship("Favorite", back_populates="restaurant")
-    claims   = relationship("RestaurantClaim", back_populates="restaurant")
\ No newline at end of file
+    claims   = relationship("RestaurantClaim", back_populates="restaurant")
+
+
+# The geohash column is what radius / nearest searches use as their index.
+# Bulk loaders that insert through Core set it themselves.
+@event.listens_for(Restaurant, "before_insert")
+@event.listens_for(Restaurant, "before_update")
+def set_geohash(mapper, connection, target):
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = encode(target.latitude, target.longitude)
+    else:
+        target.geohash = None
+
+
+# Amenity / dietary / ambiance filters test attribute_bits (see
+# app.services.attributes). Bulk loaders set it themselves too.
+@event.listens_for(Restaurant, "before_insert")
+@event.listens_for(Restaurant, "before_update")
+def set_attribute_bits(mapper, connection, target):
+    target.attribute_bits = to_bits(target.amenities)
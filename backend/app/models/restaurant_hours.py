@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database import Base
+
+class RestaurantHours(Base):
+    __tablename__ = "restaurant_hours"
+    # "Open at" is one range scan per zone: its intervals opening by then
+    __table_args__ = (
+        Index("ix_restaurant_hours_open_at", "timezone", "open_minute", "close_minute", "restaurant_id"),
+    )
+
+    # restaurants.hours parsed into the weekly intervals it's open, in minutes
+    # from Monday 00:00 local time; intervals over Sunday midnight are split in two
+    id            = Column(Integer, primary_key=True)
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id", ondelete="CASCADE"), nullable=False, index=True)
+    timezone      = Column(String(40), nullable=False)   # the restaurant's, from its state
+    open_minute   = Column(Integer, nullable=False)      # 0 .. 10079
+    close_minute  = Column(Integer, nullable=False)      # exclusive, up to 10080
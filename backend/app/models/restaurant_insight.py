@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class RestaurantInsight(Base):
+    __tablename__ = "restaurant_insights"
+
+    # Review text sentiment and highlights per restaurant, summed from review_insights
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id", ondelete="CASCADE"), primary_key=True)
+    review_count  = Column(Integer, nullable=False, default=0)   # reviews analyzed
+    positive      = Column(Integer, nullable=False, default=0)
+    neutral       = Column(Integer, nullable=False, default=0)
+    negative      = Column(Integer, nullable=False, default=0)
+    avg_sentiment = Column(Float, nullable=True)
+    highlights    = Column(Text, nullable=True)   # JSON: [{"phrase", "mentions", "sentiment"}, ...]
+    updated_at    = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
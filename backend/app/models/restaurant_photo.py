@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.media_blob import variants_of
 
 class RestaurantPhoto(Base):
     __tablename__ = "restaurant_photos"
@@ -10,5 +11,7 @@ class RestaurantPhoto(Base):
     restaurant_id = Column(Integer, ForeignKey("restaurants.id"), nullable=False)
     photo_url     = Column(String(255), nullable=False)
     created_at    = Column(DateTime(timezone=True), server_default=func.now())
+    # Variants written for the photo's blob, for its srcset — load with undefer()
+    variants      = column_property(variants_of(photo_url), deferred=True)
 
     restaurant = relationship("Restaurant", back_populates="photos")
\ No newline at end of file
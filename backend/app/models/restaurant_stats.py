@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class RestaurantStats(Base):
+    __tablename__ = "restaurant_stats"
+
+    # Review counts per star rating, kept up to date on every review write
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id", ondelete="CASCADE"), primary_key=True)
+    rating_1      = Column(Integer, nullable=False, default=0)
+    rating_2      = Column(Integer, nullable=False, default=0)
+    rating_3      = Column(Integer, nullable=False, default=0)
+    rating_4      = Column(Integer, nullable=False, default=0)
+    rating_5      = Column(Integer, nullable=False, default=0)
+    updated_at    = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from app.database import Base
 
 class Review(Base):
     __tablename__ = "reviews"
+    # A restaurant's reviews, newest first, without a sort
+    __table_args__ = (Index("ix_reviews_restaurant_created", "restaurant_id", "created_at"),)
 
     id            = Column(Integer, primary_key=True, index=True)
     user_id       = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -12,7 +14,9 @@ class Review(Base):
     rating        = Column(Integer, nullable=False)   # 1 to 5
     comment       = Column(Text, nullable=True)
     created_at    = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at    = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at    = Column(DateTime(timezone=True), onupdate=func.now(), index=True)  # recommender watermark
+    version       = Column(Integer, nullable=False, default=1, server_default="1",
+                           onupdate=literal_column("version + 1"))  # bumped by every UPDATE, for ETags
 
     # Relationships
     user        = relationship("User", back_populates="reviews")
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ReviewInsight(Base):
+    __tablename__ = "review_insights"
+
+    # What the batch analyzer read out of one review's text
+    review_id         = Column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), primary_key=True)
+    restaurant_id     = Column(Integer, ForeignKey("restaurants.id", ondelete="CASCADE"), nullable=False, index=True)
+    sentiment         = Column(Float, nullable=False)          # -1 (negative) to 1 (positive)
+    label             = Column(String(8), nullable=False)      # positive / neutral / negative
+    phrases           = Column(String(500), nullable=False, default="")   # "|"-separated
+    version           = Column(Integer, nullable=False)        # analyzer version that produced the row
+    review_updated_at = Column(DateTime(timezone=True), nullable=True)    # reviews.updated_at when analyzed
+    analyzed_at       = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
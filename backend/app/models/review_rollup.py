@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from app.database import Base
+
+class ReviewRollup(Base):
+    __tablename__ = "review_rollups"
+
+    # One row per restaurant per day / week, keyed so a date range is one index range scan
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id", ondelete="CASCADE"), primary_key=True)
+    period        = Column(String(4), primary_key=True)   # "day" or "week" (weeks start on Monday)
+    bucket_start  = Column(Date, primary_key=True)
+    review_count  = Column(Integer, nullable=False, default=0)
+    rating_sum    = Column(Integer, nullable=False, default=0)
+    rating_1      = Column(Integer, nullable=False, default=0)
+    rating_2      = Column(Integer, nullable=False, default=0)
+    rating_3      = Column(Integer, nullable=False, default=0)
+    rating_4      = Column(Integer, nullable=False, default=0)
+    rating_5      = Column(Integer, nullable=False, default=0)
+    positive      = Column(Integer, nullable=False, default=0)   # 4–5 stars
+    neutral       = Column(Integer, nullable=False, default=0)   # 3 stars
+    negative      = Column(Integer, nullable=False, default=0)   # 1–2 stars
@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.media_blob import variants_of
 
 class User(Base):
     __tablename__ = "users"
@@ -22,6 +23,8 @@ class User(Base):
     is_active     = Column(Boolean, default=True)
     created_at    = Column(DateTime(timezone=True), server_default=func.now())
     updated_at    = Column(DateTime(timezone=True), onupdate=func.now())
+    # Variants written for the profile pic's blob, for its srcset
+    profile_pic_variants = column_property(variants_of(profile_pic), deferred=True)
 
     # Relationships
     reviews       = relationship("Review", back_populates="user")
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Index
+from app.database import Base
+
+class UserFeed(Base):
+    __tablename__ = "user_feeds"
+    __table_args__ = (Index("ix_user_feeds_city_stale", "city_key", "stale_at"),)
+
+    user_id        = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    city_key       = Column(String(100), nullable=False, default="")  # city the feed was ranked for, "" if none
+    restaurant_ids = Column(LargeBinary, nullable=False)   # ranked ids, packed little-endian uint32
+    computed_at    = Column(DateTime(timezone=True), nullable=False)
+    stale_at       = Column(DateTime(timezone=True), nullable=True, index=True)  # set when it needs re-ranking
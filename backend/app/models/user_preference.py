@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum
+from sqlalchemy import event, Column, Integer, BigInteger, String, ForeignKey, Enum
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import literal_column
 from app.database import Base
+from app.services.attributes import to_bits
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
@@ -13,7 +15,18 @@ class UserPreference(Base):
     search_radius_km    = Column(Integer, default=10)
     dietary_needs       = Column(String(300), nullable=True)   # e.g. "vegetarian,gluten-free"
     ambiance            = Column(String(300), nullable=True)   # e.g. "casual,fine dining"
+    dietary_bits        = Column(BigInteger, nullable=True)    # the two above as attribute bits, kept in sync below
+    ambiance_bits       = Column(BigInteger, nullable=True)
     sort_preference     = Column(Enum("rating", "distance", "popularity", "price"), default="rating")
+    version             = Column(Integer, nullable=False, default=1, server_default="1",
+                                 onupdate=literal_column("version + 1"))  # bumped by every UPDATE, for ETags
 
     # Relationship
-    user = relationship("User", back_populates="preferences")
\ No newline at end of file
+    user = relationship("User", back_populates="preferences")
+
+
+@event.listens_for(UserPreference, "before_insert")
+@event.listens_for(UserPreference, "before_update")
+def set_attribute_bits(mapper, connection, target):
+    target.dietary_bits = to_bits(target.dietary_needs)
+    target.ambiance_bits = to_bits(target.ambiance)
@@ -26,11 +26,17 @@ async def chat(
         for msg in payload.conversation_history
     ]
 
+    # Search around the user when the browser shared their position
+    location = None
+    if payload.latitude is not None and payload.longitude is not None:
+        location = (payload.latitude, payload.longitude)
+
     result = await process_chat(
         user_message=payload.message,
         conversation_history=history,
         user_id=current_user.id,
-        db=db
+        db=db,
+        location=location
     )
 
     return ChatResponse(
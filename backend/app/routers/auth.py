@@ -1,16 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserSignup, UserLogin, Token, UserResponse
-from app.services.auth import hash_password, verify_password, create_access_token
+from app.services.auth import (
+    hash_password_async, verify_and_update_password_async, create_access_token
+)
 from app.services.dependencies import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Signup and login are async so bcrypt runs on the hashing executor and the
+# DB calls hop onto the threadpool — neither holds a threadpool slot while hashing.
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-def signup(payload: UserSignup, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == payload.email).first()
+async def signup(payload: UserSignup, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == payload.email).first()
+    )
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -19,27 +26,43 @@ def signup(payload: UserSignup, db: Session = Depends(get_db)):
     new_user = User(
         name=payload.name,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         role=payload.role
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+
+    def save():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+
+    await run_in_threadpool(save)
 
     token = create_access_token(data={"sub": str(new_user.id)})
     return Token(access_token=token, role=new_user.role, user_id=new_user.id, name=new_user.name)
 
 
 @router.post("/login", response_model=Token)
-def login(payload: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == payload.email).first()
+    )
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password_async(payload.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
+
     token = create_access_token(data={"sub": str(user.id)})
-    return Token(access_token=token, role=user.role, user_id=user.id, name=user.name)
+    response = Token(access_token=token, role=user.role, user_id=user.id, name=user.name)
+
+    # Stored hash was made with a different bcrypt cost — swap in the re-hashed one
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
+    return response
 
 
 @router.get("/me", response_model=UserResponse)
@@ -6,10 +6,11 @@ from app.models.favorite import Favorite
 from app.models.restaurant import Restaurant
 from app.models.review import Review
 from app.models.user import User
-from app.schemas.favorite import FavoriteResponse
+from app.schemas.favorite import FavoriteResponse, FavoriteStatus, FavoriteStatusResponse
 from app.schemas.review import ReviewResponse
 from app.schemas.restaurant import RestaurantResponse
-from app.services.dependencies import get_current_user
+from app.services.dependencies import get_current_user, batch_ids
+from app.services.feed import mark_stale
 
 router = APIRouter(tags=["Favorites & History"])
 
@@ -50,6 +51,7 @@ def add_favorite(
         restaurant_id=restaurant_id
     )
     db.add(favorite)
+    mark_stale(db, user_ids=[current_user.id])
     db.commit()
     return {"message": "Restaurant added to favorites"}
 
@@ -76,6 +78,7 @@ def remove_favorite(
         )
 
     db.delete(favorite)
+    mark_stale(db, user_ids=[current_user.id])
     db.commit()
     return {"message": "Restaurant removed from favorites"}
 
@@ -92,6 +95,23 @@ def get_favorites(
     return favorites
 
 
+# --- Favorite Status of Many Restaurants ---
+# What a page of restaurant cards needs, instead of the whole favorites list
+@router.get("/users/me/favorites/status", response_model=FavoriteStatusResponse)
+def get_favorite_status(
+    ids: list[int] = Depends(batch_ids),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    saved = {rid for (rid,) in db.query(Favorite.restaurant_id).filter(
+        Favorite.user_id == current_user.id,
+        Favorite.restaurant_id.in_(ids)
+    )}
+    return FavoriteStatusResponse(
+        statuses=[FavoriteStatus(restaurant_id=i, is_favorite=i in saved) for i in ids]
+    )
+
+
 # --- Get User History ---
 # History = restaurants added by user + reviews written by user
 @router.get("/users/me/history")
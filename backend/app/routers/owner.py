@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
+from datetime import date, timedelta
 from app.database import get_db
 from app.models.restaurant import Restaurant
 from app.models.review import Review
 from app.models.user import User
 from app.models.restaurant_claim import RestaurantClaim
-from app.schemas.owner import ClaimRequest, ClaimResponse, OwnerDashboardResponse
+from app.schemas.owner import ClaimRequest, ClaimResponse, OwnerDashboardResponse, TrendResponse
 from app.schemas.restaurant import RestaurantResponse, RestaurantUpdate
 from app.schemas.review import ReviewResponse
 from app.services.dependencies import get_current_user, get_current_owner
+from app.services.feed import mark_stale
+from app.services.restaurant_index import restaurant_saved
+from app.services.ratings import rating_distribution
+from app.services.review_insights import restaurant_insight
+from app.services.rollups import trend, bucket_start, MAX_BUCKETS
+from app.services.serialization import ORJSONResponse, model_columns, model_rows
 
 router = APIRouter(prefix="/owner", tags=["Restaurant Owner"])
 
@@ -20,10 +27,10 @@ def get_owner_restaurants(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_owner)
 ):
-    restaurants = db.query(Restaurant).filter(
+    restaurants = db.query(*model_columns(RestaurantResponse, Restaurant)).filter(
         Restaurant.owner_id == current_user.id
-    ).all()
-    return restaurants
+    )
+    return ORJSONResponse(model_rows(RestaurantResponse, restaurants))
 
 
 # --- Update Owner's Restaurant Profile ---
@@ -45,12 +52,15 @@ def update_owner_restaurant(
             detail="Restaurant not found or you don't own it"
         )
 
+    old_city = restaurant.city
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(restaurant, field, value)
 
+    mark_stale(db, cities=[old_city, restaurant.city])
     db.commit()
     db.refresh(restaurant)
+    restaurant_saved(restaurant)
     return restaurant
 
 
@@ -104,6 +114,7 @@ def claim_restaurant(
 
     db.commit()
     db.refresh(claim)
+    restaurant_saved(restaurant)
     return claim
 
 
@@ -125,17 +136,12 @@ def get_restaurant_reviews(
             detail="Restaurant not found or you don't own it"
         )
 
-    reviews = db.query(Review).filter(
+    reviews = db.query(
+        *model_columns(ReviewResponse, Review, user_name=User.name)
+    ).outerjoin(User, User.id == Review.user_id).filter(
         Review.restaurant_id == restaurant_id
-    ).all()
-
-    result = []
-    for review in reviews:
-        response = ReviewResponse.model_validate(review)
-        response.user_name = review.user.name if review.user else None
-        result.append(response)
-
-    return result
+    )
+    return ORJSONResponse(model_rows(ReviewResponse, reviews))
 
 
 # --- Owner Dashboard ---
@@ -156,32 +162,39 @@ def get_owner_dashboard(
             detail="Restaurant not found or you don't own it"
         )
 
-    # Get all reviews
-    all_reviews = db.query(Review).filter(
-        Review.restaurant_id == restaurant_id
-    ).order_by(Review.created_at.desc()).all()
+    # Rating distribution — kept per restaurant in restaurant_stats
+    counts = rating_distribution(db, restaurant_id)
+    distribution = {str(stars): n for stars, n in counts.items()}
 
-    # Rating distribution
-    distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-    for review in all_reviews:
-        distribution[str(review.rating)] += 1
+    # Recent 5 reviews, with the author's name joined in
+    recent = db.query(
+        Review.id, Review.rating, Review.comment, Review.created_at, User.name
+    ).outerjoin(User, User.id == Review.user_id).filter(
+        Review.restaurant_id == restaurant_id
+    ).order_by(Review.created_at.desc()).limit(5).all()
 
-    # Recent 5 reviews
     recent_reviews = []
-    for review in all_reviews[:5]:
+    for review_id, rating, comment, created_at, user_name in recent:
         recent_reviews.append({
-            "review_id": review.id,
-            "user_name": review.user.name if review.user else "Anonymous",
-            "rating": review.rating,
-            "comment": review.comment,
-            "created_at": review.created_at
+            "review_id": review_id,
+            "user_name": user_name or "Anonymous",
+            "rating": rating,
+            "comment": comment,
+            "created_at": created_at
         })
 
-    # Sentiment summary
-    total = len(all_reviews)
-    positive = sum(1 for r in all_reviews if r.rating >= 4)
-    neutral = sum(1 for r in all_reviews if r.rating == 3)
-    negative = sum(1 for r in all_reviews if r.rating <= 2)
+    # Sentiment summary — from the review text once the analyzer has been
+    # through this restaurant's reviews, by star rating until then
+    total = sum(counts.values())
+    insight = restaurant_insight(db, restaurant_id)
+    if insight:
+        positive, neutral, negative = insight["positive"], insight["neutral"], insight["negative"]
+        analyzed = insight["review_count"]
+    else:
+        positive = counts[4] + counts[5]
+        neutral = counts[3]
+        negative = counts[1] + counts[2]
+        analyzed = total
 
     return {
         "restaurant_id": restaurant.id,
@@ -193,13 +206,65 @@ def get_owner_dashboard(
             "positive": positive,
             "neutral": neutral,
             "negative": negative,
-            "positive_pct": round(positive / total * 100, 1) if total > 0 else 0,
-            "negative_pct": round(negative / total * 100, 1) if total > 0 else 0
+            "positive_pct": round(positive / analyzed * 100, 1) if analyzed > 0 else 0,
+            "negative_pct": round(negative / analyzed * 100, 1) if analyzed > 0 else 0,
+            "source": "review_text" if insight else "rating",
+            "avg_sentiment": insight["avg_sentiment"] if insight else None
         },
+        "highlights": insight["highlights"] if insight else [],
         "recent_reviews": recent_reviews
     }
 
 
+# --- Rating Trends (day / week rollups) ---
+@router.get("/dashboard/{restaurant_id}/trends", response_model=TrendResponse)
+def get_rating_trends(
+    restaurant_id: int,
+    period: Literal["day", "week"] = Query("week", description="Bucket size"),
+    start: Optional[date] = Query(None, description="First day (default: 12 weeks / 30 days back); "
+                                                     "for weeks, the Monday on or before it"),
+    end: Optional[date] = Query(None, description="Last day (default: today); for weeks, the Sunday on or after it"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_owner)
+):
+    # Verify ownership
+    restaurant = db.query(Restaurant).filter(
+        Restaurant.id == restaurant_id,
+        Restaurant.owner_id == current_user.id
+    ).first()
+    if not restaurant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Restaurant not found or you don't own it"
+        )
+
+    end = end or date.today()
+    start = start or end - (timedelta(weeks=11) if period == "week" else timedelta(days=29))
+    if period == "week" and start <= end:
+        # Week buckets only count whole weeks, so widen the range to them; the
+        # response's start / end are the days its totals actually cover
+        start, end = bucket_start(start, "week"), bucket_start(end, "week") + timedelta(days=6)
+    buckets_asked = (end - start).days // (7 if period == "week" else 1) + 1
+    if start > end or buckets_asked > MAX_BUCKETS[period]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end, and at most {MAX_BUCKETS[period]} {period}s apart"
+        )
+
+    buckets = trend(db, restaurant_id, period, start, end)
+    total = sum(b["review_count"] for b in buckets)
+    rating_sum = sum(b["rating_sum"] for b in buckets)
+    return TrendResponse(
+        restaurant_id=restaurant_id,
+        period=period,
+        start=start,
+        end=end,
+        total_reviews=total,
+        avg_rating=round(rating_sum / total, 2) if total else None,
+        buckets=buckets
+    )
+
+
 # --- Get My Claims ---
 @router.get("/claims", response_model=List[ClaimResponse])
 def get_my_claims(
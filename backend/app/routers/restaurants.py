@@ -1,18 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-import shutil
-import uuid
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, undefer
 from sqlalchemy import or_
-from typing import Optional
+from typing import Optional, Literal
 from app.database import get_db
 from app.models.restaurant import Restaurant
+from app.models.restaurant_photo import RestaurantPhoto
+from app.models.review import Review
+from app.models.favorite import Favorite
 from app.models.user import User
 from app.schemas.restaurant import (
     RestaurantCreate, RestaurantUpdate,
-    RestaurantResponse, RestaurantListResponse
+    RestaurantResponse, RestaurantListResponse,
+    RecommendedRestaurant, RecommendationListResponse, AutocompleteResponse,
+    RestaurantDetailResponse, RestaurantPhotoResponse, ViewerStatus, RestaurantBatchResponse
 )
-from app.services.dependencies import get_current_user
+from app.schemas.review import ReviewResponse
+from app.services.dependencies import get_current_user, get_optional_user, batch_ids
+from app.services.uploads import receive_image_upload
+from app.services.blob_store import TMP_DIR, acquire_blob, release_blob, schedule_blob_variants
+from app.services.images import RESTAURANT_PHOTO_WIDTHS, build_srcset
+from app.services import geo
+from app.services.recommendations import recommender, with_restaurants
+from app.services.feed import mark_stale
+from app.services.facets import facet_index
+from app.services import attributes, hours
+from app.services.autocomplete import autocomplete, MAX_RESULTS
+from app.services.name_search import name_index
+from app.services.restaurant_index import restaurant_saved, restaurant_deleted
+from app.services.search_cache import search_cache, case_key
+from app.services.etags import weak_etag, not_modified
+from app.services.ratings import rating_distribution
+from app.services.serialization import ORJSONResponse, dumps, model_columns, model_rows
 import os
+import time
 
 router = APIRouter(prefix="/restaurants", tags=["Restaurants"])
 
@@ -29,8 +50,10 @@ def create_restaurant(
         owner_id=current_user.id
     )
     db.add(restaurant)
+    mark_stale(db, cities=[restaurant.city])
     db.commit()
     db.refresh(restaurant)
+    restaurant_saved(restaurant)
     return restaurant
 
 
@@ -38,28 +61,63 @@ def create_restaurant(
 @router.get("", response_model=RestaurantListResponse)
 def list_restaurants(
     name: Optional[str] = Query(None, description="Search by restaurant name"),
+    fuzzy: bool = Query(False, description="Typo-tolerant name search, best matches first"),
     cuisine_type: Optional[str] = Query(None, description="Filter by cuisine type"),
     city: Optional[str] = Query(None, description="Filter by city"),
     zip_code: Optional[str] = Query(None, description="Filter by zip code"),
     price_tier: Optional[str] = Query(None, description="Filter by price tier e.g. $, $$"),
     keywords: Optional[str] = Query(None, description="Search in description and amenities"),
+    amenities: Optional[str] = Query(None, description="Comma-separated amenities / dietary options / ambiance"),
+    amenities_match: Literal["all", "any"] = Query("all", description="Require all of the amenities, or any"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Search around this latitude"),
+    lng: Optional[float] = Query(None, ge=-180, le=180, description="Search around this longitude"),
+    radius_km: Optional[float] = Query(None, gt=0, le=geo.MAX_RADIUS_KM, description="Only restaurants within this distance"),
+    nearest: Optional[int] = Query(None, ge=1, le=100, description="Return the N nearest restaurants instead"),
+    open_now: bool = Query(False, description="Only restaurants open now, in their local time"),
+    open_at: Optional[str] = Query(None, description='Only restaurants open at a local day and time, e.g. "fri 22:30"'),
     skip: int = Query(0, description="Pagination offset"),
     limit: int = Query(10, description="Number of results per page"),
+    facets: bool = Query(False, description="Also count results per cuisine, price tier, city and amenity"),
     db: Session = Depends(get_db)
 ):
+    if (lat is None) != (lng is None) or ((radius_km or nearest) and lat is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Location searches need both lat and lng"
+        )
+
+    if open_at:
+        try:
+            open_minute = hours.parse_open_at(open_at)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Repeated searches are answered from the result cache with the JSON sent last time
+    cache_key = search_cache.key(
+        {"name": case_key(name), "fuzzy": fuzzy and bool(name), "cuisine_type": case_key(cuisine_type),
+         "city": case_key(city), "zip_code": zip_code, "price_tier": price_tier, "keywords": case_key(keywords),
+         "amenities": sorted(attributes.attribute_terms(amenities)) or None,
+         "amenities_match": amenities_match if amenities else None,
+         "lat": lat, "lng": lng, "radius_km": radius_km, "nearest": nearest,
+         "open_now": int(time.time() // 60) if open_now else None, "open_at": open_minute if open_at else None,
+         "skip": skip, "limit": limit, "facets": facets},
+        filters={"city": city, "cuisine": cuisine_type}, facets=facets
+    )
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     query = db.query(Restaurant)
 
-    # Apply filters
-    if name:
+    # Apply filters — first the ones facet counts are taken within
+    rank = None
+    if name and fuzzy:
+        rank = {rid: i for i, (rid, _) in enumerate(name_index.search(db, name))}
+        query = query.filter(Restaurant.id.in_(list(rank)))
+    elif name:
         query = query.filter(Restaurant.name.ilike(f"%{name}%"))
-    if cuisine_type:
-        query = query.filter(Restaurant.cuisine_type.ilike(f"%{cuisine_type}%"))
-    if city:
-        query = query.filter(Restaurant.city.ilike(f"%{city}%"))
     if zip_code:
         query = query.filter(Restaurant.zip_code == zip_code)
-    if price_tier:
-        query = query.filter(Restaurant.price_tier == price_tier)
     if keywords:
         query = query.filter(
             or_(
@@ -68,17 +126,109 @@ def list_restaurants(
                 Restaurant.cuisine_type.ilike(f"%{keywords}%")
             )
         )
+    if open_now:
+        query = query.filter(hours.open_now())
+    if open_at:
+        query = query.filter(hours.open_at(open_minute))
+    if lat is not None and not nearest:
+        query = geo.within_radius(query, lat, lng, radius_km or geo.DEFAULT_RADIUS_KM)
+    narrowed = bool(name or zip_code or keywords or open_now or open_at or lat is not None)
+    unfaceted = query
+
+    # ...then the facets themselves
+    facet_filters = {"cuisine_type": [cuisine_type] if cuisine_type else [],
+                     "price_tier": [price_tier] if price_tier else [],
+                     "city": [city] if city else [],
+                     "amenities": attributes.attribute_terms(amenities)}
+    if cuisine_type:
+        query = query.filter(Restaurant.cuisine_type.ilike(f"%{cuisine_type}%"))
+    if city:
+        query = query.filter(Restaurant.city.ilike(f"%{city}%"))
+    if price_tier:
+        query = query.filter(Restaurant.price_tier == price_tier)
+    if facet_filters["amenities"]:
+        query = query.filter(attributes.matches(
+            Restaurant.attribute_bits, Restaurant.amenities, facet_filters["amenities"], amenities_match
+        ))
+
+    # Results are rows of the response's columns, dumped straight to JSON
+    # (see services/serialization.py)
+    columns = model_columns(RestaurantResponse, Restaurant)
+    if lat is None and rank is not None:
+        # Fuzzy search — best matches first, among at most FUZZY_MAX_MATCHES
+        ids = sorted((rid for (rid,) in query.with_entities(Restaurant.id)), key=rank.get)
+        page = ids[skip:skip + limit]
+        by_id = {r["id"]: r for r in model_rows(
+            RestaurantResponse, db.query(*columns).filter(Restaurant.id.in_(page))
+        )}
+        total, results = len(ids), [by_id[rid] for rid in page]
+    elif lat is None:
+        total = query.count()
+        results = model_rows(RestaurantResponse, query.with_entities(*columns).offset(skip).limit(limit))
+    else:
+        # Location search — within a radius, or the N nearest — closest first
+        if nearest:
+            restaurants = geo.nearest(query, lat, lng, nearest).with_entities(*columns).order_by(
+                geo.distance_sq(lat, lng)
+            ).limit(nearest).all()
+            total = len(restaurants)
+            unfaceted = None   # the facets describe the N nearest
+        else:
+            total = query.count()
+            restaurants = query.with_entities(*columns).order_by(
+                geo.distance_sq(lat, lng)
+            ).offset(skip).limit(limit).all()
+
+        results = model_rows(RestaurantResponse, restaurants)
+        for result, restaurant in zip(results, restaurants):
+            result["distance_km"] = geo.distance_km(restaurant, lat, lng)
+
+    # Field for field what RestaurantListResponse would write
+    response = {"total": total, "restaurants": results, "facets": None}
+    if facets:
+        if unfaceted is None:
+            candidate_ids = [r.id for r in restaurants]
+        elif narrowed:
+            candidate_ids = [rid for (rid,) in unfaceted.with_entities(Restaurant.id)]
+        else:
+            candidate_ids = None
+        response["facets"] = facet_index.counts(db, facet_filters, candidate_ids, amenities_match)
+    body = dumps(response)
+    search_cache.put(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+
+# --- Autocomplete (declared before /{restaurant_id}) ---
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+def autocomplete_restaurants(
+    q: str = Query(..., description="What has been typed so far"),
+    limit: int = Query(5, ge=1, le=MAX_RESULTS, description="Suggestions per kind"),
+    db: Session = Depends(get_db)
+):
+    """Restaurant names, cities and cuisines starting with q — names by popularity and rating"""
+    return autocomplete.suggest(db, q, limit)
 
-    total = query.count()
-    restaurants = query.offset(skip).limit(limit).all()
 
-    return RestaurantListResponse(total=total, restaurants=restaurants)
+# --- Get Restaurants by IDs (declared before /{restaurant_id}) ---
+@router.get("/batch", response_model=RestaurantBatchResponse)
+def get_restaurants_by_ids(
+    ids: list[int] = Depends(batch_ids),
+    db: Session = Depends(get_db)
+):
+    """Many restaurants in one IN query, in the order of ids"""
+    by_id = {r.id: r for r in db.query(Restaurant).filter(Restaurant.id.in_(ids))}
+    return RestaurantBatchResponse(
+        restaurants=[by_id[i] for i in ids if i in by_id],
+        missing=[i for i in ids if i not in by_id]
+    )
 
 
 # --- Get Restaurant by ID ---
 @router.get("/{restaurant_id}", response_model=RestaurantResponse)
 def get_restaurant(
     restaurant_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     restaurant = db.query(Restaurant).filter(
@@ -90,9 +240,108 @@ def get_restaurant(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Restaurant not found"
         )
+
+    unchanged = not_modified(request, response, weak_etag("restaurant", restaurant.id, restaurant.version))
+    if unchanged:
+        return unchanged
     return restaurant
 
 
+# --- Restaurant Detail Page ---
+# Everything the detail page shows in one round trip, at a fixed number of
+# queries however many photos and reviews there are: the restaurant, its
+# photos, the rating histogram (restaurant_stats), the first page of reviews
+# joined to their authors' names, and for a signed-in caller whether it's a
+# favorite and their own review.
+@router.get("/{restaurant_id}/details", response_model=RestaurantDetailResponse)
+def get_restaurant_details(
+    restaurant_id: int,
+    review_limit: int = Query(20, ge=0, le=100, description="Reviews to include, newest first"),
+    db: Session = Depends(get_db),
+    viewer: Optional[User] = Depends(get_optional_user)
+):
+    restaurant = db.query(Restaurant).filter(
+        Restaurant.id == restaurant_id
+    ).first()
+    if not restaurant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Restaurant not found"
+        )
+    details = RestaurantResponse.model_validate(restaurant)
+
+    photos = db.query(RestaurantPhoto).options(undefer(RestaurantPhoto.variants)).filter(
+        RestaurantPhoto.restaurant_id == restaurant_id
+    ).all()
+
+    reviews = []
+    rows = db.query(Review, User.name).outerjoin(User, User.id == Review.user_id).filter(
+        Review.restaurant_id == restaurant_id
+    ).order_by(Review.created_at.desc(), Review.id.desc()).limit(review_limit)
+    for review, user_name in rows:
+        response = ReviewResponse.model_validate(review)
+        response.user_name = user_name
+        reviews.append(response)
+
+    viewer_status = None
+    if viewer is not None:
+        own_review = next((r for r in reviews if r.user_id == viewer.id), None)
+        if own_review is None:
+            review = db.query(Review).filter(
+                Review.restaurant_id == restaurant_id,
+                Review.user_id == viewer.id
+            ).first()
+            if review is not None:
+                own_review = ReviewResponse.model_validate(review)
+                own_review.user_name = viewer.name
+        is_favorite = db.query(Favorite.id).filter(
+            Favorite.restaurant_id == restaurant_id,
+            Favorite.user_id == viewer.id
+        ).first() is not None
+        viewer_status = ViewerStatus(is_favorite=is_favorite, review=own_review)
+
+    return RestaurantDetailResponse(
+        restaurant=details,
+        photos=[
+            RestaurantPhotoResponse(
+                id=p.id,
+                restaurant_id=p.restaurant_id,
+                photo_url=p.photo_url,
+                srcset=build_srcset(p.photo_url, RESTAURANT_PHOTO_WIDTHS, p.variants)
+            )
+            for p in photos
+        ],
+        rating_distribution={str(stars): n for stars, n in rating_distribution(db, restaurant_id).items()},
+        reviews=reviews,
+        viewer=viewer_status
+    )
+
+
+# --- Similar Restaurants ("people who liked this also liked") ---
+@router.get("/{restaurant_id}/similar", response_model=RecommendationListResponse)
+def get_similar_restaurants(
+    restaurant_id: int,
+    limit: int = Query(10, ge=1, le=50, description="Number of restaurants to return"),
+    db: Session = Depends(get_db)
+):
+    restaurant = db.query(Restaurant).filter(
+        Restaurant.id == restaurant_id
+    ).first()
+    if not restaurant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Restaurant not found"
+        )
+
+    scored = recommender.similar(db, restaurant_id, limit)
+    results = []
+    for match, score, source in with_restaurants(db, scored, limit, exclude={restaurant_id}):
+        response = RecommendedRestaurant.model_validate(match)
+        response.score, response.source = score, source
+        results.append(response)
+    return RecommendationListResponse(restaurants=results)
+
+
 # --- Update Restaurant ---
 @router.put("/{restaurant_id}", response_model=RestaurantResponse)
 def update_restaurant(
@@ -118,12 +367,15 @@ def update_restaurant(
             detail="You are not authorized to update this restaurant"
         )
 
+    old_city = restaurant.city
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(restaurant, field, value)
 
+    mark_stale(db, cities=[old_city, restaurant.city])
     db.commit()
     db.refresh(restaurant)
+    restaurant_saved(restaurant)
     return restaurant
 
 
@@ -151,8 +403,19 @@ def delete_restaurant(
             detail="You are not authorized to delete this restaurant"
         )
 
+    # Photos go with it — each drops its reference, so blobs nothing else uses are deleted
+    photos = db.query(RestaurantPhoto).filter(
+        RestaurantPhoto.restaurant_id == restaurant_id
+    ).all()
+    for photo in photos:
+        release_blob(db, photo.photo_url)
+        db.delete(photo)
+    db.flush()
+
     db.delete(restaurant)
+    mark_stale(db, cities=[restaurant.city])
     db.commit()
+    restaurant_deleted(restaurant_id)
     return {"message": "Restaurant deleted successfully"}
 
 
@@ -162,23 +425,26 @@ def get_my_restaurants(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    restaurants = db.query(Restaurant).filter(
+    restaurants = db.query(*model_columns(RestaurantResponse, Restaurant)).filter(
         Restaurant.owner_id == current_user.id
-    ).all()
-    return RestaurantListResponse(total=len(restaurants), restaurants=restaurants)
+    )
+    results = model_rows(RestaurantResponse, restaurants)
+    return ORJSONResponse({"total": len(results), "restaurants": results, "facets": None})
 
 # --- Upload Restaurant Photo ---
+# Async so the upload streams to disk without holding a threadpool worker;
+# the DB work hops onto the threadpool.
 @router.post("/{restaurant_id}/photos", status_code=status.HTTP_201_CREATED)
-def upload_restaurant_photo(
+async def upload_restaurant_photo(
     restaurant_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Check restaurant exists
-    restaurant = db.query(Restaurant).filter(
-        Restaurant.id == restaurant_id
-    ).first()
+    restaurant = await run_in_threadpool(
+        lambda: db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
+    )
     if not restaurant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -192,39 +458,36 @@ def upload_restaurant_photo(
             detail="Only the restaurant owner can upload photos"
         )
 
-    # Validate file extension
-    filename_lower = file.filename.lower()
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif']
-    if not any(filename_lower.endswith(ext) for ext in allowed_extensions):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only image files are allowed"
-        )
-
-    # Save file
-    upload_dir = f"uploads/restaurant_photos/{restaurant_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    ext = file.filename.split(".")[-1].lower()
-    filename = f"{uuid.uuid4()}.{ext}"
-    file_path = os.path.join(upload_dir, filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Save to DB
-    from app.models.restaurant_photo import RestaurantPhoto
-    photo = RestaurantPhoto(
-        restaurant_id=restaurant_id,
-        photo_url="/" + file_path.replace("\\", "/")
-    )
-    db.add(photo)
-    db.commit()
-    db.refresh(photo)
+    # Receive file — type is checked from its magic bytes and size is capped while streaming
+    tmp_path, ext, digest, size = await receive_image_upload(file, TMP_DIR)
+
+    # Store it content-addressed (identical images share one blob) and save to DB
+    def save():
+        try:
+            photo_url = acquire_blob(db, tmp_path, digest, ext, size)
+            photo = RestaurantPhoto(restaurant_id=restaurant_id, photo_url=photo_url)
+            db.add(photo)
+            restaurant.version = Restaurant.version + 1   # the photo list's ETag
+            db.commit()
+        except BaseException:
+            db.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        db.refresh(photo)
+        return photo
+
+    photo = await run_in_threadpool(save)
+
+    # Thumbnails are generated in the background; srcset lists each one once
+    # it's written and recorded on the blob
+    schedule_blob_variants(db, photo.photo_url, RESTAURANT_PHOTO_WIDTHS)
 
     return {
         "id": photo.id,
         "restaurant_id": photo.restaurant_id,
-        "photo_url": photo.photo_url
+        "photo_url": photo.photo_url,
+        "srcset": {}
     }
 
 
@@ -232,24 +495,38 @@ def upload_restaurant_photo(
 @router.get("/{restaurant_id}/photos")
 def get_restaurant_photos(
     restaurant_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    restaurant = db.query(Restaurant).filter(
+    # Uploading or deleting a photo bumps the restaurant's version, and so
+    # does recording a photo's variants, so it alone says whether the list
+    # changed. (Pre-blob photos' srcset also grows when backfill_images
+    # writes their variants; that shows on the next bump.)
+    version = db.query(Restaurant.version).filter(
         Restaurant.id == restaurant_id
-    ).first()
-    if not restaurant:
+    ).scalar()
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Restaurant not found"
         )
 
-    from app.models.restaurant_photo import RestaurantPhoto
-    photos = db.query(RestaurantPhoto).filter(
+    unchanged = not_modified(request, response, weak_etag("photos", restaurant_id, version))
+    if unchanged:
+        return unchanged
+
+    photos = db.query(RestaurantPhoto).options(undefer(RestaurantPhoto.variants)).filter(
         RestaurantPhoto.restaurant_id == restaurant_id
     ).all()
 
     return [
-        {"id": p.id, "photo_url": p.photo_url, "restaurant_id": p.restaurant_id}
+        {
+            "id": p.id,
+            "photo_url": p.photo_url,
+            "restaurant_id": p.restaurant_id,
+            "srcset": build_srcset(p.photo_url, RESTAURANT_PHOTO_WIDTHS, p.variants)
+        }
         for p in photos
     ]
 
@@ -277,7 +554,6 @@ def delete_restaurant_photo(
             detail="Only the restaurant owner can delete photos"
         )
 
-    from app.models.restaurant_photo import RestaurantPhoto
     photo = db.query(RestaurantPhoto).filter(
         RestaurantPhoto.id == photo_id,
         RestaurantPhoto.restaurant_id == restaurant_id
@@ -289,11 +565,10 @@ def delete_restaurant_photo(
             detail="Photo not found"
         )
 
-    # Delete file from disk
-    file_path = photo.photo_url.lstrip("/")
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # Drop our reference — the file itself goes once no other photo or profile pic uses it
+    release_blob(db, photo.photo_url)
 
     db.delete(photo)
+    restaurant.version = Restaurant.version + 1   # the photo list's ETag
     db.commit()
     return {"message": "Photo deleted successfully"}
\ No newline at end of file
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from app.database import get_db
 from app.models.review import Review
 from app.models.restaurant import Restaurant
 from app.models.user import User
 from app.schemas.review import ReviewCreate, ReviewUpdate, ReviewResponse
 from app.services.dependencies import get_current_user
+from app.services.etags import weak_etag, not_modified
+from app.services.feed import mark_stale
+from app.services.ratings import record_review_change
+from app.services.restaurant_index import restaurant_saved
+from app.services.rollups import record_review
+from app.services.serialization import ORJSONResponse, model_columns, model_rows
 from typing import List
 
 router = APIRouter(tags=["Reviews"])
@@ -53,20 +60,18 @@ def create_review(
     )
     db.add(review)
 
-    # Update restaurant avg_rating and review_count
-    all_reviews = db.query(Review).filter(
-        Review.restaurant_id == restaurant_id
-    ).all()
-    new_count = len(all_reviews) + 1
-    new_avg = (
-        sum(r.rating for r in all_reviews) + payload.rating
-    ) / new_count
+    # Update restaurant avg_rating and review_count, and the day / week rollups
+    record_review_change(db, restaurant, new_rating=payload.rating)
+    db.flush()
+    record_review(db, restaurant_id, review.created_at, new_rating=payload.rating)
 
-    restaurant.review_count = new_count
-    restaurant.avg_rating = round(new_avg, 2)
+    # Re-rank this user's feed and feeds in the restaurant's city
+    mark_stale(db, user_ids=[current_user.id], cities=[restaurant.city])
 
     db.commit()
     db.refresh(review)
+    # New rating — autocomplete ranks by it, in this worker and the others
+    restaurant_saved(restaurant)
 
     # Add user name to response
     response = ReviewResponse.model_validate(review)
@@ -81,28 +86,42 @@ def create_review(
 )
 def get_reviews(
     restaurant_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    restaurant = db.query(Restaurant).filter(
+    restaurant_version = db.query(Restaurant.version).filter(
         Restaurant.id == restaurant_id
-    ).first()
-    if not restaurant:
+    ).scalar()
+    if restaurant_version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Restaurant not found"
         )
 
-    reviews = db.query(Review).filter(
+    # Versions, without loading the reviews: a new or deleted review changes
+    # review_count and so bumps the restaurant's version, an edit bumps its
+    # own (so the sum only grows between those), and a renamed author moves
+    # their updated_at.
+    review_versions, authors_updated = db.query(
+        func.coalesce(func.sum(Review.version), 0), func.max(User.updated_at)
+    ).outerjoin(User, User.id == Review.user_id).filter(
         Review.restaurant_id == restaurant_id
-    ).all()
-
-    result = []
-    for review in reviews:
-        response = ReviewResponse.model_validate(review)
-        response.user_name = review.user.name if review.user else None
-        result.append(response)
+    ).one()
+    etag = weak_etag("reviews", restaurant_id, restaurant_version, review_versions, authors_updated)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+
+    # Just the response's columns, authors' names in the same query, and
+    # the rows dumped straight to JSON (see services/serialization.py)
+    reviews = db.query(
+        *model_columns(ReviewResponse, Review, user_name=User.name)
+    ).outerjoin(User, User.id == Review.user_id).filter(
+        Review.restaurant_id == restaurant_id
+    ).order_by(Review.created_at.desc(), Review.id.desc())
 
-    return result
+    return ORJSONResponse(model_rows(ReviewResponse, reviews), headers={"etag": etag})
 
 
 # --- Update Review (own only) ---
@@ -135,25 +154,23 @@ def update_review(
             detail="You can only edit your own reviews"
         )
 
+    old_rating = review.rating
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(review, field, value)
 
-    db.commit()
-
     # Recalculate avg rating
-    restaurant = db.query(Restaurant).filter(
-        Restaurant.id == restaurant_id
-    ).first()
-    all_reviews = db.query(Review).filter(
-        Review.restaurant_id == restaurant_id
-    ).all()
-    if all_reviews:
-        restaurant.avg_rating = round(
-            sum(r.rating for r in all_reviews) / len(all_reviews), 2
-        )
+    if review.rating != old_rating:
+        restaurant = db.query(Restaurant).filter(
+            Restaurant.id == restaurant_id
+        ).first()
+        record_review_change(db, restaurant, old_rating=old_rating, new_rating=review.rating)
+        record_review(db, restaurant_id, review.created_at, old_rating=old_rating, new_rating=review.rating)
+        mark_stale(db, cities=[restaurant.city])
     db.commit()
     db.refresh(review)
+    if review.rating != old_rating:
+        restaurant_saved(restaurant)
 
     response = ReviewResponse.model_validate(review)
     response.user_name = current_user.name
@@ -195,17 +212,13 @@ def delete_review(
     restaurant = db.query(Restaurant).filter(
         Restaurant.id == restaurant_id
     ).first()
-    remaining_reviews = db.query(Review).filter(
-        Review.restaurant_id == restaurant_id,
-        Review.id != review_id
-    ).all()
+    record_review_change(db, restaurant, old_rating=review.rating)
+    record_review(db, restaurant_id, review.created_at, old_rating=review.rating)
 
-    restaurant.review_count = len(remaining_reviews)
-    restaurant.avg_rating = round(
-        sum(r.rating for r in remaining_reviews) / len(remaining_reviews), 2
-    ) if remaining_reviews else 0.0
+    mark_stale(db, user_ids=[current_user.id], cities=[restaurant.city])
 
     db.commit()
+    restaurant_saved(restaurant)
     return {"message": "Review deleted successfully"}
 
 
@@ -215,14 +228,7 @@ def get_my_reviews(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    reviews = db.query(Review).filter(
+    reviews = db.query(*model_columns(ReviewResponse, Review)).filter(
         Review.user_id == current_user.id
-    ).all()
-
-    result = []
-    for review in reviews:
-        response = ReviewResponse.model_validate(review)
-        response.user_name = current_user.name
-        result.append(response)
-
-    return result
\ No newline at end of file
+    )
+    return ORJSONResponse(model_rows(ReviewResponse, reviews, user_name=current_user.name))
\ No newline at end of file
@@ -1,20 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, undefer
 from app.database import get_db
 from app.models.user import User
 from app.models.user_preference import UserPreference
-from app.schemas.user import UserProfileUpdate, UserResponse
+from app.models.restaurant import Restaurant
+from app.schemas.user import UserProfileUpdate, UserResponse, UserSummaryListResponse
 from app.schemas.preference import PreferenceUpdate, PreferenceResponse
-from app.services.dependencies import get_current_user
-import shutil
+from app.schemas.restaurant import RecommendedRestaurant, RecommendationListResponse, RestaurantListResponse
+from app.services.dependencies import get_current_user, batch_ids
+from app.services.images import PROFILE_PIC_WIDTHS
+from app.services.uploads import receive_image_upload
+from app.services.blob_store import TMP_DIR, acquire_blob, release_blob, schedule_blob_variants
+from app.services.recommendations import recommend_for_user
+from app.services.feed import build_feeds, get_feed, mark_stale
+from app.services.invalidation import bus
+from app.services.etags import weak_etag, not_modified
 import os
-import uuid
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-UPLOAD_DIR = "uploads/profile_pics"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 
 # --- Get Profile ---
 @router.get("/profile", response_model=UserResponse)
@@ -22,6 +27,21 @@ def get_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+# --- Public Summaries of Many Users ---
+@router.get("/batch", response_model=UserSummaryListResponse)
+def get_user_summaries(
+    ids: list[int] = Depends(batch_ids),
+    db: Session = Depends(get_db)
+):
+    """Names and profile pictures for a list of users, in one IN query and the order of ids"""
+    users = db.query(User).options(undefer(User.profile_pic_variants)).filter(User.id.in_(ids))
+    by_id = {u.id: u for u in users}
+    return UserSummaryListResponse(
+        users=[by_id[i] for i in ids if i in by_id],
+        missing=[i for i in ids if i not in by_id]
+    )
+
+
 # --- Update Profile ---
 @router.put("/profile", response_model=UserResponse)
 def update_profile(
@@ -34,55 +54,54 @@ def update_profile(
     for field, value in update_data.items():
         setattr(current_user, field, value)
 
+    # The profile city ranks the feed when preferences don't name one
+    if "city" in update_data:
+        mark_stale(db, user_ids=[current_user.id])
+
     db.commit()
     db.refresh(current_user)
+    bus.publish("user", id=current_user.id, changed="profile")
     return current_user
 
 
 # --- Upload Profile Picture ---
+# Async so the upload streams to disk without holding a threadpool worker
 @router.post("/profile/picture", response_model=UserResponse)
-def upload_profile_picture(
+async def upload_profile_picture(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Print for debugging
-    print(f"Uploaded file: {file.filename}, content_type: {file.content_type}")
-
-    # Validate by file extension (more reliable than content_type)
-    filename_lower = file.filename.lower()
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif']
-    if not any(filename_lower.endswith(ext) for ext in allowed_extensions):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only JPEG, PNG, WebP, GIF and AVIF images are allowed"
-        )
-
-    # Generate unique filename
-    ext = file.filename.split(".")[-1].lower()
-    filename = f"{uuid.uuid4()}.{ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-
-    # Save file to disk
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Delete old profile pic if exists
-    if current_user.profile_pic:
-        old_path = current_user.profile_pic.lstrip("/")
-        if os.path.exists(old_path):
-            os.remove(old_path)
-
-    # Save path to DB
-    current_user.profile_pic = "/" + file_path.replace("\\", "/")
-    db.commit()
-    db.refresh(current_user)
+    # Receive file — type is checked from its magic bytes and size is capped while streaming
+    tmp_path, ext, digest, size = await receive_image_upload(file, TMP_DIR)
+
+    # Point the profile at the content-addressed blob and release the old picture,
+    # which is only deleted from disk if nothing else uses it
+    def save():
+        try:
+            old_pic = current_user.profile_pic
+            current_user.profile_pic = acquire_blob(db, tmp_path, digest, ext, size)
+            release_blob(db, old_pic)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        db.refresh(current_user)
+
+    await run_in_threadpool(save)
+    bus.publish("user", id=current_user.id, changed="profile")
+
+    schedule_blob_variants(db, current_user.profile_pic, PROFILE_PIC_WIDTHS)
     return current_user
 
 
 # --- Get Preferences ---
 @router.get("/preferences", response_model=PreferenceResponse)
 def get_preferences(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -95,6 +114,10 @@ def get_preferences(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No preferences found. Please set your preferences first."
         )
+
+    unchanged = not_modified(request, response, weak_etag("preferences", prefs.id, prefs.version))
+    if unchanged:
+        return unchanged
     return prefs
 
 
@@ -118,7 +141,46 @@ def update_preferences(
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(prefs, field, value)
+    db.flush()
+
+    # Re-rank the home feed now so the change shows on the next page load
+    build_feeds(db, [current_user.id])
 
     db.commit()
     db.refresh(prefs)
-    return prefs
\ No newline at end of file
+    bus.publish("user", id=current_user.id, changed="preferences")
+    return prefs
+
+
+# --- Personal Recommendations ---
+@router.get("/me/recommendations", response_model=RecommendationListResponse)
+def get_recommendations(
+    limit: int = Query(10, ge=1, le=50, description="Number of restaurants to return"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    results = []
+    for restaurant, score, source in recommend_for_user(db, current_user.id, limit):
+        response = RecommendedRestaurant.model_validate(restaurant)
+        response.score, response.source = score, source
+        results.append(response)
+    return RecommendationListResponse(restaurants=results)
+
+
+# --- Personalized Home Feed ---
+# Ranked ahead of time (see app/services/feed.py), so this reads one row
+# plus the page of restaurants it points at
+@router.get("/me/feed", response_model=RestaurantListResponse)
+def get_my_feed(
+    skip: int = Query(0, ge=0, description="Pagination offset"),
+    limit: int = Query(10, ge=1, le=50, description="Number of results per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    ranked = get_feed(db, current_user.id)
+    page = [int(restaurant_id) for restaurant_id in ranked[skip:skip + limit]]
+    by_id = {r.id: r for r in db.query(Restaurant).filter(Restaurant.id.in_(page)).all()} if page else {}
+    return RestaurantListResponse(
+        total=len(ranked),
+        restaurants=[by_id[restaurant_id] for restaurant_id in page if restaurant_id in by_id]
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 class ChatMessage(BaseModel):
@@ -8,6 +8,8 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     conversation_history: list[ChatMessage] = []
+    latitude: Optional[float] = Field(None, ge=-90, le=90)    # the user's position, if the browser shared it
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class RestaurantCard(BaseModel):
     id: int
@@ -20,6 +22,9 @@ class RestaurantCard(BaseModel):
     description: Optional[str] = None
     address: Optional[str] = None
     phone: Optional[str] = None
+    distance_km: Optional[float] = None
+    recommended: bool = False     # from the user's collaborative-filtering recommendations
+    highlights: list[str] = []    # phrases reviewers mention most, from the review text analysis
 
 class ChatResponse(BaseModel):
     response: str
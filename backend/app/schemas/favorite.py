@@ -10,4 +10,12 @@ class FavoriteResponse(BaseModel):
     restaurant: RestaurantResponse
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Favorite status of many restaurants at once, in the order asked ---
+class FavoriteStatus(BaseModel):
+    restaurant_id: int
+    is_favorite: bool
+
+class FavoriteStatusResponse(BaseModel):
+    statuses: list[FavoriteStatus]
\ No newline at end of file
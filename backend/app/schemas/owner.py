@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 class ClaimRequest(BaseModel):
     restaurant_id: int
@@ -22,4 +22,20 @@ class OwnerDashboardResponse(BaseModel):
     total_reviews: int
     avg_rating: float
     recent_reviews: list
-    rating_distribution: dict  # e.g. {"1": 0, "2": 1, "3": 2, "4": 5, "5": 10}
\ No newline at end of file
+    rating_distribution: dict  # e.g. {"1": 0, "2": 1, "3": 2, "4": 5, "5": 10}
+
+class TrendBucket(BaseModel):
+    bucket_start: date
+    review_count: int
+    avg_rating: Optional[float] = None   # None for buckets with no reviews
+    rating_distribution: dict            # e.g. {"1": 0, "2": 0, "3": 1, "4": 2, "5": 4}
+    sentiment: dict                      # {"positive": .., "neutral": .., "negative": ..}
+
+class TrendResponse(BaseModel):
+    restaurant_id: int
+    period: str
+    start: date                          # the days counted — for weeks, widened to Monday .. Sunday
+    end: date
+    total_reviews: int
+    avg_rating: Optional[float] = None
+    buckets: list[TrendBucket]
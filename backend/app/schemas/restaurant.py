@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from enum import Enum
+from app.schemas.review import ReviewResponse
 
 class PriceTierEnum(str, Enum):
     one = "$"
@@ -23,6 +24,8 @@ class RestaurantCreate(BaseModel):
     hours: Optional[str] = None        # e.g. '{"mon": "9am-10pm", "tue": "9am-10pm"}'
     price_tier: Optional[PriceTierEnum] = None
     amenities: Optional[str] = None   # e.g. "wifi,outdoor_seating,parking"
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 # --- Update Restaurant ---
 class RestaurantUpdate(BaseModel):
@@ -39,6 +42,8 @@ class RestaurantUpdate(BaseModel):
     hours: Optional[str] = None
     price_tier: Optional[PriceTierEnum] = None
     amenities: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 # --- Restaurant Response ---
 class RestaurantResponse(BaseModel):
@@ -56,6 +61,9 @@ class RestaurantResponse(BaseModel):
     hours: Optional[str] = None
     price_tier: Optional[str] = None
     amenities: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    distance_km: Optional[float] = None   # set on location searches
     avg_rating: float = 0.0
     review_count: int = 0
     is_claimed: bool = False
@@ -67,4 +75,56 @@ class RestaurantResponse(BaseModel):
 # --- Restaurant List Response (for search results) ---
 class RestaurantListResponse(BaseModel):
     total: int
-    restaurants: list[RestaurantResponse]
\ No newline at end of file
+    restaurants: list[RestaurantResponse]
+    # With facets=true, counts per value of cuisine_type, price_tier, city and
+    # amenities, e.g. {"cuisine_type": [{"value": "Italian", "count": 12}, ...], ...}
+    facets: Optional[dict] = None
+
+# --- Batch Lookup (in the order asked; ids that don't exist are listed in missing) ---
+class RestaurantBatchResponse(BaseModel):
+    restaurants: list[RestaurantResponse]
+    missing: list[int]
+
+# --- Restaurant Detail Page (everything it shows, in one response) ---
+class RestaurantPhotoResponse(BaseModel):
+    id: int
+    restaurant_id: int
+    photo_url: str
+    srcset: dict   # e.g. {"webp": "/uploads/..._w320.webp 320w, ..."}
+
+class ViewerStatus(BaseModel):
+    is_favorite: bool = False
+    review: Optional[ReviewResponse] = None   # the caller's own review, wherever it falls in the list
+
+class RestaurantDetailResponse(BaseModel):
+    restaurant: RestaurantResponse
+    photos: list[RestaurantPhotoResponse]
+    rating_distribution: dict          # e.g. {"1": 0, "2": 1, "3": 2, "4": 5, "5": 10}
+    reviews: list[ReviewResponse]      # newest first, the first review_limit of restaurant.review_count
+    viewer: Optional[ViewerStatus] = None   # only when signed in
+
+# --- Autocomplete ---
+class AutocompleteRestaurant(BaseModel):
+    id: int
+    name: str
+    city: Optional[str] = None
+    cuisine_type: Optional[str] = None
+    avg_rating: float = 0.0
+    review_count: int = 0
+
+class AutocompleteValue(BaseModel):
+    value: str
+    count: int   # restaurants with this city / cuisine
+
+class AutocompleteResponse(BaseModel):
+    restaurants: list[AutocompleteRestaurant]
+    cities: list[AutocompleteValue]
+    cuisines: list[AutocompleteValue]
+
+# --- Recommended Restaurant (similar restaurants / personal recommendations) ---
+class RecommendedRestaurant(RestaurantResponse):
+    score: float = 0.0
+    source: str = "collaborative"   # "collaborative" or "popular" (no signal yet)
+
+class RecommendationListResponse(BaseModel):
+    restaurants: list[RecommendedRestaurant]
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, computed_field
 from typing import Optional
 from enum import Enum
+from app.services.images import PROFILE_PIC_WIDTHS, build_srcset
 
 class RoleEnum(str, Enum):
     user = "user"
@@ -66,6 +67,33 @@ class UserResponse(BaseModel):
     languages: Optional[str] = None
     gender: Optional[str] = None
     profile_pic: Optional[str] = None
+    profile_pic_variants: Optional[str] = Field(None, exclude=True)   # what srcset may list
+
+    @computed_field
+    @property
+    def profile_pic_srcset(self) -> dict:
+        return build_srcset(self.profile_pic, PROFILE_PIC_WIDTHS, self.profile_pic_variants)
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Public User Summary (what other users may see — no email or phone) ---
+class UserSummary(BaseModel):
+    id: int
+    name: str
+    city: Optional[str] = None
+    country: Optional[str] = None
+    profile_pic: Optional[str] = None
+    profile_pic_variants: Optional[str] = Field(None, exclude=True)   # what srcset may list
+
+    @computed_field
+    @property
+    def profile_pic_srcset(self) -> dict:
+        return build_srcset(self.profile_pic, PROFILE_PIC_WIDTHS, self.profile_pic_variants)
+
+    class Config:
+        from_attributes = True
+
+class UserSummaryListResponse(BaseModel):
+    users: list[UserSummary]   # in the order asked
+    missing: list[int]
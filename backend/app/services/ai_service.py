@@ -4,6 +4,10 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from sqlalchemy.orm import Session
 from app.models.user_preference import UserPreference
 from app.models.restaurant import Restaurant
+from app.services import geo
+from app.services.recommendations import recommender, load_interactions
+from app.services.review_insights import highlights_for
+from app.services import attributes, hours
 from sqlalchemy import or_
 import os
 from dotenv import load_dotenv
@@ -14,6 +18,9 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL    = os.getenv("OLLAMA_MODEL", "llama3.2:latest")
 TAVILY_API_KEY  = os.getenv("TAVILY_API_KEY")
 
+RECOMMENDATION_CANDIDATES = 50   # personal recommendations checked against the chat filters
+RECOMMENDED_IN_CHAT       = 2    # at most this many of the 5 results come from them
+
 # Initialize Ollama
 llm = ChatOllama(
     model=OLLAMA_MODEL,
@@ -43,7 +50,8 @@ def get_user_preferences(user_id: int, db: Session) -> dict:
         "preferred_location":  prefs.preferred_location or "any",
         "dietary_needs":       prefs.dietary_needs or "none",
         "ambiance":            prefs.ambiance or "any",
-        "sort_preference":     prefs.sort_preference or "rating"
+        "sort_preference":     prefs.sort_preference or "rating",
+        "search_radius_km":    prefs.search_radius_km or geo.DEFAULT_RADIUS_KM
     }
 
 
@@ -51,6 +59,9 @@ def search_restaurants(db: Session, filters: dict) -> list:
     """Search restaurants in the database based on extracted filters"""
     query = db.query(Restaurant)
 
+    # Only these restaurants (e.g. the user's collaborative-filtering picks)
+    if filters.get("candidate_ids") is not None:
+        query = query.filter(Restaurant.id.in_(filters["candidate_ids"]))
     if filters.get("cuisine_type"):
         query = query.filter(
             Restaurant.cuisine_type.ilike(f"%{filters['cuisine_type']}%")
@@ -63,6 +74,24 @@ def search_restaurants(db: Session, filters: dict) -> list:
         query = query.filter(
             Restaurant.price_tier == filters["price_tier"]
         )
+    if filters.get("amenities"):
+        wanted = filters["amenities"]
+        if isinstance(wanted, str):
+            wanted = attributes.attribute_terms(wanted)
+        query = query.filter(attributes.matches(
+            Restaurant.attribute_bits, Restaurant.amenities, wanted,
+            "any" if filters.get("amenities_match") == "any" else "all"
+        ))
+
+    # Time-aware questions: "open now", "open late on Friday"
+    if filters.get("open_now"):
+        query = query.filter(hours.open_now())
+    if filters.get("open_at"):
+        try:
+            query = query.filter(hours.open_at(hours.parse_open_at(str(filters["open_at"]))))
+        except ValueError:
+            pass   # not a day and time — ignore it rather than fail the chat
+
     if filters.get("keywords"):
         kw = filters["keywords"]
         query = query.filter(
@@ -74,12 +103,20 @@ def search_restaurants(db: Session, filters: dict) -> list:
             )
         )
 
+    # Around the user's location, when the client sent one
+    lat, lng = filters.get("latitude"), filters.get("longitude")
+    if lat is not None and lng is not None:
+        radius_km = min(float(filters.get("radius_km") or geo.DEFAULT_RADIUS_KM), geo.MAX_RADIUS_KM)
+        query = geo.within_radius(query, lat, lng, radius_km)
+
     # Sort results
     sort_by = filters.get("sort_by", "rating")
-    if sort_by == "rating":
-        query = query.order_by(Restaurant.avg_rating.desc())
+    if sort_by == "distance" and lat is not None and lng is not None:
+        query = query.order_by(geo.distance_sq(lat, lng))
     elif sort_by == "popularity":
         query = query.order_by(Restaurant.review_count.desc())
+    else:
+        query = query.order_by(Restaurant.avg_rating.desc())
 
     restaurants = query.limit(5).all()
 
@@ -95,16 +132,32 @@ def search_restaurants(db: Session, filters: dict) -> list:
             "description":  r.description,
             "amenities":    r.amenities,
             "address":      r.address,
-            "phone":        r.phone
+            "phone":        r.phone,
+            "distance_km":  geo.distance_km(r, lat, lng) if lat is not None and lng is not None else None,
+            "recommended":  False
         }
         for r in restaurants
     ]
 
 
+def recommended_matches(db: Session, user_id: int, filters: dict) -> list:
+    """The user's collaborative-filtering recommendations that also match the filters"""
+    _, liked, liked_weights = load_interactions(db, [user_id])
+    scored = recommender.for_user(db, liked, liked_weights, limit=RECOMMENDATION_CANDIDATES)
+    if not scored:
+        return []
+    matches = search_restaurants(db, {**filters, "candidate_ids": [rid for rid, _ in scored]})
+    rank = {rid: i for i, (rid, _) in enumerate(scored)}
+    matches.sort(key=lambda r: rank[r["id"]])
+    for r in matches:
+        r["recommended"] = True
+    return matches[:RECOMMENDED_IN_CHAT]
+
+
 def extract_filters_from_message(user_message: str, preferences: dict) -> dict:
     """
     Use Ollama to extract structured filters from a natural language query.
-    Returns a dict with cuisine_type, price_tier, keywords, city, sort_by.
+    Returns a dict with cuisine_type, price_tier, keywords, amenities, open_now, open_at, city, sort_by.
     """
     system_prompt = """You are a filter extraction assistant. 
 Extract search filters from the user's restaurant query and return ONLY a JSON object.
@@ -114,6 +167,10 @@ Return this exact JSON format (use null for missing values):
   "cuisine_type": "Italian" or null,
   "price_tier": "$" or "$$" or "$$$" or "$$$$" or null,
   "keywords": "vegan romantic outdoor wifi" or null,
+  "amenities": ["wifi", "outdoor_seating", "vegan", "romantic"] or null,
+  "amenities_match": "all" or "any",
+  "open_now": true or null,
+  "open_at": "fri 23:00" or null,
   "city": "San Jose" or null,
   "sort_by": "rating" or "popularity" or "price"
 }
@@ -122,6 +179,11 @@ Examples:
 - "vegan food" → {"cuisine_type": null, "price_tier": null, "keywords": "vegan", "city": null, "sort_by": "rating"}
 - "cheap Italian in San Jose" → {"cuisine_type": "Italian", "price_tier": "$", "keywords": null, "city": "San Jose", "sort_by": "price"}
 - "romantic dinner" → {"cuisine_type": null, "price_tier": null, "keywords": "romantic", "city": null, "sort_by": "rating"}
+- "what's open right now" → {"cuisine_type": null, "price_tier": null, "keywords": null, "open_now": true, "city": null, "sort_by": "rating"}
+- "late night tacos on saturday" → {"cuisine_type": "Mexican", "price_tier": null, "keywords": "tacos", "open_at": "sat 23:00", "city": null, "sort_by": "rating"}
+- "somewhere with wifi and outdoor seating" → {"cuisine_type": null, "price_tier": null, "keywords": null, "amenities": ["wifi", "outdoor_seating"], "amenities_match": "all", "city": null, "sort_by": "rating"}
+
+Amenities come from: """ + ", ".join(attributes.ATTRIBUTES) + """
 
 Return ONLY the JSON object. No explanation."""
 
@@ -189,6 +251,8 @@ def build_recommendation_prompt(
             f"{i+1}. {r['name']} | {r['cuisine_type']} | {r['price_tier']} | "
             f"Rating: {r['avg_rating']}★ ({r['review_count']} reviews) | "
             f"{r['city']} | {r.get('description', '')[:80]}"
+            f"{' | Reviewers mention: ' + ', '.join(r['highlights']) if r.get('highlights') else ''}"
+            f"{' | Recommended for this user (liked by people with similar taste)' if r.get('recommended') else ''}"
             for i, r in enumerate(restaurants)
         ])
     else:
@@ -216,7 +280,8 @@ INSTRUCTIONS:
 - For each recommendation explain WHY it matches the user's query
 - If no restaurants match, say so honestly and suggest what they could search for
 - Keep responses concise — 3-5 sentences per recommendation
-- Always mention the restaurant name, rating, price tier and why it fits"""
+- Always mention the restaurant name, rating, price tier and why it fits
+- When reviewers mention something relevant to the query, use it as evidence"""
 
     messages = [SystemMessage(content=system_prompt)]
 
@@ -236,7 +301,8 @@ async def process_chat(
     user_message: str,
     conversation_history: list,
     user_id: int,
-    db: Session
+    db: Session,
+    location: tuple[float, float] | None = None
 ) -> dict:
     """
     Main function that orchestrates the entire chatbot flow:
@@ -252,10 +318,23 @@ async def process_chat(
 
         # Step 2 - Extract search filters from the message
         filters = extract_filters_from_message(user_message, preferences)
+        if location:
+            filters["latitude"], filters["longitude"] = location
+            filters["radius_km"] = preferences.get("search_radius_km")
+            # A real position beats the city name filled in from the profile
+            preferred_city = (preferences.get("preferred_location") or "").split(",")[0].strip()
+            if filters.get("city") == preferred_city:
+                filters.pop("city")
         print(f"Extracted filters: {filters}")
 
-        # Step 3 - Search restaurants in DB
-        restaurants = search_restaurants(db, filters)
+        # Step 3 - Search restaurants in DB, personal recommendations that match first
+        restaurants = recommended_matches(db, user_id, filters)
+        seen = {r["id"] for r in restaurants}
+        restaurants += [r for r in search_restaurants(db, filters) if r["id"] not in seen]
+        restaurants = restaurants[:5]
+        highlights = highlights_for(db, [r["id"] for r in restaurants])
+        for r in restaurants:
+            r["highlights"] = highlights.get(r["id"], [])
         print(f"Found {len(restaurants)} restaurants")
 
         # Step 4 - Get web context if Tavily is available
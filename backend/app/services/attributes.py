@@ -0,0 +1,68 @@
+from sqlalchemy import and_, or_, false
+
+# Restaurant attributes — amenities, dietary options and ambiance — from a
+# fixed vocabulary, each one bit of a BigInteger column kept in sync with the
+# comma-separated text it comes from (restaurants.amenities ->
+# attribute_bits; user_preferences.dietary_needs / ambiance -> dietary_bits /
+# ambiance_bits). Filters compare bits instead of ILIKE-ing the text, so
+# "vegan" no longer matches "non_vegan_friendly" and an "all of" / "any of"
+# filter is one integer test per row.
+#
+# Bit positions are stored, so new attributes are only ever appended. Terms
+# outside the vocabulary stay in the text and are still matched with ILIKE.
+
+ATTRIBUTES = (
+    # amenities
+    "wifi", "outdoor_seating", "delivery", "takeout", "reservations", "parking", "wheelchair_accessible",
+    "credit_cards", "dogs_allowed", "bar", "live_music",
+    # dietary options
+    "vegetarian", "vegan", "gluten_free", "halal", "kosher", "dairy_free",
+    # ambiance
+    "casual", "romantic", "fine_dining", "family", "trendy", "quiet", "lively",
+)
+BIT = {name: 1 << i for i, name in enumerate(ATTRIBUTES)}
+ALIASES = {
+    "wi_fi": "wifi", "free_wifi": "wifi", "outdoor": "outdoor_seating", "patio": "outdoor_seating",
+    "take_out": "takeout", "reservation": "reservations", "wheelchair": "wheelchair_accessible",
+    "accessible": "wheelchair_accessible", "dog_friendly": "dogs_allowed", "no_gluten": "gluten_free",
+    "vegan_friendly": "vegan", "vegetarian_friendly": "vegetarian", "family_friendly": "family",
+    "kid_friendly": "family", "upscale": "fine_dining", "full_bar": "bar",
+}
+
+
+def canonical(term: str) -> str:
+    """ "Gluten-Free" -> "gluten_free", "kid friendly" -> "family" """
+    term = "_".join(term.strip().lower().replace("-", " ").replace("_", " ").split())
+    return ALIASES.get(term, term)
+
+
+def attribute_terms(text: str | None) -> list[str]:
+    """The canonical terms of "wifi, Outdoor Seating", in order, without repeats"""
+    return list(dict.fromkeys(canonical(t) for t in (text or "").split(",") if t.strip()))
+
+
+def to_bits(terms) -> int:
+    """Bits of the known terms (a comma-separated string or a list); unknown ones are skipped"""
+    if isinstance(terms, str) or terms is None:
+        terms = attribute_terms(terms)
+    bits = 0
+    for term in terms:
+        bits |= BIT.get(canonical(term), 0)
+    return bits
+
+
+def from_bits(bits: int | None) -> list[str]:
+    return [name for name, bit in BIT.items() if (bits or 0) & bit]
+
+
+def matches(bits_column, text_column, terms: list[str], match: str = "all"):
+    """
+    Filter for rows with all (or any) of the terms. Known terms test
+    bits_column; the rest fall back to ILIKE on text_column.
+    """
+    terms = [canonical(t) for t in terms]
+    mask = to_bits(terms)
+    text_tests = [text_column.ilike(f"%{t}%") for t in terms if t not in BIT]
+    if match == "any":
+        return or_(bits_column.op("&")(mask) != 0 if mask else false(), *text_tests)
+    return and_(bits_column.op("&")(mask) == mask, *text_tests)
@@ -1,10 +1,25 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException, status
+import asyncio
+import threading
+import time
+from app.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS, HASH_EXECUTOR, HASH_WORKERS, HASH_QUEUE_SIZE
+)
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max pin the cost so hashes made with any other cost report needs_update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -12,6 +27,94 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Returns (is_valid, new_hash) — new_hash is set when the stored cost is out of date"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# --- Dedicated hashing executor ---
+# bcrypt is CPU-bound, so it gets its own small pool instead of borrowing the
+# threadpool that every sync route shares. The semaphore caps running + queued
+# jobs; once it's full we shed load with a 503 rather than queue forever.
+if HASH_EXECUTOR == "process":
+    _hash_executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+else:
+    _hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+_stats_lock = threading.Lock()
+_hash_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "total_wait_ms": 0.0,
+    "total_run_ms": 0.0,
+}
+
+
+def _timed(fn, *args):
+    """Runs in the worker — returns the result along with when the work actually started"""
+    started = time.perf_counter()
+    return fn(*args), started, time.perf_counter()
+
+
+async def _run_hash_job(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        with _stats_lock:
+            _hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    with _stats_lock:
+        _hash_stats["submitted"] += 1
+        _hash_stats["in_flight"] += 1
+    submitted = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result, started, finished = await loop.run_in_executor(_hash_executor, _timed, fn, *args)
+    finally:
+        _hash_slots.release()
+        with _stats_lock:
+            _hash_stats["in_flight"] -= 1
+
+    with _stats_lock:
+        _hash_stats["completed"] += 1
+        # perf_counter isn't comparable across processes, so only the thread pool reports wait time
+        if HASH_EXECUTOR != "process":
+            _hash_stats["total_wait_ms"] += (started - submitted) * 1000
+        _hash_stats["total_run_ms"] += (finished - started) * 1000
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash_job(hash_password, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run_hash_job(verify_and_update_password, plain_password, hashed_password)
+
+
+def get_hashing_stats() -> dict:
+    """Snapshot of the hashing executor for the metrics endpoint"""
+    with _stats_lock:
+        stats = dict(_hash_stats)
+    completed = stats["completed"]
+    stats["queued"] = max(stats["in_flight"] - HASH_WORKERS, 0)
+    stats["avg_wait_ms"] = round(stats.pop("total_wait_ms") / completed, 2) if completed else 0.0
+    stats["avg_run_ms"] = round(stats.pop("total_run_ms") / completed, 2) if completed else 0.0
+    stats.update({
+        "executor": HASH_EXECUTOR,
+        "workers": HASH_WORKERS,
+        "queue_size": HASH_QUEUE_SIZE,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+    })
+    return stats
+
+
 # JWT Token
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -24,4 +127,4 @@ def decode_access_token(token: str) -> dict | None:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
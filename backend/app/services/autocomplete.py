@@ -0,0 +1,243 @@
+from sqlalchemy.orm import Session
+from array import array
+from bisect import bisect_left, insort
+import heapq
+import math
+import re
+import unicodedata
+from app.config import AUTOCOMPLETE_REFRESH_SECONDS
+from app.models.restaurant import Restaurant
+from app.services.restaurant_index import RestaurantIndex
+
+# Search-as-you-type suggestions: restaurant names, cities and cuisines that
+# start with what was typed, best first.
+#
+# Each kind is a PrefixIndex — its keys in one sorted list, so everything
+# starting with a prefix is one bisect range. Restaurant names are keyed
+# from every word ("blue bottle cafe", "bottle cafe", "cafe") so typing any
+# word finds them. Ranges too long to rank per request (one or two letters
+# on a big catalog) keep their top MAX_RESULTS cached, and writes update or
+# drop the cached lists they affect. Names rank by popularity and rating,
+# cities and cuisines by how many restaurants have them.
+#
+# Kept in sync with the restaurants table as described in restaurant_index,
+# every AUTOCOMPLETE_REFRESH_SECONDS — review counts and ratings come along.
+
+MAX_RESULTS = 20       # most suggestions per kind one request can ask for
+SCAN_LIMIT = 500       # longer prefix ranges get their top MAX_RESULTS cached
+PRIOR_RATING = 3.5     # ratings of restaurants with few reviews are shrunk toward this
+PRIOR_REVIEWS = 5
+SKIP_WORDS = {"the", "and", "of", "a", "an", "at", "on", "in", "de", "la", "le", "el"}
+
+
+def normalize(text: str | None) -> str:
+    """Lower-case ASCII words separated by single spaces: "Café  d'Amélie" -> "cafe damelie" """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower().replace("'", "")
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def word_starts(text: str | None) -> list[str]:
+    """A key per word a search may start at (skipping "the", "of", ...)"""
+    words = normalize(text).split()
+    return [" ".join(words[i:]) for i in range(len(words)) if i == 0 or words[i] not in SKIP_WORDS]
+
+
+def popularity(avg_rating, review_count) -> float:
+    n = review_count or 0
+    rating = (PRIOR_RATING * PRIOR_REVIEWS + (avg_rating or 0.0) * n) / (PRIOR_REVIEWS + n)
+    return math.log1p(n) + rating
+
+
+class PrefixIndex:
+    """Sorted keys searched with bisect; ids ranked by score"""
+
+    def __init__(self):
+        self.keys = []             # sorted
+        self.ids = array("q")      # id of each key
+        self.keys_of = {}          # id -> its keys
+        self.score = {}            # id -> score
+        self.top = {}              # crowded prefix -> its best ids, best first
+
+    def _order(self, item_id):
+        """Sort key, best first"""
+        return -self.score[item_id], item_id
+
+    def build(self, items):
+        """items: (id, keys, score) — sorted once instead of inserted one by one"""
+        pairs = []
+        for item_id, keys, score in items:
+            self.keys_of[item_id], self.score[item_id] = keys, score
+            pairs.extend((key, item_id) for key in keys)
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = array("q", (item_id for _, item_id in pairs))
+        self.top = {}
+
+    def add(self, item_id: int, keys: list[str], score: float):
+        if self.keys_of.get(item_id) != keys:
+            self.remove(item_id)
+            self.keys_of[item_id] = keys
+            for key in keys:
+                i = bisect_left(self.keys, key)
+                self.keys.insert(i, key)
+                self.ids.insert(i, item_id)
+        self.score[item_id] = score
+        self._rerank(item_id, keys)
+
+    def _rerank(self, item_id: int, keys: list[str]):
+        """Fit item_id, new or with a new score, into the cached top lists it belongs in"""
+        for key in keys:
+            for n in range(1, len(key) + 1):
+                cached = self.top.get(key[:n])
+                if cached is None:
+                    continue
+                if item_id in cached:
+                    cached.remove(item_id)
+                    if len(cached) == MAX_RESULTS - 1 and self._order(item_id) > self._order(cached[-1]):
+                        del self.top[key[:n]]   # dropped out — its replacement is somewhere in the range
+                        continue
+                insort(cached, item_id, key=self._order)
+                del cached[MAX_RESULTS:]
+
+    def remove(self, item_id: int):
+        keys = self.keys_of.pop(item_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            i = bisect_left(self.keys, key)
+            while self.ids[i] != item_id:
+                i += 1
+            del self.keys[i]
+            del self.ids[i]
+            for n in range(1, len(key) + 1):
+                if item_id in self.top.get(key[:n], ()):
+                    del self.top[key[:n]]   # its replacement is somewhere in the range
+        del self.score[item_id]
+
+    def search(self, prefix: str, limit: int) -> list[int]:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\x7f", lo)
+        if hi - lo <= SCAN_LIMIT:
+            return self._best(lo, hi, limit)
+        cached = self.top.get(prefix)
+        if cached is None:
+            cached = self.top[prefix] = self._best(lo, hi, MAX_RESULTS)
+        return cached[:limit]
+
+    def _best(self, lo: int, hi: int, limit: int) -> list[int]:
+        return heapq.nsmallest(limit, set(self.ids[lo:hi]), key=self._order)
+
+
+class AutocompleteState:
+    """Names, cities and cuisines, plus what a suggestion shows"""
+
+    def __init__(self):
+        self.names = PrefixIndex()
+        self.cities = PrefixIndex()
+        self.cuisines = PrefixIndex()
+        self.restaurants = {}      # id -> (name, city, cuisine_type, avg_rating, review_count)
+        # City / cuisine values get ids; the label is the first spelling seen
+        self.value_id = {"city": {}, "cuisine": {}}
+        self.labels = {"city": [], "cuisine": []}
+        self.counts = {"city": [], "cuisine": []}
+
+    def __len__(self) -> int:
+        return len(self.restaurants)
+
+    def _index(self, kind: str) -> PrefixIndex:
+        return self.cities if kind == "city" else self.cuisines
+
+    def _value(self, kind: str, value: str | None) -> int | None:
+        key = normalize(value)
+        if not key:
+            return None
+        value_id = self.value_id[kind].get(key)
+        if value_id is None:
+            value_id = self.value_id[kind][key] = len(self.labels[kind])
+            self.labels[kind].append(value.strip())
+            self.counts[kind].append(0)
+        return value_id
+
+    def _count(self, kind: str, value: str | None, delta: int):
+        value_id = self._value(kind, value)
+        if value_id is None:
+            return
+        self.counts[kind][value_id] += delta
+        count = self.counts[kind][value_id]
+        if count > 0:
+            self._index(kind).add(value_id, word_starts(self.labels[kind][value_id]), count)
+        else:
+            self._index(kind).remove(value_id)
+
+    def build(self, rows: list):
+        for restaurant_id, name, city, cuisine_type, avg_rating, review_count in rows:
+            self.restaurants[restaurant_id] = (name, city, cuisine_type, avg_rating, review_count)
+            for kind, value in (("city", city), ("cuisine", cuisine_type)):
+                value_id = self._value(kind, value)
+                if value_id is not None:
+                    self.counts[kind][value_id] += 1
+        self.names.build(
+            (restaurant_id, word_starts(name), popularity(avg_rating, review_count))
+            for restaurant_id, (name, _, _, avg_rating, review_count) in self.restaurants.items()
+        )
+        for kind in ("city", "cuisine"):
+            self._index(kind).build(
+                (value_id, word_starts(label), count)
+                for value_id, (label, count) in enumerate(zip(self.labels[kind], self.counts[kind])) if count
+            )
+
+    def add(self, restaurant_id: int, name, city, cuisine_type, avg_rating, review_count):
+        old = self.restaurants.get(restaurant_id)
+        if old and (old[1], old[2]) != (city, cuisine_type):
+            self._count("city", old[1], -1)
+            self._count("cuisine", old[2], -1)
+        self.restaurants[restaurant_id] = (name, city, cuisine_type, avg_rating, review_count)
+        self.names.add(restaurant_id, word_starts(name), popularity(avg_rating, review_count))
+        if not old or (old[1], old[2]) != (city, cuisine_type):
+            self._count("city", city, +1)
+            self._count("cuisine", cuisine_type, +1)
+
+    def remove(self, restaurant_id: int):
+        old = self.restaurants.pop(restaurant_id, None)
+        if old:
+            self.names.remove(restaurant_id)
+            self._count("city", old[1], -1)
+            self._count("cuisine", old[2], -1)
+
+    def suggest(self, query: str, limit: int) -> dict:
+        prefix = normalize(query)
+        if not prefix:
+            return {"restaurants": [], "cities": [], "cuisines": []}
+        restaurants = []
+        for restaurant_id in self.names.search(prefix, limit):
+            name, city, cuisine_type, avg_rating, review_count = self.restaurants[restaurant_id]
+            restaurants.append({"id": restaurant_id, "name": name, "city": city, "cuisine_type": cuisine_type,
+                                "avg_rating": avg_rating or 0.0, "review_count": review_count or 0})
+        return {
+            "restaurants": restaurants,
+            **{
+                plural: [{"value": self.labels[kind][value_id], "count": self.counts[kind][value_id]}
+                         for value_id in self._index(kind).search(prefix, limit)]
+                for kind, plural in (("city", "cities"), ("cuisine", "cuisines"))
+            },
+        }
+
+
+class Autocomplete(RestaurantIndex):
+    """An AutocompleteState kept in sync with the restaurants table"""
+    name = "Autocomplete index"
+    columns = (Restaurant.id, Restaurant.name, Restaurant.city, Restaurant.cuisine_type, Restaurant.avg_rating,
+               Restaurant.review_count)
+    refresh_seconds = AUTOCOMPLETE_REFRESH_SECONDS
+
+    def new_state(self) -> AutocompleteState:
+        return AutocompleteState()
+
+    def suggest(self, db: Session, query: str, limit: int) -> dict:
+        self.ensure_fresh(db)
+        with self._lock:
+            return self._state.suggest(query, limit)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,193 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from functools import partial
+import json
+import mimetypes
+import os
+import xxhash
+from app.config import UPLOAD_TMP_DIR
+from app.models.media_blob import MediaBlob
+from app.models.restaurant import Restaurant
+from app.models.restaurant_photo import RestaurantPhoto
+from app.services.images import RESTAURANT_PHOTO_WIDTHS, PROFILE_PIC_WIDTHS, variant_keys, schedule_variants
+from app.services.storage import storage, run_storage, key_from_url, url_from_key
+
+# Content-addressed storage: every distinct image is stored once, under its
+# xxh3-128 hash, and photos / profile pics point at it. media_blobs.ref_count
+# tracks how many rows use a blob so it's only deleted when the last one goes.
+# A blob's bytes never change, so its URL can be cached forever.
+BLOB_PREFIX = "blobs/"
+BLOB_URL_PREFIX = url_from_key(BLOB_PREFIX)
+
+# Node-local scratch space for uploads on their way into storage — outside
+# the /uploads mount, so partial or rejected uploads are never served
+TMP_DIR = UPLOAD_TMP_DIR
+
+# Any kind of upload can end up sharing a blob, so clean up every variant width
+ALL_VARIANT_WIDTHS = tuple(sorted(set(RESTAURANT_PHOTO_WIDTHS + PROFILE_PIC_WIDTHS)))
+
+
+def blob_key(digest: str, ext: str) -> str:
+    """blobs/a9/a96faf705af16834e6c632b61e964e1f.jpg — fanned out so no directory gets huge"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest}.{ext}"
+
+
+def blob_url(digest: str, ext: str) -> str:
+    return url_from_key(blob_key(digest, ext))
+
+
+def is_blob_url(url: str | None) -> bool:
+    return bool(url) and url.startswith(BLOB_URL_PREFIX)
+
+
+def hash_file(path: str) -> str:
+    hasher = xxhash.xxh3_128()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# acquire_blob / release_blob run inside the routes' threadpool functions, so
+# storage calls go through run_storage to hop back onto the event loop.
+
+def acquire_blob(db: Session, tmp_path: str, digest: str, ext: str, size: int) -> str:
+    """
+    Take a reference on the blob for this content and return its URL.
+    If the blob already exists the temp file is dropped and ref_count bumped;
+    otherwise the temp file is moved into storage. The caller commits.
+    """
+    blob = db.query(MediaBlob).filter(MediaBlob.hash == digest).with_for_update().first()
+    if blob is None:
+        key = blob_key(digest, ext)
+        run_storage(storage.put_file, key, tmp_path, mimetypes.guess_type(key)[0])
+        try:
+            # Savepoint — if another request inserted the same hash first, fall back to a reference
+            with db.begin_nested():
+                db.add(MediaBlob(hash=digest, ext=ext, size_bytes=size, ref_count=1))
+            return url_from_key(key)
+        except IntegrityError:
+            blob = db.query(MediaBlob).filter(MediaBlob.hash == digest).with_for_update().one()
+    elif not run_storage(storage.exists, blob_key(blob.hash, blob.ext)):
+        # Row without a file (e.g. restored DB dump) — heal it with the bytes we just got
+        key = blob_key(blob.hash, blob.ext)
+        run_storage(storage.put_file, key, tmp_path, mimetypes.guess_type(key)[0])
+    else:
+        os.remove(tmp_path)
+
+    # Increment in SQL so concurrent uploads can't lose a count
+    blob.ref_count = MediaBlob.ref_count + 1
+    db.flush()
+    return blob_url(blob.hash, blob.ext)
+
+
+def release_blob(db: Session, url: str | None):
+    """
+    Drop one reference to the file behind url. Blobs are deleted (with their
+    variants, in one batch) when nothing else uses them; pre-blob uploads are
+    just deleted. The caller commits — storage is only touched after that.
+    """
+    if not url:
+        return
+    key = key_from_url(url)
+    if not is_blob_url(url):
+        db.info.setdefault(PENDING_KEYS, []).extend([key] + variant_keys(key, ALL_VARIANT_WIDTHS))
+        return
+
+    digest = os.path.splitext(os.path.basename(key))[0]
+    blob = db.query(MediaBlob).filter(MediaBlob.hash == digest).with_for_update().first()
+    if blob is None:
+        return
+    if blob.ref_count > 1:
+        blob.ref_count = MediaBlob.ref_count - 1
+    else:
+        blob.ref_count = 0   # deleted by the sweep once this commits
+        db.info.setdefault(PENDING_BLOBS, set()).add(digest)
+    db.flush()
+
+
+# --- Variants written for a blob ---
+# srcset only lists variants recorded on the blob (MediaBlob.variants) once
+# they're in storage, so a failed or unfinished background job never shows
+# up as broken URLs. `python -m app.commands.backfill_images` fills in blobs
+# whose variants are missing or unrecorded.
+
+def record_variants(bind, url: str, written: dict):
+    """
+    Merge what store_variants wrote into the blob's record, and bump the
+    version of every restaurant showing it — its photo list's ETag.
+    """
+    digest = os.path.splitext(os.path.basename(key_from_url(url)))[0]
+    with Session(bind=bind) as db:
+        blob = db.query(MediaBlob).filter(MediaBlob.hash == digest).with_for_update().first()
+        if blob is None:
+            return
+        recorded = json.loads(blob.variants) if blob.variants else {}
+        for fmt, widths in written.items():
+            recorded.setdefault(fmt, {}).update(widths)
+        blob.variants = json.dumps(recorded, sort_keys=True)
+        db.query(Restaurant).filter(Restaurant.id.in_(
+            select(RestaurantPhoto.restaurant_id).where(RestaurantPhoto.photo_url == url)
+        )).update({Restaurant.version: Restaurant.version + 1}, synchronize_session=False)
+        db.commit()
+
+
+def schedule_blob_variants(db: Session, url: str, widths: tuple):
+    """schedule_variants for a blob, recording on it what gets written"""
+    return schedule_variants(url, widths, on_stored=partial(record_variants, db.get_bind(), url))
+
+
+# --- Deleting from storage once the release commits ---
+# If the transaction that dropped the last reference rolled back, its rows
+# would still point at the file, so nothing is deleted until it commits.
+# The blob row isn't deleted with it either: it stays at ref_count 0 until
+# the sweep below, which locks it again, deletes the bytes and then the row,
+# and skips it if an upload of the same bytes took a reference meanwhile.
+# An upload that comes in while the sweep holds the lock waits, finds no
+# row, and writes a fresh copy. Rows left at 0 by a crash between the two
+# are harmless — the next upload of those bytes reuses them.
+# Any rollback, a savepoint's included, forgets what was queued: at worst
+# a file is left behind, never deleted while something still uses it.
+
+PENDING_KEYS = "blob_store_pending_keys"     # pre-blob files, deleted as they are
+PENDING_BLOBS = "blob_store_pending_blobs"   # blob hashes released to 0
+
+
+def sweep_blobs(db: Session, digests):
+    """Delete the released blobs still at ref_count 0, bytes first, one row lock at a time"""
+    for digest in digests:
+        blob = db.query(MediaBlob).filter(
+            MediaBlob.hash == digest,
+            MediaBlob.ref_count == 0
+        ).with_for_update().first()
+        if blob is None:
+            db.rollback()
+            continue
+        key = blob_key(blob.hash, blob.ext)
+        run_storage(storage.delete_many, [key] + variant_keys(key, ALL_VARIANT_WIDTHS))
+        db.delete(blob)
+        db.commit()
+
+
+@event.listens_for(Session, "after_commit")
+def delete_released(session):
+    if session.in_nested_transaction():
+        return
+    keys = session.info.pop(PENDING_KEYS, None)
+    digests = session.info.pop(PENDING_BLOBS, None)
+    try:
+        if keys:
+            run_storage(storage.delete_many, keys)
+        if digests:
+            with Session(bind=session.get_bind()) as db:
+                sweep_blobs(db, sorted(digests))
+    except Exception as e:
+        # The rows are committed either way; at worst the bytes are left behind
+        print(f"Deleting released uploads failed: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_released(session):
+    session.info.pop(PENDING_KEYS, None)
+    session.info.pop(PENDING_BLOBS, None)
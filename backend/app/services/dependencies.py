@@ -1,11 +1,13 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.config import BATCH_MAX_IDS
 from app.database import get_db
 from app.services.auth import decode_access_token
 from app.models.user import User
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -30,10 +32,46 @@ def get_current_user(
 
     return user
 
+def get_optional_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> User | None:
+    """The signed-in user on public pages — None without a token, or with one that's invalid or expired"""
+    if credentials is None:
+        return None
+    payload = decode_access_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        return None
+    return db.query(User).filter(User.id == int(payload["sub"])).first()
+
 def get_current_owner(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "owner":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only restaurant owners can perform this action"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def batch_ids(
+    ids: str = Query(..., description=f"Comma-separated ids, at most {BATCH_MAX_IDS}, e.g. 3,17,42")
+) -> list[int]:
+    """The ids of a batch lookup in the order asked, repeats dropped"""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+    unique = list(dict.fromkeys(parsed))
+    if not unique:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must name at least one id"
+        )
+    if len(unique) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_IDS} ids per request"
+        )
+    return unique
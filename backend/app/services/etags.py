@@ -0,0 +1,110 @@
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+import xxhash
+
+# Conditional GET for the JSON API. Every 200 GET response leaves with a weak
+# ETag, and a request whose If-None-Match already names it gets an empty 304
+# instead of the payload.
+#
+# Handlers that know what their response is built from tag it themselves,
+# from version counters (the `version` column on restaurants, reviews and
+# preferences, bumped by every UPDATE): they read the counters, call
+# not_modified() and return its 304 before loading photos, reviews or their
+# authors. Everything else is tagged by ConditionalGetMiddleware from a hash
+# of the body it was about to send — the work is done either way, but the
+# bytes aren't.
+#
+# Responses go out with Cache-Control: no-cache, so browsers keep them and
+# revalidate on every use (axios sees the cached 200 after a 304). Requests
+# with an Authorization header also get private and Vary: Authorization.
+
+NO_CACHE = "no-cache"
+PRIVATE_NO_CACHE = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    """W/"<xxh3 of the parts>" — e.g. weak_etag("restaurant", 12, 3)"""
+    return f'W/"{xxhash.xxh3_64_hexdigest("|".join(map(str, parts)).encode())}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/"x" matches "x", and * matches anything"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """
+    Tag the response with etag. Returns a 304 for the handler to return
+    instead when the client already has this version, otherwise None.
+    """
+    response.headers["etag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return NotModifiedResponse(Headers({"etag": etag}))
+    return None
+
+
+def _add_cache_headers(headers: MutableHeaders, request_headers: Headers):
+    if "cache-control" not in headers:
+        headers["cache-control"] = PRIVATE_NO_CACHE if "authorization" in request_headers else NO_CACHE
+    if "authorization" in request_headers:
+        headers.add_vary_header("Authorization")
+
+
+class ConditionalGetMiddleware:
+    """
+    Weak ETags and 304s for GET responses. A 200 JSON response without an
+    ETag is held until its last chunk, tagged from a hash of the body, and
+    replaced by a 304 if the client has it. Responses a handler tagged (and
+    its 304s) only get the cache headers; anything else passes through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        request_headers = Headers(scope=scope)
+        held = None   # the response start message, while its body is buffered
+        body = []
+
+        async def send_tagged(message):
+            nonlocal held
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if "etag" in headers:
+                    _add_cache_headers(headers, request_headers)
+                elif message["status"] == 200 and headers.get("content-type", "").startswith("application/json"):
+                    held = message
+                    return
+                await send(message)
+                return
+
+            if held is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            data = b"".join(body)
+            headers = MutableHeaders(scope=held)
+            headers["etag"] = f'W/"{xxhash.xxh3_64_hexdigest(data)}"'
+            _add_cache_headers(headers, request_headers)
+            if etag_matches(request_headers.get("if-none-match"), headers["etag"]):
+                await NotModifiedResponse(headers)(scope, receive, send)
+                return
+            await send(held)
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, send_tagged)
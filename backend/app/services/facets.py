@@ -0,0 +1,263 @@
+from sqlalchemy.orm import Session
+import numpy as np
+from app.config import FACET_VALUES, FACET_REFRESH_SECONDS
+from app.models.restaurant import Restaurant
+from app.services.attributes import attribute_terms, canonical
+from app.services.restaurant_index import RestaurantIndex
+
+# Facet counts for the restaurant search: how many of the matching
+# restaurants have each cuisine, price tier, city and amenity.
+#
+# Counting with GROUP BYs per request would mean four scans under the
+# search's ILIKE filters. Instead every process keeps an in-memory count
+# cube. Restaurants are grouped into cells, one per (cuisine, price tier,
+# city) combination that exists. Each cell keeps how many restaurants it has,
+# and how many of them have each amenity. Facet counts under cuisine / price
+# / city filters (plus at most one amenity) are then weighted bincounts over
+# the matching cells. Those are far fewer than restaurants, and their number
+# doesn't grow with the catalog once every combination exists. Other
+# filters — name, keywords, location, several amenities — count the rows
+# they match instead. Each facet is counted under every filter except its
+# own, so the UI can show the alternatives to what is selected.
+#
+# Kept in sync with the restaurants table as described in restaurant_index,
+# every FACET_REFRESH_SECONDS.
+
+FACETS = ("cuisine_type", "price_tier", "city", "amenities")
+SINGLE = ("cuisine_type", "price_tier", "city")   # one value per restaurant; amenities are a list
+
+
+def _grow(array: np.ndarray, size: int, axis: int = 0, fill: int = 0) -> np.ndarray:
+    """array padded with fill along axis to hold at least size entries (doubling)"""
+    if array.shape[axis] >= size:
+        return array
+    pad = [(0, 0)] * array.ndim
+    pad[axis] = (0, max(size, 2 * array.shape[axis], 8) - array.shape[axis])
+    return np.pad(array, pad, constant_values=fill)
+
+
+def _bit(code: int) -> tuple[int, np.uint64]:
+    return code // 64, np.uint64(1) << np.uint64(code % 64)
+
+
+class FacetState:
+    """The index itself — value codes per restaurant, and the count cube"""
+
+    def __init__(self):
+        self.values = {f: [] for f in FACETS}           # code -> display value
+        self.code_of = {f: {} for f in FACETS}          # lower-cased value -> code
+        # Per restaurant (row)
+        self.row_of = {}                                # restaurant id -> row
+        self.free = []                                  # rows of removed restaurants, reused
+        self.size = 0
+        self.codes = {f: np.full(8, -1, np.int32) for f in SINGLE}
+        self.amenities = np.zeros((8, 1), np.uint64)    # one bit per amenity code
+        self.cell_of_row = np.full(8, -1, np.int64)
+        # Per cell
+        self.cell_of = {}                               # (cuisine, price, city) codes -> cell
+        self.cell_codes = {f: np.full(8, -1, np.int32) for f in SINGLE}
+        self.cell_count = np.zeros(8, np.int64)
+        self.cell_amenities = np.zeros((8, 8), np.int64)   # cell x amenity code -> restaurants
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    # --- Codes ---
+
+    def _code(self, facet: str, value: str | None) -> int:
+        key = (value or "").strip().lower()
+        if not key:
+            return -1
+        code = self.code_of[facet].get(key)
+        if code is None:
+            code = self.code_of[facet][key] = len(self.values[facet])
+            self.values[facet].append(value.strip())
+            if facet == "amenities":
+                self.amenities = _grow(self.amenities, code // 64 + 1, axis=1)
+                self.cell_amenities = _grow(self.cell_amenities, code + 1, axis=1)
+        return code
+
+    def _cell(self, key: tuple) -> int:
+        cell = self.cell_of.get(key)
+        if cell is None:
+            cell = self.cell_of[key] = len(self.cell_of)
+            for f, code in zip(SINGLE, key):
+                self.cell_codes[f] = _grow(self.cell_codes[f], cell + 1, fill=-1)
+                self.cell_codes[f][cell] = code
+            self.cell_count = _grow(self.cell_count, cell + 1)
+            self.cell_amenities = _grow(self.cell_amenities, cell + 1)
+        return cell
+
+    def _amenity_codes(self, row: int) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(self.amenities[row].astype("<u8").view(np.uint8), bitorder="little"))
+
+    # --- Writes ---
+
+    def add(self, restaurant_id: int, cuisine_type, price_tier, city, amenities):
+        if restaurant_id in self.row_of:
+            self.remove(restaurant_id)
+        if self.free:
+            row = self.free.pop()
+        else:
+            row, self.size = self.size, self.size + 1
+            for f in SINGLE:
+                self.codes[f] = _grow(self.codes[f], self.size, fill=-1)
+            self.amenities = _grow(self.amenities, self.size)
+            self.cell_of_row = _grow(self.cell_of_row, self.size, fill=-1)
+        self.row_of[restaurant_id] = row
+
+        key = tuple(self._code(f, value) for f, value in zip(SINGLE, (cuisine_type, price_tier, city)))
+        for f, code in zip(SINGLE, key):
+            self.codes[f][row] = code
+        cell = self.cell_of_row[row] = self._cell(key)
+        self.cell_count[cell] += 1
+        for term in attribute_terms(amenities):
+            code = self._code("amenities", term)
+            word, bit = _bit(code)
+            self.amenities[row, word] |= bit
+            self.cell_amenities[cell, code] += 1
+
+    def remove(self, restaurant_id: int):
+        row = self.row_of.pop(restaurant_id, None)
+        if row is None:
+            return
+        cell = self.cell_of_row[row]
+        self.cell_count[cell] -= 1
+        self.cell_amenities[cell, self._amenity_codes(row)] -= 1
+        for f in SINGLE:
+            self.codes[f][row] = -1
+        self.amenities[row] = 0
+        self.cell_of_row[row] = -1
+        self.free.append(row)
+
+    def build(self, rows: list):
+        """Load every restaurant at once — cells and their counts come from np.unique / bincounts"""
+        if not rows:
+            return
+        ids, *columns, amenities = zip(*rows)
+        n = self.size = len(ids)
+        self.row_of = dict(zip(ids, range(n)))
+        for f, column in zip(SINGLE, columns):
+            self.codes[f] = np.fromiter((self._code(f, value) for value in column), np.int32, n)
+
+        amenity_rows, amenity_codes = [], []
+        for row, text in enumerate(amenities):
+            for term in attribute_terms(text):
+                amenity_rows.append(row)
+                amenity_codes.append(self._code("amenities", term))
+        amenity_rows = np.array(amenity_rows, np.int64)
+        amenity_codes = np.array(amenity_codes, np.int64)
+        self.amenities = np.zeros((n, self.amenities.shape[1]), np.uint64)
+        np.bitwise_or.at(self.amenities, (amenity_rows, amenity_codes // 64),
+                         np.left_shift(np.uint64(1), (amenity_codes % 64).astype(np.uint64)))
+
+        keys, self.cell_of_row = np.unique(np.stack([self.codes[f] for f in SINGLE], axis=1),
+                                           axis=0, return_inverse=True)
+        self.cell_of_row = self.cell_of_row.ravel().astype(np.int64)
+        self.cell_of = {tuple(key): cell for cell, key in enumerate(keys.tolist())}
+        for i, f in enumerate(SINGLE):
+            self.cell_codes[f] = keys[:, i].astype(np.int32)
+        self.cell_count = np.bincount(self.cell_of_row, minlength=len(keys)).astype(np.int64)
+        self.cell_amenities = np.zeros((len(keys), max(len(self.values["amenities"]), 1)), np.int64)
+        np.add.at(self.cell_amenities, (self.cell_of_row[amenity_rows], amenity_codes), 1)
+
+    # --- Counting ---
+
+    def allowed(self, facet: str, term: str) -> list[int]:
+        """Codes a search term matches — the same way list_restaurants' SQL filter does"""
+        term = canonical(term) if facet == "amenities" else term.strip().lower()
+        if facet in ("price_tier", "amenities"):
+            code = self.code_of[facet].get(term)
+            return [] if code is None else [code]
+        return [code for key, code in self.code_of[facet].items() if term in key]
+
+    def _matches(self, rows: np.ndarray, facet: str, allowed: list[int]) -> np.ndarray:
+        if facet != "amenities":
+            return np.isin(self.codes[facet][rows], allowed)
+        mask = np.zeros(self.amenities.shape[1], np.uint64)
+        for code in allowed:
+            word, bit = _bit(code)
+            mask[word] |= bit
+        return (self.amenities[rows] & mask).any(axis=1)
+
+    def _count_rows(self, facet: str, rows: np.ndarray, conditions: list) -> np.ndarray:
+        """Counts among the given rows that meet every condition"""
+        n = len(self.values[facet])
+        for g, allowed in conditions:
+            rows = rows[self._matches(rows, g, allowed)]
+        if facet != "amenities":
+            codes = self.codes[facet][rows]
+            return np.bincount(codes[codes >= 0], minlength=n)[:n]
+        bits = np.unpackbits(self.amenities[rows].astype("<u8").view(np.uint8), axis=1, bitorder="little")
+        return bits.sum(axis=0)[:n]
+
+    def _count_cells(self, facet: str, conditions: list) -> np.ndarray | None:
+        """Counts from the cube, or None when the conditions need more than it keeps"""
+        n = len(self.values[facet])
+        cells = len(self.cell_of)
+        mask = np.ones(cells, bool)
+        amenity = None
+        for g, allowed in conditions:
+            if g != "amenities":
+                mask &= np.isin(self.cell_codes[g][:cells], allowed)
+            elif not allowed:
+                return np.zeros(n, np.int64)
+            elif amenity is None and len(allowed) == 1:
+                amenity = allowed[0]
+            else:
+                return None   # restaurants with several amenities at once aren't in the cube
+        if facet == "amenities":
+            return self.cell_amenities[:cells][mask].sum(axis=0)[:n]
+        codes = self.cell_codes[facet][:cells]
+        mask &= codes >= 0
+        weights = self.cell_count[:cells] if amenity is None else self.cell_amenities[:cells, amenity]
+        return np.bincount(codes[mask], weights=weights[mask], minlength=n)[:n].astype(np.int64)
+
+    def counts(self, filters: dict, candidate_ids=None, amenities_match: str = "all",
+               limit: int = FACET_VALUES) -> dict:
+        conditions = [(f, self.allowed(f, term)) for f, terms in filters.items() for term in terms
+                      if f != "amenities" or amenities_match == "all"]
+        if amenities_match == "any" and filters.get("amenities"):
+            codes = {code for term in filters["amenities"] for code in self.allowed("amenities", term)}
+            conditions.append(("amenities", sorted(codes)))
+        rows = masks = None
+        if candidate_ids is not None:
+            rows = np.fromiter((self.row_of[i] for i in candidate_ids if i in self.row_of), np.int64)
+        result = {}
+        for facet in FACETS:
+            others = [c for c in conditions if c[0] != facet]
+            if rows is not None:
+                counts = self._count_rows(facet, rows, others)
+            elif (counts := self._count_cells(facet, others)) is None:
+                # Every restaurant, one pass over each condition's column shared by the facets
+                if masks is None:
+                    masks = [self._matches(slice(0, self.size), g, allowed) for g, allowed in conditions]
+                keep = np.logical_and.reduce([m for m, (g, _) in zip(masks, conditions) if g != facet])
+                counts = self._count_rows(facet, np.flatnonzero(keep), [])
+            top = np.argsort(-counts, kind="stable")[:limit]
+            result[facet] = [{"value": self.values[facet][code], "count": int(counts[code])}
+                             for code in top if counts[code] > 0]
+        return result
+
+
+class FacetIndex(RestaurantIndex):
+    """A FacetState kept in sync with the restaurants table"""
+    name = "Facet index"
+    columns = (Restaurant.id, Restaurant.cuisine_type, Restaurant.price_tier, Restaurant.city, Restaurant.amenities)
+    refresh_seconds = FACET_REFRESH_SECONDS
+
+    def new_state(self) -> FacetState:
+        return FacetState()
+
+    def counts(self, db: Session, filters: dict, candidate_ids=None, amenities_match: str = "all") -> dict:
+        """
+        Facet counts under the given facet filters ({facet: [search terms]}),
+        among candidate_ids when other filters (name, keywords, location)
+        narrowed the search. Amenity terms must all match, or any of them.
+        """
+        self.ensure_fresh(db)
+        with self._lock:
+            return self._state.counts(filters, candidate_ids, amenities_match)
+
+
+facet_index = FacetIndex()
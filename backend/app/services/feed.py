@@ -0,0 +1,309 @@
+from sqlalchemy import select, update, insert, bindparam, case, or_, true
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+import numpy as np
+from app.config import FEED_SIZE
+from app.models.favorite import Favorite
+from app.models.restaurant import Restaurant
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_feed import UserFeed
+from app.models.user_preference import UserPreference
+from app.services.attributes import attribute_terms, BIT
+
+# The home feed ranks restaurants for each user from their preferences plus
+# rating and popularity. Ranking is done in batches by refresh_feeds (run by
+# `python -m app.commands.refresh_feeds`) and stored as one row per user, so
+# GET /users/me/feed is a primary-key read however the scoring evolves.
+#
+# Feeds go stale when something that feeds the score changes — the user's
+# preferences or favorites, or a restaurant in their city — and the next
+# pass re-ranks just those users.
+
+CITY_POOL_SIZE = 5000     # most-reviewed restaurants in the user's city considered
+GLOBAL_POOL_SIZE = 500    # plus the most-reviewed anywhere, for users with no city / small cities
+BATCH_SIZE = 500          # users ranked per pass of the job
+
+# Score = weighted sum of the parts below, each between 0 and 1
+WEIGHTS = {
+    "cuisine": 3.0,     # one of the user's cuisines
+    "price": 1.5,       # close to their price range
+    "tags": 1.0,        # share of their dietary needs / ambiance the restaurant has
+    "local": 1.5,       # in their city
+    "quality": 2.0,     # rating, shrunk toward PRIOR_RATING for restaurants with few reviews
+    "popularity": 1.0,  # review count, log scale
+}
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 5
+PRICE_TIERS = {"$": 1, "$$": 2, "$$$": 3, "$$$$": 4}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _terms(text: str | None) -> list[str]:
+    return [t.strip().lower().replace("_", " ") for t in (text or "").split(",") if t.strip()]
+
+
+def city_key(preferred_location: str | None, profile_city: str | None = None) -> str:
+    """The city part of "San Jose, CA" (falling back to the profile's city), or "" """
+    city = (preferred_location or "").split(",")[0].strip() or (profile_city or "").strip()
+    return city[:100]
+
+
+def pack(restaurant_ids) -> bytes:
+    return np.asarray(restaurant_ids, dtype="<u4").tobytes()
+
+
+def unpack(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+# --- Candidate pools ---
+
+class Pool:
+    """A set of candidate restaurants as arrays, ready for vectorized scoring"""
+
+    def __init__(self, rows):
+        self.ids = np.array([r.id for r in rows], dtype=np.int64)
+        self.cuisines = [(r.cuisine_type or "").strip().lower() for r in rows]
+        self.cities = np.array([(r.city or "").strip().lower() for r in rows])
+        self.price = np.array([PRICE_TIERS.get(r.price_tier, 0) for r in rows], dtype=np.float32)
+        self.attribute_bits = np.array([r.attribute_bits or 0 for r in rows], dtype=np.int64)
+        self.text = [
+            " ".join(filter(None, (r.name, r.cuisine_type, r.description, r.amenities))).lower().replace("_", " ")
+            for r in rows
+        ]
+        count = np.array([r.review_count or 0 for r in rows], dtype=np.float32)
+        rating = np.array([r.avg_rating or 0 for r in rows], dtype=np.float32)
+        shrunk = (rating * count + PRIOR_RATING * PRIOR_REVIEWS) / (count + PRIOR_REVIEWS)
+        self.quality = np.clip((shrunk - 1) / 4, 0, 1)
+        self.popularity = np.log1p(count) / max(np.log1p(count.max(initial=0)), 1.0)
+        self._term_cache = {}
+
+    def has_term(self, term: str) -> np.ndarray:
+        """Restaurants with an attribute (attribute_terms' canonical form), or mentioning other terms"""
+        if term not in self._term_cache:
+            if term in BIT:
+                self._term_cache[term] = ((self.attribute_bits & BIT[term]) != 0).astype(np.float32)
+            else:
+                words = term.replace("_", " ")
+                self._term_cache[term] = np.array([words in t for t in self.text], dtype=np.float32)
+        return self._term_cache[term]
+
+
+_POOL_COLUMNS = (Restaurant.id, Restaurant.name, Restaurant.cuisine_type, Restaurant.city, Restaurant.price_tier,
+                 Restaurant.description, Restaurant.amenities, Restaurant.attribute_bits, Restaurant.avg_rating,
+                 Restaurant.review_count)
+
+
+def load_pool(db: Session, city: str, global_rows: list) -> Pool:
+    rows = list(global_rows)
+    if city:
+        seen = {r.id for r in rows}
+        local = db.execute(
+            select(*_POOL_COLUMNS).where(Restaurant.city == city)
+            .order_by(Restaurant.review_count.desc()).limit(CITY_POOL_SIZE)
+        ).all()
+        rows += [r for r in local if r.id not in seen]
+    return Pool(rows)
+
+
+def load_global_rows(db: Session) -> list:
+    return db.execute(
+        select(*_POOL_COLUMNS).order_by(Restaurant.review_count.desc()).limit(GLOBAL_POOL_SIZE)
+    ).all()
+
+
+# --- Scoring ---
+
+def rank(pool: Pool, users: list[dict], size: int = FEED_SIZE) -> list[np.ndarray]:
+    """
+    Ranked restaurant ids for each user — a users x restaurants score matrix
+    built with array operations, then the top `size` per row. Each user is a
+    dict of city, cuisines, price, terms and exclude (ids already liked).
+    """
+    if len(pool.ids) == 0:
+        return [np.empty(0, dtype=np.int64) for _ in users]
+    n_users = len(users)
+    score = np.broadcast_to(
+        WEIGHTS["quality"] * pool.quality + WEIGHTS["popularity"] * pool.popularity, (n_users, len(pool.ids))
+    ).copy()
+
+    # Cuisine: users x distinct cuisines, expanded to restaurants by cuisine code
+    names, codes = np.unique(pool.cuisines, return_inverse=True)
+    column = {name: i for i, name in enumerate(names)}
+    likes = np.zeros((n_users, len(names)), dtype=np.float32)
+    for row, user in enumerate(users):
+        for cuisine in user["cuisines"]:
+            if cuisine in column and cuisine:
+                likes[row, column[cuisine]] = 1
+    score += WEIGHTS["cuisine"] * likes[:, codes]
+
+    # Price: 1 on their tier, falling off by a third per tier away
+    wanted = np.array([PRICE_TIERS.get(u["price"], 0) for u in users], dtype=np.float32)[:, None]
+    fit = 1 - np.abs(wanted - pool.price[None, :]) / 3
+    score += WEIGHTS["price"] * np.where((wanted > 0) & (pool.price[None, :] > 0), fit, 0)
+
+    # Dietary needs / ambiance: share of the user's terms the restaurant has
+    terms = sorted({t for u in users for t in u["terms"]})
+    if terms:
+        index = {t: i for i, t in enumerate(terms)}
+        asks = np.zeros((n_users, len(terms)), dtype=np.float32)
+        for row, user in enumerate(users):
+            for t in user["terms"]:
+                asks[row, index[t]] = 1 / len(user["terms"])
+        score += WEIGHTS["tags"] * (asks @ np.stack([pool.has_term(t) for t in terms]))
+
+    cities = np.array([u["city"].lower() for u in users])[:, None]
+    score += WEIGHTS["local"] * ((cities == pool.cities[None, :]) & (cities != ""))
+
+    # Places they've already favorited or reviewed aren't news
+    order = np.argsort(pool.ids)
+    for row, user in enumerate(users):
+        if user["exclude"]:
+            exclude = np.fromiter(user["exclude"], dtype=np.int64)
+            at = np.clip(np.searchsorted(pool.ids, exclude, sorter=order), 0, len(order) - 1)
+            hit = order[at][pool.ids[order[at]] == exclude]
+            score[row, hit] = -np.inf
+
+    k = min(size, len(pool.ids))
+    top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+    ranked = []
+    for row in range(n_users):
+        best = top[row][np.argsort(-score[row, top[row]], kind="stable")]
+        best = best[np.isfinite(score[row, best])]
+        ranked.append(pool.ids[best])
+    return ranked
+
+
+def load_users(db: Session, user_ids: list[int]) -> list[dict]:
+    """What rank() needs to know about each user"""
+    rows = db.execute(
+        select(User.id, User.city, UserPreference)
+        .outerjoin(UserPreference, UserPreference.user_id == User.id)
+        .where(User.id.in_(user_ids))
+    ).all()
+    exclude = {user_id: set() for user_id in user_ids}
+    for user_id, restaurant_id in db.execute(
+        select(Favorite.user_id, Favorite.restaurant_id).where(Favorite.user_id.in_(user_ids))
+    ):
+        exclude[user_id].add(restaurant_id)
+    for user_id, restaurant_id in db.execute(
+        select(Review.user_id, Review.restaurant_id).where(Review.user_id.in_(user_ids))
+    ):
+        exclude[user_id].add(restaurant_id)
+
+    users = []
+    for user_id, profile_city, prefs in rows:
+        users.append({
+            "id": user_id,
+            "city": city_key(prefs.preferred_location if prefs else None, profile_city),
+            "cuisines": _terms(prefs.cuisine_preferences) if prefs else [],
+            "price": prefs.price_range if prefs else None,
+            "terms": (attribute_terms(prefs.dietary_needs) + attribute_terms(prefs.ambiance)) if prefs else [],
+            "exclude": exclude[user_id],
+        })
+    return users
+
+
+# --- Building and storing feeds ---
+
+def build_feeds(db: Session, user_ids: list[int], global_rows=None, pools=None) -> int:
+    """Rank the given users and store their feeds. The caller commits."""
+    started = _now()
+    users = load_users(db, user_ids)
+    if global_rows is None:
+        global_rows = load_global_rows(db)
+    pools = {} if pools is None else pools
+
+    by_city = {}
+    for user in users:
+        by_city.setdefault(user["city"], []).append(user)
+
+    existing = set(db.execute(select(UserFeed.user_id).where(UserFeed.user_id.in_(user_ids))).scalars())
+    table = UserFeed.__table__
+    # Keep a feed marked stale if it was marked again while we were ranking it
+    stmt = (
+        update(table)
+        .where(table.c.user_id == bindparam("uid"))
+        .values(
+            city_key=bindparam("city"),
+            restaurant_ids=bindparam("ids"),
+            computed_at=started,
+            stale_at=case((table.c.stale_at > started, table.c.stale_at), else_=None)
+        )
+    )
+    for city, group in by_city.items():
+        key = city.lower()
+        if key not in pools:
+            pools[key] = load_pool(db, city, global_rows)
+        ranked = rank(pools[key], group)
+        rows = [{"uid": u["id"], "city": city, "ids": pack(ids)} for u, ids in zip(group, ranked)]
+        updates = [r for r in rows if r["uid"] in existing]
+        inserts = [
+            {"user_id": r["uid"], "city_key": r["city"], "restaurant_ids": r["ids"], "computed_at": started}
+            for r in rows if r["uid"] not in existing
+        ]
+        if updates:
+            db.execute(stmt, updates)
+        if inserts:
+            db.execute(insert(UserFeed), inserts)
+    return len(users)
+
+
+def refresh_feeds(db: Session, batch_size: int = BATCH_SIZE, log=print) -> int:
+    """
+    One pass of the background job: rank users who have no feed yet, then
+    the ones whose feed went stale, batch by batch. Returns users ranked.
+    """
+    global_rows = load_global_rows(db)
+    pools = {}
+    done = 0
+    while True:
+        missing = db.execute(
+            select(User.id).outerjoin(UserFeed, UserFeed.user_id == User.id)
+            .where(UserFeed.user_id.is_(None), User.is_active.isnot(False))
+            .limit(batch_size)
+        ).scalars().all()
+        user_ids = missing or db.execute(
+            select(UserFeed.user_id).where(UserFeed.stale_at.isnot(None))
+            .order_by(UserFeed.stale_at).limit(batch_size)
+        ).scalars().all()
+        if not user_ids:
+            return done
+        build_feeds(db, user_ids, global_rows, pools)
+        db.commit()
+        done += len(user_ids)
+        log(f"  ranked {done} feeds")
+
+
+def mark_stale(db: Session, user_ids=None, cities=None, everyone: bool = False):
+    """
+    Flag feeds for re-ranking — the given users', and/or everyone's ranked
+    for the given cities (plus feeds with no city, which draw on every
+    city's most-reviewed restaurants), or simply all of them. The caller
+    commits.
+    """
+    conditions = [true()] if everyone else []
+    if user_ids:
+        conditions.append(UserFeed.user_id.in_(list(user_ids)))
+    if cities:
+        conditions.append(UserFeed.city_key.in_([c for c in cities if c] + [""]))
+    if not conditions:
+        return
+    db.execute(
+        update(UserFeed).where(or_(*conditions), UserFeed.stale_at.is_(None))
+        .values(stale_at=_now()).execution_options(synchronize_session=False)
+    )
+
+
+def get_feed(db: Session, user_id: int) -> np.ndarray:
+    """The user's ranked restaurant ids — built on the spot the first time"""
+    feed = db.get(UserFeed, user_id)
+    if feed is None:
+        build_feeds(db, [user_id])
+        db.commit()
+        feed = db.get(UserFeed, user_id)
+    return unpack(feed.restaurant_ids)
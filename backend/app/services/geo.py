@@ -0,0 +1,59 @@
+from sqlalchemy import and_, or_, case
+import math
+from app.models.restaurant import Restaurant
+from app.services.geohash import covering_prefixes, haversine_km, KM_PER_DEG_LAT, KM_PER_DEG_LNG
+
+DEFAULT_RADIUS_KM = 10      # same as UserPreference.search_radius_km's default
+MAX_RADIUS_KM = 200
+NEAREST_START_KM = 2        # nearest-k searches start here and double until they find k
+
+
+def distance_sq(lat: float, lng: float):
+    """
+    Squared distance in km² from (lat, lng), as a SQL expression. Flat-earth
+    (equirectangular) maths is plain arithmetic the database can sort by, and
+    within a couple of hundred km it's within a fraction of a percent of the
+    great-circle distance reported back to clients. The longitude difference
+    is taken modulo 360, so 179.9 and -179.9 are 0.2° apart, not 359.8°.
+    """
+    km_per_deg_lng = KM_PER_DEG_LNG * math.cos(math.radians(lat))
+    d_lng = Restaurant.longitude - lng
+    # Both longitudes are within ±180, so one turn either way is enough — and
+    # unlike %, which SQLite truncates to integers, it works on every database
+    d_lng = case((d_lng > 180, d_lng - 360), (d_lng < -180, d_lng + 360), else_=d_lng)
+    dy = (Restaurant.latitude - lat) * KM_PER_DEG_LAT
+    dx = d_lng * km_per_deg_lng
+    return dy * dy + dx * dx
+
+
+def within_radius(query, lat: float, lng: float, radius_km: float):
+    """
+    Restrict a Restaurant query to radius_km around a point. The geohash
+    prefixes covering the circle become index range scans, so only nearby
+    rows are read before the exact distance check.
+    """
+    cells = or_(*(
+        and_(Restaurant.geohash >= prefix, Restaurant.geohash < prefix + "~")  # "~" sorts after every geohash char
+        for prefix in covering_prefixes(lat, lng, radius_km)
+    ))
+    return query.filter(cells, distance_sq(lat, lng) <= radius_km * radius_km)
+
+
+def nearest(query, lat: float, lng: float, k: int, max_radius_km: float = MAX_RADIUS_KM):
+    """
+    Restrict a Restaurant query to a circle holding its k nearest matches.
+    The radius doubles until the circle has k of them, so dense areas stay
+    cheap; order the result with distance_sq and take k.
+    """
+    radius_km = NEAREST_START_KM
+    while radius_km < max_radius_km:
+        if within_radius(query, lat, lng, radius_km).limit(k).count() >= k:
+            break
+        radius_km *= 2
+    return within_radius(query, lat, lng, min(radius_km, max_radius_km))
+
+
+def distance_km(restaurant, lat: float, lng: float) -> float | None:
+    if restaurant.latitude is None or restaurant.longitude is None:
+        return None
+    return round(haversine_km(lat, lng, restaurant.latitude, restaurant.longitude), 2)
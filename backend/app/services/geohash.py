@@ -0,0 +1,95 @@
+import math
+
+# Geohash cells nest: every extra character splits a cell into 32, so a
+# B-tree index on the geohash string doubles as a spatial index — all points
+# inside a cell share its prefix and sit next to each other in the index.
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9       # ~4.8m x 4.8m cells, what we store per restaurant
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG = 111.320  # at the equator, scaled by cos(latitude)
+
+
+def encode(lat: float, lng: float, precision: int = PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """(height, width) of a cell in degrees"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> list[tuple[float, float, float, float]]:
+    """
+    (min_lat, min_lng, max_lat, max_lng) boxes around a point, clamped at the
+    poles — two when the circle crosses the antimeridian, one each side of it
+    """
+    d_lat = radius_km / KM_PER_DEG_LAT
+    d_lng = radius_km / (KM_PER_DEG_LNG * max(math.cos(math.radians(lat)), 0.01))
+    min_lat, max_lat = max(lat - d_lat, -90.0), min(lat + d_lat, 90.0)
+    if d_lng >= 180.0 or max_lat == 90.0 or min_lat == -90.0:
+        # As wide as the world, or round a pole — every longitude is in it
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+    if min_lng < -180.0:
+        return [(min_lat, min_lng + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+    if max_lng > 180.0:
+        return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng - 360.0)]
+    return [(min_lat, min_lng, max_lat, max_lng)]
+
+
+def covering_prefixes(lat: float, lng: float, radius_km: float, max_cells: int = 16) -> list[str]:
+    """
+    Geohash prefixes whose cells together cover the circle's bounding boxes,
+    at the finest precision that needs no more than max_cells of them.
+    """
+    boxes = bounding_boxes(lat, lng, radius_km)
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        cells = sum(
+            (math.floor(max_lat / height) - math.floor(min_lat / height) + 1)
+            * (math.floor(max_lng / width) - math.floor(min_lng / width) + 1)
+            for min_lat, min_lng, max_lat, max_lng in boxes
+        )
+        if cells <= max_cells:
+            break
+
+    prefixes = set()
+    for min_lat, min_lng, max_lat, max_lng in boxes:
+        # Step through the box one cell at a time and take the cell each point falls in
+        cell_lat = min_lat
+        while True:
+            cell_lng = min_lng
+            while True:
+                prefixes.add(encode(cell_lat, cell_lng, precision))
+                if cell_lng >= max_lng:
+                    break
+                cell_lng = min(cell_lng + width, max_lng)
+            if cell_lat >= max_lat:
+                break
+            cell_lat = min(cell_lat + height, max_lat)
+    return sorted(prefixes)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2
+    return 6371.0088 * 2 * math.asin(math.sqrt(a))
@@ -0,0 +1,209 @@
+from sqlalchemy import event, select, delete, insert, inspect, exists, or_, and_
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+import json
+import re
+from app.config import DEFAULT_TIMEZONE
+from app.models.restaurant import Restaurant
+from app.models.restaurant_hours import RestaurantHours
+
+# restaurants.hours is free-form JSON ({"mon": "9am-10pm", "fri": "11:00-2:00",
+# "sun": "closed"}, or Yelp's {"Monday": "9:0-22:0"}). It's parsed when a
+# restaurant is written into restaurant_hours rows: the weekly intervals it's
+# open, in minutes from Monday 00:00 local time, plus its time zone. "Open
+# at" is then an index range scan — intervals with open <= t < close — and
+# "open now" the same with t taken in each time zone the restaurants are in.
+#
+# ORM writes are kept in sync by the mapper events at the bottom; bulk loaders
+# and migrate_schema call write_hours / rebuild_hours themselves.
+
+REBUILD_BATCH_SIZE = 5000
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DAY = 24 * 60
+WEEK = 7 * DAY
+
+STATE_TIMEZONES = {
+    "America/New_York": "CT DE DC FL GA IN KY MA MD ME MI NC NH NJ NY OH PA RI SC VA VT WV",
+    "America/Chicago": "AL AR IA IL KS LA MN MO MS ND NE OK SD TN TX WI",
+    "America/Denver": "CO ID MT NM UT WY",
+    "America/Phoenix": "AZ",
+    "America/Los_Angeles": "CA NV OR WA",
+    "America/Anchorage": "AK",
+    "Pacific/Honolulu": "HI",
+}
+TIMEZONE_OF_STATE = {state: zone for zone, states in STATE_TIMEZONES.items() for state in states.split()}
+ZONES = sorted(set(STATE_TIMEZONES) | {DEFAULT_TIMEZONE})
+
+TIME_RE = re.compile(r"^(\d{1,2})(?::(\d{1,2}))?\s*(am|pm|a|p)?$")
+RANGE_SPLIT_RE = re.compile(r"\s*(?:-|–|—|\bto\b)\s*")
+ALL_DAY_RE = re.compile(r"24\s*(?:h\b|hrs?\b|hours)|all day")
+
+
+def timezone_for(state: str | None) -> str:
+    return TIMEZONE_OF_STATE.get((state or "").strip().upper(), DEFAULT_TIMEZONE)
+
+
+def parse_time(text: str) -> int | None:
+    """Minutes after midnight of "9am", "9:30 pm", "21:00", "9:0", "noon" — None if it isn't a time"""
+    text = text.strip().lower().replace(".", "")
+    if text in ("noon", "midday"):
+        return 12 * 60
+    if text == "midnight":
+        return 0
+    match = TIME_RE.match(text)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+    if hour > 24 or minute > 59:
+        return None
+    return min(hour * 60 + minute, DAY)
+
+
+def _merge(intervals: list) -> list[tuple[int, int]]:
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_hours(text: str | None) -> list[tuple[int, int]]:
+    """
+    The weekly open intervals of a restaurants.hours value, as (open, close)
+    minutes from Monday 00:00. Past-midnight closing runs into the next day
+    (into Monday for Sunday); equal open and close times mean 24 hours.
+    Days or ranges that can't be read are left out.
+    """
+    try:
+        days = json.loads(text) if text else {}
+    except ValueError:
+        return []
+    if not isinstance(days, dict):
+        return []
+    intervals = []
+    for day, value in days.items():
+        day = str(day).strip().lower()[:3]
+        if day not in DAYS or not isinstance(value, str):
+            continue
+        start_of_day = DAYS.index(day) * DAY
+        value = value.strip().lower()
+        if ALL_DAY_RE.search(value):
+            intervals.append((start_of_day, start_of_day + DAY))
+            continue
+        for part in re.split(r"[,;&]|\band\b", value):
+            times = RANGE_SPLIT_RE.split(part.strip())
+            if len(times) != 2:
+                continue
+            opens, closes = parse_time(times[0]), parse_time(times[1])
+            if opens is None or closes is None:
+                continue
+            if closes <= opens:
+                closes += DAY
+            start, end = start_of_day + opens, start_of_day + closes
+            if end > WEEK:
+                intervals.append((0, end - WEEK))
+                end = WEEK
+            intervals.append((start, end))
+    return _merge(intervals)
+
+
+def minute_of_week(moment: datetime) -> int:
+    return moment.weekday() * DAY + moment.hour * 60 + moment.minute
+
+
+def parse_open_at(text: str) -> int:
+    """Minute of the week of "fri 22:30", "Saturday 11pm" — ValueError if it isn't one"""
+    day, _, time = text.strip().lower().partition(" ")
+    minutes = parse_time(time) if time else None
+    if day[:3] not in DAYS or minutes is None or minutes >= DAY:
+        raise ValueError(f'Expected a day and time like "fri 22:30", got "{text}"')
+    return DAYS.index(day[:3]) * DAY + minutes
+
+
+# --- Filters ---
+
+def _open(zone_minutes: dict):
+    """Restaurants open at {time zone: minute of the week} — one indexed range per zone"""
+    intervals = select(RestaurantHours.restaurant_id).where(or_(*(
+        and_(RestaurantHours.timezone == zone, RestaurantHours.open_minute <= minute,
+             RestaurantHours.close_minute > minute)
+        for zone, minute in zone_minutes.items()
+    )))
+    return Restaurant.id.in_(intervals)
+
+
+def open_at(minute: int):
+    """Open at this minute of the week, in each restaurant's own local time"""
+    return _open({zone: minute for zone in ZONES})
+
+
+def open_now(now: datetime | None = None):
+    now = now or datetime.now(dt_timezone.utc)
+    return _open({zone: minute_of_week(now.astimezone(ZoneInfo(zone))) for zone in ZONES})
+
+
+# --- Keeping restaurant_hours in sync ---
+
+def hours_rows(restaurant_id: int, hours: str | None, state: str | None) -> list[dict]:
+    zone = timezone_for(state)
+    return [{"restaurant_id": restaurant_id, "timezone": zone, "open_minute": start, "close_minute": end}
+            for start, end in parse_hours(hours)]
+
+
+def write_hours(db: Session, restaurants) -> int:
+    """Replace the intervals of (restaurant_id, hours, state) rows — for bulk loads and backfills"""
+    restaurants = list(restaurants)
+    if not restaurants:
+        return 0
+    db.execute(delete(RestaurantHours).where(RestaurantHours.restaurant_id.in_([r[0] for r in restaurants])))
+    rows = [row for restaurant_id, hours, state in restaurants for row in hours_rows(restaurant_id, hours, state)]
+    if rows:
+        db.execute(insert(RestaurantHours), rows)
+    return len(rows)
+
+
+def rebuild_hours(db: Session, after_id: int = 0, missing_only: bool = False) -> int:
+    """Re-parse the hours of restaurants past after_id (only those without intervals yet, with missing_only)"""
+    written = 0
+    while True:
+        query = select(Restaurant.id, Restaurant.hours, Restaurant.state).where(
+            Restaurant.id > after_id, Restaurant.hours.isnot(None)
+        )
+        if missing_only:
+            query = query.where(~exists().where(RestaurantHours.restaurant_id == Restaurant.id))
+        rows = db.execute(query.order_by(Restaurant.id).limit(REBUILD_BATCH_SIZE)).all()
+        if not rows:
+            return written
+        written += write_hours(db, rows)
+        after_id = rows[-1][0]
+
+
+def _replace_hours(connection, target):
+    connection.execute(delete(RestaurantHours).where(RestaurantHours.restaurant_id == target.id))
+    rows = hours_rows(target.id, target.hours, target.state)
+    if rows:
+        connection.execute(insert(RestaurantHours), rows)
+
+
+@event.listens_for(Restaurant, "after_insert")
+def hours_on_insert(mapper, connection, target):
+    _replace_hours(connection, target)
+
+
+@event.listens_for(Restaurant, "after_update")
+def hours_on_update(mapper, connection, target):
+    changed = inspect(target).attrs
+    if changed.hours.history.has_changes() or changed.state.history.has_changes():
+        _replace_hours(connection, target)
+
+
+@event.listens_for(Restaurant, "after_delete")
+def hours_on_delete(mapper, connection, target):
+    connection.execute(delete(RestaurantHours).where(RestaurantHours.restaurant_id == target.id))
@@ -0,0 +1,153 @@
+from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import json
+import mimetypes
+import os
+import re
+from app.config import IMAGE_WORKERS, IMAGE_FORMATS
+from app.services.storage import storage, key_from_url, url_from_key
+
+# Widths generated for each kind of upload — cards and galleries vs. avatars
+RESTAURANT_PHOTO_WIDTHS = (320, 640, 1280)
+PROFILE_PIC_WIDTHS = (96, 192, 384)
+
+# format name -> (file extension, Pillow format, save options)
+FORMAT_OPTIONS = {
+    "avif": ("avif", "AVIF", {"quality": 60}),
+    "webp": ("webp", "WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Matches the files we write, e.g. "abc_w640.webp"
+VARIANT_NAME_RE = re.compile(r"_w\d+\.(avif|webp|jpg)$")
+
+# Resizing is CPU work, so it runs on its own pool; storage I/O stays on the event loop
+_image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+_pending = set()  # keeps scheduled tasks alive until they finish
+
+
+def variant_key(key: str, width: int, fmt: str) -> str:
+    """blobs/a9/a96f...1f.png -> blobs/a9/a96f...1f_w640.webp"""
+    root, _ = os.path.splitext(key)
+    return f"{root}_w{width}.{FORMAT_OPTIONS[fmt][0]}"
+
+
+def variant_keys(key: str, widths: tuple) -> list[str]:
+    """Every variant key an original could have, in any format"""
+    return [variant_key(key, width, fmt) for width in widths for fmt in FORMAT_OPTIONS]
+
+
+def is_variant(path: str) -> bool:
+    return bool(VARIANT_NAME_RE.search(path))
+
+
+def render_variants(data: bytes, wanted: list[tuple[int, str]]) -> list[tuple[int, str, int, bytes]]:
+    """
+    Encode a resized copy of the image for each (width, format) pair, as
+    (width, format, actual width, bytes). Widths wider than the original are
+    written at the original size rather than upscaled, so every variant name
+    exists once generation is done.
+    """
+    rendered = []
+    resized_by_width = {}
+    with Image.open(io.BytesIO(data)) as img:
+        img.seek(0)  # first frame of animated GIF/WebP
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        for width, fmt in wanted:
+            if width not in resized_by_width:
+                target_w = min(width, img.width)
+                target_h = max(round(img.height * target_w / img.width), 1)
+                resized_by_width[width] = img.resize((target_w, target_h), Image.Resampling.LANCZOS)
+            resized = resized_by_width[width]
+
+            _, pil_format, options = FORMAT_OPTIONS[fmt]
+            out = resized.convert("RGB") if pil_format == "JPEG" else resized
+            buf = io.BytesIO()
+            out.save(buf, format=pil_format, **options)
+            rendered.append((width, fmt, resized.width, buf.getvalue()))
+    return rendered
+
+
+async def store_variants(key: str, widths: tuple, force: bool = False, executor=None) -> dict:
+    """
+    Generate and store the missing variants of the original at key and return
+    what was written, per format: {"webp": {"320": 320, "640": 500}} (asked
+    width -> actual width). Rendering runs on executor (default: the image pool).
+    """
+    wanted = [(width, fmt) for width in widths for fmt in IMAGE_FORMATS]
+    if not force:
+        root, _ = os.path.splitext(key)
+        existing = set(await storage.list_keys(f"{root}_w"))
+        wanted = [(w, f) for w, f in wanted if variant_key(key, w, f) not in existing]
+    if not wanted:
+        return {}
+
+    data = await storage.get(key)
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(executor or _image_executor, render_variants, data, wanted)
+
+    written = {}
+    for width, fmt, actual_width, body in rendered:
+        out_key = variant_key(key, width, fmt)
+        await storage.put(out_key, body, mimetypes.guess_type(out_key)[0])
+        written.setdefault(fmt, {})[str(width)] = actual_width
+    return written
+
+
+def _log_failure(task):
+    _pending.discard(task)
+    if not task.cancelled() and task.exception():
+        print(f"Image variant generation failed: {task.exception()}")
+
+
+async def _store_and_record(key: str, widths: tuple, on_stored):
+    written = await store_variants(key, widths)
+    if written and on_stored is not None:
+        await asyncio.get_running_loop().run_in_executor(None, on_stored, written)
+
+
+def schedule_variants(photo_url: str, widths: tuple, on_stored=None):
+    """
+    Generate variants in the background so the upload request returns right
+    away, then call on_stored(written) on a worker thread with what
+    store_variants wrote
+    """
+    task = asyncio.get_running_loop().create_task(_store_and_record(key_from_url(photo_url), widths, on_stored))
+    _pending.add(task)
+    task.add_done_callback(_log_failure)
+    return task
+
+
+def build_srcset(photo_url: str | None, widths: tuple, variants: str | None = None) -> dict:
+    """
+    srcset strings per format, e.g.
+    {"webp": "/uploads/blobs/a9/a96f..._w320.webp 320w, /uploads/blobs/a9/a96f..._w640.webp 500w"}.
+
+    Variants are listed from variants, the JSON recorded on the blob as
+    they're written (MediaBlob.variants), with the width each file really has;
+    asked widths that came out the same size as a smaller one are left out.
+    Nothing touches storage, so an upload without recorded variants — one
+    from before blobs/ that migrate_uploads_to_blobs hasn't moved yet —
+    gets no srcset.
+    """
+    if not photo_url or not variants:
+        return {}
+    key = key_from_url(photo_url)
+    written = json.loads(variants)
+    srcset = {}
+    for fmt in IMAGE_FORMATS:
+        entries, listed = [], set()
+        for width in widths:
+            actual_width = written.get(fmt, {}).get(str(width))
+            if actual_width is None or actual_width in listed:
+                continue
+            listed.add(actual_width)
+            entries.append(f"{url_from_key(variant_key(key, width, fmt))} {actual_width}w")
+        if entries:
+            srcset[fmt] = ", ".join(entries)
+    return srcset
@@ -0,0 +1,228 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import queue
+import socket
+import threading
+import uuid
+from app.config import INVALIDATION_BUS, INVALIDATION_SOCKET_DIR, INVALIDATION_CHANNEL
+
+# Cross-worker cache invalidation. Each worker keeps caches in memory (the
+# restaurant indexes, the search cache's versions with the "memory" backend)
+# and updates them itself when it makes a write. A write also publishes a
+# small event on the bus, and every other worker evicts or reloads what the
+# event names, rather than serving stale results until its next refresh.
+#
+# Events are JSON objects with a topic and a few ids:
+#   restaurant  {"action": "saved" | "deleted", "id": 12}
+#   search      {"cities": [...], "cuisines": [...]}
+#   user        {"id": 7, "changed": "profile" | "preferences"}
+# Handlers run on the bus's listener thread, only for other workers' events.
+# Delivery is best effort — the periodic refreshes and SEARCH_CACHE_TTL_SECONDS
+# still bound staleness when a message is dropped.
+
+MAX_MESSAGE_BYTES = 64 * 1024
+SEND_TIMEOUT_SECONDS = 0.05   # wait this long on a worker whose queue is full, then drop the event for it
+
+
+class Bus(ABC):
+    """Publish events to the other workers and run subscribed handlers for theirs"""
+
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self.stats = {"published": 0, "received": 0, "dropped": 0, "handler_errors": 0}
+
+    def subscribe(self, topic: str):
+        """Decorator: call the function with each event on this topic from another worker"""
+        def register(handler):
+            self._handlers.setdefault(topic, []).append(handler)
+            return handler
+        return register
+
+    def publish(self, topic: str, **data):
+        message = json.dumps({"topic": topic, "origin": self.origin, **data}, default=list).encode()
+        self.stats["published"] += 1
+        self._send(message)
+
+    def _deliver(self, message: bytes):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            self.stats["dropped"] += 1
+            return
+        if event.get("origin") == self.origin:
+            return
+        self.stats["received"] += 1
+        for handler in self._handlers.get(event.get("topic"), ()):
+            try:
+                handler(event)
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                print(f"Invalidation handler for {event.get('topic')} failed: {e}")
+
+    @abstractmethod
+    def _send(self, message: bytes):
+        ...
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LocalBus(Bus):
+    """A single worker — there is no one else to tell"""
+
+    def _send(self, message: bytes):
+        pass
+
+
+class UnixSocketBus(Bus):
+    """
+    Every worker on this host binds a Unix datagram socket in a shared
+    directory and sends each event to all the others' sockets. Sockets left
+    behind by workers that exited are removed on the first failed send.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.path = None
+        self._listener = None
+        self._sender = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._listener.bind(self.path)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.settimeout(SEND_TIMEOUT_SECONDS)   # a worker that isn't reading mustn't stall a request
+        threading.Thread(target=self._listen, args=(self._listener,), daemon=True).start()
+
+    def _listen(self, listener: socket.socket):
+        while True:
+            try:
+                message = listener.recv(MAX_MESSAGE_BYTES)
+            except OSError:
+                return   # closed
+            self._deliver(message)
+
+    def _send(self, message: bytes):
+        if self._sender is None:
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                self._sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.remove(path)   # its worker is gone
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                self.stats["dropped"] += 1   # its queue stayed full
+
+    def close(self):
+        for sock in (self._listener, self._sender):
+            if sock is not None:
+                sock.close()
+        self._listener = self._sender = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class Broker(ABC):
+    """
+    Pub/sub transport for BrokerBus — what a Redis PUBLISH / SUBSCRIBE or NATS
+    client would implement to spread events across nodes. Callbacks get the
+    raw message bytes.
+    """
+
+    @abstractmethod
+    def publish(self, channel: str, message: bytes):
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback):
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, channel: str, callback):
+        ...
+
+
+class LocalBroker(Broker):
+    """In-process stand-in for a broker: every subscriber gets every message, on a delivery thread"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            channel, message = self._queue.get()
+            with self._lock:
+                callbacks = list(self._subscribers.get(channel, ()))
+            for callback in callbacks:
+                callback(message)
+            self._queue.task_done()
+
+    def publish(self, channel: str, message: bytes):
+        self._queue.put((channel, message))
+
+    def subscribe(self, channel: str, callback):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, channel: str, callback):
+        with self._lock:
+            self._subscribers.get(channel, []).remove(callback)
+
+    def join(self):
+        """Wait until everything published so far is delivered"""
+        self._queue.join()
+
+
+class BrokerBus(Bus):
+    """Events over a pub/sub broker channel, for workers on several nodes"""
+
+    def __init__(self, broker: Broker, channel: str):
+        super().__init__()
+        self.broker = broker
+        self.channel = channel
+        self._started = False
+
+    def start(self):
+        self.broker.subscribe(self.channel, self._deliver)
+        self._started = True
+
+    def _send(self, message: bytes):
+        if self._started:
+            self.broker.publish(self.channel, message)
+
+    def close(self):
+        if self._started:
+            self.broker.unsubscribe(self.channel, self._deliver)
+            self._started = False
+
+
+def build_bus() -> Bus:
+    if INVALIDATION_BUS == "unix":
+        return UnixSocketBus(INVALIDATION_SOCKET_DIR)
+    if INVALIDATION_BUS == "broker":
+        # Swap in a real broker client here to span nodes
+        return BrokerBus(LocalBroker(), INVALIDATION_CHANNEL)
+    return LocalBus()
+
+
+bus = build_bus()
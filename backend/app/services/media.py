@@ -0,0 +1,177 @@
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from collections import OrderedDict
+import mimetypes
+import os
+import stat
+import threading
+import xxhash
+from app.services.images import is_variant
+from app.services.storage import public_url
+
+# Cache policy per kind of file under /uploads:
+#  - blobs are content-addressed, so their bytes can never change under the same URL
+#  - variants are derived from a blob and only change if the encoder settings do
+#  - everything else (pre-blob uploads) gets a day and then revalidates
+IMMUTABLE = "public, max-age=31536000, immutable"
+VARIANT_CACHE = "public, max-age=604800"
+DEFAULT_CACHE = "public, max-age=86400"
+
+# Precompressed siblings we look for, in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+ETAG_CACHE_SIZE = 4096
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for /uploads with cache-friendly headers.
+
+    Every response carries a strong, content-based ETag — the hash itself for
+    blobs, an xxh3 of the bytes (cached by path/mtime/size) for anything else —
+    plus a Cache-Control chosen by the kind of file. Conditional GETs answer
+    304, and Range / If-Range requests are handled by FileResponse using the
+    same ETag. If a client accepts br or gzip and a .br / .gz file sits next to
+    the original, that is sent instead with its own ETag.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._etags = OrderedDict()
+        self._etags_lock = threading.Lock()
+
+    def lookup_path(self, path: str):
+        # Runs on a worker thread, so this is where we pay for hashing a file the first time
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result and stat.S_ISREG(stat_result.st_mode):
+            self._content_etag(full_path, stat_result)
+        return full_path, stat_result
+
+    def _is_blob(self, full_path: str) -> bool:
+        # Relative to the mount, so a parent directory that happens to be called blobs doesn't count
+        return os.path.relpath(full_path, self.directory).split(os.sep)[0] == "blobs"
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        name = os.path.basename(full_path)
+
+        etag = self._content_etag(full_path, stat_result)
+        if self._is_blob(full_path) and not is_variant(name):
+            cache_control = IMMUTABLE
+        elif self._is_blob(full_path):
+            cache_control = VARIANT_CACHE
+        else:
+            cache_control = DEFAULT_CACHE
+
+        headers = {"etag": etag, "cache-control": cache_control, "vary": "Accept-Encoding"}
+        media_type = mimetypes.guess_type(name)[0]
+        serve_path, serve_stat = full_path, stat_result
+
+        # Byte ranges always refer to the identity encoding, so skip precompressed files for them
+        if "range" not in request_headers:
+            accepted = request_headers.get("accept-encoding", "")
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding in accepted and os.path.exists(full_path + suffix):
+                    serve_path = full_path + suffix
+                    serve_stat = os.stat(serve_path)
+                    headers["content-encoding"] = encoding
+                    headers["etag"] = f'{etag[:-1]}-{encoding}"'
+                    break
+
+        response = FileResponse(
+            serve_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=serve_stat
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _content_etag(self, full_path, stat_result) -> str:
+        full_path = str(full_path)
+        name = os.path.basename(full_path)
+        if self._is_blob(full_path) and not is_variant(name):
+            # The file name is the content hash
+            return f'"{os.path.splitext(name)[0]}"'
+
+        key = (full_path, stat_result.st_mtime_ns, stat_result.st_size)
+        with self._etags_lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+
+        hasher = xxhash.xxh3_128()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        etag = f'"{hasher.hexdigest()}"'
+
+        with self._etags_lock:
+            self._etags[key] = etag
+            if len(self._etags) > ETAG_CACHE_SIZE:
+                self._etags.popitem(last=False)
+        return etag
+
+
+class StorageFiles:
+    """
+    /uploads for object-store backends, where the bytes don't live on this
+    node's disk. If the bucket is publicly readable (S3_PUBLIC_URL) clients
+    are redirected there; otherwise the object is proxied with the same
+    ETag and Cache-Control policy MediaFiles uses. A conditional GET for a
+    blob original is answered 304 from its hash without touching storage.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        request_headers = Headers(scope=scope)
+        # Mount leaves the full path in scope and the mount point in root_path
+        path, root_path = scope["path"], scope.get("root_path", "")
+        key = (path[len(root_path):] if path.startswith(root_path) else path).lstrip("/")
+        name = os.path.basename(key)
+        is_blob = key.startswith("blobs/")
+
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif not key or ".." in key.split("/"):
+            response = PlainTextResponse("Not Found", status_code=404)
+        elif public_url(key):
+            response = RedirectResponse(public_url(key), status_code=307)
+        else:
+            if is_blob and not is_variant(name):
+                cache_control = IMMUTABLE
+            elif is_blob:
+                cache_control = VARIANT_CACHE
+            else:
+                cache_control = DEFAULT_CACHE
+            headers = {"cache-control": cache_control}
+
+            if is_blob and not is_variant(name):
+                headers["etag"] = f'"{os.path.splitext(name)[0]}"'
+                if _etag_matches(request_headers, headers["etag"]):
+                    return await NotModifiedResponse(headers)(scope, receive, send)
+            try:
+                data = await self.backend.get(key)
+            except FileNotFoundError:
+                return await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+
+            headers.setdefault("etag", f'"{xxhash.xxh3_128_hexdigest(data)}"')
+            if _etag_matches(request_headers, headers["etag"]):
+                response = NotModifiedResponse(headers)
+            else:
+                response = Response(data, headers=headers, media_type=mimetypes.guess_type(name)[0])
+        await response(scope, receive, send)
+
+
+def _etag_matches(request_headers: Headers, etag: str) -> bool:
+    if_none_match = request_headers.get("if-none-match", "")
+    return etag in [tag.strip(" W/") for tag in if_none_match.split(",")]
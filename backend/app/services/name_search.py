@@ -0,0 +1,107 @@
+from sqlalchemy.orm import Session
+from array import array
+import numpy as np
+from app.config import FUZZY_MIN_SIMILARITY, FUZZY_MAX_MATCHES, NAME_SEARCH_REFRESH_SECONDS
+from app.models.restaurant import Restaurant
+from app.services.autocomplete import normalize
+from app.services.restaurant_index import RestaurantIndex
+
+# Typo-tolerant restaurant name search ("resturant", "pho hoa" for "Phở Hòa").
+#
+# Names are accent-folded and cut into trigrams the way Postgres' pg_trgm
+# does — each word padded with two spaces in front and one behind, so
+# "pho" is "  p", " ph", "pho", "ho ". A misspelling still shares most of
+# its trigrams with the name it means. Each trigram has a posting list of
+# the rows whose name contains it, so a search only touches the rows that
+# share at least one trigram with it, counted with one bincount.
+#
+# A name matches when it holds at least FUZZY_MIN_SIMILARITY of the
+# search's trigrams (a search for one word of a long name still matches).
+# Matches rank by that share, then by how much of the name the search
+# covers, so "pho hoa" puts "Pho Hoa" before "Pho Hoa Noodle House".
+#
+# Kept in sync with the restaurants table as described in restaurant_index,
+# every NAME_SEARCH_REFRESH_SECONDS.
+
+
+def trigrams(text: str | None) -> set[str]:
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramState:
+    """Posting lists of rows per trigram; a row per restaurant, never reused"""
+
+    def __init__(self):
+        self.postings = {}                        # trigram -> array of rows
+        self.row_of = {}                          # restaurant id -> row
+        self.ids = array("q")                     # row -> restaurant id, -1 once removed
+        self.grams = []                           # row -> its trigrams
+        self.gram_count = np.zeros(8, np.int64)   # row -> how many
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def add(self, restaurant_id: int, name):
+        grams = trigrams(name)
+        row = self.row_of.get(restaurant_id)
+        if row is not None and self.grams[row] == grams:
+            return
+        self.remove(restaurant_id)
+        row = self.row_of[restaurant_id] = len(self.ids)
+        self.ids.append(restaurant_id)
+        self.grams.append(grams)
+        if len(self.gram_count) <= row:
+            self.gram_count = np.pad(self.gram_count, (0, len(self.gram_count)))
+        self.gram_count[row] = len(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, array("q")).append(row)
+
+    def remove(self, restaurant_id: int):
+        row = self.row_of.pop(restaurant_id, None)
+        if row is None:
+            return
+        for gram in self.grams[row]:
+            self.postings[gram].remove(row)
+        self.ids[row] = -1
+        self.grams[row] = set()
+        self.gram_count[row] = 0
+
+    def build(self, rows: list):
+        for restaurant_id, name in rows:
+            self.add(restaurant_id, name)
+
+    def search(self, query: str, limit: int) -> list[tuple[int, float]]:
+        """(restaurant id, similarity) of the best matching names, best first"""
+        grams = trigrams(query)
+        lists = [np.frombuffer(self.postings[g], np.int64) for g in grams if self.postings.get(g)]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.ids))
+        rows = np.flatnonzero(shared >= max(FUZZY_MIN_SIMILARITY * len(grams), 1))
+        shared = shared[rows]
+        similarity = shared / len(grams)
+        coverage = shared / self.gram_count[rows]
+        order = np.lexsort((rows, -coverage, -similarity))[:limit]
+        return [(self.ids[row], round(float(similarity[i]), 3)) for i, row in zip(order, rows[order])]
+
+
+class NameSearch(RestaurantIndex):
+    """A TrigramState kept in sync with the restaurants table"""
+    name = "Name search index"
+    columns = (Restaurant.id, Restaurant.name)
+    refresh_seconds = NAME_SEARCH_REFRESH_SECONDS
+
+    def new_state(self) -> TrigramState:
+        return TrigramState()
+
+    def search(self, db: Session, query: str, limit: int = FUZZY_MAX_MATCHES) -> list[tuple[int, float]]:
+        self.ensure_fresh(db)
+        with self._lock:
+            return self._state.search(query, limit)
+
+
+name_index = NameSearch()
@@ -0,0 +1,133 @@
+from sqlalchemy import select, update, delete, insert, bindparam, func
+from sqlalchemy.orm import Session
+from app.models.restaurant import Restaurant
+from app.models.restaurant_stats import RestaurantStats
+from app.models.review import Review
+
+UPDATE_BATCH_SIZE = 5000
+STARS = (1, 2, 3, 4, 5)
+
+
+def _column(rating: int):
+    return getattr(RestaurantStats, f"rating_{rating}")
+
+
+def _summary(counts: dict) -> tuple[int, float]:
+    """(review_count, avg_rating) from {stars: reviews}"""
+    total = sum(counts.values())
+    return total, round(sum(stars * n for stars, n in counts.items()) / total, 2) if total else 0.0
+
+
+def count_by_rating(db: Session, restaurant_id: int) -> dict:
+    """{stars: reviews} straight from the reviews table — one GROUP BY on the (restaurant_id, ...) index"""
+    counts = dict.fromkeys(STARS, 0)
+    for rating, n in db.execute(
+        select(Review.rating, func.count(Review.id))
+        .where(Review.restaurant_id == restaurant_id)
+        .group_by(Review.rating)
+    ):
+        if rating in counts:
+            counts[rating] = n
+    return counts
+
+
+def rating_distribution(db: Session, restaurant_id: int) -> dict:
+    """
+    {stars: reviews} for one restaurant — read from restaurant_stats, or
+    aggregated from the reviews for a restaurant without a stats row yet.
+    Nothing is written: the row is created by the restaurant's next review
+    (record_review_change), and migrate_schema backfills it for reviews
+    that predate the table.
+    """
+    stats = db.get(RestaurantStats, restaurant_id)
+    if stats is None:
+        return count_by_rating(db, restaurant_id)
+    return {s: getattr(stats, f"rating_{s}") for s in STARS}
+
+
+def record_review_change(db: Session, restaurant: Restaurant, old_rating: int | None = None,
+                         new_rating: int | None = None):
+    """
+    Keep restaurant_stats, avg_rating and review_count in step with a review
+    being added (new_rating), removed (old_rating) or re-rated (both) — a
+    counter update instead of re-reading every review. Call after the review
+    change is made in the session; the caller commits.
+    """
+    if old_rating == new_rating:
+        return
+    deltas = {}
+    if old_rating is not None:
+        deltas[_column(old_rating)] = _column(old_rating) - 1
+    if new_rating is not None:
+        deltas[_column(new_rating)] = _column(new_rating) + 1
+
+    updated = db.execute(
+        update(RestaurantStats).where(RestaurantStats.restaurant_id == restaurant.id)
+        .values(deltas).execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        stats = db.execute(
+            select(RestaurantStats).where(RestaurantStats.restaurant_id == restaurant.id)
+            .execution_options(populate_existing=True)
+        ).scalar_one()
+        counts = {s: getattr(stats, f"rating_{s}") for s in STARS}
+    else:
+        # No stats row yet — count everything, including the change just made
+        db.flush()
+        counts = count_by_rating(db, restaurant.id)
+        db.add(RestaurantStats(restaurant_id=restaurant.id, **{f"rating_{s}": n for s, n in counts.items()}))
+    restaurant.review_count, restaurant.avg_rating = _summary(counts)
+
+
+def recompute_ratings(db: Session, restaurant_ids=None) -> int:
+    """
+    Set avg_rating, review_count and restaurant_stats from the reviews table
+    — for the given restaurants, or every restaurant that has reviews. One
+    GROUP BY pass over reviews, then batched writes by id, so it's used after
+    bulk loads instead of recomputing once per inserted review. The caller
+    commits. Returns the number of restaurants updated.
+    """
+    query = (
+        select(Review.restaurant_id, Review.rating, func.count(Review.id))
+        .group_by(Review.restaurant_id, Review.rating)
+        .order_by(Review.restaurant_id)
+    )
+    if restaurant_ids is not None:
+        query = query.where(Review.restaurant_id.in_(restaurant_ids))
+
+    stmt = (
+        update(Restaurant.__table__)
+        .where(Restaurant.__table__.c.id == bindparam("restaurant_id"))
+        .values(review_count=bindparam("count"), avg_rating=bindparam("avg"))
+    )
+
+    def write(batch: dict):
+        db.execute(stmt, [
+            {"restaurant_id": restaurant_id, "count": total, "avg": avg}
+            for restaurant_id, (total, avg) in ((rid, _summary(c)) for rid, c in batch.items())
+        ])
+        db.execute(delete(RestaurantStats).where(RestaurantStats.restaurant_id.in_(list(batch))))
+        db.execute(insert(RestaurantStats), [
+            {"restaurant_id": restaurant_id, **{f"rating_{s}": n for s, n in counts.items()}}
+            for restaurant_id, counts in batch.items()
+        ])
+
+    updated = 0
+    batch = {}
+    result = db.execute(query)
+    while rows := result.fetchmany(UPDATE_BATCH_SIZE):
+        for restaurant_id, rating, n in rows:
+            if restaurant_id not in batch:
+                # Rows arrive grouped by restaurant, so a full batch is complete
+                # once the next restaurant starts
+                if len(batch) >= UPDATE_BATCH_SIZE:
+                    write(batch)
+                    updated += len(batch)
+                    batch = {}
+                batch[restaurant_id] = dict.fromkeys(STARS, 0)
+            if rating in batch[restaurant_id]:
+                batch[restaurant_id][rating] = n
+    if batch:
+        write(batch)
+        updated += len(batch)
+    return updated
@@ -0,0 +1,360 @@
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import Session
+import numpy as np
+import threading
+import time
+from app.config import RECOMMENDER_NEIGHBORS, RECOMMENDER_REFRESH_SECONDS, RECOMMENDER_REBUILD_SECONDS
+from app.models.favorite import Favorite
+from app.models.restaurant import Restaurant
+from app.models.review import Review
+
+# Item-item collaborative filtering ("people who liked this also liked").
+#
+# Favorites and reviews form a sparse user x restaurant matrix of how much each
+# user liked each restaurant. Two restaurants are similar when the same users
+# like both: cosine similarity between their columns. Only the top
+# RECOMMENDER_NEIGHBORS neighbours of each restaurant are kept, and a user's
+# recommendations are their liked restaurants' neighbours, weighted by how
+# much they liked each one.
+
+FAVORITE_WEIGHT = 1.0
+# How much a review of n stars says the user liked the place; low ratings say nothing
+RATING_WEIGHTS = np.array([0.0, 0.0, 0.0, 0.3, 0.7, 1.0], dtype=np.float32)
+
+MAX_PAIRS_PER_CHUNK = 4_000_000  # bounds memory while multiplying the matrix
+ID_CHUNK_SIZE = 1000             # ids per IN (...) list
+
+
+# --- Loading the matrix ---
+
+def load_interactions(db: Session, user_ids=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (users, restaurants, weights) — one entry per user/restaurant pair, for
+    every user or just the given ones. A favorite and a review of the same
+    place count once, at whichever weight is higher.
+    """
+    fav_query = select(Favorite.user_id, Favorite.restaurant_id)
+    review_query = select(Review.user_id, Review.restaurant_id, Review.rating)
+    if user_ids is None:
+        favorites = db.execute(fav_query).all()
+        reviews = db.execute(review_query).all()
+    else:
+        favorites, reviews = [], []
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), ID_CHUNK_SIZE):
+            chunk = user_ids[i:i + ID_CHUNK_SIZE]
+            favorites += db.execute(fav_query.where(Favorite.user_id.in_(chunk))).all()
+            reviews += db.execute(review_query.where(Review.user_id.in_(chunk))).all()
+
+    fav = np.array(favorites, dtype=np.int64).reshape(-1, 2)
+    rev = np.array(reviews, dtype=np.int64).reshape(-1, 3)
+    users = np.concatenate([fav[:, 0], rev[:, 0]])
+    items = np.concatenate([fav[:, 1], rev[:, 1]])
+    weights = np.concatenate([
+        np.full(len(fav), FAVORITE_WEIGHT, dtype=np.float32),
+        RATING_WEIGHTS[np.clip(rev[:, 2], 0, 5)]
+    ])
+    keep = weights > 0
+    return _dedupe(users[keep], items[keep], weights[keep])
+
+
+def _dedupe(users, items, weights):
+    """Collapse repeated (user, restaurant) pairs, keeping the highest weight"""
+    if len(users) == 0:
+        return users, items, weights
+    order = np.lexsort((items, users))
+    users, items, weights = users[order], items[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, (users[1:] != users[:-1]) | (items[1:] != items[:-1])])
+    return users[starts], items[starts], np.maximum.reduceat(weights, starts)
+
+
+# --- Item-item similarity ---
+
+def compute_neighbors(users, items, weights, for_items=None, k: int = RECOMMENDER_NEIGHBORS) -> dict:
+    """
+    restaurant id -> (neighbour ids, similarities), best first, for for_items
+    (default: every restaurant). This is the sparse product XᵀX restricted to
+    the wanted rows: each interaction (u, i) pairs up with every other
+    interaction of user u, and the pair products summed per (i, j) are the
+    dot products. Rows are processed in chunks so memory stays bounded.
+    """
+    if len(users) == 0:
+        return {}
+    item_ids, item_idx = np.unique(items, return_inverse=True)
+    n_items = len(item_ids)
+    norms = np.sqrt(np.bincount(item_idx, weights=weights.astype(np.float64) ** 2, minlength=n_items))
+
+    # CSR by user: user_start[r] .. + user_deg[r] are user r's interactions
+    by_user = np.lexsort((item_idx, users))
+    u_items, u_weights = item_idx[by_user], weights[by_user]
+    user_ids, user_start, user_deg = np.unique(users[by_user], return_index=True, return_counts=True)
+    user_row = np.searchsorted(user_ids, users)
+
+    # The interactions whose item rows we need, grouped by item
+    wanted = np.ones(len(items), dtype=bool) if for_items is None else np.isin(items, for_items)
+    rows_i = item_idx[wanted]
+    order = np.argsort(rows_i, kind="stable")
+    rows_i, rows_u, rows_w = rows_i[order], user_row[wanted][order], weights[wanted][order]
+    pair_counts = user_deg[rows_u]
+
+    # Cut chunks on item boundaries so every row is summed in one piece
+    item_bounds = np.flatnonzero(np.r_[True, rows_i[1:] != rows_i[:-1], True])
+    pairs_before = np.r_[0, np.cumsum(pair_counts)][item_bounds]
+    result = {}
+    start = 0
+    while start < len(item_bounds) - 1:
+        end = start + 1
+        while end < len(item_bounds) - 1 and pairs_before[end + 1] - pairs_before[start] <= MAX_PAIRS_PER_CHUNK:
+            end += 1
+        lo, hi = item_bounds[start], item_bounds[end]
+        result.update(_neighbor_rows(
+            rows_i[lo:hi], rows_u[lo:hi], rows_w[lo:hi], pair_counts[lo:hi],
+            u_items, u_weights, user_start, norms, item_ids, n_items, k
+        ))
+        start = end
+    return result
+
+
+def _neighbor_rows(rows_i, rows_u, rows_w, counts, u_items, u_weights, user_start, norms, item_ids, n_items, k):
+    # Expand every (i, u) into (i, j) for each item j of user u
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(rows_i)), counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    source = user_start[rows_u[owner]] + offset
+    i, j = rows_i[owner], u_items[source]
+    products = rows_w[owner].astype(np.float64) * u_weights[source]
+
+    not_self = i != j
+    keys, inverse = np.unique(i[not_self] * n_items + j[not_self], return_inverse=True)
+    dots = np.bincount(inverse, weights=products[not_self])
+    i, j = keys // n_items, keys % n_items
+    similarity = dots / (norms[i] * norms[j])
+
+    # Top k per row: sort by row, then similarity descending
+    order = np.lexsort((-similarity, i))
+    i, j, similarity = i[order], j[order], similarity[order]
+    row_start = np.flatnonzero(np.r_[True, i[1:] != i[:-1]])
+    rank = np.arange(len(i)) - np.repeat(row_start, np.diff(np.r_[row_start, len(i)]))
+    top = rank < k
+    i, j, similarity = i[top], j[top], similarity[top]
+
+    rows = {}
+    bounds = np.flatnonzero(np.r_[True, i[1:] != i[:-1], True]) if len(i) else []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        rows[int(item_ids[i[a]])] = (item_ids[j[a:b]], similarity[a:b].astype(np.float32))
+    # Rows with no co-liked restaurants at all still get an (empty) entry
+    for row in np.unique(rows_i):
+        rows.setdefault(int(item_ids[row]), (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+    return rows
+
+
+def item_norms(items, weights, for_items) -> np.ndarray:
+    """Length of each for_items restaurant's column of the matrix"""
+    position = np.searchsorted(for_items, items)
+    position[position == len(for_items)] = 0
+    inside = for_items[position] == items
+    squares = np.bincount(position[inside], weights=weights[inside].astype(np.float64) ** 2, minlength=len(for_items))
+    return np.sqrt(squares)
+
+
+def patch_neighbors(neighbors: dict, rows: dict, affected, rescale) -> dict:
+    """
+    A copy of neighbors with the affected restaurants' rows replaced. Every
+    other row keeps its co-occurrence counts — no user who liked it changed —
+    so only its similarities to affected restaurants move, by the ratio
+    between their old and new lengths.
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rescale = np.nan_to_num(rescale, nan=0.0, posinf=0.0).astype(np.float32)
+    patched = dict(neighbors)
+    for restaurant_id, (ids, sims) in neighbors.items():
+        touched = np.isin(ids, affected)
+        if touched.any():
+            sims = sims.copy()
+            sims[touched] *= rescale[np.searchsorted(affected, ids[touched])]
+            order = np.argsort(-sims, kind="stable")
+            order = order[sims[order] > 0]
+            patched[restaurant_id] = (ids[order], sims[order])
+    for restaurant_id in affected.tolist():
+        patched[restaurant_id] = rows.get(restaurant_id, empty)
+    return patched
+
+
+# --- The served model ---
+
+class Recommender:
+    """
+    The precomputed neighbour lists plus what's needed to refresh them.
+
+    A refresh reloads only the users with favorites/reviews newer than the
+    last one, recomputes the rows of the restaurants they touched and rescales
+    everyone else's similarities to those restaurants. A restaurant that
+    would only now climb into another's top RECOMMENDER_NEIGHBORS waits for
+    the next full rebuild. Deletions (which leave no trace to query) show up as row counts that
+    don't add up, and trigger a full rebuild, as does RECOMMENDER_REBUILD_SECONDS
+    passing. Refreshes run on a background thread; requests keep using the
+    previous model meanwhile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._neighbors = None
+        self._users = self._items = self._weights = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self.stats = {"restaurants": 0, "users": 0, "interactions": 0,
+                      "last_refresh_ms": None, "last_rebuild_ms": None, "refreshes": 0, "rebuilds": 0}
+
+    def ensure_fresh(self, db: Session):
+        """Build the model on first use; afterwards kick off a refresh when it's due"""
+        if self._neighbors is None:
+            with self._lock:
+                if self._neighbors is None:
+                    self._rebuild(db)
+            return
+        if time.monotonic() - self._refreshed_at >= RECOMMENDER_REFRESH_SECONDS and self._lock.acquire(blocking=False):
+            engine = db.get_bind()
+            threading.Thread(target=self._refresh_in_background, args=(engine,), daemon=True).start()
+
+    def _refresh_in_background(self, engine):
+        try:
+            with Session(bind=engine) as db:
+                if time.monotonic() - self._rebuilt_at >= RECOMMENDER_REBUILD_SECONDS:
+                    self._rebuild(db)
+                else:
+                    self._refresh(db)
+        except Exception as e:
+            print(f"Recommender refresh failed: {e}")
+            self._refreshed_at = time.monotonic()  # don't retry on every request
+        finally:
+            self._lock.release()
+
+    def _read_watermark(self, db: Session) -> dict:
+        fav_count, fav_max = db.execute(select(func.count(Favorite.id), func.max(Favorite.id))).one()
+        review_count, review_max, review_updated = db.execute(
+            select(func.count(Review.id), func.max(Review.id), func.max(Review.updated_at))
+        ).one()
+        return {"fav_count": fav_count, "fav_max": fav_max or 0, "review_count": review_count,
+                "review_max": review_max or 0, "review_updated": review_updated}
+
+    def _rebuild(self, db: Session):
+        started = time.perf_counter()
+        watermark = self._read_watermark(db)
+        users, items, weights = load_interactions(db)
+        neighbors = compute_neighbors(users, items, weights)
+
+        self._users, self._items, self._weights = users, items, weights
+        self._neighbors, self._watermark = neighbors, watermark
+        self._refreshed_at = self._rebuilt_at = time.monotonic()
+        self._update_stats(rebuild_ms=(time.perf_counter() - started) * 1000)
+
+    def _refresh(self, db: Session):
+        started = time.perf_counter()
+        old = self._watermark
+        watermark = self._read_watermark(db)
+
+        changed = [Favorite.id > old["fav_max"]]
+        new_favorites = db.execute(select(func.count(Favorite.id)).where(*changed)).scalar()
+        review_changed = [Review.id > old["review_max"]]
+        if old["review_updated"] is not None:
+            review_changed.append(Review.updated_at >= old["review_updated"])
+        new_reviews = db.execute(select(func.count(Review.id)).where(Review.id > old["review_max"])).scalar()
+
+        # Anything deleted since last time means counts no longer add up
+        if (watermark["fav_count"] != old["fav_count"] + new_favorites
+                or watermark["review_count"] != old["review_count"] + new_reviews):
+            self._rebuild(db)
+            return
+
+        changed_users = set(db.execute(select(Favorite.user_id).where(*changed).distinct()).scalars())
+        changed_users |= set(db.execute(select(Review.user_id).where(or_(*review_changed)).distinct()).scalars())
+        if changed_users:
+            changed_users = np.array(sorted(changed_users), dtype=np.int64)
+            new_users, new_items, new_weights = load_interactions(db, changed_users.tolist())
+            keep = ~np.isin(self._users, changed_users)
+            affected = np.union1d(self._items[~keep], new_items)
+
+            users = np.concatenate([self._users[keep], new_users])
+            items = np.concatenate([self._items[keep], new_items])
+            weights = np.concatenate([self._weights[keep], new_weights])
+            rows = compute_neighbors(users, items, weights, for_items=affected)
+            rescale = item_norms(self._items, self._weights, affected) / item_norms(items, weights, affected)
+
+            # Swap in a new dict so readers never see a half-updated one
+            self._neighbors = patch_neighbors(self._neighbors, rows, affected, rescale)
+            self._users, self._items, self._weights = users, items, weights
+
+        self._watermark = watermark
+        self._refreshed_at = time.monotonic()
+        self._update_stats(refresh_ms=(time.perf_counter() - started) * 1000)
+
+    def _update_stats(self, rebuild_ms=None, refresh_ms=None):
+        self.stats["restaurants"] = len(self._neighbors)
+        self.stats["users"] = int(len(np.unique(self._users)))
+        self.stats["interactions"] = int(len(self._users))
+        if rebuild_ms is not None:
+            self.stats["last_rebuild_ms"] = round(rebuild_ms, 1)
+            self.stats["rebuilds"] += 1
+        if refresh_ms is not None:
+            self.stats["last_refresh_ms"] = round(refresh_ms, 1)
+            self.stats["refreshes"] += 1
+
+    # --- Queries ---
+
+    def similar(self, db: Session, restaurant_id: int, limit: int) -> list[tuple[int, float]]:
+        """(restaurant id, similarity) for restaurants liked by the same people"""
+        self.ensure_fresh(db)
+        ids, sims = self._neighbors.get(restaurant_id, (np.empty(0), np.empty(0)))
+        return [(int(r), float(s)) for r, s in zip(ids[:limit], sims[:limit])]
+
+    def for_user(self, db: Session, liked, liked_weights, limit: int) -> list[tuple[int, float]]:
+        """(restaurant id, score) for restaurants similar to the ones a user liked, best first"""
+        self.ensure_fresh(db)
+        neighbors = self._neighbors
+        parts = [(neighbors[r], w) for r, w in zip(liked.tolist(), liked_weights) if r in neighbors]
+        if not parts:
+            return []
+
+        candidates = np.concatenate([ids for (ids, _), _ in parts])
+        scores = np.concatenate([sims * w for (_, sims), w in parts])
+        unique_ids, inverse = np.unique(candidates, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        totals[np.isin(unique_ids, liked)] = 0  # already liked
+        best = np.argsort(-totals, kind="stable")[:limit]
+        return [(int(unique_ids[b]), round(float(totals[b]), 4)) for b in best if totals[b] > 0]
+
+
+recommender = Recommender()
+
+
+def popular_restaurants(db: Session, limit: int, exclude=()) -> list[Restaurant]:
+    """Fallback for users and restaurants with no collaborative signal yet"""
+    query = db.query(Restaurant)
+    if exclude:
+        query = query.filter(Restaurant.id.notin_(list(exclude)))
+    return query.order_by(Restaurant.review_count.desc(), Restaurant.avg_rating.desc()).limit(limit).all()
+
+
+def with_restaurants(db: Session, scored: list[tuple[int, float]], limit: int, exclude=()) -> list[tuple[Restaurant, float, str]]:
+    """
+    (restaurant, score, source) for the scored ids in order, topped up with
+    popular restaurants when collaborative filtering doesn't find enough
+    """
+    by_id = {}
+    if scored:
+        by_id = {r.id: r for r in db.query(Restaurant).filter(Restaurant.id.in_([rid for rid, _ in scored])).all()}
+    results = [(by_id[rid], score, "collaborative") for rid, score in scored if rid in by_id]
+    if len(results) < limit:
+        seen = set(exclude) | set(by_id)
+        results += [(r, 0.0, "popular") for r in popular_restaurants(db, limit - len(results), exclude=seen)]
+    return results[:limit]
+
+
+def recommend_for_user(db: Session, user_id: int, limit: int) -> list[tuple[Restaurant, float, str]]:
+    """A user's top restaurants they haven't favorited or reviewed yet"""
+    # Their own likes come straight from the DB so fresh activity counts right away
+    _, liked, liked_weights = load_interactions(db, [user_id])
+    scored = recommender.for_user(db, liked, liked_weights, limit)
+    return with_restaurants(db, scored, limit, exclude=set(liked.tolist()))
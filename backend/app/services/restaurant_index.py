@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import Session
+import threading
+import time
+from app.models.restaurant import Restaurant
+from app.services.invalidation import bus
+
+# Base for the per-process in-memory indexes over restaurant columns (search
+# facets, autocomplete). An index is built on first use, or at startup. The
+# routes that write restaurants update it directly, after their commit. Other
+# workers' writes, bulk loads and review counts are picked up every
+# refresh_seconds from a watermark on restaurants.id / updated_at, reloading
+# only the rows at or past it. A row count that doesn't add up (a delete
+# elsewhere) triggers a rebuild. Refreshes run on a background thread;
+# requests keep using the index meanwhile.
+#
+# A subclass names the columns it needs (id first) and its state: an object
+# with build(rows), add(*row), remove(restaurant_id) and len(). Every index
+# is registered in INDEXES, so the routes tell them all about a write with
+# one restaurant_saved / restaurant_deleted call. That call also publishes the
+# write on the invalidation bus, and other workers apply it to their indexes.
+
+LOAD_BATCH_SIZE = 50000
+INDEXES = []
+_engine = None   # for loading rows other workers wrote, set by warm_up_all
+
+
+class RestaurantIndex(ABC):
+    name = "Restaurant index"
+    columns = (Restaurant.id,)
+    refresh_seconds = 60
+
+    def __init__(self):
+        self._lock = threading.RLock()       # guards the state
+        self._refreshing = threading.Lock()  # one build / refresh at a time
+        self._state = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        INDEXES.append(self)
+        self.stats = {"restaurants": 0, "last_build_ms": None, "last_refresh_ms": None, "builds": 0, "refreshes": 0}
+
+    @abstractmethod
+    def new_state(self):
+        ...
+
+    # --- Loading ---
+
+    def _read_watermark(self, db: Session) -> dict:
+        count, max_id, max_updated = db.execute(
+            select(func.count(Restaurant.id), func.max(Restaurant.id), func.max(Restaurant.updated_at))
+        ).one()
+        return {"count": count, "max_id": max_id or 0, "max_updated": max_updated}
+
+    def _load(self, db: Session, where=None):
+        query = select(*self.columns)
+        if where is not None:
+            query = query.where(where)
+        result = db.execute(query.execution_options(yield_per=LOAD_BATCH_SIZE))
+        while rows := result.fetchmany(LOAD_BATCH_SIZE):
+            yield from rows
+
+    def _build(self, db: Session):
+        started = time.perf_counter()
+        watermark = self._read_watermark(db)
+        state = self.new_state()
+        state.build(list(self._load(db)))
+        with self._lock:
+            self._state, self._watermark = state, watermark
+        self._refreshed_at = time.monotonic()
+        self.stats.update(restaurants=len(state), builds=self.stats["builds"] + 1,
+                          last_build_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def _refresh(self, db: Session):
+        started = time.perf_counter()
+        watermark = self._read_watermark(db)
+        if watermark != self._watermark:
+            old = self._watermark
+            changed = Restaurant.id > old["max_id"]
+            if old["max_updated"] is not None:
+                changed = or_(changed, Restaurant.updated_at >= old["max_updated"])
+            rows = list(self._load(db, changed))
+            with self._lock:
+                for row in rows:
+                    self._state.add(*row)
+                self._watermark = watermark
+                in_sync = len(self._state) == watermark["count"]
+            if not in_sync:
+                self._build(db)   # something was deleted elsewhere
+        self._refreshed_at = time.monotonic()
+        self.stats.update(restaurants=len(self._state), refreshes=self.stats["refreshes"] + 1,
+                          last_refresh_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def _in_background(self, work, engine):
+        try:
+            with Session(bind=engine) as db:
+                work(db)
+        except Exception as e:
+            print(f"{self.name} refresh failed: {e}")
+            self._refreshed_at = time.monotonic()  # don't retry on every request
+        finally:
+            self._refreshing.release()
+
+    def ensure_fresh(self, db: Session):
+        """Build the index on first use; afterwards kick off a refresh when it's due"""
+        if self._state is None:
+            with self._refreshing:
+                if self._state is None:
+                    self._build(db)
+            return
+        if time.monotonic() - self._refreshed_at >= self.refresh_seconds and self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._in_background, args=(self._refresh, db.get_bind()), daemon=True).start()
+
+    def refresh_due(self):
+        """Refresh on the next request instead of after refresh_seconds"""
+        self._refreshed_at = 0.0
+
+    def warm_up(self, engine):
+        """Build the index on a background thread (at startup), so no request waits for it"""
+        if self._state is None and self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._in_background, args=(self._build, engine), daemon=True).start()
+
+    # --- Writes, from the routes ---
+
+    def update(self, restaurant: Restaurant):
+        """A restaurant was created or edited — call after the commit"""
+        with self._lock:
+            if self._state is not None:
+                self._state.add(*(getattr(restaurant, column.key) for column in self.columns))
+
+    def remove(self, restaurant_id: int):
+        """A restaurant was deleted — call after the commit"""
+        with self._lock:
+            if self._state is not None:
+                self._state.remove(restaurant_id)
+
+
+def restaurant_saved(restaurant: Restaurant):
+    """A restaurant was created or edited — call after the commit"""
+    for index in INDEXES:
+        index.update(restaurant)
+    bus.publish("restaurant", action="saved", id=restaurant.id)
+
+
+def restaurant_deleted(restaurant_id: int):
+    """A restaurant was deleted — call after the commit"""
+    for index in INDEXES:
+        index.remove(restaurant_id)
+    bus.publish("restaurant", action="deleted", id=restaurant_id)
+
+
+def warm_up_all(engine):
+    global _engine
+    _engine = engine
+    for index in INDEXES:
+        index.warm_up(engine)
+
+
+@bus.subscribe("restaurant")
+def apply_other_workers_write(event: dict):
+    if event["action"] == "deleted":
+        for index in INDEXES:
+            index.remove(event["id"])
+        return
+    if _engine is None:
+        for index in INDEXES:
+            index.refresh_due()
+        return
+    with Session(bind=_engine) as db:
+        restaurant = db.get(Restaurant, event["id"])
+        if restaurant is not None:
+            for index in INDEXES:
+                index.update(restaurant)
@@ -0,0 +1,276 @@
+from sqlalchemy import select, delete, insert, func, or_, and_
+from sqlalchemy.orm import Session
+from collections import Counter, defaultdict
+import json
+import re
+import numpy as np
+from app.models.restaurant import Restaurant
+from app.models.restaurant_insight import RestaurantInsight
+from app.models.review import Review
+from app.models.review_insight import ReviewInsight
+
+# Review text analysis, run offline in batches by
+# `python -m app.commands.analyze_reviews`. Each review gets a sentiment score
+# from a word lexicon (with negation and intensifiers), blended with its star
+# rating when the text says little, plus the two-word phrases it mentions.
+# Per restaurant the labels are counted and the most mentioned phrases kept
+# as highlights, so the owner dashboard and the AI assistant read one row
+# instead of the reviews.
+#
+# A review is (re)analyzed when it has no insight yet, was edited since, or
+# was analyzed by an older ANALYZER_VERSION — bump it when the lexicon or the
+# rules below change.
+
+ANALYZER_VERSION = 1
+BATCH_SIZE = 2000            # reviews analyzed per transaction
+HIGHLIGHTS = 5               # phrases kept per restaurant
+MAX_PHRASES_PER_REVIEW = 8
+NEGATION_WINDOW = 3          # "not" flips sentiment words up to this many words later, within the clause
+NEGATED = -0.75              # "not great" is milder than "terrible"
+INTENSIFIED = 1.5
+CONFIDENCE_HITS = 2          # sentiment words needed before the text outweighs the rating
+POSITIVE_ABOVE = 0.2
+NEGATIVE_BELOW = -0.2
+
+LEXICON = {
+    # positive
+    "amazing": 1.0, "awesome": 1.0, "best": 1.0, "excellent": 1.0, "fantastic": 1.0, "incredible": 1.0,
+    "outstanding": 1.0, "perfect": 1.0, "superb": 1.0, "wonderful": 1.0, "phenomenal": 1.0, "loved": 1.0,
+    "love": 0.9, "delicious": 0.9, "great": 0.8, "tasty": 0.7, "fresh": 0.6, "friendly": 0.7, "good": 0.5,
+    "nice": 0.5, "enjoyed": 0.7, "recommend": 0.7, "recommended": 0.7, "favorite": 0.8, "attentive": 0.6,
+    "helpful": 0.6, "cozy": 0.5, "clean": 0.4, "flavorful": 0.7, "authentic": 0.5, "generous": 0.5,
+    "quick": 0.4, "fast": 0.3, "welcoming": 0.6, "beautiful": 0.6, "lovely": 0.7, "solid": 0.4,
+    "reasonable": 0.3, "affordable": 0.4, "worth": 0.5, "impressed": 0.7, "pleasant": 0.5, "decent": 0.2,
+    "fine": 0.1, "happy": 0.6, "crispy": 0.3, "juicy": 0.4, "polite": 0.5,
+    # negative
+    "terrible": -1.0, "horrible": -1.0, "awful": -1.0, "worst": -1.0, "disgusting": -1.0, "inedible": -1.0,
+    "rude": -0.9, "gross": -0.9, "bad": -0.7, "poor": -0.7, "disappointing": -0.7, "disappointed": -0.7,
+    "cold": -0.5, "bland": -0.6, "slow": -0.5, "overpriced": -0.6, "dirty": -0.8, "stale": -0.6,
+    "soggy": -0.6, "greasy": -0.4, "salty": -0.3, "burnt": -0.6, "undercooked": -0.7, "raw": -0.3,
+    "expensive": -0.3, "mediocre": -0.4, "meh": -0.3, "sick": -0.9, "wrong": -0.5, "waited": -0.3,
+    "noisy": -0.3, "loud": -0.2, "crowded": -0.2, "avoid": -0.8, "never": -0.3, "unfriendly": -0.7,
+    "nothing": -0.1, "forgot": -0.5, "ignored": -0.7, "lukewarm": -0.4, "tasteless": -0.7, "pricey": -0.2,
+}
+NEGATORS = {"not", "no", "never", "isn't", "wasn't", "aren't", "weren't", "don't", "didn't", "doesn't",
+            "won't", "wouldn't", "can't", "couldn't", "hardly", "barely", "without"}
+INTENSIFIERS = {"very", "really", "so", "super", "extremely", "incredibly", "absolutely", "totally", "truly",
+                "quite", "too", "highly"}
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "then", "than", "of", "to", "in", "on", "at", "for", "with",
+    "by", "from", "as", "is", "was", "were", "are", "be", "been", "being", "it", "its", "it's", "this", "that",
+    "these", "those", "there", "here", "i", "i'm", "i've", "we", "we're", "you", "they", "he", "she", "my",
+    "our", "your", "their", "me", "us", "them", "what", "which", "who", "when", "where", "how", "all", "any",
+    "some", "also", "just", "had", "has", "have", "did", "do", "does", "got", "get", "would", "will", "could",
+    "should", "can", "one", "out", "up", "about", "again", "back", "come", "came", "go", "went", "place",
+    "restaurant", "time", "food", "more", "most", "much", "many", "other", "only", "own", "same", "such",
+    "little", "bit", "lot", "even", "still", "ever", "every", "each", "both", "because", "after", "before",
+}
+# "food" is a stopword on its own (every review is about food) but still
+# reads well after an adjective, so phrases may end on these
+PHRASE_HEADS = {"food", "place", "time", "restaurant"}
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?|[.!?;:,]")
+BREAK = "."   # ends a clause: negation doesn't carry past it, phrases don't span it
+
+
+def _flags(uniq: np.ndarray, inverse: np.ndarray, words: set) -> np.ndarray:
+    """Per-token membership of a word set, looked up once per distinct word"""
+    return np.fromiter((w in words for w in uniq), dtype=bool, count=len(uniq))[inverse]
+
+
+def _label(score: float) -> str:
+    return "positive" if score > POSITIVE_ABOVE else "negative" if score < NEGATIVE_BELOW else "neutral"
+
+
+# --- Analysis ---
+
+def analyze(comments: list, ratings: list) -> tuple[np.ndarray, list[str], list[list[str]]]:
+    """
+    Sentiment scores (-1 to 1), labels and phrases for a batch of reviews.
+    The whole batch is one token array: each distinct word is looked up once,
+    and negation, intensifiers and per-review sums are array operations.
+    """
+    n_docs = len(comments)
+    tokens = []
+    lengths = np.zeros(n_docs, dtype=np.int64)
+    for i, comment in enumerate(comments):
+        doc = TOKEN_RE.findall((comment or "").lower())
+        doc.append(BREAK)   # so nothing carries over into the next review
+        tokens.extend(doc)
+        lengths[i] = len(doc)
+    doc_of = np.repeat(np.arange(n_docs), lengths)
+
+    uniq, inverse = np.unique(np.array(tokens), return_inverse=True)
+    valence = np.fromiter((LEXICON.get(w, 0.0) for w in uniq), dtype=np.float64, count=len(uniq))[inverse]
+    is_negator = _flags(uniq, inverse, NEGATORS)
+    is_intensifier = _flags(uniq, inverse, INTENSIFIERS)
+    is_break = np.fromiter((not w[0].isalpha() for w in uniq), dtype=bool, count=len(uniq))[inverse]
+    is_stop = _flags(uniq, inverse, STOPWORDS)
+    is_head = _flags(uniq, inverse, PHRASE_HEADS)
+
+    # Negated: a negator earlier in the same clause, at most NEGATION_WINDOW words back
+    position = np.arange(len(tokens))
+    last_negator = np.maximum.accumulate(np.where(is_negator, position, -1))
+    last_break = np.maximum.accumulate(np.where(is_break, position, -1))
+    negated = (last_negator > last_break) & (position - last_negator <= NEGATION_WINDOW) & ~is_negator
+    intensified = np.concatenate(([False], is_intensifier[:-1]))
+
+    weighted = valence * np.where(intensified, INTENSIFIED, 1.0) * np.where(negated, NEGATED, 1.0)
+    hits = np.bincount(doc_of, weights=(valence != 0) & ~is_negator, minlength=n_docs)
+    text_score = np.clip(np.bincount(doc_of, weights=weighted * ~is_negator, minlength=n_docs)
+                         / np.maximum(hits, 1), -1.0, 1.0)
+
+    # Short or bland text leans on the star rating
+    rating_score = (np.asarray(ratings, dtype=np.float64) - 3.0) / 2.0
+    confidence = hits / (hits + CONFIDENCE_HITS)
+    scores = np.round(confidence * text_score + (1 - confidence) * rating_score, 3)
+
+    # Phrases: two adjacent content words in one clause ("friendly staff", "best meal")
+    content = ~(is_stop | is_break | is_negator | is_intensifier) & (np.char.str_len(uniq)[inverse] > 2)
+    pairs = np.flatnonzero(content[:-1] & (content[1:] | is_head[1:]) & ~is_break[1:])
+    phrases = [[] for _ in range(n_docs)]
+    for i in pairs:
+        doc_phrases = phrases[doc_of[i]]
+        phrase = f"{tokens[i]} {tokens[i + 1]}"
+        if len(doc_phrases) < MAX_PHRASES_PER_REVIEW and phrase not in doc_phrases:
+            doc_phrases.append(phrase)
+
+    return scores, [_label(s) for s in scores], phrases
+
+
+def _write_insights(db: Session, rows):
+    scores, labels, phrases = analyze([r.comment for r in rows], [r.rating for r in rows])
+    review_ids = [r.id for r in rows]
+    db.execute(delete(ReviewInsight).where(ReviewInsight.review_id.in_(review_ids)))
+    db.execute(insert(ReviewInsight), [
+        {"review_id": r.id, "restaurant_id": r.restaurant_id, "sentiment": float(score), "label": label,
+         "phrases": "|".join(doc_phrases)[:500], "version": ANALYZER_VERSION, "review_updated_at": r.updated_at}
+        for r, score, label, doc_phrases in zip(rows, scores, labels, phrases)
+    ])
+
+
+# --- Per-restaurant summaries ---
+
+def summarize(db: Session, restaurant_ids) -> int:
+    """Recount labels and highlights of the given restaurants from review_insights. The caller commits."""
+    restaurant_ids = list(restaurant_ids)
+    # Joined to reviews so insights of deleted reviews never count
+    live = and_(Review.id == ReviewInsight.review_id, ReviewInsight.restaurant_id.in_(restaurant_ids))
+
+    summaries = defaultdict(lambda: {"positive": 0, "neutral": 0, "negative": 0, "total": 0.0})
+    for restaurant_id, label, n, total in db.execute(
+        select(ReviewInsight.restaurant_id, ReviewInsight.label, func.count(), func.sum(ReviewInsight.sentiment))
+        .join(Review, live).group_by(ReviewInsight.restaurant_id, ReviewInsight.label)
+    ):
+        summaries[restaurant_id][label] = n
+        summaries[restaurant_id]["total"] += total or 0.0
+
+    mentions, sentiment = defaultdict(Counter), defaultdict(Counter)
+    for restaurant_id, text, score in db.execute(
+        select(ReviewInsight.restaurant_id, ReviewInsight.phrases, ReviewInsight.sentiment)
+        .join(Review, live).where(ReviewInsight.phrases != "")
+    ):
+        for phrase in text.split("|"):
+            mentions[restaurant_id][phrase] += 1
+            sentiment[restaurant_id][phrase] += score
+
+    rows = []
+    for restaurant_id, s in summaries.items():
+        count = s["positive"] + s["neutral"] + s["negative"]
+        min_mentions = 2 if count >= 5 else 1
+        top = sorted(
+            ((phrase, n) for phrase, n in mentions[restaurant_id].items() if n >= min_mentions),
+            key=lambda item: (-item[1], item[0])
+        )[:HIGHLIGHTS]
+        rows.append({
+            "restaurant_id": restaurant_id, "review_count": count,
+            "positive": s["positive"], "neutral": s["neutral"], "negative": s["negative"],
+            "avg_sentiment": round(s["total"] / count, 3) if count else None,
+            "highlights": json.dumps([
+                {"phrase": phrase, "mentions": n, "sentiment": round(sentiment[restaurant_id][phrase] / n, 2)}
+                for phrase, n in top
+            ]),
+        })
+    db.execute(delete(RestaurantInsight).where(RestaurantInsight.restaurant_id.in_(restaurant_ids)))
+    if rows:
+        db.execute(insert(RestaurantInsight), rows)
+    return len(restaurant_ids)
+
+
+def _out_of_date_restaurants(db: Session) -> set[int]:
+    """Restaurants whose summary counts a different number of reviews than they have — e.g. after deletes"""
+    return set(db.execute(
+        select(Restaurant.id)
+        .outerjoin(RestaurantInsight, RestaurantInsight.restaurant_id == Restaurant.id)
+        .where(or_(
+            and_(RestaurantInsight.restaurant_id.is_(None), Restaurant.review_count > 0),
+            RestaurantInsight.review_count != Restaurant.review_count,
+        ))
+    ).scalars())
+
+
+# --- Batch job ---
+
+def analyze_reviews(db: Session, batch_size: int = BATCH_SIZE, everything: bool = False,
+                    log=print) -> tuple[int, int]:
+    """
+    Analyze new and edited reviews (or every review), then re-summarize the
+    restaurants they belong to. Commits per batch. Returns reviews analyzed
+    and restaurants summarized.
+    """
+    query = (
+        select(Review.id, Review.restaurant_id, Review.rating, Review.comment, Review.updated_at)
+        .outerjoin(ReviewInsight, ReviewInsight.review_id == Review.id)
+        .order_by(Review.id)
+        .limit(batch_size)
+    )
+    if not everything:
+        query = query.where(or_(
+            ReviewInsight.review_id.is_(None),
+            ReviewInsight.version != ANALYZER_VERSION,
+            Review.updated_at > ReviewInsight.review_updated_at,
+            and_(Review.updated_at.isnot(None), ReviewInsight.review_updated_at.is_(None)),
+        ))
+
+    analyzed, touched, last_id = 0, set(), 0
+    while rows := db.execute(query.where(Review.id > last_id)).all():
+        _write_insights(db, rows)
+        db.commit()
+        analyzed += len(rows)
+        last_id = rows[-1].id
+        touched.update(r.restaurant_id for r in rows)
+        log(f"  analyzed {analyzed} reviews")
+
+    dirty = sorted(touched | _out_of_date_restaurants(db))
+    for i in range(0, len(dirty), batch_size):
+        summarize(db, dirty[i:i + batch_size])
+        db.commit()
+    return analyzed, len(dirty)
+
+
+# --- Reading ---
+
+def _summary(row: RestaurantInsight) -> dict:
+    return {
+        "review_count": row.review_count,
+        "positive": row.positive,
+        "neutral": row.neutral,
+        "negative": row.negative,
+        "avg_sentiment": row.avg_sentiment,
+        "highlights": json.loads(row.highlights or "[]"),
+    }
+
+
+def restaurant_insight(db: Session, restaurant_id: int) -> dict | None:
+    """The restaurant's text sentiment and highlights, or None before its reviews are analyzed"""
+    row = db.get(RestaurantInsight, restaurant_id)
+    return _summary(row) if row and row.review_count else None
+
+
+def highlights_for(db: Session, restaurant_ids) -> dict[int, list[str]]:
+    """Highlight phrases per restaurant, for the ones that have any"""
+    rows = db.query(RestaurantInsight).filter(RestaurantInsight.restaurant_id.in_(list(restaurant_ids))).all()
+    return {
+        row.restaurant_id: [h["phrase"] for h in _summary(row)["highlights"]]
+        for row in rows if row.highlights and row.highlights != "[]"
+    }
@@ -0,0 +1,164 @@
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import date, datetime, timedelta
+from app.models.review import Review
+from app.models.review_rollup import ReviewRollup
+
+# Review analytics per restaurant per day and per week. The review write paths
+# add and subtract their review's contribution to the two buckets it falls
+# in, so a trend over any date range reads one rollup row per bucket instead
+# of scanning reviews. rebuild_rollups recomputes them from scratch (backfill,
+# bulk loads).
+
+PERIODS = ("day", "week")
+MAX_BUCKETS = {"day": 366, "week": 260}   # longest range one trends request may ask for
+COUNT_COLUMNS = ("review_count", "rating_sum", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+                 "positive", "neutral", "negative")
+WRITE_BATCH_SIZE = 5000
+
+
+def bucket_start(day: date, period: str) -> date:
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def _sentiment(rating: int) -> str:
+    return "positive" if rating >= 4 else "neutral" if rating == 3 else "negative"
+
+
+def _contribution(rating: int, sign: int = 1) -> Counter:
+    return Counter({"review_count": sign, "rating_sum": sign * rating, f"rating_{rating}": sign,
+                    _sentiment(rating): sign})
+
+
+def _as_date(value) -> date:
+    # SQLite hands back func.date() as a string
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+# --- Incremental updates ---
+
+def record_review(db: Session, restaurant_id: int, created_at: datetime, old_rating: int | None = None,
+                  new_rating: int | None = None):
+    """
+    Move a review's contribution in its day and week buckets — added
+    (new_rating), removed (old_rating) or re-rated (both). Atomic counter
+    updates, so concurrent reviews don't lose each other's counts. The caller
+    commits.
+    """
+    if old_rating == new_rating or created_at is None:
+        return
+    deltas = Counter()
+    if old_rating is not None:
+        deltas.update(_contribution(old_rating, -1))
+    if new_rating is not None:
+        deltas.update(_contribution(new_rating))
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+
+    day = _as_date(created_at)
+    for period in PERIODS:
+        key = (ReviewRollup.restaurant_id == restaurant_id, ReviewRollup.period == period,
+               ReviewRollup.bucket_start == bucket_start(day, period))
+        stmt = (
+            update(ReviewRollup).where(*key)
+            .values({getattr(ReviewRollup, column): getattr(ReviewRollup, column) + delta
+                     for column, delta in deltas.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount or min(deltas.values()) < 0:
+            continue  # updated — or a removal from a bucket that was never rolled up
+        try:
+            with db.begin_nested():
+                db.execute(insert(ReviewRollup).values(
+                    restaurant_id=restaurant_id, period=period, bucket_start=bucket_start(day, period),
+                    **{column: deltas.get(column, 0) for column in COUNT_COLUMNS}
+                ))
+        except IntegrityError:
+            db.execute(stmt)  # another request created the bucket first
+
+
+# --- Rebuilding from the reviews table ---
+
+def rebuild_rollups(db: Session, restaurant_ids=None) -> int:
+    """
+    Recompute the rollups of the given restaurants (default: every restaurant
+    with reviews) with one GROUP BY restaurant, day, rating pass; weeks are
+    summed from the days. The caller commits. Returns restaurants rebuilt.
+    """
+    query = (
+        select(Review.restaurant_id, func.date(Review.created_at), Review.rating, func.count(Review.id))
+        .where(Review.created_at.isnot(None))
+        .group_by(Review.restaurant_id, func.date(Review.created_at), Review.rating)
+        .order_by(Review.restaurant_id)
+    )
+    if restaurant_ids is not None:
+        query = query.where(Review.restaurant_id.in_(restaurant_ids))
+
+    def write(buckets: dict, restaurants: set):
+        db.execute(delete(ReviewRollup).where(ReviewRollup.restaurant_id.in_(list(restaurants))))
+        rows = [
+            {"restaurant_id": rid, "period": period, "bucket_start": start,
+             **{column: counts.get(column, 0) for column in COUNT_COLUMNS}}
+            for (rid, period, start), counts in buckets.items()
+        ]
+        for i in range(0, len(rows), WRITE_BATCH_SIZE):
+            db.execute(insert(ReviewRollup), rows[i:i + WRITE_BATCH_SIZE])
+
+    rebuilt = 0
+    buckets, restaurants = {}, set()
+    result = db.execute(query)
+    while rows := result.fetchmany(WRITE_BATCH_SIZE):
+        for restaurant_id, day, rating, n in rows:
+            if restaurant_id not in restaurants:
+                # Rows arrive grouped by restaurant, so the batch so far is complete
+                if len(restaurants) >= WRITE_BATCH_SIZE:
+                    write(buckets, restaurants)
+                    rebuilt += len(restaurants)
+                    buckets, restaurants = {}, set()
+                restaurants.add(restaurant_id)
+            day = _as_date(day)
+            for period in PERIODS:
+                key = (restaurant_id, period, bucket_start(day, period))
+                buckets.setdefault(key, Counter()).update(
+                    {column: delta * n for column, delta in _contribution(rating).items()}
+                )
+    if restaurants:
+        write(buckets, restaurants)
+        rebuilt += len(restaurants)
+    return rebuilt
+
+
+# --- Reading ---
+
+def trend(db: Session, restaurant_id: int, period: str, start: date, end: date) -> list[dict]:
+    """
+    One entry per bucket from start to end (inclusive), empty buckets
+    included — read from the rollups with a single range scan.
+    """
+    first, last = bucket_start(start, period), bucket_start(end, period)
+    rows = db.query(ReviewRollup).filter(
+        ReviewRollup.restaurant_id == restaurant_id,
+        ReviewRollup.period == period,
+        ReviewRollup.bucket_start.between(first, last)
+    ).all()
+    by_start = {_as_date(row.bucket_start): row for row in rows}
+
+    step = timedelta(days=7 if period == "week" else 1)
+    buckets = []
+    current = first
+    while current <= last:
+        row = by_start.get(current)
+        counts = {column: getattr(row, column) if row else 0 for column in COUNT_COLUMNS}
+        buckets.append({
+            "bucket_start": current,
+            "review_count": counts["review_count"],
+            "rating_sum": counts["rating_sum"],
+            "avg_rating": round(counts["rating_sum"] / counts["review_count"], 2) if counts["review_count"] else None,
+            "rating_distribution": {str(stars): counts[f"rating_{stars}"] for stars in range(1, 6)},
+            "sentiment": {s: counts[s] for s in ("positive", "neutral", "negative")},
+        })
+        current += step
+    return buckets
@@ -0,0 +1,317 @@
+from abc import ABC, abstractmethod
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from collections import OrderedDict
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import xxhash
+from app.config import SEARCH_CACHE_BACKEND, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_PATH
+from app.models.restaurant import Restaurant
+from app.services.invalidation import bus
+
+# GET /restaurants responses, cached as the JSON bytes sent. The key is the
+# normalized search parameters plus the catalog version of the part of the
+# catalog the search covers: restaurant writes (including the rating changes
+# reviews make) bump a version counter for the restaurant's city and its
+# cuisine, and one for the whole catalog. A search filtered by city only
+# depends on the counters of the cities its filter matches, so an edit in
+# Austin leaves cached Boston searches alone. Old entries are never deleted
+# on a write — nothing asks for their key any more and the LRU drops them.
+#
+# Counters are bumped after the commit, from the mapper events at the bottom,
+# whichever route made the write. With the "memory" backend the bump is also
+# published on the invalidation bus for the other workers' counters. Bulk
+# loaders aren't seen; SEARCH_CACHE_TTL_SECONDS bounds that.
+
+DIMENSIONS = ("city", "cuisine")
+CATALOG = "catalog"
+ANY_VALUE = "*"    # bumped when a write's city or cuisine wasn't loaded — counts for every filter
+LIKE_WILDCARDS_RE = re.compile(r"[%_\\]")
+TRIM_EVERY = 100   # shared backend: writes between evictions
+
+
+def fold(text: str | None) -> str:
+    """Case- and accent-insensitive form of a city or cuisine, so a filter is found in every value it can match"""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def case_key(text: str | None) -> str | None:
+    """An ILIKE filter as a cache key — lower-cased when ASCII, where every database ignores its case"""
+    return text.lower() if text and text.isascii() else text
+
+
+class CacheBackend(ABC):
+    """Expiring bytes under string keys, plus version counters grouped by dimension"""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    def versions(self, dimension: str) -> dict[str, int]:
+        ...
+
+    @abstractmethod
+    def bump(self, dimension: str, names):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class NoCache(CacheBackend):
+    """SEARCH_CACHE_BACKEND=off"""
+
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        pass
+
+    def versions(self, dimension: str) -> dict[str, int]:
+        return {}
+
+    def bump(self, dimension: str, names):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+
+class MemoryCache(CacheBackend):
+    """A per-process LRU — every worker caches (and sees writes) on its own"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries = OrderedDict()   # key -> (expires, value)
+        self._versions = {}             # dimension -> {name: version}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def versions(self, dimension: str) -> dict[str, int]:
+        with self._lock:
+            return dict(self._versions.get(dimension, {}))
+
+    def bump(self, dimension: str, names):
+        with self._lock:
+            versions = self._versions.setdefault(dimension, {})
+            for name in names:
+                versions[name] = versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedFileCache(CacheBackend):
+    """
+    A SQLite file every worker on the host opens — a local stand-in for a
+    shared cache server. Entries and counters are shared, so a write in one
+    worker invalidates the others' cached searches. Eviction is by expiry
+    time, oldest first, which with a single TTL is insertion order.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_expires ON entries (expires)")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions "
+                         "(dimension TEXT, name TEXT, version INTEGER, PRIMARY KEY (dimension, name))")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; WAL so readers don't wait on a writer in another worker
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                     (key, value, time.time() + ttl))
+        self._writes += 1
+        if self._writes % TRIM_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            conn.execute("DELETE FROM entries WHERE key IN "
+                         "(SELECT key FROM entries ORDER BY expires DESC LIMIT -1 OFFSET ?)", (self.size,))
+
+    def versions(self, dimension: str) -> dict[str, int]:
+        return dict(self._connect().execute(
+            "SELECT name, version FROM versions WHERE dimension = ?", (dimension,)
+        ).fetchall())
+
+    def bump(self, dimension: str, names):
+        self._connect().executemany(
+            "INSERT INTO versions (dimension, name, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (dimension, name) DO UPDATE SET version = version + 1",
+            [(dimension, name) for name in names]
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class SearchCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _scope(self, filters: dict, facets: bool) -> list[tuple[str, str | None]]:
+        """
+        The (dimension, folded filter) partitions a search's response depends
+        on. Facet counts ignore their own facet's filter — the city facet of
+        a search in Austin counts every city — so a search with facets needs
+        both a city and a cuisine filter to be scoped by them.
+        """
+        usable = [(d, fold(filters[d])) for d in DIMENSIONS
+                  if filters.get(d) and not LIKE_WILDCARDS_RE.search(filters[d])]
+        if facets:
+            return usable if len(usable) == len(DIMENSIONS) else [(CATALOG, None)]
+        return usable[:1] or [(CATALOG, None)]
+
+    def key(self, params: dict, filters: dict, facets: bool) -> str:
+        """
+        Cache key of a search: its parameters, normalized by the caller so
+        equivalent searches match, and the current versions of the partitions
+        it covers — the sum of the counters of every city (or cuisine) the
+        filter is a substring of, matching the ILIKE the search runs.
+        """
+        scope = []
+        for dimension, needle in self._scope(filters, facets):
+            versions = self.backend.versions(dimension)
+            if needle is not None:
+                versions = {name: v for name, v in versions.items() if needle in name or name == ANY_VALUE}
+            scope.append((dimension, sum(versions.values())))
+        text = json.dumps([sorted(params.items()), scope], default=str, separators=(",", ":"))
+        return "search:" + xxhash.xxh3_128_hexdigest(text.encode())
+
+    def get(self, key: str) -> bytes | None:
+        body = self.backend.get(key)
+        self.stats["hits" if body is not None else "misses"] += 1
+        return body
+
+    def put(self, key: str, body: bytes):
+        self.backend.set(key, body, self.ttl)
+
+    def invalidate(self, cities=(), cuisines=(), publish: bool = True):
+        """Restaurants in these cities / cuisines changed — call after the commit"""
+        cities, cuisines = sorted({fold(c) for c in cities}), sorted({fold(c) for c in cuisines})
+        self.backend.bump(CATALOG, [""])
+        self.backend.bump("city", cities)
+        self.backend.bump("cuisine", cuisines)
+        self.stats["invalidations"] += 1
+        if publish and isinstance(self.backend, MemoryCache):
+            bus.publish("search", cities=cities, cuisines=cuisines)
+
+
+def build_backend() -> CacheBackend:
+    if SEARCH_CACHE_BACKEND == "off":
+        return NoCache()
+    if SEARCH_CACHE_BACKEND == "shared":
+        return SharedFileCache(SEARCH_CACHE_PATH, SEARCH_CACHE_SIZE)
+    return MemoryCache(SEARCH_CACHE_SIZE)
+
+
+search_cache = SearchCache(build_backend(), SEARCH_CACHE_TTL_SECONDS)
+
+
+@bus.subscribe("search")
+def apply_other_workers_invalidation(event: dict):
+    search_cache.invalidate(event["cities"], event["cuisines"], publish=False)
+
+
+# --- Invalidation on restaurant writes ---
+# The mapper events note which cities and cuisines a flush touched (old and
+# new values, for a restaurant that moved); the versions are bumped once the
+# transaction commits, so no request can cache pre-commit rows under them.
+# Notes left by a rolled-back flush are bumped with the session's next commit
+# — an extra invalidation, never a missed one.
+
+PENDING = "search_cache_pending"
+
+
+def _note(target, attributes=None):
+    session = object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault(PENDING, (set(), set()))
+    for values, column in zip(pending, ("city", "cuisine_type")):
+        if attributes is None:
+            values.add(getattr(target, column))
+        else:
+            values.update(attributes[column].history.sum() or [ANY_VALUE])
+
+
+@event.listens_for(Restaurant, "after_insert")
+@event.listens_for(Restaurant, "after_delete")
+def note_restaurant_written(mapper, connection, target):
+    _note(target)
+
+
+@event.listens_for(Restaurant, "after_update")
+def note_restaurant_updated(mapper, connection, target):
+    attributes = inspect(target).attrs
+    if any(attributes[column.key].history.has_changes() for column in mapper.column_attrs):
+        _note(target, attributes)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session):
+    pending = session.info.pop(PENDING, None)
+    if pending:
+        cities, cuisines = pending
+        search_cache.invalidate(cities, cuisines)
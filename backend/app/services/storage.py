@@ -0,0 +1,325 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+import anyio
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import uuid
+import weakref
+import httpx
+from app.config import (
+    STORAGE_BACKEND, UPLOAD_ROOT,
+    S3_ENDPOINT_URL, S3_BUCKET, S3_REGION, S3_ACCESS_KEY, S3_SECRET_KEY, S3_PUBLIC_URL
+)
+
+# Everything we upload is addressed by a storage key relative to the uploads
+# root, e.g. "blobs/a9/a96f...1f.png". The URL we store in the DB and hand to
+# the frontend is always "/uploads/<key>", whichever backend holds the bytes.
+URL_PREFIX = "/uploads/"
+
+
+def key_from_url(url: str) -> str:
+    return url[len(URL_PREFIX):] if url.startswith(URL_PREFIX) else url.lstrip("/")
+
+
+def url_from_key(key: str) -> str:
+    return URL_PREFIX + key
+
+
+class StorageBackend(ABC):
+    """Async put/get/delete over keys. Missing keys raise FileNotFoundError."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str | None = None):
+        ...
+
+    @abstractmethod
+    async def put_file(self, key: str, local_path: str, content_type: str | None = None):
+        """Store a local file under key and remove the local copy"""
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    async def delete(self, key: str):
+        """Deleting a missing key is not an error"""
+        await self.delete_many([key])
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]):
+        ...
+
+    @abstractmethod
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        ...
+
+    def local_path(self, key: str) -> str | None:
+        """Path on this node's disk, for backends that have one"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Files under a local directory — the single-node default"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Key escapes the storage root: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _move(self, key: str, local_path: str):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(local_path, path)
+        except OSError:
+            # Different filesystem — copy next to the target, then rename into place
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(local_path, tmp_path)
+            os.replace(tmp_path, path)
+            os.remove(local_path)
+
+    def _read(self, key: str) -> bytes:
+        with open(self.local_path(key), "rb") as f:
+            return f.read()
+
+    def _delete_many(self, keys: list[str]):
+        for key in keys:
+            try:
+                os.remove(self.local_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _list(self, prefix: str) -> list[str]:
+        # Walk from the deepest directory the prefix names, then filter by the rest
+        base = os.path.join(self.root, os.path.dirname(prefix))
+        keys = []
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    async def put(self, key: str, data: bytes, content_type: str | None = None):
+        await anyio.to_thread.run_sync(self._write, key, data)
+
+    async def put_file(self, key: str, local_path: str, content_type: str | None = None):
+        await anyio.to_thread.run_sync(self._move, key, local_path)
+
+    async def get(self, key: str) -> bytes:
+        return await anyio.to_thread.run_sync(self._read, key)
+
+    async def exists(self, key: str) -> bool:
+        return await anyio.to_thread.run_sync(os.path.exists, self.local_path(key))
+
+    async def delete_many(self, keys: list[str]):
+        if keys:
+            await anyio.to_thread.run_sync(self._delete_many, keys)
+
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        return await anyio.to_thread.run_sync(self._list, prefix)
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object store over plain HTTP with SigV4 signing and
+    path-style URLs, so it works with AWS as well as MinIO or moto_server
+    running locally as a stand-in.
+    """
+
+    MAX_DELETE_BATCH = 1000  # S3's limit for one DeleteObjects call
+
+    def __init__(self, endpoint_url: str, bucket: str, region: str, access_key: str, secret_key: str):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.host = urlsplit(self.endpoint_url).netloc
+        # httpx clients are tied to the event loop they were first used on
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=30.0)
+            self._clients[loop] = client
+        return client
+
+    def _signed_headers(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> dict:
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = now.strftime("%Y%m%d")
+        payload_hash = hashlib.sha256(body).hexdigest()
+
+        headers = {k.lower(): str(v).strip() for k, v in headers.items()}
+        headers.update({"host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+        signed_names = sorted(headers)
+
+        canonical_request = "\n".join([
+            method,
+            quote(path, safe="/-_.~"),
+            _canonical_query(query),
+            "".join(f"{name}:{headers[name]}\n" for name in signed_names),
+            ";".join(signed_names),
+            payload_hash,
+        ])
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+
+        signing_key = ("AWS4" + self.secret_key).encode()
+        for part in (datestamp, self.region, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(signed_names)}, Signature={signature}"
+        )
+        del headers["host"]  # httpx sets it
+        return headers
+
+    async def _request(self, method: str, key: str = "", query: dict | None = None,
+                       headers: dict | None = None, body: bytes = b"") -> httpx.Response:
+        query = query or {}
+        path = f"/{self.bucket}/{key}" if key else f"/{self.bucket}"
+        signed = self._signed_headers(method, path, query, headers or {}, body)
+        # Build the query string ourselves so it matches what was signed byte for byte
+        url = self.endpoint_url + quote(path, safe="/-_.~")
+        if query:
+            url += "?" + _canonical_query(query)
+        response = await self._client().request(method, url, headers=signed, content=body)
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        response.raise_for_status()
+        return response
+
+    async def put(self, key: str, data: bytes, content_type: str | None = None):
+        headers = {"content-type": content_type} if content_type else {}
+        await self._request("PUT", key, headers=headers, body=data)
+
+    async def put_file(self, key: str, local_path: str, content_type: str | None = None):
+        data = await anyio.to_thread.run_sync(_read_file, local_path)
+        await self.put(key, data, content_type)
+        await anyio.to_thread.run_sync(os.remove, local_path)
+
+    async def get(self, key: str) -> bytes:
+        return (await self._request("GET", key)).content
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self._request("HEAD", key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete_many(self, keys: list[str]):
+        for i in range(0, len(keys), self.MAX_DELETE_BATCH):
+            batch = keys[i:i + self.MAX_DELETE_BATCH]
+            objects = "".join(f"<Object><Key>{_xml_escape(k)}</Key></Object>" for k in batch)
+            body = f"<Delete><Quiet>true</Quiet>{objects}</Delete>".encode()
+            md5 = base64.b64encode(hashlib.md5(body).digest()).decode()
+            await self._request("POST", query={"delete": ""}, body=body,
+                                headers={"content-md5": md5, "content-type": "application/xml"})
+
+    async def list_keys(self, prefix: str = "") -> list[str]:
+        keys, token = [], None
+        while True:
+            query = {"list-type": "2", "prefix": prefix}
+            if token:
+                query["continuation-token"] = token
+            root = ElementTree.fromstring((await self._request("GET", query=query)).content)
+            ns = {"s3": root.tag.split("}")[0].strip("{")} if root.tag.startswith("{") else {}
+            find = (lambda el, tag: el.find(f"s3:{tag}", ns)) if ns else (lambda el, tag: el.find(tag))
+            contents = root.findall("s3:Contents", ns) if ns else root.findall("Contents")
+            keys.extend(find(c, "Key").text for c in contents)
+            truncated = find(root, "IsTruncated")
+            if truncated is None or truncated.text != "true":
+                return keys
+            token = find(root, "NextContinuationToken").text
+
+
+def _canonical_query(query: dict) -> str:
+    return "&".join(
+        f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(query.items())
+    )
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def run_storage(fn, *args):
+    """
+    Call an async storage method from sync code — route handlers and jobs on
+    the threadpool, or a CLI command with no event loop at all.
+    """
+    try:
+        return anyio.from_thread.run(fn, *args)
+    except RuntimeError as exc:
+        if "worker thread" not in str(exc):
+            raise
+    # Not on an anyio worker thread, so there's no loop to hop back onto. A
+    # fresh asyncio.run() per call would leave S3Storage an unclosed client
+    # (and its sockets) on every loop it throws away, so share one instead.
+    return asyncio.run_coroutine_threadsafe(fn(*args), _background_loop()).result()
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The event loop run_storage uses for callers without one, on a daemon thread"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="storage-loop", daemon=True).start()
+    return _loop
+
+
+def build_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_ENDPOINT_URL, S3_BUCKET, S3_REGION, S3_ACCESS_KEY, S3_SECRET_KEY)
+    return LocalStorage(UPLOAD_ROOT)
+
+
+storage = build_storage()
+
+
+def public_url(key: str) -> str | None:
+    """Direct bucket URL for a key when the bucket is publicly readable (S3_PUBLIC_URL set)"""
+    return f"{S3_PUBLIC_URL.rstrip('/')}/{key}" if S3_PUBLIC_URL else None
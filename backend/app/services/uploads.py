@@ -0,0 +1,133 @@
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+import os
+import uuid
+import xxhash
+from app.config import MAX_UPLOAD_BYTES
+
+CHUNK_SIZE = 256 * 1024
+
+# Leading bytes of each image type we accept -> extension we store it under
+IMAGE_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (8, b"WEBP", "webp"),      # RIFF....WEBP
+    (4, b"ftypavif", "avif"),
+    (4, b"ftypavis", "avif"),
+]
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Extension for the image type in the first bytes of a file, or None if it isn't one we accept"""
+    for offset, signature, ext in IMAGE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if ext == "webp" and not head.startswith(b"RIFF"):
+                continue
+            return ext
+    return None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"File too large — the limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+    )
+
+
+async def receive_image_upload(file: UploadFile, tmp_dir: str) -> tuple[str, str, str, int]:
+    """
+    Stream an uploaded image into a temp file under tmp_dir.
+    Returns (tmp_path, ext, xxh3-128 hex digest, size in bytes).
+
+    The type comes from the file's magic bytes, not its name. The size limit is
+    enforced and the content hash computed while copying, and disk writes run
+    on the threadpool. The caller moves the temp file into place with a rename,
+    so readers never see a partial file.
+    """
+    head = await file.read(CHUNK_SIZE)
+    ext = sniff_image_type(head)
+    if ext is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only JPEG, PNG, WebP, GIF and AVIF images are allowed"
+        )
+
+    await run_in_threadpool(os.makedirs, tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f".{uuid.uuid4()}.part")
+    hasher = xxhash.xxh3_128()
+
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        size = 0
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise _too_large()
+            hasher.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+            chunk = await file.read(CHUNK_SIZE)
+        await run_in_threadpool(out.close)
+    except BaseException:
+        out.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path, ext, hasher.hexdigest(), size
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized multipart bodies with 413 before they are fully received.
+
+    Starlette spools the whole multipart body to a temp file before the route
+    runs, so the cap has to be applied here as the bytes arrive: up front from
+    Content-Length when the client sends one, and by counting body chunks
+    otherwise. A little headroom is allowed for the multipart framing.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + 64 * 1024):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+
+        # FastAPI re-raises HTTPExceptions that come out of receive() while it
+        # parses the form, so this turns into a normal 413 response.
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"File too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_CONTENT_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,89 @@
+"""
+Shared setup for the benchmark scripts.
+
+Builds the real FastAPI app against a throwaway SQLite file (or a database URL
+you pass in) so the routes can be driven in-process through httpx — no running
+uvicorn needed.
+Import this module before anything from `app`, since it fills in the env vars
+app.database reads at import time.
+"""
+import os
+import sys
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)  # main.py mounts the relative uploads/ directory
+
+for key, value in {"DB_USER": "bench", "DB_PASSWORD": "bench", "DB_NAME": "bench"}.items():
+    os.environ.setdefault(key, value)
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def make_engine(path: str | None = None, url: str | None = None):
+    """
+    Engine with every model's table created — a throwaway SQLite file unless
+    url points at a real database (e.g. a local MySQL schema for load tests)
+    """
+    from app.database import Base
+    from app import models  # noqa: F401 — registers the tables on Base
+
+    if url:
+        engine = create_engine(url, pool_size=20, max_overflow=20)
+        Base.metadata.create_all(bind=engine)
+        return engine
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="yelp_bench_", suffix=".db")
+        os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def make_app(engine):
+    """The real app with get_db pointed at the benchmark engine"""
+    from app.main import app
+    from app.database import get_db
+
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app, TestSession
+
+
+def make_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        timeout=None
+    )
+
+
+def percentiles(samples_ms: list[float]) -> dict:
+    """p50/p95/p99/max of a list of latencies in milliseconds"""
+    if not samples_ms:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples_ms)
+
+    def pick(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 2),
+    }
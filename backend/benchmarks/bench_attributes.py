@@ -0,0 +1,86 @@
+"""
+Amenity / dietary / ambiance filter benchmark.
+
+Generates restaurants and counts them under "all of" / "any of" attribute
+filters on the attribute_bits column and under the ILIKE-per-term filters
+they replace, checking the bit filters return exactly the restaurants whose
+amenities list the terms. Then clears the bits and times the migration backfill that
+converts the comma-separated text, checking it restores them.
+
+    python benchmarks/bench_attributes.py
+    python benchmarks/bench_attributes.py --restaurants 1000000 --queries 50
+"""
+import argparse
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--queries", type=int, default=30, help="filter combinations timed per mode")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, percentiles  # noqa: E402
+from sqlalchemy import and_, or_, func, update  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user_preference import UserPreference  # noqa: E402
+from app.commands.generate_data import generate, AMENITIES, TAGS  # noqa: E402
+from app.commands.migrate_schema import backfill_attribute_bits  # noqa: E402
+from app.services.attributes import attribute_terms, matches  # noqa: E402
+
+
+def by_hand(rows, terms, match) -> set:
+    test = all if match == "all" else any
+    return {rid for rid, text in rows if test(t in attribute_terms(text) for t in terms)}
+
+
+def main():
+    rng = random.Random(4)
+    engine = make_engine()
+    _, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=10000, owners=100, restaurants=args.restaurants, reviews=0, favorites=0,
+                 log=lambda *_: None)
+        rows = db.query(Restaurant.id, Restaurant.amenities).all()
+        print()
+
+        for match, combine in (("all", and_), ("any", or_)):
+            like_ms, bits_ms = [], []
+            for _ in range(args.queries):
+                terms = rng.sample(AMENITIES + TAGS, rng.randint(1, 3))
+                like = combine(*(Restaurant.amenities.ilike(f"%{a}%") for a in terms))
+                bits = matches(Restaurant.attribute_bits, Restaurant.amenities, terms, match)
+                t = time.perf_counter()
+                db.query(func.count(Restaurant.id)).filter(like).scalar()
+                like_ms.append((time.perf_counter() - t) * 1000)
+                t = time.perf_counter()
+                db.query(func.count(Restaurant.id)).filter(bits).scalar()
+                bits_ms.append((time.perf_counter() - t) * 1000)
+                found = {rid for (rid,) in db.query(Restaurant.id).filter(bits)}
+                assert found == by_hand(rows, terms, match), f"{match} of {terms} differs"
+            print(f"== {match} of 1-3 attributes ({args.queries} combinations, results exact)")
+            print(f"   ILIKE per term : {percentiles(like_ms)}")
+            print(f"   attribute bits : {percentiles(bits_ms)}\n")
+
+        # The migration: text -> bits for rows that don't have them yet
+        before = dict(db.query(Restaurant.id, Restaurant.attribute_bits).all())
+        before_prefs = dict(db.query(UserPreference.id, UserPreference.dietary_bits).all())
+        db.execute(update(Restaurant).values(attribute_bits=None))
+        db.execute(update(UserPreference).values(dietary_bits=None, ambiance_bits=None))
+        db.commit()
+        started = time.perf_counter()
+        converted = backfill_attribute_bits(db)
+        elapsed = time.perf_counter() - started
+        assert dict(db.query(Restaurant.id, Restaurant.attribute_bits).all()) == before
+        assert dict(db.query(UserPreference.id, UserPreference.dietary_bits).all()) == before_prefs
+        assert db.query(func.count()).filter(UserPreference.ambiance_bits.is_(None)).scalar() == 0
+        print(f"== backfill: {converted} rows converted in {elapsed:.1f}s ({converted / elapsed:,.0f} rows/s), "
+              f"same bits as written by the loader")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Autocomplete benchmark.
+
+Generates restaurants and times suggestions for typed prefixes (one letter up
+to whole words) from the in-memory prefix index against the equivalent LIKE
+query, checking the index returns the same best matches as ranking every
+restaurant by hand. Then creates, renames and deletes restaurants through the
+API and checks suggestions follow, and times GET /restaurants/autocomplete.
+
+    python benchmarks/bench_autocomplete.py
+    python benchmarks/bench_autocomplete.py --restaurants 1000000 --queries 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--reviews", type=int, default=200000)
+parser.add_argument("--queries", type=int, default=1000, help="prefixes timed")
+parser.add_argument("--limit", type=int, default=5)
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import or_  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD, NAME_PARTS, CITIES, CUISINES  # noqa: E402
+from app.services.autocomplete import autocomplete, normalize, word_starts, popularity  # noqa: E402
+
+
+def random_prefix(rng) -> str:
+    word = rng.choice(rng.choice([NAME_PARTS[0], NAME_PARTS[1], [c for c, *_ in CITIES], CUISINES]))
+    return word[:rng.randint(1, len(word))]
+
+
+def by_hand(rows: list, prefix: str, limit: int) -> list[int]:
+    """Every restaurant with a word starting with prefix, ranked the index's way"""
+    prefix = normalize(prefix)
+    matches = [(popularity(rating, count), -rid) for rid, name, rating, count in rows
+               if any(key.startswith(prefix) for key in word_starts(name))]
+    return [-neg_id for _, neg_id in sorted(matches, reverse=True)[:limit]]
+
+
+def like_query(db, prefix: str, limit: int) -> list:
+    return (db.query(Restaurant.id, Restaurant.name)
+            .filter(or_(Restaurant.name.ilike(f"{prefix}%"), Restaurant.name.ilike(f"% {prefix}%")))
+            .order_by(Restaurant.review_count.desc(), Restaurant.avg_rating.desc())
+            .limit(limit).all())
+
+
+async def main():
+    rng = random.Random(11)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=max(args.reviews // 10, 100), owners=100, restaurants=args.restaurants,
+                 reviews=args.reviews, favorites=0, log=lambda *_: None)
+        started = time.perf_counter()
+        autocomplete.ensure_fresh(db)
+        print(f"== index built in {time.perf_counter() - started:.2f}s\n")
+
+        rows = db.query(Restaurant.id, Restaurant.name, Restaurant.avg_rating, Restaurant.review_count).all()
+        prefixes = [random_prefix(rng) for _ in range(args.queries)]
+        index_ms, like_ms = [], []
+        for prefix in prefixes:
+            t = time.perf_counter()
+            autocomplete.suggest(db, prefix, args.limit)
+            index_ms.append((time.perf_counter() - t) * 1000)
+            if len(like_ms) < 100:
+                t = time.perf_counter()
+                like_query(db, prefix, args.limit)
+                like_ms.append((time.perf_counter() - t) * 1000)
+        for prefix in prefixes[:20]:
+            found = [r["id"] for r in autocomplete.suggest(db, prefix, args.limit)["restaurants"]]
+            assert found == by_hand(rows, prefix, args.limit), f"suggestions differ for {prefix!r}"
+        print(f"== suggestions for {args.queries} prefixes (top {args.limit} match ranking every restaurant)")
+        print(f"   LIKE query       : {percentiles(like_ms)}")
+        print(f"   prefix index     : {percentiles(index_ms)}")
+
+        # Rating changes reorder the cached top lists of crowded prefixes
+        changed = {}
+        for rid, name, rating, count in rng.sample(rows, 200):
+            restaurant = db.get(Restaurant, rid)
+            restaurant.avg_rating, restaurant.review_count = rng.choice([1.0, 5.0]), rng.choice([0, count * 3])
+            autocomplete.update(restaurant)
+            changed[rid] = (rid, name, restaurant.avg_rating, restaurant.review_count)
+        db.rollback()
+        rows = [changed.get(row[0], row) for row in rows]
+        for prefix in prefixes[:20]:
+            found = [r["id"] for r in autocomplete.suggest(db, prefix, args.limit)["restaurants"]]
+            assert found == by_hand(rows, prefix, args.limit), f"suggestions differ for {prefix!r} after updates"
+        print("   ... and still match after 200 rating changes")
+        example = autocomplete.suggest(db, "gold", args.limit)["restaurants"]
+        print(f"   e.g. 'gold' -> {[(r['name'], r['review_count'], r['avg_rating']) for r in example]}\n")
+        owner = db.query(User).filter(User.role == "owner").first()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        login = await client.post("/auth/login", json={"email": owner.email, "password": GENERATED_PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def suggest(q):
+            r = await client.get("/restaurants/autocomplete", params={"q": q, "limit": args.limit})
+            r.raise_for_status()
+            return r.json()
+
+        # Writes show up in the suggestions straight away
+        body = {"name": "Zanzibar Quokka Café", "cuisine_type": "Zambian", "city": "Zurichville"}
+        r = await client.post("/restaurants", json=body, headers=headers)
+        r.raise_for_status()
+        restaurant_id = r.json()["id"]
+        found = await suggest("quok")
+        assert [s["id"] for s in found["restaurants"]] == [restaurant_id], found
+        assert (await suggest("zurich"))["cities"] == [{"value": "Zurichville", "count": 1}]
+        assert (await suggest("cafe"))["restaurants"] != []
+        r = await client.put(f"/restaurants/{restaurant_id}", json={"name": "Wombat Diner"}, headers=headers)
+        r.raise_for_status()
+        assert (await suggest("quok"))["restaurants"] == []
+        assert [s["id"] for s in (await suggest("wombat"))["restaurants"]] == [restaurant_id]
+        (await client.delete(f"/restaurants/{restaurant_id}", headers=headers)).raise_for_status()
+        found = await suggest("z")
+        assert found["restaurants"] == [] and found["cities"] == [] and found["cuisines"] == [], found
+        print("Create / rename / delete reflected in the suggestions\n")
+
+        latencies = []
+        started = time.perf_counter()
+        for prefix in prefixes:
+            t = time.perf_counter()
+            await suggest(prefix)
+            latencies.append((time.perf_counter() - t) * 1000)
+        elapsed = time.perf_counter() - started
+        print(f"== GET /restaurants/autocomplete: {percentiles(latencies)} "
+              f"({len(prefixes) / elapsed:,.0f} requests/s, one client)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""
+Batch lookup benchmark.
+
+Generates restaurants, users and favorites, then compares the chatty ways
+of loading a page of cards with the batch endpoints: one GET
+/restaurants/{id} per card against GET /restaurants/batch, and the caller's
+whole favorites list against GET /users/me/favorites/status for the cards on
+the page. Also times GET /users/batch. Checks responses come back in the
+order asked with unknown ids listed as missing, and that oversized or
+malformed id lists are refused.
+
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --restaurants 1000000 --favorites 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=100000)
+parser.add_argument("--favorites", type=int, default=500, help="favorites of the signed-in user")
+parser.add_argument("--cards", type=int, default=50, help="restaurants per page")
+parser.add_argument("--loads", type=int, default=30, help="page loads per way")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app.config import BATCH_MAX_IDS  # noqa: E402
+from app.models.favorite import Favorite  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+
+
+async def main():
+    rng = random.Random(49)
+    engine = make_engine()
+    app, Session = make_app(engine)
+    statements = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements["sql"] += 1
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=2000, owners=20, restaurants=args.restaurants, reviews=0, favorites=0,
+                 log=lambda *_: None)
+        restaurant_ids = [rid for (rid,) in db.query(Restaurant.id)]
+        user_ids = [uid for (uid,) in db.query(User.id)]
+        viewer = db.query(User).filter(User.role == "user").first()
+        viewer_email = viewer.email
+        saved = rng.sample(restaurant_ids, args.favorites)
+        db.add_all(Favorite(user_id=viewer.id, restaurant_id=rid) for rid in saved)
+        db.commit()
+        print()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        r = await client.post("/auth/login", json={"email": viewer_email, "password": GENERATED_PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        async def get(url, **params):
+            r = await client.get(url, params=params, headers=headers)
+            r.raise_for_status()
+            return r.json()
+
+        async def timed(label, load):
+            latencies, sql = [], []
+            for _ in range(args.loads):
+                cards = rng.sample(restaurant_ids, args.cards - 5) + rng.sample(saved, 5)
+                rng.shuffle(cards)
+                statements.clear()
+                t = time.perf_counter()
+                result, requests = await load(cards)
+                latencies.append((time.perf_counter() - t) * 1000)
+                sql.append(statements["sql"])
+            print(f"   {label:34}: {requests:>3} request(s), {max(sql):>3} SQL, {percentiles(latencies)}")
+            return result
+
+        print(f"== a page of {args.cards} restaurant cards")
+
+        async def one_by_one(cards):
+            return [await get(f"/restaurants/{rid}") for rid in cards], len(cards)
+
+        async def batched(cards):
+            return (await get("/restaurants/batch", ids=",".join(map(str, cards))))["restaurants"], 1
+        await timed("GET /restaurants/{id} per card", one_by_one)
+        await timed("GET /restaurants/batch", batched)
+
+        print(f"== favorite hearts on those cards (the caller has {args.favorites} favorites)")
+
+        async def whole_list(cards):
+            favorite_ids = {f["restaurant_id"] for f in await get("/users/me/favorites")}
+            return [rid in favorite_ids for rid in cards], 1
+
+        async def status(cards):
+            statuses = (await get("/users/me/favorites/status", ids=",".join(map(str, cards))))["statuses"]
+            assert [s["restaurant_id"] for s in statuses] == cards
+            return [s["is_favorite"] for s in statuses], 1
+        await timed("GET /users/me/favorites", whole_list)
+        await timed("GET /users/me/favorites/status", status)
+
+        print("== review authors")
+
+        async def summaries(cards):
+            return await get("/users/batch", ids=",".join(map(str, rng.sample(user_ids, args.cards)))), 1
+        await timed(f"GET /users/batch ({args.cards} users)", summaries)
+
+        # Same answers, in the order asked
+        cards = rng.sample(restaurant_ids, 20) + rng.sample(saved, 5)
+        rng.shuffle(cards)
+        unknown = max(restaurant_ids) + 1
+        asked = cards + [unknown, cards[0]]
+        batch = await get("/restaurants/batch", ids=",".join(map(str, asked)))
+        assert [r["id"] for r in batch["restaurants"]] == cards and batch["missing"] == [unknown]
+        assert batch["restaurants"] == [await get(f"/restaurants/{rid}") for rid in cards]
+        favorite_ids = {f["restaurant_id"] for f in await get("/users/me/favorites")}
+        statuses = (await get("/users/me/favorites/status", ids=",".join(map(str, asked))))["statuses"]
+        assert statuses == [{"restaurant_id": rid, "is_favorite": rid in favorite_ids} for rid in asked[:-1]]
+        users = await get("/users/batch", ids=f"{user_ids[3]},{unknown * 10},{user_ids[1]}")
+        assert [u["id"] for u in users["users"]] == [user_ids[3], user_ids[1]] and users["missing"] == [unknown * 10]
+        assert "email" not in users["users"][0]
+        print("\nBatches come back in the order asked, repeats dropped, unknown ids listed as missing")
+
+        too_many = ",".join(map(str, restaurant_ids[:BATCH_MAX_IDS + 1]))
+        for url, ids in (("/restaurants/batch", too_many), ("/users/batch", "1,two"), ("/restaurants/batch", ",")):
+            r = await client.get(url, params={"ids": ids}, headers=headers)
+            assert r.status_code == 400, (url, ids[:20], r.status_code)
+        print(f"More than BATCH_MAX_IDS ({BATCH_MAX_IDS}) ids, or ids that aren't integers, get a 400")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Owner dashboard benchmark.
+
+Loads restaurants with 100 to 50k reviews and times GET /owner/dashboard/{id}
+against the previous approach of loading every Review ORM object and
+counting in Python, to show the dashboard staying flat as reviews grow.
+Then adds, re-rates and deletes reviews through the API and checks the
+stored stats still match the reviews table.
+
+    python benchmarks/bench_dashboard.py
+    python benchmarks/bench_dashboard.py --sizes 1000 10000 100000 --queries 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000], help="reviews per restaurant")
+parser.add_argument("--queries", type=int, default=30, help="dashboard loads per restaurant")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.auth import hash_password  # noqa: E402
+from app.services.ratings import recompute_ratings, count_by_rating, rating_distribution  # noqa: E402
+
+PASSWORD = "password123"
+BATCH_SIZE = 20000
+
+
+def load(Session, rng) -> tuple[list[int], int]:
+    """Restaurant ids (one per size) owned by one owner, reviewed by a pool of users"""
+    db = Session()
+    try:
+        password_hash = hash_password(PASSWORD)
+        db.execute(insert(User), [{"name": "Owner", "email": "owner@example.com", "password_hash": password_hash,
+                                   "role": "owner"}])
+        user_count = max(args.sizes)
+        db.execute(insert(User), [
+            {"name": f"User {i}", "email": f"user{i}@example.com", "password_hash": password_hash, "role": "user"}
+            for i in range(user_count)
+        ])
+        owner_id = db.query(User.id).filter(User.email == "owner@example.com").scalar()
+        first_user = owner_id + 1
+
+        restaurant_ids = []
+        for size in args.sizes:
+            restaurant = Restaurant(name=f"Bench {size}", owner_id=owner_id, is_claimed=True)
+            db.add(restaurant)
+            db.flush()
+            restaurant_ids.append(restaurant.id)
+            for start in range(0, size, BATCH_SIZE):
+                db.execute(insert(Review), [
+                    {"user_id": first_user + i, "restaurant_id": restaurant.id,
+                     "rating": rng.choices((1, 2, 3, 4, 5), (5, 5, 10, 30, 50))[0], "comment": "Bench review"}
+                    for i in range(start, min(start + BATCH_SIZE, size))
+                ])
+        recompute_ratings(db, restaurant_ids)
+        db.commit()
+        return restaurant_ids, first_user
+    finally:
+        db.close()
+
+
+def load_everything(db, restaurant_id):
+    """What the dashboard used to do: every review as an ORM object, counted in Python"""
+    all_reviews = db.query(Review).filter(
+        Review.restaurant_id == restaurant_id
+    ).order_by(Review.created_at.desc()).all()
+    distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+    for review in all_reviews:
+        distribution[str(review.rating)] += 1
+    recent = [review.user.name if review.user else "Anonymous" for review in all_reviews[:5]]
+    positive = sum(1 for r in all_reviews if r.rating >= 4)
+    return distribution, recent, positive
+
+
+async def main():
+    rng = random.Random(11)
+    engine = make_engine()
+    app, Session = make_app(engine)
+    print(f"Loading {sum(args.sizes)} reviews...")
+    restaurant_ids, first_user = load(Session, rng)
+
+    async with make_client(app) as client:
+        login = await client.post("/auth/login", json={"email": "owner@example.com", "password": PASSWORD})
+        login.raise_for_status()
+        owner = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        for size, restaurant_id in zip(args.sizes, restaurant_ids):
+            old_ms = []
+            for _ in range(max(args.queries // 5, 2)):
+                db = Session()
+                t = time.perf_counter()
+                load_everything(db, restaurant_id)
+                old_ms.append((time.perf_counter() - t) * 1000)
+                db.close()
+
+            new_ms = []
+            for _ in range(args.queries):
+                t = time.perf_counter()
+                r = await client.get(f"/owner/dashboard/{restaurant_id}", headers=owner)
+                r.raise_for_status()
+                new_ms.append((time.perf_counter() - t) * 1000)
+            print(f"== {size} reviews")
+            print(f"   load every review     : {percentiles(old_ms)}")
+            print(f"   GET /owner/dashboard  : {percentiles(new_ms)}\n")
+
+        # Writes keep the stats exact
+        restaurant_id = restaurant_ids[0]
+        user_id = first_user + max(args.sizes) - 1
+        login = await client.post("/auth/login", json={"email": f"user{user_id - first_user}@example.com",
+                                                        "password": PASSWORD})
+        user = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        r = await client.post(f"/restaurants/{restaurant_id}/reviews", json={"rating": 2, "comment": "Meh"},
+                              headers=user)
+        r.raise_for_status()
+        review_id = r.json()["id"]
+        (await client.put(f"/restaurants/{restaurant_id}/reviews/{review_id}", json={"rating": 5},
+                          headers=user)).raise_for_status()
+        (await client.delete(f"/restaurants/{restaurant_id}/reviews/{review_id}", headers=user)).raise_for_status()
+        (await client.post(f"/restaurants/{restaurant_id}/reviews", json={"rating": 4}, headers=user)).raise_for_status()
+
+    db = Session()
+    try:
+        stored, actual = rating_distribution(db, restaurant_id), count_by_rating(db, restaurant_id)
+        assert stored == actual, f"stats drifted: {stored} != {actual}"
+        print(f"Stats match the reviews table after add / re-rate / delete: {stored}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
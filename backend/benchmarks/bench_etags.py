@@ -0,0 +1,157 @@
+"""
+Conditional GET benchmark.
+
+Generates restaurants with a few hundred reviews each and times a repeat
+visit to the detail page's endpoints (restaurant, photos, reviews) and to
+preferences and a search, without and with If-None-Match, reporting latency
+and bytes sent. Then makes every kind of write those responses depend on —
+an owner edit, a photo upload and delete, a new, edited and deleted review,
+an author rename, a preferences change — and checks each one changes exactly
+the ETags it should, and that a revalidation after it gets the fresh body.
+
+    python benchmarks/bench_etags.py
+    python benchmarks/bench_etags.py --restaurants 1000 --reviews 500000
+"""
+import argparse
+import asyncio
+import io
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200)
+parser.add_argument("--reviews", type=int, default=60000)
+parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and mode")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from PIL import Image  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+
+
+def jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+async def main():
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants and {args.reviews} reviews...")
+        generate(db, users=1000, owners=5, restaurants=args.restaurants, reviews=args.reviews, favorites=0,
+                 log=lambda *_: None)
+        owner = db.query(User).filter(User.role == "owner").first()
+        restaurant_id, other_id = [rid for (rid,) in db.query(Restaurant.id).filter(Restaurant.owner_id == owner.id)
+                                   .order_by(Restaurant.id).limit(2)]
+        reviewed = {uid for (uid,) in db.query(Review.user_id).filter(Review.restaurant_id == restaurant_id)}
+        reviewer = db.query(User).filter(User.role == "user", User.id.notin_(reviewed)).first()
+        review_count = len(reviewed)
+        print()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        async def token(user):
+            r = await client.post("/auth/login", json={"email": user.email, "password": GENERATED_PASSWORD})
+            r.raise_for_status()
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        owner_headers, reviewer_headers = await token(owner), await token(reviewer)
+        (await client.put("/users/preferences", json={"price_range": "$$"}, headers=reviewer_headers)).raise_for_status()
+
+        urls = {
+            "restaurant": (f"/restaurants/{restaurant_id}", {}),
+            "photos": (f"/restaurants/{restaurant_id}/photos", {}),
+            "reviews": (f"/restaurants/{restaurant_id}/reviews", {}),
+            "preferences": ("/users/preferences", reviewer_headers),
+            "search": ("/restaurants?limit=20", {}),
+            "other restaurant": (f"/restaurants/{other_id}", {}),
+        }
+
+        async def get(name, etag=None):
+            url, headers = urls[name]
+            r = await client.get(url, headers={**headers, **({"If-None-Match": etag} if etag else {})})
+            assert r.status_code in (200, 304), r.text
+            return r
+
+        print(f"== repeat visits, {args.requests} each (reviews: {review_count} on the restaurant)")
+        for name in urls:
+            if name == "other restaurant":
+                continue
+            etag = (await get(name)).headers["etag"]
+            for label, conditional in (("full GET", None), ("If-None-Match", etag)):
+                latencies, sent = [], 0
+                for _ in range(args.requests):
+                    t = time.perf_counter()
+                    r = await get(name, conditional)
+                    latencies.append((time.perf_counter() - t) * 1000)
+                    sent += len(r.content)
+                assert r.status_code == (304 if conditional else 200)
+                print(f"   {name:11} {label:13}: {percentiles(latencies)}  {sent // args.requests:>7} bytes")
+
+        async def etags():
+            return {name: (await get(name)).headers["etag"] for name in urls}
+
+        async def check(label, write, changed):
+            """Make the write; the named responses must get a new ETag and everything else still 304"""
+            before = await etags()
+            await write()
+            for name, etag in before.items():
+                r = await get(name, etag)
+                if name in changed:
+                    fresh = await get(name)
+                    assert r.status_code == 200 and r.headers["etag"] != etag, f"{label}: {name} still 304"
+                    assert r.content == fresh.content, f"{label}: {name} revalidated to a stale body"
+                else:
+                    assert r.status_code == 304, f"{label}: {name} changed"
+            print(f"   {label:24} -> new ETag for {', '.join(sorted(changed)) or 'nothing'}")
+
+        async def ok(response):
+            (await response).raise_for_status()
+
+        print("\n== writes")
+        await check("owner edit", lambda: ok(client.put(
+            f"/restaurants/{restaurant_id}", json={"description": "Now with ETags"}, headers=owner_headers)),
+            {"restaurant", "photos", "reviews", "search"})
+        photo = {}
+
+        async def upload():
+            r = await client.post(f"/restaurants/{restaurant_id}/photos", headers=owner_headers,
+                                  files={"file": ("bench.jpg", jpeg(), "image/jpeg")})
+            r.raise_for_status()
+            photo.update(r.json())
+        # The restaurant's version counts its photos, so its own ETag moves too (its body doesn't)
+        await check("photo upload", upload, {"restaurant", "photos", "reviews"})
+        await check("photo delete", lambda: ok(client.delete(
+            f"/restaurants/{restaurant_id}/photos/{photo['id']}", headers=owner_headers)),
+            {"restaurant", "photos", "reviews"})
+        review = {}
+
+        async def new_review():
+            r = await client.post(f"/restaurants/{restaurant_id}/reviews", headers=reviewer_headers,
+                                  json={"rating": 5, "comment": "Benchmark review"})
+            r.raise_for_status()
+            review.update(r.json())
+        await check("new review", new_review, {"restaurant", "photos", "reviews", "search"})
+        await check("review comment edited", lambda: ok(client.put(
+            f"/restaurants/{restaurant_id}/reviews/{review['id']}", json={"comment": "Edited"},
+            headers=reviewer_headers)), {"reviews"})
+        await check("author renamed", lambda: ok(client.put(
+            "/users/profile", json={"name": "Renamed Reviewer"}, headers=reviewer_headers)), {"reviews"})
+        await check("review deleted", lambda: ok(client.delete(
+            f"/restaurants/{restaurant_id}/reviews/{review['id']}", headers=reviewer_headers)),
+            {"restaurant", "photos", "reviews", "search"})
+        await check("preferences changed", lambda: ok(client.put(
+            "/users/preferences", json={"price_range": "$$$"}, headers=reviewer_headers)), {"preferences"})
+        await check("preferences resent", lambda: ok(client.put(
+            "/users/preferences", json={"price_range": "$$$"}, headers=reviewer_headers)), set())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Search facet benchmark.
+
+Generates restaurants and compares facet counts from the in-memory index with
+GROUP BY queries under the same filters: the time per facet set, and that the
+counts agree. Then creates, edits and deletes restaurants through the API and
+checks the index follows, and times GET /restaurants with and without
+facets=true.
+
+    python benchmarks/bench_facets.py
+    python benchmarks/bench_facets.py --restaurants 1000000 --queries 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--queries", type=int, default=100, help="filter combinations timed")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import (  # noqa: E402
+    generate, GENERATED_PASSWORD, CITIES, CUISINES, AMENITIES, PRICE_TIERS
+)
+from app.services.facets import facet_index, FACETS  # noqa: E402
+from app.services.attributes import attribute_terms, matches  # noqa: E402
+
+
+def random_filters(rng) -> dict:
+    filters = {f: [] for f in FACETS}
+    if rng.random() < 0.5:
+        filters["city"] = [rng.choice(CITIES)[0]]
+    if rng.random() < 0.5:
+        filters["cuisine_type"] = [rng.choice(CUISINES)]
+    if rng.random() < 0.4:
+        filters["price_tier"] = [rng.choice(PRICE_TIERS)]
+    if rng.random() < 0.3:
+        filters["amenities"] = rng.sample(AMENITIES, rng.randint(1, 2))
+    return filters
+
+
+def sql_counts(db, filters: dict) -> dict:
+    """The same counts with one GROUP BY per facet, each under the other facets' filters"""
+    def filtered(query, skip):
+        if filters["cuisine_type"] and skip != "cuisine_type":
+            query = query.filter(Restaurant.cuisine_type.ilike(f"%{filters['cuisine_type'][0]}%"))
+        if filters["city"] and skip != "city":
+            query = query.filter(Restaurant.city.ilike(f"%{filters['city'][0]}%"))
+        if filters["price_tier"] and skip != "price_tier":
+            query = query.filter(Restaurant.price_tier == filters["price_tier"][0])
+        if skip != "amenities" and filters["amenities"]:
+            query = query.filter(matches(Restaurant.attribute_bits, Restaurant.amenities, filters["amenities"]))
+        return query
+
+    result = {}
+    for facet in ("cuisine_type", "price_tier", "city"):
+        column = getattr(Restaurant, facet)
+        rows = filtered(db.query(column, func.count()), facet).filter(column.isnot(None)).group_by(column).all()
+        result[facet] = {value: n for value, n in rows}
+    counts = {}
+    for (text,) in filtered(db.query(Restaurant.amenities), "amenities").filter(Restaurant.amenities.isnot(None)):
+        for amenity in attribute_terms(text):
+            counts[amenity] = counts.get(amenity, 0) + 1
+    result["amenities"] = counts
+    return result
+
+
+def as_dict(facets: dict) -> dict:
+    return {facet: {v["value"]: v["count"] for v in values} for facet, values in facets.items()}
+
+
+async def main():
+    rng = random.Random(9)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=100, owners=100, restaurants=args.restaurants, reviews=0, favorites=0,
+                 log=lambda *_: None)
+        started = time.perf_counter()
+        facet_index.ensure_fresh(db)
+        print(f"== index built in {time.perf_counter() - started:.2f}s\n")
+
+        filter_sets = [random_filters(rng) for _ in range(args.queries)]
+        index_ms, sql_ms = [], []
+        for filters in filter_sets:
+            t = time.perf_counter()
+            from_index = facet_index.counts(db, filters)
+            index_ms.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            from_sql = sql_counts(db, filters)
+            sql_ms.append((time.perf_counter() - t) * 1000)
+            assert as_dict(from_index) == from_sql, f"counts differ for {filters}"
+        print(f"== facet counts, {args.queries} filter combinations (results agree)")
+        print(f"   GROUP BY queries : {percentiles(sql_ms)}")
+        print(f"   facet index      : {percentiles(index_ms)}\n")
+        owner = db.query(User).filter(User.role == "owner").first()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        login = await client.post("/auth/login", json={"email": owner.email, "password": GENERATED_PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        # Writes show up in the counts straight away
+        body = {"name": "Facet Test", "cuisine_type": "Ethiopian", "city": "Facetville", "price_tier": "$$$$",
+                "amenities": "wifi,rooftop"}
+        r = await client.post("/restaurants", json=body, headers=headers)
+        r.raise_for_status()
+        restaurant_id = r.json()["id"]
+
+        async def facets_for(**params):
+            r = await client.get("/restaurants", params={"facets": "true", **params})
+            r.raise_for_status()
+            return as_dict(r.json()["facets"])
+
+        facets = await facets_for(city="Facetville")
+        assert facets["cuisine_type"] == {"Ethiopian": 1} and facets["amenities"] == {"wifi": 1, "rooftop": 1}, facets
+        r = await client.put(f"/restaurants/{restaurant_id}", json={"cuisine_type": "Eritrean"}, headers=headers)
+        r.raise_for_status()
+        facets = await facets_for(city="Facetville")
+        assert facets["cuisine_type"] == {"Eritrean": 1}, facets
+        (await client.delete(f"/restaurants/{restaurant_id}", headers=headers)).raise_for_status()
+        facets = await facets_for()
+        assert "Facetville" not in facets["city"], facets
+        print("Create / edit / delete reflected in the facet counts\n")
+
+        for label, extra in (("without facets", {}), ("facets=true", {"facets": "true"})):
+            latencies = []
+            for filters in filter_sets:
+                params = {facet: ",".join(terms) for facet, terms in filters.items() if terms}
+                t = time.perf_counter()
+                r = await client.get("/restaurants", params={**params, **extra, "limit": 10})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - t) * 1000)
+            print(f"== GET /restaurants {label:15}: {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
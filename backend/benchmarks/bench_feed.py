@@ -0,0 +1,107 @@
+"""
+Personalized feed benchmark.
+
+Generates users (with preferences), ranks every feed the way the background
+job does and reports users/s, then compares GET /users/me/feed with the
+generic GET /restaurants page the home page used to load, and times how long
+a preference change takes to re-rank inline.
+
+    python benchmarks/bench_feed.py
+    python benchmarks/bench_feed.py --users 100000 --restaurants 50000
+    python benchmarks/bench_feed.py --db /tmp/feed.db    # reuse the data between runs
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--users", type=int, default=20000)
+parser.add_argument("--restaurants", type=int, default=20000)
+parser.add_argument("--reviews", type=int, default=100000)
+parser.add_argument("--favorites", type=int, default=50000)
+parser.add_argument("--queries", type=int, default=200, help="requests per endpoint")
+parser.add_argument("--db", help="SQLite file to keep the data in (reused if it already has users)")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.user_feed import UserFeed  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD, CITIES, CUISINES  # noqa: E402
+from app.services.feed import refresh_feeds, mark_stale  # noqa: E402
+
+
+def load(Session):
+    db = Session()
+    try:
+        if db.query(func.count(User.id)).scalar():
+            print(f"Reusing the data in {args.db}\n")
+            return
+        print("Generating data...")
+        started = time.perf_counter()
+        generate(db, users=args.users, owners=max(args.restaurants // 10, 1), restaurants=args.restaurants,
+                 reviews=args.reviews, favorites=args.favorites, log=lambda *_: None)
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+    finally:
+        db.close()
+
+
+async def timed_gets(client, path, params_list, headers_list) -> list[float]:
+    latencies = []
+    for params, headers in zip(params_list, headers_list):
+        t = time.perf_counter()
+        r = await client.get(path, params=params, headers=headers)
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - t) * 1000)
+    return latencies
+
+
+async def main():
+    rng = random.Random(3)
+    engine = make_engine(path=args.db)
+    app, Session = make_app(engine)
+    load(Session)
+
+    db = Session()
+    try:
+        mark_stale(db, everyone=True)
+        db.commit()
+        started = time.perf_counter()
+        ranked = refresh_feeds(db, log=lambda *_: None)
+        elapsed = time.perf_counter() - started
+        print(f"== ranked {ranked} feeds in {elapsed:.1f}s ({ranked / elapsed:,.0f} users/s)")
+        sizes = [len(blob) for (blob,) in db.query(UserFeed.restaurant_ids).limit(1000)]
+        print(f"   stored size per feed: {sum(sizes) / max(len(sizes), 1):.0f} bytes\n")
+        users = db.query(User).filter(User.role == "user").limit(args.queries).all()
+        emails = [u.email for u in users]
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        headers = []
+        for email in emails[:20]:
+            login = await client.post("/auth/login", json={"email": email, "password": GENERATED_PASSWORD})
+            login.raise_for_status()
+            headers.append({"Authorization": f"Bearer {login.json()['access_token']}"})
+        headers = [headers[i % len(headers)] for i in range(args.queries)]
+        pages = [{"skip": 9 * rng.randint(0, 5), "limit": 9} for _ in range(args.queries)]
+
+        generic = await timed_gets(client, "/restaurants", pages, headers)
+        feed = await timed_gets(client, "/users/me/feed", pages, headers)
+        print(f"== GET /restaurants (generic page)  : {percentiles(generic)}")
+        print(f"== GET /users/me/feed               : {percentiles(feed)}")
+
+        latencies = []
+        for h in headers[:20]:
+            city, state = rng.choice(CITIES)[:2]
+            body = {"cuisine_preferences": ",".join(rng.sample(CUISINES, 2)), "preferred_location": f"{city}, {state}"}
+            t = time.perf_counter()
+            r = await client.put("/users/preferences", json=body, headers=h)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+        print(f"== PUT /users/preferences (re-ranks inline): {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
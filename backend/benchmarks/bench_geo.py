@@ -0,0 +1,139 @@
+"""
+Location search benchmark at 1M restaurants.
+
+Loads restaurants clustered around a few hundred "cities", then times radius
+and nearest-k searches two ways: a full scan that computes every restaurant's
+distance (what a query without a spatial index has to do), and the geohash
+index path used by GET /restaurants?lat=..&lng=... It checks that both
+return the same restaurants — searches from either side of the antimeridian
+included — then runs the real route for end-to-end numbers.
+
+    python benchmarks/bench_geo.py                          # 1M restaurants
+    python benchmarks/bench_geo.py --restaurants 200000 --queries 100
+    python benchmarks/bench_geo.py --db /tmp/geo.db         # reuse the data between runs
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=1_000_000)
+parser.add_argument("--queries", type=int, default=200, help="searches per mode")
+parser.add_argument("--db", help="SQLite file to keep the data in (reused if it already has restaurants)")
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import insert, func  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.services import geo  # noqa: E402
+from app.services.geohash import encode  # noqa: E402
+
+CITY_COUNT = 300
+CITY_SPREAD_DEG = 0.1
+BATCH_SIZE = 20000
+
+
+def load(Session, rng, cities):
+    db = Session()
+    try:
+        if db.query(func.count(Restaurant.id)).scalar() >= args.restaurants:
+            print(f"Reusing {args.restaurants} restaurants in {args.db}\n")
+            return
+        print(f"Loading {args.restaurants} restaurants...")
+        started = time.perf_counter()
+        for start in range(0, args.restaurants, BATCH_SIZE):
+            rows = []
+            for _ in range(min(BATCH_SIZE, args.restaurants - start)):
+                city_lat, city_lng = rng.choice(cities)
+                lat = max(min(rng.gauss(city_lat, CITY_SPREAD_DEG), 89.9), -89.9)
+                lng = (rng.gauss(city_lng, CITY_SPREAD_DEG) + 180.0) % 360.0 - 180.0
+                rows.append({"name": "Bench", "latitude": lat, "longitude": lng, "geohash": encode(lat, lng),
+                             "avg_rating": 0.0, "review_count": 0})
+            db.execute(insert(Restaurant), rows)
+            db.commit()
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+    finally:
+        db.close()
+
+
+def timed(fn, points) -> tuple[list, list[float]]:
+    results, latencies = [], []
+    for lat, lng in points:
+        t = time.perf_counter()
+        results.append(fn(lat, lng))
+        latencies.append((time.perf_counter() - t) * 1000)
+    return results, latencies
+
+
+async def main():
+    rng = random.Random(args.seed)
+    # Cities spread over the populated latitudes, a few of them straddling the antimeridian (Fiji, Chukotka)
+    cities = [(rng.uniform(-40, 60), rng.uniform(-150, 150)) for _ in range(CITY_COUNT - 4)]
+    cities += [(-17.8, 180.0), (-16.5, -179.95), (65.0, 179.98), (66.0, -180.0)]
+
+    engine = make_engine(path=args.db)
+    app, Session = make_app(engine)
+    load(Session, rng, cities)
+
+    # Search from points near the cities, where people actually are
+    points = []
+    for _ in range(args.queries):
+        city_lat, city_lng = rng.choice(cities)
+        lng = (rng.gauss(city_lng, CITY_SPREAD_DEG) + 180.0) % 360.0 - 180.0
+        points.append((rng.gauss(city_lat, CITY_SPREAD_DEG), lng))
+    # and from both sides of the antimeridian, where the search area wraps around to the other side
+    points[:4] = [(-17.8, 179.99), (-16.5, -179.99), (65.0, 179.95), (66.0, -179.9)]
+
+    db = Session()
+    try:
+        for radius_km in (1, 5, 25):
+            def full_scan(lat, lng):
+                query = db.query(Restaurant.id).filter(geo.distance_sq(lat, lng) <= radius_km * radius_km)
+                return {row.id for row in query}
+
+            def indexed(lat, lng):
+                query = geo.within_radius(db.query(Restaurant.id), lat, lng, radius_km)
+                return {row.id for row in query}
+
+            scan_results, scan_ms = timed(full_scan, points[:max(args.queries // 10, 5)])
+            index_results, index_ms = timed(indexed, points)
+            assert scan_results == index_results[:len(scan_results)], "index and full scan disagree"
+            found = sum(len(r) for r in index_results) / len(index_results)
+            print(f"== radius {radius_km} km  (avg {found:.0f} restaurants found)")
+            print(f"   full scan     : {percentiles(scan_ms)}")
+            print(f"   geohash index : {percentiles(index_ms)}\n")
+
+        k = 10
+
+        def nearest_scan(lat, lng):
+            query = db.query(Restaurant.id).order_by(geo.distance_sq(lat, lng)).limit(k)
+            return [row.id for row in query]
+
+        def nearest_indexed(lat, lng):
+            query = geo.nearest(db.query(Restaurant.id), lat, lng, k).order_by(geo.distance_sq(lat, lng)).limit(k)
+            return [row.id for row in query]
+
+        scan_results, scan_ms = timed(nearest_scan, points[:max(args.queries // 10, 5)])
+        index_results, index_ms = timed(nearest_indexed, points)
+        assert scan_results == index_results[:len(scan_results)], "index and full scan disagree"
+        print(f"== nearest {k}")
+        print(f"   full scan     : {percentiles(scan_ms)}")
+        print(f"   geohash index : {percentiles(index_ms)}\n")
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        for label, extra in (("radius 5 km", {"radius_km": 5}), (f"nearest {k}", {"nearest": k})):
+            latencies = []
+            for lat, lng in points:
+                t = time.perf_counter()
+                r = await client.get("/restaurants", params={"lat": lat, "lng": lng, "limit": 20, **extra})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - t) * 1000)
+            print(f"== GET /restaurants, {label}: {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Opening-hours benchmark.
+
+Generates restaurants and answers "open at <day time>" and "open now" from
+the restaurant_hours intervals, against loading every restaurant's hours
+and parsing them per request (the only way before), checking both find the
+same restaurants. Then creates, edits and deletes restaurants through the
+API and checks the filters follow, and times GET /restaurants?open_now=true.
+
+    python benchmarks/bench_hours.py
+    python benchmarks/bench_hours.py --restaurants 1000000 --queries 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--queries", type=int, default=20, help="days and times asked about")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+from app.services import hours  # noqa: E402
+
+
+def by_parsing(db, zone_minutes) -> set:
+    """Every restaurant's hours parsed on the spot"""
+    found = set()
+    for rid, text, state in db.query(Restaurant.id, Restaurant.hours, Restaurant.state):
+        minute = zone_minutes[hours.timezone_for(state)]
+        if any(start <= minute < end for start, end in hours.parse_hours(text)):
+            found.add(rid)
+    return found
+
+
+async def main():
+    rng = random.Random(8)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=100, owners=100, restaurants=args.restaurants, reviews=0, favorites=0,
+                 log=lambda *_: None)
+        print()
+        parse_ms, index_ms = [], []
+        for i in range(args.queries):
+            day, minute = rng.choice(hours.DAYS), rng.randrange(0, hours.DAY, 15)
+            asked = f"{day} {minute // 60}:{minute % 60:02d}"
+            t = time.perf_counter()
+            expected = by_parsing(db, {zone: hours.parse_open_at(asked) for zone in hours.ZONES})
+            parse_ms.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            found = {rid for (rid,) in db.query(Restaurant.id).filter(hours.open_at(hours.parse_open_at(asked)))}
+            index_ms.append((time.perf_counter() - t) * 1000)
+            assert found == expected, f"open at {asked} differs"
+        print(f"== open at a day and time ({args.queries} times, same restaurants found)")
+        print(f"   load and parse every row : {percentiles(parse_ms)}")
+        print(f"   restaurant_hours index   : {percentiles(index_ms)}")
+
+        now = datetime.now(timezone.utc)
+        expected = by_parsing(db, {z: hours.minute_of_week(now.astimezone(ZoneInfo(z))) for z in hours.ZONES})
+        found = {rid for (rid,) in db.query(Restaurant.id).filter(hours.open_now(now))}
+        assert found == expected, "open now differs"
+        print(f"   open now: {len(found)} of {args.restaurants}, matches parsing in each restaurant's time zone\n")
+        owner = db.query(User).filter(User.role == "owner").first()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        login = await client.post("/auth/login", json={"email": owner.email, "password": GENERATED_PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def open_ids(**params):
+            r = await client.get("/restaurants", params={"limit": 1000, "city": "Hourstown", **params})
+            r.raise_for_status()
+            return [restaurant["id"] for restaurant in r.json()["restaurants"]]
+
+        body = {"name": "Night Owl", "city": "Hourstown", "state": "NY",
+                "hours": '{"fri": "6pm-2am", "sat": "6pm-2am", "sun": "closed"}'}
+        r = await client.post("/restaurants", json=body, headers=headers)
+        r.raise_for_status()
+        restaurant_id = r.json()["id"]
+        assert await open_ids(open_at="sat 1:30") == [restaurant_id]   # Friday night, past midnight
+        assert await open_ids(open_at="sun 1:30") == [restaurant_id]
+        assert await open_ids(open_at="sun 12:00") == []
+        r = await client.put(f"/restaurants/{restaurant_id}", json={"hours": '{"sun": "10am-2pm"}'}, headers=headers)
+        r.raise_for_status()
+        assert await open_ids(open_at="sat 1:30") == []
+        assert await open_ids(open_at="sunday noon") == [restaurant_id]
+        assert (await client.get("/restaurants", params={"open_at": "someday"})).status_code == 400
+        (await client.delete(f"/restaurants/{restaurant_id}", headers=headers)).raise_for_status()
+        assert await open_ids(open_at="sunday noon") == []
+        print("Create / edit / delete reflected in the hours filters\n")
+
+        latencies = []
+        for _ in range(50):
+            t = time.perf_counter()
+            r = await client.get("/restaurants", params={"open_now": "true", "limit": 10})
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+        print(f"== GET /restaurants?open_now=true: {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
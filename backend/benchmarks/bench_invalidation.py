@@ -0,0 +1,212 @@
+"""
+Cross-worker cache invalidation benchmark.
+
+Starts extra worker processes on the same database, each with its own
+in-memory indexes and search cache versions and with the periodic index
+refresh pushed out of reach. One worker on the Unix-socket bus, one without
+a bus. Creates, renames, reviews and deletes a restaurant through the API
+in this process and times how long until each worker's fuzzy name search,
+autocomplete and search cache versions reflect it. Then measures bus
+throughput and checks the broker bus against the in-process stand-in.
+
+    python benchmarks/bench_invalidation.py
+    python benchmarks/bench_invalidation.py --restaurants 200000 --events 50000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=50000)
+parser.add_argument("--events", type=int, default=20000, help="events published for the throughput run")
+parser.add_argument("--timeout", type=float, default=3.0, help="seconds a worker waits to see a write")
+args = parser.parse_args()
+
+# Inherited by the worker processes, so everyone shares one socket directory
+os.environ.setdefault("INVALIDATION_BUS", "unix")
+os.environ.setdefault("INVALIDATION_SOCKET_DIR", tempfile.mkdtemp(prefix="yelp_bus_"))
+for setting in ("FACET_REFRESH_SECONDS", "AUTOCOMPLETE_REFRESH_SECONDS", "NAME_SEARCH_REFRESH_SECONDS"):
+    os.environ[setting] = "3600"   # only the bus can bring news
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+from app.services.invalidation import bus, BrokerBus, LocalBroker  # noqa: E402
+from app.services.restaurant_index import INDEXES, warm_up_all  # noqa: E402
+from app.services.name_search import name_index  # noqa: E402
+from app.services.autocomplete import autocomplete  # noqa: E402
+from app.services.facets import facet_index  # noqa: E402
+from app.services.search_cache import search_cache  # noqa: E402
+
+
+def observe(db, restaurant_id: int, name: str) -> dict:
+    """What this worker's caches say about a restaurant"""
+    found = [s for s in autocomplete.suggest(db, name, 20)["restaurants"] if s["id"] == restaurant_id]
+    in_city = facet_index.counts(db, {"cuisine_type": [], "price_tier": [], "city": ["Busville"], "amenities": []})
+    return {
+        "facet count": sum(c["count"] for c in in_city["cuisine_type"]),
+        "name search": restaurant_id in {rid for rid, _ in name_index.search(db, name, 50)},
+        "autocomplete rating": found[0]["avg_rating"] if found else None,
+        "search versions": search_cache.backend.versions("city").get("busville", 0),
+    }
+
+
+def worker(db_path: str, conn):
+    """Another uvicorn worker's caches, answering the benchmark over a pipe"""
+    engine = make_engine(db_path)
+    with Session(bind=engine) as db:
+        for index in INDEXES:
+            index.ensure_fresh(db)
+    warm_up_all(engine)
+    bus.start()
+    conn.send("ready")
+    with Session(bind=engine) as db:
+        while (command := conn.recv()) is not None:
+            if command[0] == "stats":
+                conn.send(dict(bus.stats))
+                continue
+            _, restaurant_id, name, want = command
+            deadline = time.time() + args.timeout
+            seen = {}
+            while time.time() < deadline and len(seen) < len(want):
+                state = observe(db, restaurant_id, name)
+                for key, value in want.items():
+                    if key not in seen and state[key] == value:
+                        seen[key] = time.time()
+                time.sleep(0.0005)
+            conn.send(seen)
+    bus.close()
+
+
+async def main():
+    engine_path = tempfile.mkstemp(prefix="yelp_bench_", suffix=".db")[1]
+    engine = make_engine(engine_path)
+    app, SessionLocal = make_app(engine)
+    db = SessionLocal()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=20, owners=5, restaurants=args.restaurants, reviews=0, favorites=0, log=lambda *_: None)
+        owner = db.query(User).filter(User.role == "owner").first()
+        reviewer = db.query(User).filter(User.role == "user").first()
+        for index in INDEXES:
+            index.ensure_fresh(db)
+    finally:
+        db.close()
+    warm_up_all(engine)
+    bus.start()
+
+    workers = {}
+    context = multiprocessing.get_context("spawn")
+    for label, bus_kind in (("unix bus", "unix"), ("no bus", "local")):
+        os.environ["INVALIDATION_BUS"] = bus_kind
+        parent_end, child_end = context.Pipe()
+        process = context.Process(target=worker, args=(engine_path, child_end), daemon=True)
+        process.start()
+        workers[label] = (process, parent_end)
+    for _, conn in workers.values():
+        assert conn.recv() == "ready"
+    print(f"Workers ready: {', '.join(workers)}\n")
+
+    async with make_client(app) as client:
+        async def token(user):
+            r = await client.post("/auth/login", json={"email": user.email, "password": GENERATED_PASSWORD})
+            r.raise_for_status()
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        owner_headers, reviewer_headers = await token(owner), await token(reviewer)
+
+        async def timed_write(label, write, name, want, watchers=tuple(workers)):
+            """Ask the workers to watch, make the write, and report when each saw it"""
+            for worker_label in watchers:
+                workers[worker_label][1].send(("watch", restaurant_id, name, want))
+            started = time.time()
+            result = await write()
+            request_ms = (time.time() - started) * 1000
+            print(f"== {label} (request {request_ms:.1f} ms)")
+            for worker_label in watchers:
+                seen = workers[worker_label][1].recv()
+                parts = [f"{key} {(seen[key] - started) * 1000:.1f} ms" if key in seen else f"{key} not seen"
+                         for key in want]
+                print(f"   {worker_label:8}: {', '.join(parts)}")
+            return result
+
+        # Workers watch for a known id, so the create is only checked once it's made
+        r = await client.post("/restaurants", headers=owner_headers,
+                              json={"name": "Quokka Quarter", "city": "Busville", "cuisine_type": "Thai"})
+        r.raise_for_status()
+        restaurant_id = r.json()["id"]
+        for _, conn in workers.values():
+            conn.send(("watch", restaurant_id, "Quokka Quarter", {"name search": True, "facet count": 1}))
+        print("== create")
+        for worker_label, (_, conn) in workers.items():
+            seen = conn.recv()
+            print(f"   {worker_label:8}: {', '.join(seen) or 'nothing'} seen within {args.timeout:.0f} s")
+
+        async def rename():
+            r = await client.put(f"/restaurants/{restaurant_id}", json={"name": "Wombat Works"}, headers=owner_headers)
+            r.raise_for_status()
+        version = search_cache.backend.versions("city").get("busville", 0)
+        await timed_write("rename", rename, "Wombat Works",
+                          {"name search": True, "search versions": version + 1})
+
+        async def review():
+            r = await client.post(f"/restaurants/{restaurant_id}/reviews", headers=reviewer_headers,
+                                  json={"rating": 4, "comment": "Benchmark review"})
+            r.raise_for_status()
+            return r.json()["id"]
+        review_id = await timed_write("new review", review, "Wombat Works", {"autocomplete rating": 4.0})
+        # Restaurants with reviews can't be deleted
+        r = await client.delete(f"/restaurants/{restaurant_id}/reviews/{review_id}", headers=reviewer_headers)
+        r.raise_for_status()
+
+        async def delete():
+            r = await client.delete(f"/restaurants/{restaurant_id}", headers=owner_headers)
+            r.raise_for_status()
+        # The worker without a bus never saw the restaurant to begin with
+        await timed_write("delete", delete, "Wombat Works", {"facet count": 0}, watchers=["unix bus"])
+
+    # Throughput: events this worker can publish, and how many the bus worker got
+    other = workers["unix bus"][1]
+    other.send(("stats",))
+    received_before = other.recv()["received"]
+    started = time.perf_counter()
+    for i in range(args.events):
+        bus.publish("user", id=i, changed="profile")
+    elapsed = time.perf_counter() - started
+    time.sleep(0.5)
+    other.send(("stats",))
+    received = other.recv()["received"] - received_before
+    print(f"\n== unix bus: {args.events} events published in {elapsed:.2f}s "
+          f"({args.events / elapsed:,.0f}/s), {received} received by the other worker, "
+          f"{bus.stats['dropped']} dropped on full queues")
+
+    for process, conn in workers.values():
+        conn.send(None)
+        process.join(timeout=5)
+    bus.close()
+
+    # Broker bus over the in-process stand-in: others get each event, the sender doesn't
+    broker = LocalBroker()
+    buses = [BrokerBus(broker, "bench") for _ in range(3)]
+    got = [[] for _ in buses]
+    for b, inbox in zip(buses, got):
+        b.subscribe("restaurant")(inbox.append)
+        b.start()
+    latencies = []
+    for i in range(1000):
+        started = time.perf_counter()
+        buses[i % 3].publish("restaurant", action="saved", id=i)
+        broker.join()
+        latencies.append((time.perf_counter() - started) * 1000)
+    for n, inbox in enumerate(got):
+        assert sorted(e["id"] for e in inbox) == [i for i in range(1000) if i % 3 != n]
+    print(f"== broker bus (local stand-in), publish to delivered: {percentiles(latencies)}; "
+          f"each bus got the other two's events only")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
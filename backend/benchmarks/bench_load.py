@@ -0,0 +1,330 @@
+"""
+End-to-end API load test.
+
+Generates a deterministic data set (app.commands.generate_data), then drives
+the real routes — search, restaurant details, reviews, favorites, history,
+owner dashboard, auth — with a weighted mix of requests from many concurrent
+clients. Reports throughput and latency percentiles per endpoint and saves
+them as JSON under benchmarks/results/ so runs on different commits can be
+compared.
+
+    python benchmarks/bench_load.py                                  # mixed traffic, small data set
+    python benchmarks/bench_load.py --scenario browse --scale medium --duration 60
+    python benchmarks/bench_load.py --database-url mysql+pymysql://root:pw@localhost/yelp_bench
+    python benchmarks/bench_load.py --compare results/old.json results/new.json
+
+Scenarios:
+    browse  anonymous visitors searching and reading restaurants and reviews
+    user    signed-in users checking favorites/history and writing reviews
+    owner   owners watching their dashboards and reviews
+    mixed   70% browse, 20% user, 10% owner — roughly our production traffic
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--scenario", default="mixed", choices=["browse", "user", "owner", "mixed"])
+parser.add_argument("--scale", default="small", choices=["small", "medium", "large"])
+parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per run")
+parser.add_argument("--concurrency", type=int, default=32, help="clients sending requests at once")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--database-url", help="run against this database instead of a throwaway SQLite file")
+parser.add_argument("--reuse", action="store_true", help="don't generate data if the database already has some")
+parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"),
+                    help="directory for the JSON results")
+parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved results and exit")
+args = parser.parse_args()
+
+# Generated accounts are hashed with this cost; keep login from dominating the mix
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD, EMAIL_DOMAIN  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.auth import create_access_token  # noqa: E402
+
+SCALES = {
+    "small":  {"users": 500, "owners": 20, "restaurants": 300, "reviews": 5000, "favorites": 2000},
+    "medium": {"users": 5000, "owners": 100, "restaurants": 2000, "reviews": 100000, "favorites": 30000},
+    "large":  {"users": 50000, "owners": 500, "restaurants": 20000, "reviews": 1000000, "favorites": 300000},
+}
+TOKEN_POOL_SIZE = 200  # signed-in users the clients act as
+
+CITIES = ["San Jose", "San Francisco", "Oakland", "Seattle", "Austin", "New York"]
+CUISINES = ["Italian", "Chinese", "Mexican", "Indian", "Japanese", "Thai"]
+KEYWORDS = ["wifi", "outdoor", "delivery", "vegan", "reservations"]
+
+
+# --- Operations — each returns (method, path, kwargs, expected status codes) ---
+
+def op_search(ctx, rng):
+    params = {"limit": 10, "skip": rng.choice([0, 0, 0, 10, 20])}
+    if rng.random() < 0.7:
+        params["city"] = rng.choice(CITIES)
+    if rng.random() < 0.5:
+        params["cuisine_type"] = rng.choice(CUISINES)
+    if rng.random() < 0.2:
+        params["price_tier"] = rng.choice(["$", "$$", "$$$"])
+    return "GET", "/restaurants", {"params": params}, (200,)
+
+
+def op_search_keywords(ctx, rng):
+    return "GET", "/restaurants", {"params": {"keywords": rng.choice(KEYWORDS), "limit": 10}}, (200,)
+
+
+def op_details(ctx, rng):
+    return "GET", f"/restaurants/{ctx.popular_restaurant(rng)}", {}, (200,)
+
+
+def op_reviews(ctx, rng):
+    return "GET", f"/restaurants/{ctx.popular_restaurant(rng)}/reviews", {}, (200,)
+
+
+def op_me(ctx, rng):
+    return "GET", "/auth/me", {"headers": ctx.user_headers(rng)}, (200,)
+
+
+def op_login(ctx, rng):
+    payload = {"email": rng.choice(ctx.user_emails), "password": GENERATED_PASSWORD}
+    return "POST", "/auth/login", {"json": payload}, (200,)
+
+
+def op_favorites(ctx, rng):
+    return "GET", "/users/me/favorites", {"headers": ctx.user_headers(rng)}, (200,)
+
+
+def op_history(ctx, rng):
+    return "GET", "/users/me/history", {"headers": ctx.user_headers(rng)}, (200,)
+
+
+def op_my_reviews(ctx, rng):
+    return "GET", "/users/me/reviews", {"headers": ctx.user_headers(rng)}, (200,)
+
+
+def op_add_favorite(ctx, rng):
+    # 400 = already a favorite, which is a normal outcome with random picks
+    path = f"/restaurants/{ctx.popular_restaurant(rng)}/favorite"
+    return "POST", path, {"headers": ctx.user_headers(rng)}, (201, 400)
+
+
+def op_write_review(ctx, rng):
+    # 400 = already reviewed
+    path = f"/restaurants/{ctx.popular_restaurant(rng)}/reviews"
+    payload = {"rating": rng.randint(1, 5), "comment": "Load test review"}
+    return "POST", path, {"json": payload, "headers": ctx.user_headers(rng)}, (201, 400)
+
+
+def op_owner_dashboard(ctx, rng):
+    owner_id, restaurant_id = rng.choice(ctx.owned)
+    return "GET", f"/owner/dashboard/{restaurant_id}", {"headers": ctx.headers_for(owner_id)}, (200,)
+
+
+def op_owner_restaurants(ctx, rng):
+    owner_id, _ = rng.choice(ctx.owned)
+    return "GET", "/owner/restaurants", {"headers": ctx.headers_for(owner_id)}, (200,)
+
+
+def op_owner_reviews(ctx, rng):
+    owner_id, restaurant_id = rng.choice(ctx.owned)
+    return "GET", f"/owner/restaurants/{restaurant_id}/reviews", {"headers": ctx.headers_for(owner_id)}, (200,)
+
+
+MIXES = {
+    "browse": {op_search: 35, op_details: 25, op_reviews: 20, op_search_keywords: 12, op_me: 6, op_login: 2},
+    "user": {op_details: 20, op_reviews: 15, op_favorites: 15, op_history: 15, op_my_reviews: 10,
+             op_add_favorite: 10, op_write_review: 10, op_me: 5},
+    "owner": {op_owner_dashboard: 40, op_owner_restaurants: 20, op_owner_reviews: 25, op_details: 15},
+}
+MIXES["mixed"] = {}
+for _name, _share in (("browse", 70), ("user", 20), ("owner", 10)):
+    _total = sum(MIXES[_name].values())
+    for _op, _weight in MIXES[_name].items():
+        MIXES["mixed"][_op] = MIXES["mixed"].get(_op, 0) + _share * _weight / _total
+
+
+def op_name(op) -> str:
+    return op.__name__.removeprefix("op_")
+
+
+class Context:
+    """Who the clients act as and which restaurants they hit"""
+
+    def __init__(self, session_factory, seed: int):
+        rng = random.Random(seed)
+        db = session_factory()
+        try:
+            users = db.query(User.id, User.email).filter(
+                User.role == "user", User.email.like(f"%@{EMAIL_DOMAIN}")
+            ).all()
+            self.user_emails = [email for _, email in users]
+            user_ids = rng.sample([user_id for user_id, _ in users], min(TOKEN_POOL_SIZE, len(users)))
+            self.owned = db.query(Restaurant.owner_id, Restaurant.id).filter(
+                Restaurant.owner_id.isnot(None)
+            ).all()
+            restaurants = db.query(Restaurant.id, Restaurant.review_count).all()
+        finally:
+            db.close()
+        if not user_ids or not self.owned:
+            raise SystemExit("No generated users/owned restaurants found — run without --reuse")
+
+        self._headers = {}
+        self.user_ids = user_ids
+        for user_id in set(user_ids) | {owner_id for owner_id, _ in self.owned}:
+            token = create_access_token(data={"sub": str(user_id)})
+            self._headers[user_id] = {"Authorization": f"Bearer {token}"}
+
+        # Pages are visited roughly in proportion to how reviewed the restaurant is
+        self.restaurant_ids = [restaurant_id for restaurant_id, _ in restaurants]
+        self.cum_weights = []
+        total = 0
+        for _, review_count in restaurants:
+            total += (review_count or 0) + 1
+            self.cum_weights.append(total)
+
+    def popular_restaurant(self, rng) -> int:
+        return rng.choices(self.restaurant_ids, cum_weights=self.cum_weights)[0]
+
+    def user_headers(self, rng) -> dict:
+        return self._headers[rng.choice(self.user_ids)]
+
+    def headers_for(self, user_id: int) -> dict:
+        return self._headers[user_id]
+
+
+async def run_load(client, ctx, mix: dict, duration: float, concurrency: int, seed: int) -> tuple[dict, float]:
+    ops, weights = list(mix), list(mix.values())
+    samples = {op_name(op): [] for op in ops}
+    errors = {op_name(op): 0 for op in ops}
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, weights)[0]
+            method, path, kwargs, expected = op(ctx, rng)
+            t = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            latency = (time.perf_counter() - t) * 1000
+            samples[op_name(op)].append(latency)
+            if r.status_code not in expected:
+                errors[op_name(op)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, latencies in samples.items():
+        results[name] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 1),
+            "errors": errors[name],
+            **percentiles(latencies),
+        }
+    all_latencies = [latency for latencies in samples.values() for latency in latencies]
+    results["TOTAL"] = {
+        "requests": len(all_latencies),
+        "rps": round(len(all_latencies) / elapsed, 1),
+        "errors": sum(errors.values()),
+        **percentiles(all_latencies),
+    }
+    return results, elapsed
+
+
+def print_table(results: dict):
+    print(f"{'endpoint':<20} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['requests']:>9} {r['rps']:>8} {r['errors']:>7} "
+              f"{r['p50']:>8} {r['p95']:>8} {r['p99']:>8}")
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['meta']['commit']} {old['meta']['scenario']}/{old['meta']['scale']} @ {old['meta']['started_at']}")
+    print(f"new: {new['meta']['commit']} {new['meta']['scenario']}/{new['meta']['scale']} @ {new['meta']['started_at']}\n")
+    print(f"{'endpoint':<20} {'req/s old':>10} {'req/s new':>10} {'change':>8} {'p95 old':>9} {'p95 new':>9} {'change':>8}")
+
+    def change(a, b):
+        return f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+
+    for name, n in new["endpoints"].items():
+        o = old["endpoints"].get(name)
+        if o is None:
+            print(f"{name:<20} {'-':>10} {n['rps']:>10}")
+            continue
+        print(f"{name:<20} {o['rps']:>10} {n['rps']:>10} {change(o['rps'], n['rps']):>8} "
+              f"{o['p95']:>9} {n['p95']:>9} {change(o['p95'], n['p95']):>8}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main():
+    engine = make_engine(url=args.database_url)
+    app, Session = make_app(engine)
+    scale = SCALES[args.scale]
+
+    db = Session()
+    try:
+        has_data = args.reuse and db.query(User.id).filter(User.email.like(f"%@{EMAIL_DOMAIN}")).first()
+        if not has_data:
+            print(f"Generating {args.scale} data set...")
+            started = time.perf_counter()
+            generate(db, seed=args.seed, **scale)
+            print(f"  done in {time.perf_counter() - started:.1f}s\n")
+    finally:
+        db.close()
+
+    ctx = Context(Session, args.seed)
+    print(f"{args.scenario} scenario, {args.concurrency} clients, {args.duration:.0f}s\n")
+    started_at = datetime.now().isoformat(timespec="seconds")
+    async with make_client(app) as client:
+        results, elapsed = await run_load(client, ctx, MIXES[args.scenario], args.duration,
+                                          args.concurrency, args.seed)
+    print_table(results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": started_at,
+            "scenario": args.scenario,
+            "scale": args.scale,
+            "data": scale,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "seed": args.seed,
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "endpoints": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{args.scenario}-{args.scale}-{report['meta']['commit']}-"
+                                  f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {path}")
+
+
+if __name__ == "__main__":
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+Login storm benchmark.
+
+Fires a burst of concurrent logins and, while they run, measures the latency of
+an unrelated sync route (GET /restaurants/{id}). Runs twice: once against a copy
+of the old inline-bcrypt handler and once against the real /auth/login, which
+hashes on the dedicated executor.
+
+    python benchmarks/bench_login_storm.py --logins 200 --concurrency 100 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--logins", type=int, default=200, help="total login requests per run")
+parser.add_argument("--concurrency", type=int, default=100, help="logins in flight at once")
+parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor")
+parser.add_argument("--workers", type=int, default=2, help="hashing executor size")
+args = parser.parse_args()
+
+os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+os.environ["HASH_WORKERS"] = str(args.workers)
+os.environ["HASH_QUEUE_SIZE"] = str(args.logins)  # measure queueing, not load shedding
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from fastapi import Depends, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.database import get_db  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.schemas.user import UserLogin  # noqa: E402
+from app.services.auth import hash_password, verify_password, create_access_token  # noqa: E402
+
+EMAIL, PASSWORD = "storm@example.com", "password123"
+
+
+def seed(Session):
+    db = Session()
+    db.add(User(name="Storm", email=EMAIL, password_hash=hash_password(PASSWORD), role="user"))
+    db.add(Restaurant(name="Probe Diner", city="San Jose"))
+    db.commit()
+    restaurant_id = db.query(Restaurant.id).scalar()
+    db.close()
+    return restaurant_id
+
+
+def add_inline_login(app):
+    """The pre-executor login handler, kept here only as the baseline"""
+    @app.post("/bench/login-inline")
+    def login_inline(payload: UserLogin, db: Session = Depends(get_db)):
+        user = db.query(User).filter(User.email == payload.email).first()
+        if not user or not verify_password(payload.password, user.password_hash):
+            raise HTTPException(status_code=401)
+        return {"access_token": create_access_token(data={"sub": str(user.id)})}
+
+
+async def storm(client, login_path, restaurant_id):
+    sem = asyncio.Semaphore(args.concurrency)
+    login_ms, probe_ms = [], []
+    done = asyncio.Event()
+
+    async def one_login():
+        async with sem:
+            t = time.perf_counter()
+            r = await client.post(login_path, json={"email": EMAIL, "password": PASSWORD})
+            r.raise_for_status()
+            login_ms.append((time.perf_counter() - t) * 1000)
+
+    async def probe():
+        while not done.is_set():
+            t = time.perf_counter()
+            r = await client.get(f"/restaurants/{restaurant_id}")
+            r.raise_for_status()
+            probe_ms.append((time.perf_counter() - t) * 1000)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    return elapsed, login_ms, probe_ms
+
+
+async def main():
+    engine = make_engine()
+    app, Session = make_app(engine)
+    add_inline_login(app)
+    restaurant_id = seed(Session)
+
+    print(f"bcrypt rounds={args.rounds}  logins={args.logins}  concurrency={args.concurrency}  "
+          f"hash workers={args.workers}\n")
+    async with make_client(app) as client:
+        for label, path in (("inline bcrypt (baseline)", "/bench/login-inline"),
+                            ("hashing executor", "/auth/login")):
+            elapsed, login_ms, probe_ms = await storm(client, path, restaurant_id)
+            print(f"== {label}")
+            print(f"   login throughput : {len(login_ms) / elapsed:8.1f} logins/s")
+            print(f"   login latency    : {percentiles(login_ms)}")
+            print(f"   probe latency    : {percentiles(probe_ms)}\n")
+
+        print("executor stats:", (await client.get("/metrics/password-hashing")).json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
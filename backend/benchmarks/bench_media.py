@@ -0,0 +1,85 @@
+"""
+/uploads serving benchmark.
+
+Serves one blob-sized image through the old plain StaticFiles mount and
+through MediaFiles, and measures requests/s for full GETs, conditional GETs
+that revalidate with the ETag from the first response, and 64 KB range GETs.
+
+    python benchmarks/bench_media.py --requests 2000 --size-kb 300
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+parser.add_argument("--size-kb", type=int, default=300, help="size of the served file")
+args = parser.parse_args()
+
+from _harness import percentiles  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.staticfiles import StaticFiles  # noqa: E402
+from app.services.media import MediaFiles  # noqa: E402
+
+BLOB_HASH = "a96faf705af16834e6c632b61e964e1f"
+
+
+async def scenario(client, path, headers_for):
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies, statuses, body_bytes = [], {}, 0
+
+    async def one():
+        nonlocal body_bytes
+        async with sem:
+            t = time.perf_counter()
+            r = await client.get(path, headers=headers_for())
+            latencies.append((time.perf_counter() - t) * 1000)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            body_bytes += len(r.content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    return args.requests / elapsed, latencies, statuses, body_bytes
+
+
+async def main():
+    root = tempfile.mkdtemp(prefix="yelp_bench_media_")
+    os.makedirs(os.path.join(root, "blobs", BLOB_HASH[:2]))
+    with open(os.path.join(root, "blobs", BLOB_HASH[:2], f"{BLOB_HASH}.jpg"), "wb") as f:
+        f.write(os.urandom(args.size_kb * 1024))
+    path = f"/uploads/blobs/{BLOB_HASH[:2]}/{BLOB_HASH}.jpg"
+
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent, {args.size_kb} KB file\n")
+    for label, files_app in (("StaticFiles (baseline)", StaticFiles(directory=root)),
+                             ("MediaFiles", MediaFiles(directory=root))):
+        app = FastAPI()
+        app.mount("/uploads", files_app)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            first = await client.get(path)
+            etag = first.headers["etag"]
+            print(f"== {label}")
+            print(f"   headers      : etag={etag}  cache-control={first.headers.get('cache-control')}")
+
+            for name, headers_for in (
+                ("full GET", lambda: {}),
+                ("revalidate", lambda: {"If-None-Match": etag}),
+                ("range 64 KB", lambda: {"Range": "bytes=0-65535"}),
+            ):
+                rps, latencies, statuses, body = await scenario(client, path, headers_for)
+                p = percentiles(latencies)
+                print(f"   {name:<13}: {rps:8.0f} req/s  p50={p['p50']}ms p99={p['p99']}ms  "
+                      f"statuses={statuses}  body={body / (1024 * 1024):.1f} MB")
+            print()
+
+    shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Fuzzy name search benchmark.
+
+Generates restaurants, then searches for some of them by misspelled names
+(a dropped, doubled, swapped or wrong letter per word) and reports recall —
+how often the restaurant meant is among the first page of results — and
+latency, for the substring search (name=...) and the trigram search
+(name=...&fuzzy=true). Also checks accent folding and that created, renamed
+and deleted restaurants are found (or not) straight away.
+
+    python benchmarks/bench_name_search.py
+    python benchmarks/bench_name_search.py --restaurants 1000000 --queries 500
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--queries", type=int, default=200, help="misspelled names searched")
+parser.add_argument("--page", type=int, default=10, help="results a hit must be among")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+from app.services.name_search import name_index  # noqa: E402
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def misspell(rng, word: str) -> str:
+    if len(word) < 4 or word.isdigit():
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(["drop", "double", "swap", "wrong"])
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+
+
+async def main():
+    rng = random.Random(3)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=100, owners=100, restaurants=args.restaurants, reviews=0, favorites=0,
+                 log=lambda *_: None)
+        started = time.perf_counter()
+        name_index.ensure_fresh(db)
+        print(f"== index built in {time.perf_counter() - started:.2f}s\n")
+        targets = rng.sample(db.query(Restaurant.id, Restaurant.name).all(), args.queries)
+        owner = db.query(User).filter(User.role == "owner").first()
+    finally:
+        db.close()
+    searches = [(rid, " ".join(misspell(rng, w) for w in name.lower().split())) for rid, name in targets]
+
+    async with make_client(app) as client:
+        login = await client.post("/auth/login", json={"email": owner.email, "password": GENERATED_PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def search(name, fuzzy):
+            r = await client.get("/restaurants", params={"name": name, "fuzzy": fuzzy, "limit": args.page})
+            r.raise_for_status()
+            return [restaurant["id"] for restaurant in r.json()["restaurants"]]
+
+        for label, fuzzy in (("substring", "false"), ("trigram", "true")):
+            hits, latencies = 0, []
+            for rid, name in searches:
+                t = time.perf_counter()
+                found = await search(name, fuzzy)
+                latencies.append((time.perf_counter() - t) * 1000)
+                hits += rid in found
+            print(f"== {label:9} search: recall {hits / len(searches):.0%}, GET /restaurants {percentiles(latencies)}")
+        print(f"   e.g. {searches[0][1]!r}\n")
+
+        # Accents, case and punctuation don't matter; writes show up straight away
+        body = {"name": "Phở Hòa Noodle House", "cuisine_type": "Vietnamese", "city": "San Jose"}
+        r = await client.post("/restaurants", json=body, headers=headers)
+        r.raise_for_status()
+        restaurant_id = r.json()["id"]
+        for name in ("pho hoa", "PHO HOA", "phở hoà", "pho hao noodle"):
+            assert (await search(name, "true"))[:1] == [restaurant_id], name
+        assert await search("pho hoa", "false") == []
+        r = await client.put(f"/restaurants/{restaurant_id}", json={"name": "Résumé Bistro"}, headers=headers)
+        r.raise_for_status()
+        assert restaurant_id not in await search("pho hoa", "true")
+        assert (await search("resume bistro", "true"))[:1] == [restaurant_id]
+        (await client.delete(f"/restaurants/{restaurant_id}", headers=headers)).raise_for_status()
+        assert await search("resume bistro", "true") == []
+        print("Accent folding and create / rename / delete checked")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
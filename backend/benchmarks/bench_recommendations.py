@@ -0,0 +1,120 @@
+"""
+Collaborative-filtering recommender benchmark.
+
+Generates a skewed data set, times a full build of the item-item model, then
+adds a trickle of new favorites/reviews and times the incremental refresh
+that picks them up. Finishes with end-to-end latency of
+GET /restaurants/{id}/similar and GET /users/me/recommendations.
+
+    python benchmarks/bench_recommendations.py
+    python benchmarks/bench_recommendations.py --users 100000 --restaurants 20000 --reviews 1000000 --favorites 500000
+    python benchmarks/bench_recommendations.py --db /tmp/recs.db    # reuse the data between runs
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--users", type=int, default=20000)
+parser.add_argument("--restaurants", type=int, default=5000)
+parser.add_argument("--reviews", type=int, default=200000)
+parser.add_argument("--favorites", type=int, default=100000)
+parser.add_argument("--new-activity", type=int, default=500, help="favorites added before the incremental refresh")
+parser.add_argument("--queries", type=int, default=200, help="requests per endpoint")
+parser.add_argument("--db", help="SQLite file to keep the data in (reused if it already has users)")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import func, insert  # noqa: E402
+import numpy as np  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.favorite import Favorite  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+from app.services.recommendations import recommender, load_interactions, compute_neighbors  # noqa: E402
+
+
+def load(Session):
+    db = Session()
+    try:
+        if db.query(func.count(User.id)).scalar():
+            print(f"Reusing the data in {args.db}\n")
+            return
+        print("Generating data...")
+        started = time.perf_counter()
+        generate(db, users=args.users, owners=max(args.restaurants // 10, 1), restaurants=args.restaurants,
+                 reviews=args.reviews, favorites=args.favorites, log=lambda *_: None)
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+    finally:
+        db.close()
+
+
+async def main():
+    rng = random.Random(7)
+    engine = make_engine(path=args.db)
+    app, Session = make_app(engine)
+    load(Session)
+
+    db = Session()
+    try:
+        started = time.perf_counter()
+        users, items, weights = load_interactions(db)
+        loaded = time.perf_counter()
+        neighbors = compute_neighbors(users, items, weights)
+        print(f"== full build: {len(users)} interactions, {len(neighbors)} restaurants")
+        print(f"   load {(loaded - started) * 1000:.0f} ms, similarities {(time.perf_counter() - loaded) * 1000:.0f} ms\n")
+
+        recommender.ensure_fresh(db)
+
+        # New activity from a handful of users, then the refresh that picks it up
+        user_ids = [row.id for row in db.query(User.id).filter(User.role == "user").limit(1000)]
+        restaurant_ids = [row.id for row in db.query(Restaurant.id)]
+        existing = set(db.query(Favorite.user_id, Favorite.restaurant_id).filter(Favorite.user_id.in_(user_ids)).all())
+        rows = []
+        while len(rows) < args.new_activity:
+            pair = (rng.choice(user_ids), rng.choice(restaurant_ids))
+            if pair not in existing:
+                existing.add(pair)
+                rows.append({"user_id": pair[0], "restaurant_id": pair[1]})
+        db.execute(insert(Favorite), rows)
+        db.commit()
+
+        recommender._refresh(db)
+        print(f"== incremental refresh after {args.new_activity} new favorites: {recommender.stats['last_refresh_ms']} ms")
+
+        # It should agree with building from scratch, except where a restaurant only now
+        # makes another's top RECOMMENDER_NEIGHBORS (compared by similarity, since ties can go either way)
+        rebuilt = compute_neighbors(*load_interactions(db))
+        mismatched = sum(1 for rid, (_, sims) in rebuilt.items()
+                         if not np.allclose(sims, recommender._neighbors.get(rid, ([], []))[1], atol=1e-5))
+        print(f"   restaurants whose neighbours differ from a full rebuild at the cut-off: {mismatched} of {len(rebuilt)}\n")
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        latencies = []
+        for _ in range(args.queries):
+            t = time.perf_counter()
+            r = await client.get(f"/restaurants/{rng.choice(restaurant_ids)}/similar", params={"limit": 10})
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+        print(f"== GET /restaurants/{{id}}/similar: {percentiles(latencies)}")
+
+        latencies = []
+        for user_id in rng.sample(user_ids, min(args.queries // 10, len(user_ids))):
+            db = Session()
+            email = db.get(User, user_id).email
+            db.close()
+            login = await client.post("/auth/login", json={"email": email, "password": GENERATED_PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            t = time.perf_counter()
+            r = await client.get("/users/me/recommendations", params={"limit": 10}, headers=headers)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+        print(f"== GET /users/me/recommendations: {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
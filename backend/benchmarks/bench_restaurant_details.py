@@ -0,0 +1,128 @@
+"""
+Restaurant detail page benchmark.
+
+Generates restaurants with reviews, photos and favorites, then loads the
+detail page the old way — GET /restaurants/{id}, /photos, /reviews and the
+caller's whole favorites list — and with the one GET /restaurants/{id}/details
+call, signed in and anonymous. Reports round trips, SQL statements and
+latency per page load, for a restaurant with few reviews and one with many,
+and checks both ways show the same restaurant, photos, histogram, favorite
+state and reviews.
+
+    python benchmarks/bench_restaurant_details.py
+    python benchmarks/bench_restaurant_details.py --reviews 500000 --loads 50
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=100)
+parser.add_argument("--reviews", type=int, default=40000)
+parser.add_argument("--photos", type=int, default=12, help="photos on each restaurant loaded")
+parser.add_argument("--loads", type=int, default=30, help="page loads per restaurant and way")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from sqlalchemy import event, func  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.restaurant_photo import RestaurantPhoto  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.favorite import Favorite  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+
+
+async def main():
+    engine = make_engine()
+    app, Session = make_app(engine)
+    statements = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements["sql"] += 1
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants, {args.reviews} reviews...")
+        generate(db, users=2000, owners=5, restaurants=args.restaurants, reviews=args.reviews,
+                 favorites=args.reviews // 4, log=lambda *_: None)
+        by_reviews = db.query(Review.restaurant_id, func.count(Review.id)).group_by(Review.restaurant_id) \
+            .order_by(func.count(Review.id)).all()
+        picks = {"fewest reviews": by_reviews[0][0], "most reviews": by_reviews[-1][0]}
+        for restaurant_id in picks.values():
+            db.add_all(RestaurantPhoto(restaurant_id=restaurant_id,
+                                       photo_url=f"/uploads/blobs/ab/ab{restaurant_id}_{n}.jpg")
+                       for n in range(args.photos))
+        # A caller who reviewed and saved the busy restaurant
+        viewer = db.query(User).join(Review, Review.user_id == User.id).filter(
+            Review.restaurant_id == picks["most reviews"]).first()
+        if not db.query(Favorite).filter_by(user_id=viewer.id, restaurant_id=picks["most reviews"]).first():
+            db.add(Favorite(user_id=viewer.id, restaurant_id=picks["most reviews"]))
+        db.commit()
+        favorites = db.query(Favorite).filter(Favorite.user_id == viewer.id).count()
+        review_counts = {rid: db.get(Restaurant, rid).review_count for rid in picks.values()}
+        print()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        r = await client.post("/auth/login", json={"email": viewer.email, "password": GENERATED_PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        async def get(url, signed_in):
+            r = await client.get(url, headers=headers if signed_in else {})
+            r.raise_for_status()
+            return r.json()
+
+        async def old_page(restaurant_id, signed_in):
+            restaurant, photos, reviews = await asyncio.gather(
+                get(f"/restaurants/{restaurant_id}", signed_in),
+                get(f"/restaurants/{restaurant_id}/photos", signed_in),
+                get(f"/restaurants/{restaurant_id}/reviews", signed_in))
+            saved = await get("/users/me/favorites", True) if signed_in else []
+            histogram = Counter(str(review["rating"]) for review in reviews)
+            return {
+                "restaurant": restaurant,
+                "photos": photos,
+                "rating_distribution": {str(stars): histogram[str(stars)] for stars in range(1, 6)},
+                "reviews": reviews[:20],
+                "is_favorite": any(f["restaurant_id"] == restaurant_id for f in saved),
+                "own_review": next((rv for rv in reviews if rv["user_id"] == viewer.id), None) if signed_in else None,
+            }, 4 if signed_in else 3
+
+        async def new_page(restaurant_id, signed_in):
+            details = await get(f"/restaurants/{restaurant_id}/details", signed_in)
+            return {
+                "restaurant": details["restaurant"],
+                "photos": details["photos"],
+                "rating_distribution": details["rating_distribution"],
+                "reviews": details["reviews"],
+                "is_favorite": bool(details["viewer"] and details["viewer"]["is_favorite"]),
+                "own_review": details["viewer"] and details["viewer"]["review"],
+            }, 1
+
+        print(f"== page loads ({args.photos} photos; the caller has {favorites} favorites)")
+        for label, restaurant_id in picks.items():
+            for signed_in in (True, False):
+                shown = {}
+                for way, load in (("separate", old_page), ("/details", new_page)):
+                    latencies, sql = [], []
+                    for _ in range(args.loads):
+                        statements.clear()
+                        t = time.perf_counter()
+                        shown[way], round_trips = await load(restaurant_id, signed_in)
+                        latencies.append((time.perf_counter() - t) * 1000)
+                        sql.append(statements["sql"])
+                    who = "signed in" if signed_in else "anonymous"
+                    print(f"   {label} ({review_counts[restaurant_id]}), {who:9}, {way:10}: {round_trips} request(s), "
+                          f"{max(sql):>4} SQL, {percentiles(latencies)}")
+                old, new = shown.values()
+                assert old == new, f"{label}: the detail endpoint shows something else"
+        print("   Both ways show the same restaurant, photos, histogram, first reviews and favorite / review state")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
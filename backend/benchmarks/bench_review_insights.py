@@ -0,0 +1,108 @@
+"""
+Review text analysis benchmark.
+
+Generates reviews, runs the batch analyzer over all of them and reports
+reviews/s, then edits, adds and deletes a few reviews through the API and
+times the incremental pass that picks them up, checking the per-restaurant
+summaries it leaves match re-analyzing everything from scratch.
+
+    python benchmarks/bench_review_insights.py
+    python benchmarks/bench_review_insights.py --reviews 1000000 --batch-size 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--users", type=int, default=20000)
+parser.add_argument("--restaurants", type=int, default=5000)
+parser.add_argument("--reviews", type=int, default=200000)
+parser.add_argument("--changes", type=int, default=50, help="reviews edited, deleted and added before the second pass")
+parser.add_argument("--batch-size", type=int, default=2000)
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from app.models.restaurant_insight import RestaurantInsight  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD  # noqa: E402
+from app.services.review_insights import analyze_reviews  # noqa: E402
+
+
+def summaries(db) -> dict:
+    columns = ("review_count", "positive", "neutral", "negative", "avg_sentiment", "highlights")
+    return {row.restaurant_id: tuple(getattr(row, c) for c in columns) for row in db.query(RestaurantInsight)}
+
+
+async def main():
+    rng = random.Random(5)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print("Generating data...")
+        generate(db, users=args.users, owners=max(args.restaurants // 10, 1), restaurants=args.restaurants,
+                 reviews=args.reviews, favorites=0, log=lambda *_: None)
+        started = time.perf_counter()
+        analyzed, summarized = analyze_reviews(db, batch_size=args.batch_size, log=lambda *_: None)
+        elapsed = time.perf_counter() - started
+        print(f"== full pass: {analyzed} reviews, {summarized} restaurants in {elapsed:.1f}s "
+              f"({analyzed / elapsed:,.0f} reviews/s)")
+        example = db.query(RestaurantInsight).order_by(RestaurantInsight.review_count.desc()).first()
+        print(f"   busiest restaurant: {example.positive}+ / {example.neutral}= / {example.negative}- "
+              f"highlights {example.highlights}\n")
+
+        reviews = db.execute(
+            select(Review.id, Review.restaurant_id, User.email).join(User, User.id == Review.user_id)
+            .order_by(Review.id).limit(args.changes * 4)
+        ).all()
+        reviewers = db.query(User.email).filter(User.role == "user").order_by(User.id.desc()).limit(args.changes).all()
+    finally:
+        db.close()
+
+    async with make_client(app) as client:
+        tokens = {}
+
+        async def auth(email):
+            if email not in tokens:
+                login = await client.post("/auth/login", json={"email": email, "password": GENERATED_PASSWORD})
+                login.raise_for_status()
+                tokens[email] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            return tokens[email]
+
+        picked = rng.sample(reviews, min(args.changes * 2, len(reviews)))
+        for review_id, restaurant_id, email in picked[:args.changes]:
+            r = await client.put(f"/restaurants/{restaurant_id}/reviews/{review_id}",
+                                 json={"rating": 1, "comment": "Not good at all. Rude staff and cold food."},
+                                 headers=await auth(email))
+            r.raise_for_status()
+        for review_id, restaurant_id, email in picked[args.changes:]:
+            r = await client.delete(f"/restaurants/{restaurant_id}/reviews/{review_id}", headers=await auth(email))
+            r.raise_for_status()
+        for (email,), (_, restaurant_id, _) in zip(reviewers, picked):
+            r = await client.post(f"/restaurants/{restaurant_id}/reviews",
+                                  json={"rating": 5, "comment": "Absolutely loved it, friendly staff!"},
+                                  headers=await auth(email))
+            if r.status_code != 400:   # already reviewed this one
+                r.raise_for_status()
+
+    db = Session()
+    try:
+        started = time.perf_counter()
+        analyzed, summarized = analyze_reviews(db, batch_size=args.batch_size, log=lambda *_: None)
+        print(f"== incremental pass: {analyzed} reviews, {summarized} restaurants in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        incremental = summaries(db)
+
+        analyze_reviews(db, batch_size=args.batch_size, everything=True, log=lambda *_: None)
+        assert summaries(db) == incremental, "incremental summaries differ from a full re-analysis"
+        print("   summaries match a full re-analysis")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
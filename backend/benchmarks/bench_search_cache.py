@@ -0,0 +1,140 @@
+"""
+Search result cache benchmark.
+
+Generates restaurants and replays a popular-search workload (a skewed mix of
+city / cuisine / price / page searches, with a review or restaurant edit
+every --write-every requests) through GET /restaurants with the cache off,
+with the in-process LRU and with the shared SQLite backend. After every
+write, a sample of searches is checked against the same searches with the
+cache off, so a stale response fails the run. Then checks one worker's
+write reaches another worker's shared-cache versions.
+
+    python benchmarks/bench_search_cache.py
+    python benchmarks/bench_search_cache.py --restaurants 1000000 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--restaurants", type=int, default=200000)
+parser.add_argument("--requests", type=int, default=2000, help="searches replayed per backend")
+parser.add_argument("--write-every", type=int, default=50, help="searches between writes")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.commands.generate_data import generate, GENERATED_PASSWORD, CITIES, CUISINES, PRICE_TIERS  # noqa: E402
+from app.services.search_cache import search_cache, NoCache, MemoryCache, SharedFileCache  # noqa: E402
+
+
+def popular_searches(rng, n: int = 400) -> tuple[list[dict], list[float]]:
+    """Distinct searches, weighted so a few get most of the traffic (Zipf-like)"""
+    searches = []
+    for _ in range(n):
+        params = {"city": rng.choice(CITIES)[0] if rng.random() < 0.9 else "San"}
+        if rng.random() < 0.7:
+            params["cuisine_type"] = rng.choice(CUISINES)
+        if rng.random() < 0.4:
+            params["price_tier"] = rng.choice(PRICE_TIERS)
+        if rng.random() < 0.3:
+            params["facets"] = "true"
+        params["skip"] = rng.choice((0, 0, 0, 10, 20))
+        searches.append(params)
+    return searches, [1 / (rank + 1) ** 1.1 for rank in range(n)]
+
+
+async def main():
+    rng = random.Random(12)
+    engine = make_engine()
+    app, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.restaurants} restaurants...")
+        generate(db, users=200, owners=20, restaurants=args.restaurants, reviews=args.restaurants, favorites=0,
+                 log=lambda *_: None)
+        owner = db.query(User).filter(User.role == "owner").first()
+        owned = [rid for (rid,) in db.query(Restaurant.id).filter(Restaurant.owner_id == owner.id)]
+        reviewers = [u.email for u in db.query(User).filter(User.role == "user").limit(5)]
+        print()
+    finally:
+        db.close()
+
+    searches, weights = popular_searches(rng)
+    shared_path = os.path.join(tempfile.mkdtemp(prefix="yelp_bench_"), "search_cache.sqlite3")
+    backends = (("cache off", NoCache()), ("in-process LRU", MemoryCache(5000)),
+                ("shared SQLite", SharedFileCache(shared_path, 5000)))
+
+    async with make_client(app) as client:
+        async def token(email):
+            r = await client.post("/auth/login", json={"email": email, "password": GENERATED_PASSWORD})
+            r.raise_for_status()
+            return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        owner_headers = await token(owner.email)
+        reviewer_headers = [await token(email) for email in reviewers]
+
+        async def search(params):
+            r = await client.get("/restaurants", params={**params, "limit": 10})
+            r.raise_for_status()
+            return r.content
+
+        async def write():
+            """A new review (changes a rating) or an owner edit, sometimes moving the restaurant to another city"""
+            restaurant_id = rng.choice(owned)
+            if rng.random() < 0.5:
+                r = await client.post(f"/restaurants/{restaurant_id}/reviews", headers=rng.choice(reviewer_headers),
+                                      json={"rating": rng.randint(1, 5), "comment": "Benchmark review"})
+                assert r.status_code in (201, 400), r.text   # 400: already reviewed by this user
+            else:
+                city, state = rng.choice(CITIES)[:2]
+                change = {"price_tier": rng.choice(PRICE_TIERS)}
+                if rng.random() < 0.3:
+                    change = {"city": city, "state": state}
+                r = await client.put(f"/restaurants/{restaurant_id}", json=change, headers=owner_headers)
+                r.raise_for_status()
+
+        async def check_fresh(sample):
+            cache_backend = search_cache.backend
+            cached = [await search(params) for params in sample]
+            search_cache.backend = NoCache()
+            fresh = [await search(params) for params in sample]
+            search_cache.backend = cache_backend
+            for params, a, b in zip(sample, cached, fresh):
+                assert a == b, f"stale cached response for {params}"
+
+        workload = rng.choices(searches, weights, k=args.requests)
+        for label, backend in backends:
+            search_cache.backend = backend
+            search_cache.stats.update(hits=0, misses=0)
+            latencies = []
+            for i, params in enumerate(workload, 1):
+                t = time.perf_counter()
+                await search(params)
+                latencies.append((time.perf_counter() - t) * 1000)
+                if i % args.write_every == 0:
+                    await write()
+                    await check_fresh(rng.choices(searches, weights, k=20))
+            stats = search_cache.stats
+            hit_rate = stats["hits"] / max(stats["hits"] + stats["misses"], 1)
+            print(f"== {label:15}: {percentiles(latencies)}  hit rate {hit_rate:.0%}")
+        print(f"   every {args.write_every} searches a write, then 20 searches matched the uncached response\n")
+
+        # Another worker opening the same file sees this worker's writes
+        other_worker = SharedFileCache(shared_path, 5000)
+        before = other_worker.versions("city")
+        search_cache.backend = backends[2][1]
+        r = await client.put(f"/restaurants/{owned[0]}", json={"city": "Cacheville"}, headers=owner_headers)
+        r.raise_for_status()
+        after = other_worker.versions("city")
+        assert after.get("cacheville") == 1 and sum(after.values()) > sum(before.values())
+        print("Shared backend: a write in one worker bumps the versions another worker reads")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+JSON serialization benchmark.
+
+Generates restaurants and reviews, then times turning a 1k-row restaurant
+list and a 1k-row review list into a response body, each way the API has
+done it: ORM objects through jsonable_encoder and json.dumps, ORM objects
+validated per row (model_validate) and then as the response_model before
+pydantic dumps them, ORM objects dumped against the response_model
+directly, and rows of just the response's columns dumped by orjson (what
+the list endpoints do now). Reports the query and the serialization
+separately, and checks every way writes the same JSON — byte for byte for
+the pydantic and orjson ways.
+
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --rows 5000 --rounds 50
+"""
+import argparse
+import json
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--rows", type=int, default=1000, help="rows per list")
+parser.add_argument("--rounds", type=int, default=30, help="timed runs per way")
+args = parser.parse_args()
+
+from _harness import make_engine, make_app, percentiles  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.models.restaurant import Restaurant  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.restaurant import RestaurantResponse  # noqa: E402
+from app.schemas.review import ReviewResponse  # noqa: E402
+from app.services.serialization import dumps, model_columns, model_rows  # noqa: E402
+from app.commands.generate_data import generate  # noqa: E402
+
+
+def main():
+    engine = make_engine()
+    _, Session = make_app(engine)
+
+    db = Session()
+    try:
+        print(f"Generating {args.rows * 2} restaurants and {args.rows * 3} reviews...")
+        generate(db, users=2000, owners=5, restaurants=args.rows * 2, reviews=args.rows * 3, favorites=0,
+                 log=lambda *_: None)
+        # Pile the reviews onto one restaurant, so it has a list of --rows
+        restaurant_id = db.query(Restaurant.id).order_by(Restaurant.id).first()[0]
+        db.query(Review).filter(Review.id.in_(
+            db.query(Review.id).order_by(Review.id).limit(args.rows).scalar_subquery()
+        )).update({Review.restaurant_id: restaurant_id}, synchronize_session=False)
+        db.commit()
+        assert db.query(func.count(Review.id)).filter(Review.restaurant_id == restaurant_id).scalar() >= args.rows
+        print()
+    finally:
+        db.close()
+
+    lists = {
+        "restaurants": (
+            RestaurantResponse,
+            lambda db: db.query(Restaurant).order_by(Restaurant.id).limit(args.rows).all(),
+            lambda db: db.query(*model_columns(RestaurantResponse, Restaurant))
+            .order_by(Restaurant.id).limit(args.rows).all(),
+            {},
+        ),
+        "reviews": (
+            ReviewResponse,
+            # As GET /restaurants/{id}/reviews loads them, newest first with the authors' names
+            lambda db: db.query(Review, User.name).outerjoin(User, User.id == Review.user_id)
+            .filter(Review.restaurant_id == restaurant_id)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(args.rows).all(),
+            lambda db: db.query(*model_columns(ReviewResponse, Review, user_name=User.name))
+            .outerjoin(User, User.id == Review.user_id).filter(Review.restaurant_id == restaurant_id)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(args.rows).all(),
+            {"user_name"},
+        ),
+    }
+
+    for label, (model, load_objects, load_rows, extra) in lists.items():
+        adapter = TypeAdapter(list[model])
+
+        def objects(db):
+            """ORM objects, with any extra fields set as attributes the way the handlers did"""
+            loaded = load_objects(db)
+            if not extra:
+                return loaded
+            result = []
+            for obj, *values in loaded:
+                for name, value in zip(extra, values):
+                    setattr(obj, name, value)
+                result.append(obj)
+            return result
+
+        def validated_per_row(items):
+            result = [model.model_validate(item) for item in items]
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+        ways = {
+            "jsonable_encoder + json.dumps": (
+                objects, lambda items: json.dumps(jsonable_encoder(
+                    [model.model_validate(item) for item in items])).encode()),
+            "model_validate + response_model": (objects, validated_per_row),
+            "response_model from ORM objects": (
+                objects, lambda items: adapter.dump_json(adapter.validate_python(items, from_attributes=True))),
+            "column rows + orjson": (load_rows, lambda rows: dumps(model_rows(model, rows))),
+        }
+
+        print(f"== {args.rows} {label}")
+        bodies = {}
+        for way, (load, serialize) in ways.items():
+            query_ms, serialize_ms = [], []
+            for _ in range(args.rounds):
+                db = Session()
+                try:
+                    t = time.perf_counter()
+                    items = load(db)
+                    query_ms.append((time.perf_counter() - t) * 1000)
+                    t = time.perf_counter()
+                    bodies[way] = serialize(items)
+                    serialize_ms.append((time.perf_counter() - t) * 1000)
+                finally:
+                    db.close()
+            print(f"   {way:32}: query p50 {percentiles(query_ms)['p50']:>7.2f} ms, "
+                  f"serialize {percentiles(serialize_ms)}, {len(bodies[way])} bytes")
+
+        first, *rest = bodies.values()
+        assert all(json.loads(body) == json.loads(first) for body in rest), f"{label}: the ways disagree"
+        pydantic_bodies = {bodies[way] for way in ways if way != "jsonable_encoder + json.dumps"}
+        assert len(pydantic_bodies) == 1, f"{label}: orjson and pydantic bodies differ"
+        print("   Every way writes the same JSON; pydantic and orjson the same bytes\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+S3 storage backend check and benchmark.
+
+Runs S3Storage against a stand-in S3 server started in-process (or a real
+endpoint with --endpoint-url, e.g. MinIO or moto_server on :9000). The
+stand-in checks every request's SigV4 signature from the spec rather than
+from S3Storage's code, the Content-MD5 of each DeleteObjects batch, and
+refuses batches over 1000 keys. It pages ListObjectsV2 results --page-size
+keys at a time.
+
+Checks that keys with spaces, "+", "&" and non-ASCII round-trip through
+put / get / exists / put_file, that list_keys follows continuation tokens
+across pages, that delete_many splits --keys keys into batches of at most
+1000, and that a wrong secret key is refused. Then times put and get of
+--size-kb objects against S3Storage and LocalStorage.
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --keys 5000 --page-size 1000
+    python benchmarks/bench_storage.py --endpoint-url http://localhost:9000 --bucket uploads \\
+        --access-key minioadmin --secret-key minioadmin
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, unquote
+from xml.etree import ElementTree
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--endpoint-url", help="a real S3-compatible endpoint instead of the in-process stand-in")
+parser.add_argument("--bucket", default="bench")
+parser.add_argument("--region", default="us-east-1")
+parser.add_argument("--access-key", default="bench-access")
+parser.add_argument("--secret-key", default="bench-secret")
+parser.add_argument("--keys", type=int, default=2500, help="objects to list and delete in bulk")
+parser.add_argument("--page-size", type=int, default=1000, help="stand-in: keys per ListObjectsV2 page")
+parser.add_argument("--size-kb", type=int, default=64, help="object size for the timed puts and gets")
+parser.add_argument("--rounds", type=int, default=200, help="timed puts and gets per backend")
+args = parser.parse_args()
+
+from _harness import percentiles  # noqa: E402
+import httpx  # noqa: E402
+from app.services.storage import LocalStorage, S3Storage  # noqa: E402
+
+S3_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+MAX_CLOCK_SKEW_SECONDS = 15 * 60
+MAX_DELETE_KEYS = 1000
+PREFIX = "bench-storage/"
+
+
+# --- Stand-in S3 server ---
+
+class StandIn:
+    """Objects in a dict, one bucket, and a log of what the client sent"""
+
+    def __init__(self, bucket, region, access_key, secret_key, page_size):
+        self.bucket, self.region = bucket, region
+        self.access_key, self.secret_key = access_key, secret_key
+        self.page_size = page_size
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.delete_batches = []
+        self.list_pages = 0
+        self.refused = 0
+
+
+def _uri_encode(text: str, safe: str = "") -> str:
+    return quote(text, safe="-_.~" + safe)
+
+
+def verify_sigv4(stand_in: StandIn, method: str, raw_path: str, raw_query: str, headers, body: bytes) -> str | None:
+    """Why the request's signature is wrong, or None when it's right — per the SigV4 spec for S3"""
+    auth = headers.get("authorization", "")
+    if not auth.startswith("AWS4-HMAC-SHA256 "):
+        return "not signed with AWS4-HMAC-SHA256"
+    fields = dict(part.strip().split("=", 1) for part in auth[len("AWS4-HMAC-SHA256 "):].split(","))
+    access_key, datestamp, region, service, terminator = fields["Credential"].split("/")
+    if access_key != stand_in.access_key:
+        return "unknown access key"
+    if (region, service, terminator) != (stand_in.region, "s3", "aws4_request"):
+        return f"bad credential scope {fields['Credential']}"
+
+    amz_date = headers.get("x-amz-date", "")
+    signed_at = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    if abs((datetime.now(timezone.utc) - signed_at).total_seconds()) > MAX_CLOCK_SKEW_SECONDS:
+        return "request time too skewed"
+    if not amz_date.startswith(datestamp):
+        return "credential date doesn't match x-amz-date"
+    if headers.get("x-amz-content-sha256") != hashlib.sha256(body).hexdigest():
+        return "x-amz-content-sha256 doesn't match the body"
+
+    signed_names = fields["SignedHeaders"].split(";")
+    if "host" not in signed_names or signed_names != sorted(signed_names):
+        return "SignedHeaders must be sorted and include host"
+    # The path as sent, re-encoded the way S3 does (each segment decoded, then URI-encoded with "/" kept)
+    canonical_path = _uri_encode(unquote(raw_path), safe="/")
+    canonical_query = "&".join(sorted(
+        f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in parse_qsl(raw_query, keep_blank_values=True)
+    ))
+    canonical_headers = "".join(f"{name}:{' '.join(headers.get(name, '').split())}\n" for name in signed_names)
+    canonical_request = "\n".join([
+        method, canonical_path, canonical_query, canonical_headers,
+        fields["SignedHeaders"], headers["x-amz-content-sha256"],
+    ])
+    scope = f"{datestamp}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+    ])
+    key = hmac.new(f"AWS4{stand_in.secret_key}".encode(), datestamp.encode(), hashlib.sha256).digest()
+    for part in (region, "s3", "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    expected = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, fields["Signature"]):
+        return "SignatureDoesNotMatch"
+    return None
+
+
+def make_handler(stand_in: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *_):
+            pass
+
+        def _reply(self, status: int, body: bytes = b"", content_type: str = "application/xml"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, status: int, code: str, message: str):
+            self._reply(status, f"<Error><Code>{code}</Code><Message>{message}</Message></Error>".encode())
+
+        def _handle(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            raw_path, _, raw_query = self.path.partition("?")
+            headers = {name.lower(): value for name, value in self.headers.items()}
+            problem = verify_sigv4(stand_in, self.command, raw_path, raw_query, headers, body)
+            if problem:
+                stand_in.refused += 1
+                return self._error(403, "SignatureDoesNotMatch", problem)
+
+            bucket, _, key = unquote(raw_path).lstrip("/").partition("/")
+            if bucket != stand_in.bucket:
+                return self._error(404, "NoSuchBucket", bucket)
+            query = dict(parse_qsl(raw_query, keep_blank_values=True))
+
+            if key:
+                with stand_in.lock:
+                    if self.command == "PUT":
+                        stand_in.objects[key] = body
+                        return self._reply(200)
+                    if self.command == "DELETE":
+                        stand_in.objects.pop(key, None)
+                        return self._reply(204)
+                    data = stand_in.objects.get(key)
+                if data is None:
+                    return self._error(404, "NoSuchKey", key)
+                return self._reply(200, data, "application/octet-stream")
+            if self.command == "POST" and "delete" in query:
+                return self._delete_objects(body)
+            if self.command == "GET" and query.get("list-type") == "2":
+                return self._list_objects(query)
+            return self._error(400, "InvalidRequest", f"{self.command} {self.path}")
+
+        def _delete_objects(self, body: bytes):
+            md5 = base64.b64encode(hashlib.md5(body).digest()).decode()
+            if self.headers.get("Content-MD5") != md5:
+                return self._error(400, "BadDigest", "Content-MD5 doesn't match the body")
+            root = ElementTree.fromstring(body)
+            keys = [el.text for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "Key"]
+            if len(keys) > MAX_DELETE_KEYS:
+                return self._error(400, "MalformedXML", f"{len(keys)} keys in one DeleteObjects call")
+            with stand_in.lock:
+                stand_in.delete_batches.append(len(keys))
+                for key in keys:
+                    stand_in.objects.pop(key, None)
+            self._reply(200, f'<DeleteResult xmlns="{S3_NS}"/>'.encode())
+
+        def _list_objects(self, query: dict):
+            prefix = query.get("prefix", "")
+            after = query.get("continuation-token")
+            after = base64.urlsafe_b64decode(after).decode() if after else ""
+            with stand_in.lock:
+                matching = sorted(k for k in stand_in.objects if k.startswith(prefix) and k > after)
+                stand_in.list_pages += 1
+            page = matching[:stand_in.page_size]
+            truncated = len(matching) > len(page)
+            parts = [f'<ListBucketResult xmlns="{S3_NS}"><Name>{stand_in.bucket}</Name>',
+                     f"<KeyCount>{len(page)}</KeyCount><IsTruncated>{str(truncated).lower()}</IsTruncated>"]
+            if truncated:
+                token = base64.urlsafe_b64encode(page[-1].encode()).decode()
+                parts.append(f"<NextContinuationToken>{token}</NextContinuationToken>")
+            for key in page:
+                escaped = key.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                parts.append(f"<Contents><Key>{escaped}</Key></Contents>")
+            parts.append("</ListBucketResult>")
+            self._reply(200, "".join(parts).encode())
+
+        do_GET = do_PUT = do_HEAD = do_POST = do_DELETE = _handle
+
+    return Handler
+
+
+def start_stand_in() -> tuple[StandIn, str]:
+    stand_in = StandIn(args.bucket, args.region, args.access_key, args.secret_key, args.page_size)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(stand_in))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return stand_in, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Checks ---
+
+async def check(storage: S3Storage, stand_in: StandIn | None):
+    odd_keys = [PREFIX + "photos/a b+c&d.png", PREFIX + "photos/ünïcødé 😀.jpg", PREFIX + "photos/x<y>z~_.-"]
+    for i, key in enumerate(odd_keys):
+        await storage.put(key, f"body {i}".encode(), "image/png")
+        assert await storage.get(key) == f"body {i}".encode(), key
+        assert await storage.exists(key), key
+    assert not await storage.exists(PREFIX + "missing")
+    try:
+        await storage.get(PREFIX + "missing")
+        raise AssertionError("get of a missing key should raise FileNotFoundError")
+    except FileNotFoundError:
+        pass
+    print(f"   put / get / exists / missing key      : ok for {len(odd_keys)} keys with spaces, +, &, <>, non-ASCII")
+
+    fd, local = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"from disk")
+    await storage.put_file(PREFIX + "from-file", local)
+    assert await storage.get(PREFIX + "from-file") == b"from disk"
+    assert not os.path.exists(local), "put_file should remove the local copy"
+    print("   put_file                              : ok, local copy removed")
+
+    bulk = [f"{PREFIX}bulk/{i:06d}{'&' if i % 97 == 0 else ''}" for i in range(args.keys)]
+    for key in bulk:
+        await storage.put(key, b"x")
+    pages_before = stand_in.list_pages if stand_in else 0
+    listed = await storage.list_keys(PREFIX + "bulk/")
+    assert sorted(listed) == sorted(bulk), f"list_keys returned {len(listed)} of {len(bulk)} keys"
+    pages = f", {stand_in.list_pages - pages_before} pages of {stand_in.page_size}" if stand_in else ""
+    print(f"   list_keys                             : {len(listed)} keys{pages}")
+
+    batches_before = len(stand_in.delete_batches) if stand_in else 0
+    await storage.delete_many(bulk + odd_keys + [PREFIX + "from-file", PREFIX + "never-written"])
+    batches = stand_in.delete_batches[batches_before:] if stand_in else None
+    assert await storage.list_keys(PREFIX) == [], "delete_many left keys behind"
+    await storage.delete(PREFIX + "never-written")
+    if stand_in:
+        assert max(batches) <= MAX_DELETE_KEYS and sum(batches) == len(bulk) + len(odd_keys) + 2, batches
+        print(f"   delete_many                           : batches of {batches}")
+    else:
+        print("   delete_many                           : ok")
+
+    wrong = S3Storage(storage.endpoint_url, storage.bucket, storage.region, storage.access_key, "not-the-secret")
+    try:
+        await wrong.put(PREFIX + "refused", b"x")
+        raise AssertionError("a request signed with the wrong secret was accepted")
+    except httpx.HTTPStatusError as exc:
+        assert exc.response.status_code == 403, exc.response.status_code
+    if stand_in:
+        assert stand_in.refused == 1, f"the stand-in refused {stand_in.refused} requests"
+    print("   wrong secret key                      : refused with 403")
+
+
+async def timed(storage, label: str):
+    data = os.urandom(args.size_kb * 1024)
+    put_ms, get_ms = [], []
+    for i in range(args.rounds):
+        key = f"{PREFIX}timed/{i}"
+        t = time.perf_counter()
+        await storage.put(key, data, "application/octet-stream")
+        put_ms.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        assert await storage.get(key) == data
+        get_ms.append((time.perf_counter() - t) * 1000)
+    await storage.delete_many([f"{PREFIX}timed/{i}" for i in range(args.rounds)])
+    print(f"   {label:14} put {percentiles(put_ms)}")
+    print(f"   {label:14} get {percentiles(get_ms)}")
+
+
+async def run():
+    stand_in = None
+    endpoint_url = args.endpoint_url
+    if not endpoint_url:
+        stand_in, endpoint_url = start_stand_in()
+    storage = S3Storage(endpoint_url, args.bucket, args.region, args.access_key, args.secret_key)
+    where = "the in-process stand-in" if stand_in else endpoint_url
+    print(f"== S3Storage against {where}, bucket {args.bucket}")
+    await check(storage, stand_in)
+    print("   Every check passed\n")
+
+    print(f"== {args.rounds} puts and gets of {args.size_kb} KB")
+    await timed(storage, "S3Storage")
+    root = tempfile.mkdtemp(prefix="yelp_bench_storage_")
+    try:
+        await timed(LocalStorage(root), "LocalStorage")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Concurrent photo upload benchmark.
+
+Uploads the same image many times in parallel, first through a copy of the old
+handler (extension check + shutil.copyfileobj on a threadpool worker) and then
+through the real POST /restaurants/{id}/photos streaming path. Reports upload
+throughput, latency and the peak Python heap seen by tracemalloc, then checks
+that an oversized body is refused with 413.
+
+Thumbnail generation is switched off unless --with-variants is given, so both
+runs measure only the upload path itself.
+
+    python benchmarks/bench_uploads.py --uploads 64 --concurrency 32 --size-mb 2
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--uploads", type=int, default=64, help="uploads per run")
+parser.add_argument("--concurrency", type=int, default=32, help="uploads in flight at once")
+parser.add_argument("--size-mb", type=float, default=2.0, help="size of each uploaded file")
+parser.add_argument("--with-variants", action="store_true", help="also generate thumbnails after each upload")
+args = parser.parse_args()
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("IMAGE_FORMATS", "webp")
+
+from _harness import make_engine, make_app, make_client, percentiles  # noqa: E402
+from fastapi import Depends, File, UploadFile  # noqa: E402
+from PIL import Image  # noqa: E402
+from app.config import MAX_UPLOAD_BYTES  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.database import get_db  # noqa: E402
+from app.models.restaurant_photo import RestaurantPhoto  # noqa: E402
+from app.services.dependencies import get_current_user  # noqa: E402
+
+
+def make_payload(size_bytes: int) -> bytes:
+    """A small valid JPEG padded out to the requested size"""
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), "red").save(buf, "JPEG")
+    data = buf.getvalue()
+    return data + b"\0" * max(size_bytes - len(data), 0)
+
+
+def add_legacy_upload(app):
+    """The pre-streaming upload handler, kept here only as the baseline"""
+    @app.post("/bench/legacy-upload/{restaurant_id}")
+    def legacy_upload(restaurant_id: int, file: UploadFile = File(...),
+                      db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+        upload_dir = f"uploads/restaurant_photos/{restaurant_id}"
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, f"{uuid.uuid4()}.jpg")
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        photo = RestaurantPhoto(restaurant_id=restaurant_id, photo_url="/" + file_path)
+        db.add(photo)
+        db.commit()
+        return {"photo_url": photo.photo_url}
+
+
+async def run(client, path, payload, headers):
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            t = time.perf_counter()
+            r = await client.post(path, files={"file": ("photo.jpg", payload, "image/jpeg")}, headers=headers)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.uploads)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, latencies, peak
+
+
+async def main():
+    app, _ = make_app(make_engine())
+    if not args.with_variants:
+        import app.routers.restaurants as restaurants_router
+        restaurants_router.schedule_variants = lambda *a, **k: None
+    add_legacy_upload(app)
+    workdir = tempfile.mkdtemp(prefix="yelp_bench_uploads_")
+    os.chdir(workdir)
+
+    payload = make_payload(int(args.size_mb * 1024 * 1024))
+    print(f"{args.uploads} uploads of {args.size_mb} MB, {args.concurrency} concurrent\n")
+
+    async with make_client(app) as client:
+        r = await client.post("/auth/signup", json={"name": "Bench", "email": "bench@example.com",
+                                                     "password": "password123", "role": "owner"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        r = await client.post("/restaurants", json={"name": "Upload Bench"}, headers=headers)
+        restaurant_id = r.json()["id"]
+
+        for label, path in (("legacy copyfileobj (baseline)", f"/bench/legacy-upload/{restaurant_id}"),
+                            ("streaming upload", f"/restaurants/{restaurant_id}/photos")):
+            elapsed, latencies, peak = await run(client, path, payload, headers)
+            mb = args.uploads * args.size_mb
+            print(f"== {label}")
+            print(f"   throughput : {args.uploads / elapsed:7.1f} uploads/s  ({mb / elapsed:.1f} MB/s)")
+            print(f"   latency    : {percentiles(latencies)}")
+            print(f"   peak heap  : {peak / (1024 * 1024):.1f} MB\n")
+
+        oversized = make_payload(MAX_UPLOAD_BYTES + 1024 * 1024)
+        r = await client.post(f"/restaurants/{restaurant_id}/photos",
+                              files={"file": ("big.jpg", oversized, "image/jpeg")}, headers=headers)
+        print(f"oversized upload ({len(oversized) // (1024 * 1024)} MB) -> {r.status_code}")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
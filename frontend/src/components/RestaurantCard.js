@@ -36,6 +36,10 @@ const CUISINE_EMOJIS = {
   'default':       '🍽️'
 };
 
+// Prefix every URL in a "url 320w, url 640w" srcset with the API host
+const withApiUrl = (srcset) =>
+  srcset && srcset.split(', ').map(entry => `${API_URL}${entry}`).join(', ');
+
 function RestaurantCard({ restaurant, isFavorite, onToggleFavorite, showFavorite = true }) {
   const navigate               = useNavigate();
   const [thumbnail, setThumbnail] = useState(null);
@@ -50,7 +54,7 @@ function RestaurantCard({ restaurant, isFavorite, onToggleFavorite, showFavorite
     getRestaurantPhotos(restaurant.id)
       .then(res => {
         if (!cancelled && res.data.length > 0) {
-          setThumbnail(res.data[0].photo_url);
+          setThumbnail(res.data[0]);
         }
       })
       .catch(() => {});
@@ -76,7 +80,9 @@ function RestaurantCard({ restaurant, isFavorite, onToggleFavorite, showFavorite
       }}>
         {thumbnail && !imgError ? (
           <img
-            src={`${API_URL}${thumbnail}`}
+            src={`${API_URL}${thumbnail.photo_url}`}
+            srcSet={withApiUrl(thumbnail.srcset?.webp || thumbnail.srcset?.jpeg)}
+            sizes="(max-width: 768px) 100vw, 33vw"
             alt={restaurant.name}
             onError={() => setImgError(true)}
             style={{
@@ -8,7 +8,7 @@ import {
 } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 
-function RestaurantPhotos({ restaurantId, ownerId }) {
+function RestaurantPhotos({ restaurantId, ownerId, initialPhotos }) {
   const { user }                      = useAuth();
   const [photos, setPhotos]           = useState([]);
   const [loading, setLoading]         = useState(true);
@@ -19,8 +19,14 @@ function RestaurantPhotos({ restaurantId, ownerId }) {
   const isOwner = user && user.id === ownerId;
 
   useEffect(() => {
-    fetchPhotos();
-  }, [restaurantId]);
+    // The detail page already has them from its one request
+    if (initialPhotos) {
+      setPhotos(initialPhotos);
+      setLoading(false);
+    } else {
+      fetchPhotos();
+    }
+  }, [restaurantId, initialPhotos]);
 
   const fetchPhotos = async () => {
     setLoading(true);
@@ -38,7 +38,7 @@ function AddRestaurantPage() {
 
   const AMENITIES_OPTIONS = [
     'wifi', 'outdoor_seating', 'parking', 'bar',
-    'vegan_friendly', 'halal', 'family_friendly',
+    'vegan_friendly', 'vegetarian', 'gluten_free', 'halal', 'family_friendly',
     'romantic', 'live_music', 'delivery', 'takeout',
     'reservations', 'wheelchair_accessible'
   ];
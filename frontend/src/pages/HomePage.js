@@ -1,16 +1,20 @@
 import React, { useState, useEffect, useCallback } from 'react';
+import { useNavigate } from 'react-router-dom';
 import {
   Container, Row, Col, Form, Button,
-  InputGroup, Spinner, Alert
+  InputGroup, Spinner, Alert, ListGroup
 } from 'react-bootstrap';
 import { FaSearch, FaFilter } from 'react-icons/fa';
 import { useAuth } from '../context/AuthContext';
-import { getRestaurants, addFavorite, removeFavorite, getMyFavorites } from '../services/api';
+import {
+  getRestaurants, getMyFeed, getAutocomplete, addFavorite, removeFavorite, getFavoriteStatus
+} from '../services/api';
 import RestaurantCard from '../components/RestaurantCard';
 import AIChatbot from '../components/AIChatbot';
 
 function HomePage() {
   const { user }                          = useAuth();
+  const navigate                          = useNavigate();
   const [restaurants, setRestaurants]     = useState([]);
   const [favorites, setFavorites]         = useState([]);
   const [loading, setLoading]             = useState(true);
@@ -22,7 +26,12 @@ function HomePage() {
   const [cuisineFilter, setCuisineFilter] = useState('');
   const [priceFilter, setPriceFilter]     = useState('');
   const [cityFilter, setCityFilter]       = useState('');
+  const [amenityFilter, setAmenityFilter] = useState('');
+  const [openNow, setOpenNow]             = useState(false);
+  const [facets, setFacets]               = useState(null);
   const [page, setPage]                   = useState(0);
+  const [suggestions, setSuggestions]     = useState(null);
+  const [typing, setTyping]               = useState(false);
   const LIMIT = 9;
 
   const fetchRestaurants = useCallback(async () => {
@@ -32,34 +41,68 @@ function HomePage() {
       const params = {
         skip: page * LIMIT,
         limit: LIMIT,
-        ...(search       && { name: search }),
+        ...(search       && { name: search, fuzzy: true }),
         ...(cuisineFilter && { cuisine_type: cuisineFilter }),
         ...(priceFilter   && { price_tier: priceFilter }),
         ...(cityFilter    && { city: cityFilter }),
+        ...(amenityFilter && { amenities: amenityFilter }),
+        ...(openNow       && { open_now: true }),
       };
-      const res = await getRestaurants(params);
+      // Signed-in users with no search or filters get their personalized feed
+      const showFeed = user && !search && !cuisineFilter && !priceFilter && !cityFilter && !amenityFilter && !openNow;
+      const res = showFeed ? await getMyFeed(params) : await getRestaurants({ ...params, facets: true });
       setRestaurants(res.data.restaurants);
       setTotalCount(res.data.total);
+      setFacets(res.data.facets || null);
     } catch {
       setError('Failed to load restaurants. Is the backend running?');
     } finally {
       setLoading(false);
     }
-  }, [search, cuisineFilter, priceFilter, cityFilter, page]);
+  }, [user, search, cuisineFilter, priceFilter, cityFilter, amenityFilter, openNow, page]);
+
+  // "Italian (12)" — how many results picking an option would give, when the search returned facet counts
+  const withCount = (facet, value, label = value) => {
+    const match = facets?.[facet]?.find(f => f.value.toLowerCase() === value.toLowerCase());
+    return facets ? `${label} (${match ? match.count : 0})` : label;
+  };
 
+  // Favorite state of just the restaurants on this page, in one request
   const fetchFavorites = useCallback(async () => {
-    if (!user) return;
+    if (!user || restaurants.length === 0) return;
     try {
-      const res = await getMyFavorites();
-      setFavorites(res.data.map(f => f.restaurant_id));
+      const res = await getFavoriteStatus(restaurants.map(r => r.id));
+      setFavorites(res.data.statuses.filter(s => s.is_favorite).map(s => s.restaurant_id));
     } catch { /* not logged in */ }
-  }, [user]);
+  }, [user, restaurants]);
 
   useEffect(() => { fetchRestaurants(); }, [fetchRestaurants]);
   useEffect(() => { fetchFavorites(); }, [fetchFavorites]);
 
+  // Typeahead — suggestions for what's in the search box, once typing pauses
+  useEffect(() => {
+    if (!typing || !search.trim()) { setSuggestions(null); return; }
+    const timer = setTimeout(async () => {
+      try {
+        const res = await getAutocomplete(search);
+        setSuggestions(res.data);
+      } catch { setSuggestions(null); }
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [search, typing]);
+
+  const pickSuggestion = (kind, value) => {
+    setTyping(false);
+    if (kind === 'restaurant') { navigate(`/restaurants/${value}`); return; }
+    setSearch('');
+    if (kind === 'city') setCityFilter(value);
+    else setCuisineFilter(value);
+    setPage(0);
+  };
+
   const handleSearch = (e) => {
     e.preventDefault();
+    setTyping(false);
     setPage(0);
     fetchRestaurants();
   };
@@ -69,6 +112,8 @@ function HomePage() {
     setCuisineFilter('');
     setPriceFilter('');
     setCityFilter('');
+    setAmenityFilter('');
+    setOpenNow(false);
     setPage(0);
   };
 
@@ -101,12 +146,13 @@ function HomePage() {
                 Discover great places to eat, read reviews, and get AI-powered recommendations.
               </p>
               {/* Main Search Bar */}
-              <Form onSubmit={handleSearch}>
+              <Form onSubmit={handleSearch} className="position-relative">
                 <InputGroup size="lg">
                   <Form.Control
                     placeholder="Search restaurants, cuisines, or keywords..."
                     value={search}
-                    onChange={(e) => setSearch(e.target.value)}
+                    onChange={(e) => { setSearch(e.target.value); setTyping(true); }}
+                    onBlur={() => setTimeout(() => setTyping(false), 150)}
                     style={{ borderRadius: '30px 0 0 30px' }}
                   />
                   <Button
@@ -117,6 +163,25 @@ function HomePage() {
                     <FaSearch />
                   </Button>
                 </InputGroup>
+                {typing && suggestions && (
+                  <ListGroup className="position-absolute shadow" style={{ zIndex: 10, minWidth: '50%' }}>
+                    {suggestions.restaurants.map(r => (
+                      <ListGroup.Item action key={`r${r.id}`} onMouseDown={() => pickSuggestion('restaurant', r.id)}>
+                        {r.name} <small className="text-muted">· {r.city} · ★ {r.avg_rating.toFixed(1)}</small>
+                      </ListGroup.Item>
+                    ))}
+                    {suggestions.cities.map(c => (
+                      <ListGroup.Item action key={`c${c.value}`} onMouseDown={() => pickSuggestion('city', c.value)}>
+                        📍 {c.value} <small className="text-muted">({c.count})</small>
+                      </ListGroup.Item>
+                    ))}
+                    {suggestions.cuisines.map(c => (
+                      <ListGroup.Item action key={`k${c.value}`} onMouseDown={() => pickSuggestion('cuisine', c.value)}>
+                        🍴 {c.value} <small className="text-muted">({c.count})</small>
+                      </ListGroup.Item>
+                    ))}
+                  </ListGroup>
+                )}
               </Form>
             </Col>
           </Row>
@@ -137,14 +202,10 @@ function HomePage() {
                 onChange={(e) => { setCuisineFilter(e.target.value); setPage(0); }}
               >
                 <option value="">All Cuisines</option>
-                <option>Italian</option>
-                <option>Mexican</option>
-                <option>Chinese</option>
-                <option>Japanese</option>
-                <option>Indian</option>
-                <option>American</option>
-                <option>French</option>
-                <option>Mediterranean</option>
+                {['Italian', 'Mexican', 'Chinese', 'Japanese', 'Indian', 'American', 'French', 'Mediterranean']
+                  .map(cuisine => (
+                    <option key={cuisine} value={cuisine}>{withCount('cuisine_type', cuisine)}</option>
+                  ))}
               </Form.Select>
 
               <Form.Select
@@ -154,21 +215,53 @@ function HomePage() {
                 onChange={(e) => { setPriceFilter(e.target.value); setPage(0); }}
               >
                 <option value="">Any Price</option>
-                <option value="$">$ Budget</option>
-                <option value="$$">$$ Moderate</option>
-                <option value="$$$">$$$ Upscale</option>
-                <option value="$$$$">$$$$ Fine Dining</option>
+                <option value="$">{withCount('price_tier', '$', '$ Budget')}</option>
+                <option value="$$">{withCount('price_tier', '$$', '$$ Moderate')}</option>
+                <option value="$$$">{withCount('price_tier', '$$$', '$$$ Upscale')}</option>
+                <option value="$$$$">{withCount('price_tier', '$$$$', '$$$$ Fine Dining')}</option>
               </Form.Select>
 
+              {facets?.amenities?.length > 0 && (
+                <Form.Select
+                  size="sm"
+                  style={{ width: 'auto' }}
+                  value={amenityFilter}
+                  onChange={(e) => { setAmenityFilter(e.target.value); setPage(0); }}
+                >
+                  <option value="">Any Amenity</option>
+                  {facets.amenities.map(a => (
+                    <option key={a.value} value={a.value}>
+                      {withCount('amenities', a.value, a.value.replace(/_/g, ' '))}
+                    </option>
+                  ))}
+                </Form.Select>
+              )}
+
               <Form.Control
                 size="sm"
                 placeholder="City..."
                 style={{ width: '130px' }}
                 value={cityFilter}
                 onChange={(e) => { setCityFilter(e.target.value); setPage(0); }}
+                list="city-facets"
+              />
+              <datalist id="city-facets">
+                {facets?.city?.map(c => (
+                  <option key={c.value} value={c.value}>{`${c.value} (${c.count})`}</option>
+                ))}
+              </datalist>
+
+              <Form.Check
+                type="switch"
+                id="open-now"
+                label="Open now"
+                className="mb-0"
+                style={{ fontSize: '0.85rem' }}
+                checked={openNow}
+                onChange={(e) => { setOpenNow(e.target.checked); setPage(0); }}
               />
 
-              {(search || cuisineFilter || priceFilter || cityFilter) && (
+              {(search || cuisineFilter || priceFilter || cityFilter || amenityFilter || openNow) && (
                 <Button
                   variant="outline-secondary"
                   size="sm"
@@ -9,7 +9,7 @@ import {
 } from 'react-icons/fa';
 import { useNavigate } from 'react-router-dom';
 import {
-  getOwnerRestaurants, getOwnerDashboard,
+  getOwnerRestaurants, getOwnerDashboard, getOwnerTrends,
   getOwnerReviews, updateOwnerRestaurant,
   claimRestaurant, getRestaurants
 } from '../services/api';
@@ -23,6 +23,7 @@ function OwnerDashboardPage() {
   const [restaurants, setRestaurants]       = useState([]);
   const [selectedRestaurant, setSelected]   = useState(null);
   const [dashboard, setDashboard]           = useState(null);
+  const [trends, setTrends]                 = useState(null);
   const [reviews, setReviews]               = useState([]);
   const [loading, setLoading]               = useState(true);
   const [dashLoading, setDashLoading]       = useState(false);
@@ -70,14 +71,17 @@ function OwnerDashboardPage() {
     setSelected(restaurant);
     setDashLoading(true);
     try {
-      const [dashRes, reviewsRes] = await Promise.all([
+      const [dashRes, reviewsRes, trendsRes] = await Promise.all([
         getOwnerDashboard(restaurant.id),
-        getOwnerReviews(restaurant.id)
+        getOwnerReviews(restaurant.id),
+        getOwnerTrends(restaurant.id, { period: 'week' })
       ]);
       setDashboard(dashRes.data);
       setReviews(reviewsRes.data);
+      setTrends(trendsRes.data);
     } catch {
       setDashboard(null);
+      setTrends(null);
     } finally {
       setDashLoading(false);
     }
@@ -157,6 +161,9 @@ function OwnerDashboardPage() {
     }
   };
 
+  // Sentiment from the review text analysis once it has run, star ratings until then
+  const textSentiment = dashboard?.sentiment?.source === 'review_text';
+
   if (loading) return (
     <div className="loading-container">
       <Spinner animation="border" variant="danger" />
@@ -403,7 +410,7 @@ function OwnerDashboardPage() {
                                     😊 Positive
                                   </div>
                                   <div style={{ fontSize: '0.8rem', color: '#666' }}>
-                                    4–5 star reviews
+                                    {textSentiment ? 'Review text' : '4–5 star reviews'}
                                   </div>
                                 </div>
                                 <div style={{ fontSize: '1.5rem', fontWeight: 700,
@@ -418,7 +425,7 @@ function OwnerDashboardPage() {
                                     😐 Neutral
                                   </div>
                                   <div style={{ fontSize: '0.8rem', color: '#666' }}>
-                                    3 star reviews
+                                    {textSentiment ? 'Review text' : '3 star reviews'}
                                   </div>
                                 </div>
                                 <div style={{ fontSize: '1.5rem', fontWeight: 700,
@@ -433,7 +440,7 @@ function OwnerDashboardPage() {
                                     😞 Negative
                                   </div>
                                   <div style={{ fontSize: '0.8rem', color: '#666' }}>
-                                    1–2 star reviews
+                                    {textSentiment ? 'Review text' : '1–2 star reviews'}
                                   </div>
                                 </div>
                                 <div style={{ fontSize: '1.5rem', fontWeight: 700,
@@ -442,10 +449,69 @@ function OwnerDashboardPage() {
                                 </div>
                               </div>
                             </div>
+                            {dashboard.highlights?.length > 0 && (
+                              <div className="mt-3">
+                                <div style={{ fontSize: '0.8rem', color: '#666' }} className="mb-2">
+                                  Reviewers mention
+                                </div>
+                                <div className="d-flex flex-wrap gap-2">
+                                  {dashboard.highlights.map(h => (
+                                    <Badge key={h.phrase}
+                                      bg={h.sentiment > 0.2 ? 'success' : h.sentiment < -0.2 ? 'danger' : 'secondary'}>
+                                      {h.phrase} ({h.mentions})
+                                    </Badge>
+                                  ))}
+                                </div>
+                              </div>
+                            )}
                           </Card.Body>
                         </Card>
                       </Col>
                     </Row>
+
+                    {/* Weekly Trend — from the review rollups */}
+                    {trends && (
+                      <Card className="border-0 shadow-sm mb-4">
+                        <Card.Body>
+                          <div className="d-flex justify-content-between mb-3">
+                            <h6 className="mb-0">Last 12 Weeks</h6>
+                            <span className="text-muted" style={{ fontSize: '0.85rem' }}>
+                              {trends.total_reviews} reviews
+                              {trends.avg_rating != null && ` · ${trends.avg_rating.toFixed(1)}★ avg`}
+                            </span>
+                          </div>
+                          <div className="d-flex align-items-end gap-1" style={{ height: 120 }}>
+                            {trends.buckets.map(bucket => {
+                              const most = Math.max(...trends.buckets.map(b => b.review_count), 1);
+                              return (
+                                <div key={bucket.bucket_start}
+                                  className="flex-grow-1 d-flex flex-column align-items-center justify-content-end"
+                                  style={{ height: '100%' }}
+                                  title={`Week of ${bucket.bucket_start}: ${bucket.review_count} reviews`
+                                    + (bucket.avg_rating != null ? `, ${bucket.avg_rating}★ avg` : '')}>
+                                  <span style={{ fontSize: '0.7rem', color: '#666' }}>
+                                    {bucket.avg_rating != null ? bucket.avg_rating.toFixed(1) : ''}
+                                  </span>
+                                  <div style={{
+                                    width: '100%',
+                                    height: `${(bucket.review_count / most) * 90}%`,
+                                    minHeight: bucket.review_count > 0 ? 4 : 0,
+                                    background: bucket.avg_rating >= 4 ? '#2d6a4f'
+                                      : bucket.avg_rating >= 3 ? '#f5a623' : '#d32323',
+                                    borderRadius: 4
+                                  }} />
+                                </div>
+                              );
+                            })}
+                          </div>
+                          <div className="d-flex justify-content-between mt-1 text-muted"
+                            style={{ fontSize: '0.75rem' }}>
+                            <span>{trends.buckets[0]?.bucket_start}</span>
+                            <span>{trends.buckets[trends.buckets.length - 1]?.bucket_start}</span>
+                          </div>
+                        </Card.Body>
+                      </Card>
+                    )}
                   </Tab>
 
                   {/* Reviews Tab */}
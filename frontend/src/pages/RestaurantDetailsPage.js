@@ -10,8 +10,8 @@ import {
   FaGlobe, FaMapMarkerAlt, FaClock, FaEdit, FaTrash
 } from 'react-icons/fa';
 import {
-  getRestaurant, getReviews, createReview, updateReview,
-  deleteReview, addFavorite, removeFavorite, getMyFavorites
+  getRestaurantDetails, getReviews, createReview, updateReview,
+  deleteReview, addFavorite, removeFavorite
 } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import StarRating from '../components/StarRating';
@@ -24,7 +24,11 @@ function RestaurantDetailsPage() {
   // Data state
   const [restaurant, setRestaurant]   = useState(null);
   const [reviews, setReviews]         = useState([]);
+  const [photos, setPhotos]           = useState([]);
+  const [ratingDistribution, setRatingDistribution] = useState({});
+  const [userReview, setUserReview]   = useState(null);
   const [isFavorite, setIsFavorite]   = useState(false);
+  const [loadingAllReviews, setLoadingAllReviews] = useState(false);
   const [loading, setLoading]         = useState(true);
   const [error, setError]             = useState('');
 
@@ -39,24 +43,22 @@ function RestaurantDetailsPage() {
   const [showDeleteModal, setShowDeleteModal] = useState(false);
   const [deletingReviewId, setDeletingReviewId] = useState(null);
 
-  // Fetch restaurant + reviews + favorites
+  // Fetch restaurant, photos, first page of reviews and our favorite / review status in one call
   useEffect(() => {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const [restaurantRes, reviewsRes] = await Promise.all([
-          getRestaurant(id),
-          getReviews(id)
-        ]);
-        setRestaurant(restaurantRes.data);
-        setReviews(reviewsRes.data);
-
-        // Check if favorited
-        if (user) {
-          const favRes = await getMyFavorites();
-          const favIds = favRes.data.map(f => f.restaurant_id);
-          setIsFavorite(favIds.includes(parseInt(id)));
-        }
+        const { data } = await getRestaurantDetails(id);
+        const ownReview = data.viewer?.review || null;
+        setRestaurant(data.restaurant);
+        setPhotos(data.photos);
+        setRatingDistribution(data.rating_distribution);
+        // Our own review goes first if it isn't on the first page
+        setReviews(ownReview && !data.reviews.some(r => r.id === ownReview.id)
+          ? [ownReview, ...data.reviews]
+          : data.reviews);
+        setUserReview(ownReview);
+        setIsFavorite(data.viewer?.is_favorite || false);
       } catch {
         setError('Restaurant not found.');
       } finally {
@@ -66,6 +68,25 @@ function RestaurantDetailsPage() {
     fetchData();
   }, [id, user]);
 
+  // New avg_rating, review_count and rating breakdown after a review change
+  const refreshSummary = async () => {
+    const { data } = await getRestaurantDetails(id, { review_limit: 0 });
+    setRestaurant(data.restaurant);
+    setRatingDistribution(data.rating_distribution);
+  };
+
+  const handleShowAllReviews = async () => {
+    setLoadingAllReviews(true);
+    try {
+      const res = await getReviews(id);
+      setReviews(res.data);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingAllReviews(false);
+    }
+  };
+
   const handleToggleFavorite = async () => {
     if (!user) return navigate('/login');
     try {
@@ -92,16 +113,15 @@ function RestaurantDetailsPage() {
         setReviews(prev =>
           prev.map(r => r.id === editingReview.id ? res.data : r)
         );
-        // Refresh restaurant to get updated avg_rating
-        const rRes = await getRestaurant(id);
-        setRestaurant(rRes.data);
+        setUserReview(res.data);
       } else {
         // Create new review
         const res = await createReview(id, reviewForm);
         setReviews(prev => [res.data, ...prev]);
-        const rRes = await getRestaurant(id);
-        setRestaurant(rRes.data);
+        setUserReview(res.data);
       }
+      // Refresh restaurant to get updated avg_rating
+      await refreshSummary();
       setShowReviewForm(false);
       setEditingReview(null);
       setReviewForm({ rating: 5, comment: '' });
@@ -122,8 +142,8 @@ function RestaurantDetailsPage() {
     try {
       await deleteReview(id, deletingReviewId);
       setReviews(prev => prev.filter(r => r.id !== deletingReviewId));
-      const rRes = await getRestaurant(id);
-      setRestaurant(rRes.data);
+      setUserReview(null);
+      await refreshSummary();
     } catch (err) {
       console.error(err);
     } finally {
@@ -139,8 +159,6 @@ function RestaurantDetailsPage() {
     setReviewError('');
   };
 
-  const userReview = reviews.find(r => r.user_id === user?.id);
-
   if (loading) return (
     <div className="loading-container">
       <Spinner animation="border" variant="danger" />
@@ -265,6 +283,7 @@ function RestaurantDetailsPage() {
                 <RestaurantPhotos
                 restaurantId={parseInt(id)}
                 ownerId={restaurant.owner_id}
+                initialPhotos={photos}
                 />
             </Card.Body>
             </Card>
@@ -350,7 +369,7 @@ function RestaurantDetailsPage() {
               <Card.Body>
                 <div className="d-flex justify-content-between align-items-center mb-3">
                   <h5 className="mb-0">
-                    Reviews ({reviews.length})
+                    Reviews ({restaurant.review_count || 0})
                   </h5>
                   {user && !userReview && !showReviewForm && (
                     <Button
@@ -419,6 +438,21 @@ function RestaurantDetailsPage() {
                     </div>
                   ))
                 )}
+
+                {reviews.length < (restaurant.review_count || 0) && (
+                  <div className="text-center">
+                    <Button
+                      variant="outline-secondary"
+                      size="sm"
+                      onClick={handleShowAllReviews}
+                      disabled={loadingAllReviews}
+                    >
+                      {loadingAllReviews
+                        ? <Spinner animation="border" size="sm" />
+                        : `Show all ${restaurant.review_count} reviews`}
+                    </Button>
+                  </div>
+                )}
               </Card.Body>
             </Card>
           </Col>
@@ -490,14 +524,15 @@ function RestaurantDetailsPage() {
             </Card>
 
             {/* Rating Breakdown */}
-            {reviews.length > 0 && (
+            {restaurant.review_count > 0 && (
               <Card className="border-0 shadow-sm">
                 <Card.Body>
                   <h5 className="mb-3">Rating Breakdown</h5>
                   {[5, 4, 3, 2, 1].map(star => {
-                    const count = reviews.filter(r => r.rating === star).length;
-                    const pct   = reviews.length > 0
-                      ? Math.round((count / reviews.length) * 100)
+                    const total = Object.values(ratingDistribution).reduce((a, b) => a + b, 0);
+                    const count = ratingDistribution[star] || 0;
+                    const pct   = total > 0
+                      ? Math.round((count / total) * 100)
                       : 0;
                     return (
                       <div key={star} className="d-flex align-items-center gap-2 mb-1">
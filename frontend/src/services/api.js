@@ -22,6 +22,7 @@ export const getMe  = ()      => api.get('/auth/me');
 // ── User Profile ──────────────────────────────────────────────
 export const getProfile       = ()     => api.get('/users/profile');
 export const updateProfile    = (data) => api.put('/users/profile', data);
+export const getUserSummaries = (ids)  => api.get('/users/batch', { params: { ids: ids.join(',') } });
 export const uploadProfilePic = (file) => {
   const formData = new FormData();
   formData.append('file', file);
@@ -38,10 +39,16 @@ export const updatePreferences = (data) => api.put('/users/preferences', data);
 export const getRestaurants = (params) =>
   api.get('/restaurants', { params });
 export const getRestaurant  = (id)     => api.get(`/restaurants/${id}`);
+export const getRestaurantDetails = (id, params) =>
+  api.get(`/restaurants/${id}/details`, { params });
+export const getRestaurantsByIds = (ids) =>
+  api.get('/restaurants/batch', { params: { ids: ids.join(',') } });
+export const getAutocomplete = (q)     => api.get('/restaurants/autocomplete', { params: { q } });
 export const createRestaurant = (data) => api.post('/restaurants', data);
 export const updateRestaurant = (id, data) => api.put(`/restaurants/${id}`, data);
 export const deleteRestaurant = (id)   => api.delete(`/restaurants/${id}`);
 export const getMyRestaurants = ()     => api.get('/restaurants/me/listings');
+export const getMyFeed = (params)        => api.get('/users/me/feed', { params });
 
 // ── Reviews ───────────────────────────────────────────────────
 export const getReviews    = (restaurantId)         =>
@@ -60,6 +67,8 @@ export const addFavorite    = (restaurantId) =>
 export const removeFavorite = (restaurantId) =>
   api.delete(`/restaurants/${restaurantId}/favorite`);
 export const getMyFavorites = () => api.get('/users/me/favorites');
+export const getFavoriteStatus = (restaurantIds) =>
+  api.get('/users/me/favorites/status', { params: { ids: restaurantIds.join(',') } });
 export const getMyHistory   = () => api.get('/users/me/history');
 
 // ── Owner ─────────────────────────────────────────────────────
@@ -70,6 +79,8 @@ export const claimRestaurant = (data)     => api.post('/owner/claim', data);
 export const getOwnerReviews = (id)       =>
   api.get(`/owner/restaurants/${id}/reviews`);
 export const getOwnerDashboard = (id)     => api.get(`/owner/dashboard/${id}`);
+export const getOwnerTrends = (id, params) =>
+  api.get(`/owner/dashboard/${id}/trends`, { params });
 
 // ── AI Assistant ──────────────────────────────────────────────
 export const sendChatMessage = (message, conversationHistory) =>